@@ -17,11 +17,16 @@ import logging
 
 from django.contrib import admin
 from django.contrib.auth import get_user_model
+from django.db.models import Max, Min, Prefetch
 from rangefilter.filter import DateTimeRangeFilter
 
 from mail_collector.models import ExchangeConfiguration
 from orion_flash.orion.api import DestSwis
 from p_soc_auto_base.admin import BaseAdmin
+from p_soc_auto_base.changelist import (
+    CachedAllValuesFieldListFilter, ComputedColumnsMixin,
+    LargeTableAdminMixin,
+)
 from .models import (AllowedEventSource, BorgSite, BorgSiteNotSeen, CitrixHost,
                      EventCluster, KnownBrokeringDevice,
                      KnownBrokeringDeviceNotSeen, WinlogEvent,
@@ -182,7 +187,8 @@ class BorgSiteNotSeenAdmin(BorgSiteAdmin):
 
 
 @admin.register(EventCluster)
-class EventClusterAdmin(CitrusBorgBaseAdmin, admin.ModelAdmin):
+class EventClusterAdmin(
+        ComputedColumnsMixin, CitrusBorgBaseAdmin, admin.ModelAdmin):
     """
     :class:`django.contrib.admin.ModelAdmin` class for the
     :class:`citrus_borg.models.EventCluster`
@@ -192,6 +198,14 @@ class EventClusterAdmin(CitrusBorgBaseAdmin, admin.ModelAdmin):
     list_filter = ('enabled', )
     readonly_fields = ('enabled', 'bots', 'end_time', 'start_time',
                        'updated_by', 'uuid')
+    list_annotations = {
+        'first_event': Min('winlogevent__timestamp'),
+        'last_event': Max('winlogevent__timestamp'),
+    }
+    list_prefetch_related = (
+        Prefetch('winlogevent_set',
+                 queryset=WinlogEvent.objects.select_related('source_host')),
+    )
 
     # For the admin framework to use these functions properly they cannot be
     # static, despite not actually using the self variable.
@@ -206,6 +220,26 @@ class EventClusterAdmin(CitrusBorgBaseAdmin, admin.ModelAdmin):
         """
         return [str(event.source_host) for event in obj.winlogevent_set.all()]
 
+    def start_time(self, obj):
+        """
+        Earliest time of an event in the cluster, from the annotation.
+
+        :param obj: The EventCluster being displayed
+        :return: The timestamp of the first event in the cluster
+        """
+        return obj.first_event
+    start_time.admin_order_field = 'first_event'
+
+    def end_time(self, obj):
+        """
+        Latest time of an event in the cluster, from the annotation.
+
+        :param obj: The EventCluster being displayed
+        :return: The timestamp of the last event in the cluster
+        """
+        return obj.last_event
+    end_time.admin_order_field = 'last_event'
+
     def alert_sent(self, obj):
         """
         Wrapper for enabled, to make the meaning more clear to the end user.
@@ -313,11 +347,14 @@ class WinlogbeatHostNotSeenAdmin(WinlogbeatHostAdmin):
 
 
 @admin.register(WinlogEvent)
-class WinlogEventAdmin(CitrusBorgBaseAdmin, admin.ModelAdmin):
+class WinlogEventAdmin(
+        LargeTableAdminMixin, CitrusBorgBaseAdmin, admin.ModelAdmin):
     """
     :class:`django.contrib.admin.ModelAdmin` class for the
     :class:`citrus_borg.models.WinlogEvent`
     """
+    keyset_field = 'created_on'
+    list_select_related = ('source_host', 'xml_broker', )
 
     def has_add_permission(self, request):
         """
@@ -352,8 +389,10 @@ class WinlogEventAdmin(CitrusBorgBaseAdmin, admin.ModelAdmin):
         'receiver_startup_duration', 'connection_achieved_duration',
         'logon_achieved_duration', 'logoff_achieved_duration',
     )
-    list_filter = ('event_state', 'source_host__host_name',
-                   'source_host__site__site',
-                   'xml_broker__broker_name',
+    list_filter = (('event_state', CachedAllValuesFieldListFilter),
+                   ('source_host__host_name', CachedAllValuesFieldListFilter),
+                   ('source_host__site__site', CachedAllValuesFieldListFilter),
+                   ('xml_broker__broker_name',
+                    CachedAllValuesFieldListFilter),
                    ('created_on', DateTimeRangeFilter),
                    'is_expired',)
@@ -0,0 +1,161 @@
+"""
+citrus_borg.benchmarks
+----------------------
+
+Query benchmarks for the :ref:`Citrus Borg Application`
+
+See :mod:`p_soc_auto_base.benchmark`.
+
+This module also contains micro-benchmarks for the event parsers in
+:mod:`citrus_borg.locutus.assimilation`. The `legacy` benchmarks run the
+copies of the parsers as they were before :mod:`citrus_borg.locutus.records`
+was introduced, kept in :mod:`citrus_borg.test_tools`, on the same samples:
+the `Exchange` events saved in `research/horsey.txt` and the `ControlUp`
+messages in :mod:`citrus_borg.test_tools`.
+
+:copyright:
+
+    Copyright 2018 - 2020 Provincial Health Service Authority
+    of British Columbia
+
+:contact:    daniel.busto@phsa.ca
+"""
+import json
+import os
+
+from citrus_borg import test_tools
+from citrus_borg.dynamic_preferences_registry import get_preference
+from citrus_borg.locutus.assimilation import (
+    parse_exchange_message, process_borg_message,
+)
+from citrus_borg.locutus.communication import (
+    GroupBy, get_dead_bots, get_dead_brokers, get_dead_sites,
+    login_states_by_site_host_hour, raise_ux_alarm,
+)
+from p_soc_auto_base.benchmark import benchmark
+
+
+@benchmark()
+def ux_alarm_by_minute():
+    """
+    the query behind the `Citrix` user experience alerts
+    """
+    list(raise_ux_alarm(
+        group_by=GroupBy.MINUTE,
+        time_delta=get_preference('citrusborgux__ux_alert_interval'),
+        ux_alert_threshold=get_preference(
+            'citrusborgux__ux_alert_threshold')))
+
+
+@benchmark()
+def ux_alarm_by_hour_with_counts():
+    """
+    the query behind the `Citrix` user experience reports
+    """
+    list(raise_ux_alarm(
+        group_by=GroupBy.HOUR, include_event_counts=True,
+        time_delta=get_preference(
+            'citrusborgevents__ignore_events_older_than'),
+        ux_alert_threshold=get_preference(
+            'citrusborgux__ux_alert_threshold')))
+
+
+@benchmark()
+def login_states_by_hour():
+    """
+    the query behind the hourly login state reports
+    """
+    list(login_states_by_site_host_hour(
+        time_delta=get_preference(
+            'citrusborgevents__ignore_events_older_than')))
+
+
+@benchmark()
+def dead_bots():
+    """
+    the query behind the dead `Citrix` bots alerts
+    """
+    list(get_dead_bots())
+
+
+@benchmark()
+def dead_brokers():
+    """
+    the query behind the dead `Citrix` session hosts alerts
+    """
+    list(get_dead_brokers())
+
+
+@benchmark()
+def dead_sites():
+    """
+    the query behind the dead `Citrix` bot sites alerts
+    """
+    list(get_dead_sites())
+
+
+PARSER_ROUNDS = 1000
+"""how many times the parser benchmarks parse each sample"""
+
+EXCHANGE_SAMPLES_FILE = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    'research', 'horsey.txt')
+
+CONTROLUP_SAMPLES = (test_tools.PASS_MSG, test_tools.FAIL_MSG)
+
+
+def exchange_samples():
+    """
+    :returns: the `Mail Borg` event messages saved in
+        :attr:`EXCHANGE_SAMPLES_FILE`
+    :rtype: list
+    """
+    marker = 'event_data param1 '
+    with open(EXCHANGE_SAMPLES_FILE) as samples:
+        return [json.loads(line.split(marker, 1)[1])
+                for line in samples if marker in line]
+
+
+def _parse_all(parser, samples):
+    """
+    parse each sample :attr:`PARSER_ROUNDS` times
+    """
+    for _ in range(PARSER_ROUNDS):
+        for sample in samples:
+            parser(sample)
+
+
+@benchmark()
+def parse_controlup():
+    """
+    parse the `ControlUp` samples with
+    :func:`citrus_borg.locutus.assimilation.process_borg_message`
+    """
+    _parse_all(process_borg_message, CONTROLUP_SAMPLES)
+
+
+@benchmark()
+def parse_controlup_legacy():
+    """
+    parse the `ControlUp` samples with
+    :func:`citrus_borg.test_tools.legacy_process_borg_message`
+    """
+    _parse_all(test_tools.legacy_process_borg_message, CONTROLUP_SAMPLES)
+
+
+@benchmark()
+def parse_exchange():
+    """
+    parse the `Exchange` samples with
+    :func:`citrus_borg.locutus.assimilation.parse_exchange_message`
+    """
+    _parse_all(parse_exchange_message, exchange_samples())
+
+
+@benchmark()
+def parse_exchange_legacy():
+    """
+    parse the `Exchange` samples with
+    :func:`citrus_borg.test_tools.legacy_parse_exchange_message`
+    """
+    _parse_all(test_tools.legacy_parse_exchange_message, exchange_samples())
@@ -37,8 +37,8 @@ from event_consumer import message_handler
 
 from citrus_borg.dynamic_preferences_registry import get_list_preference
 from mail_collector.tasks import store_mail_data
+from p_soc_auto_base import identity
 
-from .models import AllowedEventSource
 from .tasks import process_citrix_login
 
 LOG = get_task_logger(__name__)
@@ -80,8 +80,7 @@ def process_win_event(body):
 
     borg = json.loads(body)
     source_name = borg.get('source_name', None)
-    if source_name not in list(
-            AllowedEventSource.objects.values_list('source_name', flat=True)):
+    if identity.EVENT_SOURCES.get_or_none(source_name) is None:
         LOG.info('%s is not a monitored event source', source_name)
         return
 
@@ -24,6 +24,11 @@ function. For example:
 
     In [3]:
 
+Never read a preference at import time, e.g. in a module constant, a class
+attribute or the default value of a function argument. Such values are read
+once per process, from the database, while the process starts; use `None`
+as the default and call :func:`get_cached_preference` in the function body.
+
 :copyright:
 
     Copyright 2019 Provincial Health Service Authority
@@ -33,8 +38,10 @@ function. For example:
 
 """
 import decimal
+import time
 
 from django.conf import settings
+from django.core.cache import cache
 from django.utils import timezone
 from django.utils.html import format_html
 from django.utils.translation import gettext_lazy as _
@@ -177,6 +184,29 @@ class AlertArgsInfoLevel(StringPreference):
     """verbose name of this dynamic preference"""
 
 
+@global_preferences_registry.register
+class AlertCoalesceWindow(DurationPreference):
+    """
+    Dynamic preferences class controlling the coalescing window for per
+    event alerts
+
+    Only the first alert about the same entity is sent within this window.
+    The other alerts are sent together in a digest when the window closes.
+    Set to 0 to send every alert.
+
+    See :func:`p_soc_auto_base.alerts.coalesce_alert`.
+
+    :access_key: 'commonalertargs__coalesce_window'
+    """
+    section = COMMON_ALERT_ARGS
+    name = 'coalesce_window'
+    default = timezone.timedelta(minutes=15)
+    """default setting value"""
+    required = False
+    verbose_name = _('Coalescing window for repeated alerts')
+    """verbose name of this dynamic preference"""
+
+
 @global_preferences_registry.register
 class AlertArgsCriticalLevel(StringPreference):
     """
@@ -858,6 +888,25 @@ class ServiceUser(StringPreference):
         _('will be created automatically if it does not exist already'))
 
 
+@global_preferences_registry.register
+class ArchiveExpired(BooleanPreference):
+    """
+    Dynamic preferences class controlling whether expired events are written
+    to the compressed archive before they are deleted
+
+    See :mod:`p_soc_auto_base.archive`.
+
+    :access_key: 'citrusborgcommon__archive_expired'
+    """
+    section = CITRUS_BORG_COMMON
+    name = 'archive_expired'
+    default = True
+    """default value for this dynamic preference"""
+    required = False
+    verbose_name = _('archive expired events before deleting them').title()
+    """verbose name for this dynamic preference"""
+
+
 @global_preferences_registry.register
 class SendNoNews(BooleanPreference):
     """
@@ -1612,6 +1661,123 @@ def get_preference(key):
     return db_pref.value
 
 
+PREFERENCE_CACHE_PREFIX = 'preference'
+
+_SNAPSHOT = {}
+"""
+process local copies of the preferences loaded by :func:`snapshot_preferences`
+as (value, expiry) tuples keyed by accessor key
+"""
+
+
+def _preference_cache_key(key):
+    return f'{PREFERENCE_CACHE_PREFIX}:{key}'
+
+
+def get_cached_preference(key):
+    """
+    get the value of a dynamic preference through the `Django` cache
+
+    The value is kept in the cache for
+    :attr:`p_soc_auto.settings.common.PREFERENCE_CACHE_TTL` seconds or until
+    the preference is changed, see :func:`invalidate_cached_preference`.
+    Values loaded by :func:`snapshot_preferences` are read from the memory
+    of the process for the same number of seconds.
+
+    :arg str key: the accessor key for the preference, see
+        :func:`get_preference`
+    """
+    local = _SNAPSHOT.get(key)
+    if local is not None and local[1] > time.monotonic():
+        return local[0]
+
+    cache_key = _preference_cache_key(key)
+    value = cache.get(cache_key)
+    if value is None:
+        value = get_preference(key)
+        cache.set(cache_key, value, settings.PREFERENCE_CACHE_TTL)
+
+    return value
+
+
+def snapshot_preferences():
+    """
+    load all the dynamic preferences with one query and keep them in the
+    memory of the process and in the `Django` cache
+
+    This is used to warm the `Celery` worker processes before they start
+    their pool processes, see :mod:`p_soc_auto_base.preload`. The pool
+    processes inherit the snapshot and renew it with
+    :func:`renew_preference_snapshot`.
+
+    :returns: the number of loaded preferences
+    """
+    values = global_preferences_registry.manager().load_from_db()
+    expiry = time.monotonic() + settings.PREFERENCE_CACHE_TTL
+
+    _SNAPSHOT.clear()
+    _SNAPSHOT.update(
+        {key: (value, expiry) for key, value in values.items()})
+    cache.set_many(
+        {_preference_cache_key(key): value for key, value in values.items()},
+        settings.PREFERENCE_CACHE_TTL)
+
+    return len(values)
+
+
+def renew_preference_snapshot():
+    """
+    renew the preferences loaded by :func:`snapshot_preferences` in a
+    forked process
+
+    The expiry of the inherited snapshot was set when the parent process
+    loaded it, so a process forked more than
+    :attr:`p_soc_auto.settings.common.PREFERENCE_CACHE_TTL` seconds later
+    would inherit an expired snapshot. The values are read again from the
+    `Django` cache with one request, so preferences changed since the
+    snapshot are not kept. If any of them is no longer in the cache, the
+    snapshot is loaded from the database again.
+
+    :returns: the number of renewed preferences
+    """
+    if not _SNAPSHOT:
+        return 0
+
+    keys = {_preference_cache_key(key): key for key in _SNAPSHOT}
+    values = cache.get_many(list(keys))
+    if len(values) < len(keys):
+        return snapshot_preferences()
+
+    expiry = time.monotonic() + settings.PREFERENCE_CACHE_TTL
+
+    _SNAPSHOT.clear()
+    _SNAPSHOT.update(
+        {keys[cache_key]: (value, expiry)
+         for cache_key, value in values.items()})
+
+    return len(_SNAPSHOT)
+
+
+def clear_preference_snapshot():
+    """
+    forget the preferences loaded by :func:`snapshot_preferences`
+    """
+    _SNAPSHOT.clear()
+
+
+def invalidate_cached_preference(key):
+    """
+    remove a dynamic preference from the caches used by
+    :func:`get_cached_preference`
+
+    Other processes keep their snapshot of the preference until it expires.
+
+    :arg str key: the accessor key for the preference
+    """
+    _SNAPSHOT.pop(key, None)
+    cache.delete(_preference_cache_key(key))
+
+
 def get_list_preference(key):
     """
     get the a list from a dynamic preference
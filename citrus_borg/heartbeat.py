@@ -0,0 +1,241 @@
+"""
+citrus_borg.heartbeat
+---------------------
+
+This module contains the heartbeat coalescer for the `last seen` columns
+of :class:`citrus_borg.models.WinlogbeatHost` and
+:class:`citrus_borg.models.KnownBrokeringDevice`.
+
+Every incoming event used to update the `last_seen` or the
+`exchange_last_seen` column of its bot and broker rows. With several
+workers handling events from the same bot, that was the hottest `UPDATE`
+in the database and a source of row lock contention.
+
+Heartbeats are now recorded in the `Django` cache (`memcached` in
+production), shared by all the worker processes. :func:`flush` writes the
+buffered values with one `UPDATE` statement per table, touching only the
+rows whose buffered value is newer than the stored one. It runs from the
+:func:`citrus_borg.tasks.flush_heartbeats` periodic task and at the start
+of the queries that look for dead bots, brokers and sites so that those
+queries see the most recent values.
+
+Buffered values are kept in the cache for
+:attr:`p_soc_auto.settings.common.HEARTBEAT_BUFFER_TTL` seconds; flushing
+them more than once is harmless.
+
+The cache cannot list its keys, so the rows with buffered values are also
+appended to a per model index: a counter and one numbered slot for each
+row. A flush reads the slots filled since the previous flush, and only
+reads and updates those rows. A slot is filled right after the counter is
+incremented, so a flush stops at the first empty slot and reads it again
+on the next flush; a slot that is still empty by then was evicted and is
+skipped.
+
+:copyright:
+
+    Copyright 2018 - 2020 Provincial Health Service Authority
+    of British Columbia
+
+:contact:    daniel.busto@phsa.ca
+"""
+import datetime
+from logging import getLogger
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Case, DateTimeField, F, Value, When
+from django.utils import timezone
+
+
+LOG = getLogger(__name__)
+
+KEY_PREFIX = 'heartbeat'
+
+HEARTBEAT_FIELDS = {
+    'citrus_borg.WinlogbeatHost': ('last_seen', 'exchange_last_seen'),
+    'citrus_borg.KnownBrokeringDevice': ('last_seen',),
+}
+"""the buffered columns for each model"""
+
+
+def _key(model_label, field, pk):
+    return f'{KEY_PREFIX}:{model_label}:{field}:{pk}'
+
+
+def _index_key(model_label, name):
+    return f'{KEY_PREFIX}:{model_label}:index:{name}'
+
+
+def _index(model_label, pk):
+    """
+    add a row to the index of the rows with buffered values, unless it is
+    already waiting for a flush
+    """
+    if not cache.add(_index_key(model_label, f'pk:{pk}'), True,
+                     timeout=settings.HEARTBEAT_BUFFER_TTL):
+        return
+
+    count_key = _index_key(model_label, 'count')
+    cache.add(count_key, 0, timeout=None)
+    slot = cache.incr(count_key)
+    cache.set(_index_key(model_label, f'slot:{slot}'), pk,
+              timeout=settings.HEARTBEAT_BUFFER_TTL)
+
+
+def _indexed(model_label):
+    """
+    :returns: the primary keys added to the index since the previous flush,
+        and the number of the last slot read
+    :rtype: tuple
+    """
+    count = cache.get(_index_key(model_label, 'count')) or 0
+    cursor = cache.get(_index_key(model_label, 'cursor')) or 0
+    if cursor > count:
+        # the counter was evicted and started over
+        cursor = 0
+
+    slots = cache.get_many([_index_key(model_label, f'slot:{slot}')
+                            for slot in range(cursor + 1, count + 1)])
+
+    pks = set()
+    last_slot = cursor
+    for slot in range(cursor + 1, count + 1):
+        key = _index_key(model_label, f'slot:{slot}')
+        if key in slots:
+            pks.add(slots[key])
+        elif cache.get(_index_key(model_label, 'gap')) != slot:
+            # _index has incremented the counter but not filled the slot
+            # yet; the next flush starts from here
+            cache.set(_index_key(model_label, 'gap'), slot, timeout=None)
+            break
+
+        last_slot = slot
+
+    return pks, last_slot
+
+
+def record(instance, **fields):
+    """
+    buffer heartbeat values for a model instance
+
+    The values are also set on the instance.
+
+    :arg instance: a :class:`citrus_borg.models.WinlogbeatHost` or a
+        :class:`citrus_borg.models.KnownBrokeringDevice` instance
+
+    :arg fields: the heartbeat values keyed by field name; values that are
+        `None` are ignored
+
+    :raises: :exc:`ValueError` if one of the fields is not a heartbeat field
+        of the model
+    """
+    model_label = instance._meta.concrete_model._meta.label
+    values = {}
+    for field, moment in fields.items():
+        if field not in HEARTBEAT_FIELDS.get(model_label, ()):
+            raise ValueError(f'{field} is not a heartbeat field of'
+                             f' {model_label}')
+        if moment is None:
+            continue
+
+        setattr(instance, field, moment)
+        values[_key(model_label, field, instance.pk)] = moment.timestamp()
+
+    if values:
+        # the values must be in the cache before the row is indexed; see
+        # _flush_model
+        cache.set_many(values, timeout=settings.HEARTBEAT_BUFFER_TTL)
+        _index(model_label, instance.pk)
+
+
+def pending(model_label, pks):
+    """
+    :returns: the buffered heartbeat values for some rows of a model as a
+        :class:`dict` of :class:`dict` objects keyed by primary key and then
+        by field name
+    """
+    fields = HEARTBEAT_FIELDS[model_label]
+    keys = {_key(model_label, field, pk): (pk, field)
+            for pk in pks for field in fields}
+
+    values = {}
+    for key, timestamp in cache.get_many(list(keys)).items():
+        pk, field = keys[key]
+        values.setdefault(pk, {})[field] = datetime.datetime.fromtimestamp(
+            timestamp, tz=timezone.utc)
+
+    return values
+
+
+def _flush_model(model_label):
+    """
+    write the buffered heartbeats of one model
+
+    :returns: the number of updated rows
+    """
+    pks, last_slot = _indexed(model_label)
+    if not pks:
+        cache.set(_index_key(model_label, 'cursor'), last_slot, timeout=None)
+        return 0
+
+    # rows recorded from now on are indexed again; their values are either
+    # read below or picked up by the next flush
+    cache.delete_many([_index_key(model_label, f'pk:{pk}') for pk in pks])
+
+    model = apps.get_model(model_label)
+    fields = HEARTBEAT_FIELDS[model_label]
+
+    stored = {row[0]: dict(zip(fields, row[1:]))
+              for row in model.objects.filter(pk__in=pks).
+              values_list('pk', *fields)}
+    buffered = pending(model_label, stored)
+
+    updates = {}
+    for pk, values in buffered.items():
+        for field, moment in values.items():
+            if stored[pk][field] is None or moment > stored[pk][field]:
+                updates.setdefault(field, {})[pk] = moment
+
+    updated = 0
+    if updates:
+        pks = {pk for field_updates in updates.values()
+               for pk in field_updates}
+
+        columns = {
+            field: Case(
+                *[When(pk=pk, then=Value(moment))
+                  for pk, moment in field_updates.items()],
+                default=F(field), output_field=DateTimeField())
+            for field, field_updates in updates.items()
+        }
+        # a queryset update bypasses the auto_now of updated_on
+        columns['updated_on'] = timezone.now()
+
+        updated = model.objects.filter(pk__in=pks).update(**columns)
+
+    # only move past the slots once their rows are in the database
+    cache.set(_index_key(model_label, 'cursor'), last_slot, timeout=None)
+
+    return updated
+
+
+def flush():
+    """
+    write the buffered heartbeats to the database with one `UPDATE` per
+    table
+
+    Errors are logged and swallowed; the callers must keep working with
+    slightly stale values.
+
+    :returns: the number of updated rows for each model
+    :rtype: dict
+    """
+    updated = {}
+    for model_label in HEARTBEAT_FIELDS:
+        try:
+            updated[model_label] = _flush_model(model_label)
+        except Exception:  # pylint: disable=broad-except
+            LOG.exception('cannot flush heartbeats for %s', model_label)
+
+    return updated
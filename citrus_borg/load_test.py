@@ -0,0 +1,289 @@
+"""
+citrus_borg.load_test
+---------------------
+
+This module contains the load test harness for the event ingestion path
+shared by the :ref:`Citrus Borg Application` and the
+:ref:`Mail Collector Application`.
+
+The harness uses the payload generators in :mod:`citrus_borg.test_tools`
+to build a configurable mix of `Citrix`, `Exchange` and unmonitored events.
+It feeds them to :func:`citrus_borg.consumers.process_win_event` at a target
+rate. `Celery` runs in eager mode so that :func:`citrus_borg.tasks.
+process_citrix_login` and :func:`mail_collector.tasks.store_mail_data` run
+in the same process, against the configured database. Outgoing email is
+captured in memory.
+
+Each stage is timed separately through the `Celery` `task_prerun` and
+`task_postrun` signals. The report contains throughput and latency
+percentiles per stage and is written to a `JSON` file that can be compared
+with an earlier report using :func:`compare_reports`.
+
+Example, from `python manage.py shell`::
+
+    from citrus_borg.load_test import run_load_test
+    run_load_test(events=2000, rate=50, mix={'citrix': 0.7,
+                                             'exchange': 0.25,
+                                             'unknown': 0.05})
+
+.. warning::
+
+    The harness saves real rows and the `post_save` signals for
+    :class:`citrus_borg.models.WinlogEvent` will try to talk to the
+    `Orion` server. Only run it against a development environment.
+
+:copyright:
+
+    Copyright 2018 - 2020 Provincial Health Service Authority
+    of British Columbia
+
+:contact:    daniel.busto@phsa.ca
+"""
+import json
+import math
+import os
+import random
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from logging import getLogger
+
+from celery.signals import task_postrun, task_prerun
+from django.conf import settings
+from django.test.utils import override_settings
+
+from citrus_borg import test_tools
+from citrus_borg.consumers import process_win_event
+from p_soc_auto.celery import app
+
+
+LOG = getLogger(__name__)
+
+DEFAULT_MIX = {'citrix': 0.7, 'exchange': 0.25, 'unknown': 0.05}
+"""default proportions of each kind of event"""
+
+PERCENTILES = (50, 90, 95, 99)
+
+INGEST_STAGE = 'process_win_event'
+"""name used in the report for the consumer stage"""
+
+
+def percentile(values, pct):
+    """
+    :returns: the `pct` percentile of `values` using the nearest rank method
+        or `None` if there are no values
+    """
+    if not values:
+        return None
+
+    ordered = sorted(values)
+    rank = max(math.ceil(pct / 100 * len(ordered)), 1)
+
+    return ordered[rank - 1]
+
+
+def generate_event(kind, failure_ratio=0.1):
+    """
+    generate one event payload as sent by `Logstash`
+
+    :arg str kind: 'citrix', 'exchange' or 'unknown'
+    :arg float failure_ratio: the proportion of failed events
+
+    :returns: the `JSON` encoded event
+    :rtype: str
+    """
+    timestamp = datetime.now(timezone.utc).isoformat()
+    host = random.choice(test_tools.HOSTS)
+    failed = random.random() < failure_ratio
+
+    if kind == 'citrix':
+        event = test_tools.generate_example(
+            failed, random.choice([1000, 1020, 1003, 500, 1006, 1007]),
+            timestamp, host)
+    elif kind == 'exchange':
+        event = test_tools.generate_exchange_example(failed, timestamp, host)
+    elif kind == 'unknown':
+        event = test_tools.generate_unknown_example(timestamp, host)
+    else:
+        raise ValueError(f'unknown event kind {kind}')
+
+    return json.dumps(event)
+
+
+class _StageTimer:
+    """
+    collect the duration of each `Celery` task run keyed by task name
+    """
+    def __init__(self):
+        self.starts = {}
+        self.durations = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def prerun(self, sender=None, task_id=None, **kwargs):
+        # pylint: disable=unused-argument
+        self.starts[task_id] = time.perf_counter()
+
+    def postrun(self, sender=None, task_id=None, state=None, **kwargs):
+        # pylint: disable=unused-argument
+        start = self.starts.pop(task_id, None)
+        if start is None:
+            return
+
+        stage = sender.name.rsplit('.', 1)[-1]
+        self.durations[stage].append(time.perf_counter() - start)
+        if state != 'SUCCESS':
+            self.errors[stage] += 1
+
+
+def _summarize(durations, errors, elapsed):
+    """
+    :returns: the throughput and latency summary for one stage
+    """
+    summary = {
+        'count': len(durations),
+        'errors': errors,
+        'throughput_per_sec': round(len(durations) / elapsed, 3)
+        if elapsed else None,
+        'mean_ms': round(sum(durations) / len(durations) * 1000, 3)
+        if durations else None,
+        'max_ms': round(max(durations) * 1000, 3) if durations else None,
+    }
+    for pct in PERCENTILES:
+        value = percentile(durations, pct)
+        summary[f'p{pct}_ms'] = None if value is None else round(
+            value * 1000, 3)
+
+    return summary
+
+
+def run_load_test(events=1000, rate=20.0, mix=None, failure_ratio=0.1,
+                  report_file=None, seed=None):
+    """
+    run the load test and write the report
+
+    :arg int events: how many events to send
+
+    :arg float rate: target rate in events per second; use 0 to send the
+        events as fast as possible
+
+    :arg dict mix: the proportion of each kind of event, see
+        :attr:`DEFAULT_MIX`
+
+    :arg float failure_ratio: the proportion of failed `Citrix` and
+        `Exchange` events
+
+    :arg str report_file: where to write the report; by default a time
+        stamped file under `MEDIA_ROOT/load_test/`
+
+    :arg int seed: seed for the random generator to make runs repeatable
+
+    :returns: the report
+    :rtype: dict
+    """
+    mix = mix or DEFAULT_MIX
+    rng_state = random.getstate()
+    if seed is not None:
+        random.seed(seed)
+
+    kinds = random.choices(
+        list(mix.keys()), weights=list(mix.values()), k=events)
+    payloads = [generate_event(kind, failure_ratio) for kind in kinds]
+
+    timer = _StageTimer()
+    task_prerun.connect(timer.prerun, weak=False)
+    task_postrun.connect(timer.postrun, weak=False)
+
+    ingest, ingest_errors, behind = [], 0, 0
+    always_eager = app.conf.task_always_eager
+    app.conf.task_always_eager = True
+    try:
+        with override_settings(
+                EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend'):
+            started = time.perf_counter()
+            for index, payload in enumerate(payloads):
+                if rate:
+                    delay = started + index / rate - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                    else:
+                        behind += 1
+
+                start = time.perf_counter()
+                try:
+                    process_win_event(payload)
+                except Exception:  # pylint: disable=broad-except
+                    ingest_errors += 1
+                    LOG.exception('load test event %s failed', index)
+                ingest.append(time.perf_counter() - start)
+
+            elapsed = time.perf_counter() - started
+    finally:
+        app.conf.task_always_eager = always_eager
+        task_prerun.disconnect(timer.prerun)
+        task_postrun.disconnect(timer.postrun)
+        random.setstate(rng_state)
+
+    stages = {INGEST_STAGE: _summarize(ingest, ingest_errors, elapsed)}
+    for stage, durations in sorted(timer.durations.items()):
+        stages[stage] = _summarize(durations, timer.errors[stage], elapsed)
+
+    report = {
+        'created_on': datetime.now(timezone.utc).isoformat(),
+        'config': {'events': events, 'rate': rate, 'mix': mix,
+                   'failure_ratio': failure_ratio, 'seed': seed},
+        'elapsed_sec': round(elapsed, 3),
+        'achieved_rate': round(events / elapsed, 3) if elapsed else None,
+        'events_behind_schedule': behind,
+        'mix_actual': {kind: kinds.count(kind) for kind in mix},
+        'stages': stages,
+    }
+
+    if report_file is None:
+        report_dir = os.path.join(settings.MEDIA_ROOT, 'load_test')
+        os.makedirs(report_dir, exist_ok=True)
+        report_file = os.path.join(
+            report_dir,
+            f'{datetime.now():%Y_%m_%d-%H_%M_%S}-load_test.json')
+
+    with open(report_file, 'w') as file_handle:
+        json.dump(report, file_handle, indent=2)
+
+    LOG.info('load test report written to %s', report_file)
+
+    return report
+
+
+def compare_reports(baseline, current):
+    """
+    compare two load test reports
+
+    :arg baseline: the earlier report or the path to its file
+    :arg current: the later report or the path to its file
+
+    :returns: for each stage present in both reports, the relative change
+        of each latency and throughput metric; positive values mean the
+        metric went up
+    :rtype: dict
+    """
+    reports = []
+    for report in (baseline, current):
+        if isinstance(report, str):
+            with open(report) as file_handle:
+                report = json.load(file_handle)
+        reports.append(report)
+
+    baseline, current = reports
+    changes = {}
+    for stage, before in baseline['stages'].items():
+        after = current['stages'].get(stage)
+        if after is None:
+            continue
+
+        changes[stage] = {
+            metric: round((after[metric] - value) / value, 4)
+            for metric, value in before.items()
+            if metric not in ('count', 'errors') and value
+            and after.get(metric) is not None
+        }
+
+    return changes
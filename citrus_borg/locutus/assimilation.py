@@ -135,17 +135,38 @@ official bot. It has been observed that events collected from official
 bots do not include all the info in the **host:** section.
 
 """
-import collections
 import json
+import re
 from logging import getLogger
 import socket
 
 from django.utils.dateparse import parse_duration, parse_datetime
 
 from citrus_borg.dynamic_preferences_registry import get_list_preference
+from citrus_borg.locutus.records import (
+    Borg, BorgHost, BorgMessage, ExchangeEvent, ExchangeMessage,
+)
 
 LOG = getLogger(__name__)
 
+_DETAIL_LINE = re.compile(r'^\s*([A-Za-z ]+?)\s*:\s*(\S+)\s*$')
+"""
+matches the `label: value` lines in the test details of a `ControlUp`
+event
+"""
+
+_DURATION_FIELDS = {
+    'storefront connection time': 'storefront_connection_duration',
+    'receiver startup': 'receiver_startup_duration',
+    'connection time': 'connection_achieved_duration',
+    'logon time': 'logon_achieved_duration',
+    'logoff time': 'logoff_achieved_duration',
+}
+"""
+map the lower case labels of the `ControlUp` timings to
+:class:`citrus_borg.locutus.records.BorgMessage` fields
+"""
+
 
 def get_ip_for_host_name(host_name, ip_list=None):
     """
@@ -199,7 +220,7 @@ def get_ip_for_host_name(host_name, ip_list=None):
 
 def parse_citrix_login_event(body):
     """
-    :returns: a :func:`collections.namedtuple` object
+    :returns: a :class:`citrus_borg.locutus.records.Borg` object
 
     :arg dict body: the `Windows` message after it was deserialized from `JSON`
         in the :func:`citrus_borg.consumers.process_win_event` function
@@ -217,29 +238,20 @@ def parse_citrix_login_event(body):
 
     LOG.info('Processing %s', body)
 
-    borg = collections.namedtuple(
-        'Borg', [
-            'source_host', 'record_number', 'opcode', 'level',
-            'event_source', 'windows_log', 'borg_message', 'mail_borg_message',
-            'event_id', 'timestamp'
-        ]
-    )
-
     # TODO this will throw a TypeError if passed None, why bother with get?
-    borg.source_host = process_borg_host(body.get('host', None))
-    borg.record_number = body.get('record_number', 0)
-    borg.opcode = body.get('opcode', None)
-    borg.level = body.get('level', None)
-    borg.event_source = body.get('source_name', None)
-    borg.windows_log = body.get('log_name', None)
-    borg.event_id = body.get('event_id', None)
-    borg.timestamp = _parse_datetime(body.get('@timestamp', None))
+    borg = Borg(
+        source_host=process_borg_host(body.get('host', None)),
+        record_number=body.get('record_number', 0),
+        opcode=body.get('opcode', None),
+        level=body.get('level', None),
+        event_source=body.get('source_name', None),
+        windows_log=body.get('log_name', None),
+        event_id=body.get('event_id', None),
+        timestamp=_parse_datetime(body.get('@timestamp', None)))
 
     if borg.event_source in get_list_preference('citrusborgevents__source'):
         borg.borg_message = process_borg_message(body.get('message', None))
-        borg.mail_borg_message = None
     elif borg.event_source in get_list_preference('exchange__source'):
-        borg.borg_message = None
         borg.mail_borg_message = parse_exchange_message(
             json.loads(body.get('event_data')['param1'])
         )
@@ -257,8 +269,8 @@ def process_borg_host(host):
     The `BorgHost` object will be saved in the :ref:`Citrus Borg Application`
     and shared with the :ref:`Mail Collector Application`.
 
-    :returns: a :func:`collections.namedtuple` representation of the host
-        information for a remote monitoring bot
+    :returns: a :class:`citrus_borg.locutus.records.BorgHost` representation
+        of the host information for a remote monitoring bot
 
     The raw data is available under the **host:** key of the `event`
     :class:`dictionary <dict>` and it looks like this:
@@ -286,39 +298,19 @@ def process_borg_host(host):
 
 
     """
-    borg_host = collections.namedtuple(
-        'BorgHost', ['host_name', 'ip_address', ])
-
-    borg_host.host_name = host['name']
-    borg_host.ip_address = get_ip_for_host_name(host['name'],
-                                                host.get('ip', None))
-
-    return borg_host
+    return BorgHost(
+        host_name=host['name'],
+        ip_address=get_ip_for_host_name(host['name'], host.get('ip', None)))
 
 
 def create_empty_borg_message():
-    borg_message = collections.namedtuple(
-        'BorgMessage',
-        ['state', 'broker', 'test_result', 'storefront_connection_duration',
-         'receiver_startup_duration', 'connection_achieved_duration',
-         'logon_achieved_duration', 'logoff_achieved_duration',
-         'failure_reason', 'failure_details', 'raw_message'])
-    borg_message.broker = None
-    borg_message.test_result = False
-    borg_message.storefront_connection_duration = None
-    borg_message.receiver_startup_duration = None
-    borg_message.connection_achieved_duration = None
-    borg_message.logon_achieved_duration = None
-    borg_message.logoff_achieved_duration = None
-    borg_message.failure_reason = None
-    borg_message.failure_details = None
-    borg_message.raw_message = None
-    borg_message.state = 'undetermined'
-
-    return borg_message
+    """
+    :returns: a :class:`citrus_borg.locutus.records.BorgMessage` object with
+        the state set to 'undetermined' and no data
+    """
+    return BorgMessage()
 
 
-# TODO refactor this
 def process_borg_message(message=None):
     """
     prepare a `Python` object representing a `ControlUp` event
@@ -364,8 +356,8 @@ def process_borg_message(message=None):
 
     :arg dict message: the event message
 
-    :returns: a :func:`collections.namedtuple` object representing the
-        `ControlUp` event
+    :returns: a :class:`citrus_borg.locutus.records.BorgMessage` object
+        representing the `ControlUp` event
 
         The `BorgMessage` object has the following properties: 'state',
         `broker`, `test_result`, `storefront_connection_duration`,
@@ -376,7 +368,7 @@ def process_borg_message(message=None):
     .. todo::
 
         In case the message is `None`, create a dynamic preference for the
-        raw_message property of the `namedtuple`.
+        raw_message property of the record.
 
     """
 
@@ -390,28 +382,31 @@ def process_borg_message(message=None):
         return borg_message
 
     borg_message.raw_message = str(message)
-    message = message.split('\n')
-    borg_message.state = message[0].split()[0]
+    lines = borg_message.raw_message.split('\n')
+    first_line = lines[0].split()
+    if first_line:
+        borg_message.state = first_line[0]
 
     if borg_message.state.lower() == 'successful':
         LOG.debug('citrus borg event state: successful')
-        borg_message.broker = message[0].split()[-1]
-        borg_message.test_result = bool(message[4].split()[-1])
-        borg_message.storefront_connection_duration = \
-            parse_duration(message[5].split()[-1])
-        borg_message.receiver_startup_duration = \
-            parse_duration(message[6].split()[-1])
-        borg_message.connection_achieved_duration = \
-            parse_duration(message[7].split()[-1])
-        borg_message.logon_achieved_duration = \
-            parse_duration(message[8].split()[-1])
-        borg_message.logoff_achieved_duration = \
-            parse_duration(message[9].split()[-1])
+        borg_message.broker = first_line[-1]
+
+        for line in lines[1:]:
+            match = _DETAIL_LINE.match(line)
+            if match is None:
+                continue
+
+            label, value = match.group(1).lower(), match.group(2)
+            if label in _DURATION_FIELDS:
+                setattr(borg_message, _DURATION_FIELDS[label],
+                        parse_duration(value))
+            elif label == 'latest test result':
+                borg_message.test_result = value.lower() == 'true'
 
     elif borg_message.state.lower() == 'failed':
         LOG.debug('citrus borg event state: failed')
-        borg_message.failure_reason = message[1].split(': ')[1]
-        borg_message.failure_details = '\n'.join(message[-12:-1])
+        borg_message.failure_reason = lines[1].split(': ')[1]
+        borg_message.failure_details = '\n'.join(lines[-12:-1])
 
     else:
         LOG.error('citrus borg event state undetermined %s',
@@ -430,9 +425,10 @@ def parse_exchange_message(message):
 
     :arg dict message: the event message
 
-    :returns: a :class:`tuple` containing a pair of
-        :func:`collections.namedtuple` objects that describe the
-        `Mail Borg` event
+    :returns: a :class:`tuple` containing a
+        :class:`citrus_borg.locutus.records.ExchangeEvent` and a
+        :class:`citrus_borg.locutus.records.ExchangeMessage` object that
+        describe the `Mail Borg` event
 
         The `ExchangeEvent` object is the first member of the :class:`tuple` and
         represents the identification part of a `Mail Borg` event. It has the
@@ -449,19 +445,6 @@ def parse_exchange_message(message):
         `received_from`, `received_by`, `mail_message_created`,
         `mail_message_sent`, `mail_message_received`
     """
-    ExchangeEvent = collections.namedtuple(
-        'ExchangeEvent',
-        ['event_group_id', 'event_type', 'event_status', 'event_message',
-         'event_exception', 'mail_account', 'event_body']
-    )
-
-    ExchangeMessage = collections.namedtuple(
-        'ExchangeMessage',
-        ['sent_from', 'sent_to',
-         'mail_message_identifier', 'received_from', 'received_by',
-         'mail_message_created', 'mail_message_sent', 'mail_message_received']
-    )
-
     exchange_event = ExchangeEvent(
         event_group_id=message.get('wm_id'),
         event_type=message.get('type'),
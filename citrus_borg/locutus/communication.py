@@ -28,10 +28,13 @@ from django.db.models.functions import TruncHour, TruncMinute
 from django.utils import timezone
 from dynamic_preferences.exceptions import NotFoundInRegistry
 
+from citrus_borg import heartbeat
 from citrus_borg.models import (
     WinlogEvent, WinlogbeatHost, KnownBrokeringDevice, BorgSite,
 )
-from citrus_borg.dynamic_preferences_registry import get_preference
+from citrus_borg.dynamic_preferences_registry import (
+    get_cached_preference, get_preference,
+)
 
 
 class GroupBy(Enum):
@@ -67,6 +70,9 @@ def _get_dead_objects(now, obj_class, obj_name, key_for_event, time_pref=None,
     if not isinstance(now, datetime.datetime):
         raise TypeError('%s type invalid for %s' % (type(now), now))
 
+    # the dead objects are ordered by their last seen values
+    heartbeat.flush()
+
     live = set(WinlogEvent.objects.filter(created_on__gt=now - time_delta)
                .values_list(f'{key_for_event}__{obj_name}', flat=True))
     all_objs = set(obj_class.active.values_list(obj_name, flat=True))
@@ -234,8 +240,7 @@ def get_logins_by_event_state_borg_hour(now=None, time_delta=None):
 def raise_ux_alarm(
         now=None, site=None, host_name=None,
         group_by=GroupBy.MINUTE, include_event_counts=False,
-        time_delta=get_preference('citrusborgux__ux_alert_interval'),
-        ux_alert_threshold=get_preference('citrusborgux__ux_alert_threshold')):
+        time_delta=None, ux_alert_threshold=None):
     """
     The `Windows` log events generated by the `ControlUp` client provide
     timing values for multiple `Citrix` events.
@@ -307,6 +312,13 @@ def raise_ux_alarm(
         impossible to determine the underlying `Django` `model` by looking
         at the source code of the function.
     """
+    if time_delta is None:
+        time_delta = get_cached_preference('citrusborgux__ux_alert_interval')
+
+    if ux_alert_threshold is None:
+        ux_alert_threshold = get_cached_preference(
+            'citrusborgux__ux_alert_threshold')
+
     queryset = _by_site_host_hour(
         now=now, time_delta=time_delta, site=site, host_name=host_name,
         group_by=group_by, ux_alert_threshold=ux_alert_threshold,
@@ -670,9 +682,7 @@ def _group_by(queryset, group_field='winlogevent__created_on',
 
 
 def login_states_by_site_host_hour(
-        now=None, time_delta=get_preference(
-            'citrusborgevents__ignore_events_older_than'), site=None,
-        host_name=None):
+        now=None, time_delta=None, site=None, host_name=None):
     """
     :returns: a :class:`django.db.models.query.QuerySet` based on the
         :class:`citrus_borg.models.WinlogbeatHost` `annotated
@@ -712,6 +722,10 @@ def login_states_by_site_host_hour(
         combination
 
     """
+    if time_delta is None:
+        time_delta = get_cached_preference(
+            'citrusborgevents__ignore_events_older_than')
+
     queryset = _by_site_host_hour(now, time_delta, site, host_name)
 
     return queryset.order_by('site__site', 'host_name', '-hour')
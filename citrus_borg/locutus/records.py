@@ -0,0 +1,100 @@
+"""
+citrus_borg.locutus.records
+---------------------------
+
+This module contains the record types produced by the parsers in
+:mod:`citrus_borg.locutus.assimilation`.
+
+The records use `__slots__` and are defined once, at import time. The
+parsers used to define a new :func:`collections.namedtuple` class for each
+event and to store the event data as class attributes, which was slow and
+not safe when events were parsed in more than one thread.
+
+:copyright:
+
+    Copyright 2018 - 2020 Provincial Health Service Authority
+    of British Columbia
+
+:contact:    daniel.busto@phsa.ca
+"""
+
+
+class _Record:
+    """
+    base class for the record types
+
+    Fields not passed to the constructor are set to the value in
+    :attr:`_DEFAULTS` or to `None`.
+    """
+    __slots__ = ()
+    _DEFAULTS = {}
+
+    def __init__(self, **fields):
+        unknown = set(fields) - set(self.__slots__)
+        if unknown:
+            raise TypeError(
+                f'{type(self).__name__} has no fields {sorted(unknown)}')
+
+        for name in self.__slots__:
+            setattr(self, name, fields.get(name, self._DEFAULTS.get(name)))
+
+    def _asdict(self):
+        """
+        :returns: the fields as a :class:`dict`, like
+            :meth:`collections.namedtuple._asdict`
+        """
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __eq__(self, other):
+        return type(self) is type(other) and self._asdict() == other._asdict()
+
+    def __repr__(self):
+        fields = ', '.join(
+            f'{name}={getattr(self, name)!r}' for name in self.__slots__)
+        return f'{type(self).__name__}({fields})'
+
+
+class Borg(_Record):
+    """
+    a `Windows` log event as delivered by the :ref:`Logstash Server`
+    """
+    __slots__ = ('source_host', 'record_number', 'opcode', 'level',
+                 'event_source', 'windows_log', 'borg_message',
+                 'mail_borg_message', 'event_id', 'timestamp')
+
+
+class BorgHost(_Record):
+    """
+    the bot host that sent an event
+    """
+    __slots__ = ('host_name', 'ip_address')
+
+
+class BorgMessage(_Record):
+    """
+    the data in a `ControlUp` event
+    """
+    __slots__ = ('state', 'broker', 'test_result',
+                 'storefront_connection_duration',
+                 'receiver_startup_duration', 'connection_achieved_duration',
+                 'logon_achieved_duration', 'logoff_achieved_duration',
+                 'failure_reason', 'failure_details', 'raw_message')
+    _DEFAULTS = {'state': 'undetermined', 'test_result': False}
+
+
+class ExchangeEvent(_Record):
+    """
+    the identification part of a `Mail Borg` event
+    """
+    __slots__ = ('event_group_id', 'event_type', 'event_status',
+                 'event_message', 'event_exception', 'mail_account',
+                 'event_body')
+
+
+class ExchangeMessage(_Record):
+    """
+    the `Exchange` message part of a `Mail Borg` send or receive event
+    """
+    __slots__ = ('sent_from', 'sent_to', 'mail_message_identifier',
+                 'received_from', 'received_by', 'mail_message_created',
+                 'mail_message_sent', 'mail_message_received')
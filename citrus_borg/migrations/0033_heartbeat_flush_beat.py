@@ -0,0 +1,34 @@
+# Generated by Django 2.2.6 on 2020-05-04 10:12
+from django.db import migrations
+
+
+def add_beat(apps, schema_editor):
+    IntervalSchedule = apps.get_model(
+        'django_celery_beat', 'IntervalSchedule')
+    PeriodicTask = apps.get_model('django_celery_beat', 'PeriodicTask')
+
+    interval, _ = IntervalSchedule.objects.get_or_create(
+        every=30, period='seconds')
+
+    PeriodicTask.objects.get_or_create(
+        name='Citrix and Exchange bots: flush heartbeats',
+        defaults={'task': 'citrus_borg.tasks.flush_heartbeats',
+                  'args': '', 'kwargs': '', 'interval': interval})
+
+
+def remove_beat(apps, schema_editor):
+    PeriodicTask = apps.get_model('django_celery_beat', 'PeriodicTask')
+    PeriodicTask.objects.filter(
+        task='citrus_borg.tasks.flush_heartbeats').delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('citrus_borg', '0032_auto_20200420_0928'),
+        ('django_celery_beat', '0011_auto_20190508_0153'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_beat, reverse_code=remove_beat),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 2.2.6 on 2020-05-06 09:41
+from django.db import migrations
+
+import p_soc_auto_base.fields
+
+
+def compress(apps, schema_editor):
+    p_soc_auto_base.fields.rewrite_compressed_columns(
+        apps.get_model('citrus_borg', 'WinlogEvent'),
+        ['failure_details', 'raw_message'],
+        connection=schema_editor.connection)
+
+
+def decompress(apps, schema_editor):
+    p_soc_auto_base.fields.rewrite_compressed_columns(
+        apps.get_model('citrus_borg', 'WinlogEvent'),
+        ['failure_details', 'raw_message'], to_compressed=False,
+        connection=schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('citrus_borg', '0033_heartbeat_flush_beat'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='winlogevent',
+            name='failure_details',
+            field=p_soc_auto_base.fields.CompressedTextField(blank=True, null=True, verbose_name='Failure Details'),
+        ),
+        migrations.AlterField(
+            model_name='winlogevent',
+            name='raw_message',
+            field=p_soc_auto_base.fields.CompressedTextField(blank=True, help_text='the application cannot process this message', null=True, verbose_name='Raw Message'),
+        ),
+        migrations.RunPython(compress, reverse_code=decompress),
+    ]
@@ -25,11 +25,14 @@ from django.utils.safestring import mark_safe
 from django.utils.timezone import now
 from django.utils.translation import gettext_lazy as _
 
+from citrus_borg import heartbeat
 from citrus_borg.dynamic_preferences_registry import get_preference
 from orion_integration.models import OrionNode
 from orion_integration.orion import OrionClient
+from p_soc_auto_base import identity
+from p_soc_auto_base.fields import CompressedTextField
 from p_soc_auto_base.models import BaseModel
-from p_soc_auto_base.utils import get_or_create_user, get_uuid
+from p_soc_auto_base.utils import get_uuid
 
 
 LOG = getLogger(__name__)
@@ -313,23 +316,23 @@ class WinlogbeatHost(BaseModel, models.Model):
         else:
             exch_last_seen = None
 
-        winloghost = cls.objects.filter(
-            host_name__iexact=borg.source_host.host_name)
+        winloghost = identity.HOSTS.get_or_none(borg.source_host.host_name)
 
-        if winloghost.exists():
-            winloghost = winloghost.get()
-            if last_seen:
-                winloghost.last_seen = last_seen
-            if exch_last_seen:
-                winloghost.exchange_last_seen = exch_last_seen
-        else:
-            user = get_or_create_user(settings.CITRUS_BORG_SERVICE_USER)
+        if winloghost is None:
+            user = identity.get_user(settings.CITRUS_BORG_SERVICE_USER)
             winloghost = cls(
                 host_name=borg.source_host.host_name, last_seen=last_seen,
                 ip_address=borg.source_host.ip_address, created_by=user,
                 exchange_last_seen=exch_last_seen, updated_by=user)
+            winloghost.save()
+            identity.HOSTS.put(winloghost)
+            return winloghost
+
+        # the heartbeat columns are buffered and written in bulk by
+        # citrus_borg.heartbeat.flush
+        heartbeat.record(winloghost, last_seen=last_seen,
+                         exchange_last_seen=exch_last_seen)
 
-        winloghost.save()
         return winloghost
 
     class Meta:
@@ -469,19 +472,19 @@ class KnownBrokeringDevice(BaseModel, models.Model):
         if borg.borg_message.broker is None:
             return None
 
-        broker = cls.objects.filter(
-            broker_name__iexact=borg.borg_message.broker)
+        broker = identity.BROKERS.get_or_none(borg.borg_message.broker)
 
-        if broker.exists():
-            broker = broker.get()
-            broker.last_seen = now()
-        else:
-            user = get_or_create_user(settings.CITRUS_BORG_SERVICE_USER)
+        if broker is None:
+            user = identity.get_user(settings.CITRUS_BORG_SERVICE_USER)
             broker = cls(
                 broker_name=borg.borg_message.broker, created_by=user,
                 updated_by=user, last_seen=now())
+            broker.save()
+            identity.BROKERS.put(broker)
+            return broker
+
+        heartbeat.record(broker, last_seen=now())
 
-        broker.save()
         return broker
 
     class Meta:
@@ -599,7 +602,7 @@ class WinlogEvent(BaseModel, models.Model):
         _('Logoff time'), db_index=True, blank=True, null=True)
     failure_reason = models.TextField(
         _('Failure Reason'), blank=True, null=True)
-    failure_details = models.TextField(
+    failure_details = CompressedTextField(
         _('Failure Details'), blank=True, null=True)
     event_id = models.BigIntegerField(
         _('Event ID'), db_index=True, blank=True, null=True,
@@ -608,7 +611,7 @@ class WinlogEvent(BaseModel, models.Model):
     timestamp = models.DateTimeField(
         _('Timestamp'), db_index=True, blank=True, null=True,
         help_text=_('windows log event creation time stamp'))
-    raw_message = models.TextField(
+    raw_message = CompressedTextField(
         _('Raw Message'), blank=True, null=True,
         help_text=_('the application cannot process this message'))
     is_expired = models.BooleanField(
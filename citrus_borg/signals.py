@@ -15,15 +15,18 @@ for the :ref:`Citrus Borg Application`.
 """
 from logging import getLogger
 
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from django.utils import timezone
+from dynamic_preferences.models import GlobalPreferenceModel
 
-from citrus_borg.dynamic_preferences_registry import (get_preference,
-                                                      get_int_list_preference)
+from citrus_borg.dynamic_preferences_registry import (
+    get_preference, get_int_list_preference, invalidate_cached_preference,
+)
 from citrus_borg.models import EventCluster, WinlogEvent
 from citrus_borg.tasks import raise_citrix_slow_alert
 from orion_flash.orion.api import DestSwis
+from p_soc_auto_base.alerts import coalesce_alert
 from p_soc_auto_base.email import Email
 from p_soc_auto_base.models import Subscription
 from p_soc_auto_base.utils import get_or_create_user
@@ -35,6 +38,16 @@ LOG = getLogger(__name__)
 # used)
 # pylint: disable=unused-argument
 
+@receiver(post_delete, sender=GlobalPreferenceModel)
+@receiver(post_save, sender=GlobalPreferenceModel)
+def invalidate_preference(sender, instance, *args, **kwargs):
+    """
+    remove a changed dynamic preference from the cache used by
+    :func:`citrus_borg.dynamic_preferences_registry.get_cached_preference`
+    """
+    invalidate_cached_preference(f'{instance.section}__{instance.name}')
+
+
 @receiver(post_save, sender=WinlogEvent)
 def invoke_raise_citrix_slow_alert(sender, instance, *args, **kwargs):
     """
@@ -56,7 +69,8 @@ def invoke_raise_citrix_slow_alert(sender, instance, *args, **kwargs):
     threshold = get_preference('citrusborgux__ux_alert_threshold')
     if any(timing > threshold for timing in alertable_timings):
         LOG.info('Slowdown on %s', instance.source_host.host_name)
-        raise_citrix_slow_alert.delay(instance.id, threshold.total_seconds())
+        coalesce_alert(raise_citrix_slow_alert, instance.source_host.host_name,
+                       instance.id, threshold_secs=threshold.total_seconds())
 
 
 @receiver(post_save, sender=WinlogEvent)
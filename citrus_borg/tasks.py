@@ -19,6 +19,7 @@ from django.utils import timezone
 
 from celery import shared_task, group
 
+from citrus_borg import heartbeat
 from citrus_borg.dynamic_preferences_registry import get_preference
 from citrus_borg.locutus.assimilation import parse_citrix_login_event
 from citrus_borg.locutus.communication import (
@@ -32,11 +33,10 @@ from citrus_borg.models import (
     WinlogEvent, BorgSite,
 )
 
-from p_soc_auto_base import utils as base_utils
-
+from p_soc_auto_base import identity, metrics, utils as base_utils
+from p_soc_auto_base.archive import archive_queryset
 from p_soc_auto_base.email import Email
 from p_soc_auto_base.models import Subscription
-from p_soc_auto_base.utils import get_or_create_user
 
 LOG = getLogger(__name__)
 
@@ -52,7 +52,8 @@ def process_citrix_login(body):
     :raises: DoesNotExist errors if there isn't an Event Source or Windows Log
              object corresponding to the description in the citrix event.
     """
-    borg = parse_citrix_login_event(body)
+    with metrics.EVENT_PARSE_SECONDS.time(source='citrix'):
+        borg = parse_citrix_login_event(body)
     save_citrix_login_event(borg)
     LOG.debug('citrix event saved')
 
@@ -72,17 +73,17 @@ def save_citrix_login_event(borg):
     event_host = WinlogbeatHost.get_or_create_from_borg(borg)
     event_broker = KnownBrokeringDevice.get_or_create_from_borg(borg)
     try:
-        event_source = AllowedEventSource.objects.get(
-            source_name=borg.event_source)
+        event_source = identity.EVENT_SOURCES.get(borg.event_source)
     except AllowedEventSource.DoesNotExist:
         reraise('Cannot match event source for event')
 
     try:
-        windows_log = WindowsLog.objects.get(log_name=borg.windows_log)
+        windows_log = identity.WINDOWS_LOGS.get(borg.windows_log)
     except WindowsLog.DoesNotExist:
         reraise('Cannot match windows log info for event')
 
-    user = get_or_create_user(get_preference('citrusborgcommon__service_user'))
+    user = identity.get_user(
+        get_preference('citrusborgcommon__service_user'))
 
     winlogevent = WinlogEvent(
         source_host=event_host,
@@ -105,11 +106,30 @@ def save_citrix_login_event(borg):
         event_id=borg.event_id,
         timestamp=borg.timestamp,
         created_by=user, updated_by=user)
-    winlogevent.save()
+    with metrics.DB_WRITE_SECONDS.time(model='winlogevent'):
+        winlogevent.save()
+
+    metrics.EVENTS_TOTAL.inc(source='citrix')
+    if winlogevent.timestamp:
+        metrics.EVENT_QUEUE_LAG_SECONDS.observe(
+            (timezone.now() - winlogevent.timestamp).total_seconds(),
+            source='citrix')
 
     LOG.info('saved event: %s', winlogevent.uuid)
 
 
+@shared_task(queue='citrus_borg')
+def flush_heartbeats():
+    """
+    task that writes the buffered `last seen` values of the bots and
+    brokers to the database
+
+    See :mod:`citrus_borg.heartbeat`.
+    """
+    updated = heartbeat.flush()
+    LOG.debug('flushed heartbeats: %s', updated)
+
+
 @shared_task(queue='citrus_borg', rate_limit='3/s')
 def get_orion_id(primary_key):
     """
@@ -169,6 +189,8 @@ def expire_events():
     ).update(is_expired=True)
 
     if get_preference('citrusborgevents__delete_expired_events'):
+        if get_preference('citrusborgcommon__archive_expired'):
+            archive_queryset(WinlogEvent.objects.filter(is_expired=True))
         WinlogEvent.objects.filter(is_expired=True).all().delete()
         LOG.info('deleted %s events accumulated over the last %s', expired,
                  expire_threshold)
@@ -740,19 +762,24 @@ def email_ux_alarm(
 
 @shared_task(queue='borg_chat', rate_limit='3/s', max_retries=3,
              retry_backoff=True, autoretry_for=(SMTPConnectError,))
-def raise_citrix_slow_alert(event_id, threshold_secs):
+def raise_citrix_slow_alert(event_id, threshold_secs, coalesced=None):
     """
     Raises an alert for slow Citrix timings.
 
     :param event_id: The id of the WinlogEvent with slow timings.
     :param threshold_secs: The threshold used, in seconds.
+    :param coalesced: The ids of other slow WinlogEvents from the same host
+        collected by :func:`p_soc_auto_base.alerts.coalesce_alert`; they are
+        included in the same email.
     :return: 1 if an email is sent, 0 otherwise.
     """
-    data = WinlogEvent.active.filter(pk=event_id)
+    coalesced = coalesced or []
+    data = WinlogEvent.active.filter(pk__in=[event_id, *coalesced])
     return Email.send_email(
         data=data,
         subscription=Subscription.get_subscription('Citrix Slow Alert'),
-        ux_alert_threshold=timezone.timedelta(seconds=threshold_secs))
+        ux_alert_threshold=timezone.timedelta(seconds=threshold_secs),
+        coalesced_count=len(coalesced))
 
 
 @shared_task(queue='borg_chat', rate_limit='3/s', max_retries=3,
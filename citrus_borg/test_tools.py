@@ -3,9 +3,14 @@ from time import sleep
 from citrus_borg.tasks import process_citrix_login
 from citrus_borg.dynamic_preferences_registry import get_int_list_preference
 
+import collections
+import json
+import uuid
 from random import choice
 from datetime import datetime, timezone
 
+from django.utils.dateparse import parse_datetime, parse_duration
+
 # TODO fix formatting of this dict
 FAILURE_EXAMPLE = {
     'host': {
@@ -360,6 +365,62 @@ def generate_example(failed, id_num, timestamp, host):
     return output
 
 
+EXCHANGE_EVENTS = [
+    {'type': 'connection', 'status': 'PASS',
+     'message': 'connected to exchange',
+     'account': 'PHSABC\\svc_SOCmailbox, z-spexcm001-db01001@phsa.ca'},
+    {'type': 'send', 'status': 'PASS', 'message': 'monitoring message sent',
+     'from_email': 'z-spexcm001-db01001@phsa.ca',
+     'to_emails': 'z-spexcm001-db01001@phsa.ca'},
+    {'type': 'receive', 'status': 'PASS', 'message': 'message received',
+     'from_address': 'svc_SOCmailbox@phsa.ca',
+     'to_addresses': 'z-spexcm001-db01001@phsa.ca',
+     'created': '2019-05-28 16:41:13+00:00',
+     'sent': '2019-05-28 16:41:14+00:00',
+     'received': '2019-05-28 16:41:20+00:00'},
+]
+"""
+samples of the `param1` payload of `Mail Borg` events, see
+`research/horsey.txt`
+"""
+
+EXCHANGE_FAILURE = {
+    'type': 'connection', 'status': 'FAIL',
+    'message': 'cannot connect to exchange',
+    'exception': 'ErrorNonExistentMailbox',
+    'account': 'PHSABC\\svc_SOCmailbox, z-spexcm001-db01001@phsa.ca'}
+"""sample of the `param1` payload of a failed `Mail Borg` event"""
+
+
+def generate_exchange_example(failed, timestamp, host,
+                              source_name='BorgExchangeMonitor'):
+    """
+    Generate an example of a mail borg message.
+    """
+    param1 = dict(EXCHANGE_FAILURE if failed else choice(EXCHANGE_EVENTS))
+    param1['wm_id'] = str(uuid.uuid4())
+    if param1['type'] in ['send', 'receive']:
+        param1['message_uuid'] = str(uuid.uuid4())
+
+    output = generate_example(failed, 7, timestamp, host)
+    output['source_name'] = source_name
+    output['event_data'] = {'param1': json.dumps(param1)}
+    output['message'] = json.dumps(param1)
+
+    return output
+
+
+def generate_unknown_example(timestamp, host):
+    """
+    Generate an example of a message from an event source that is not
+    monitored.
+    """
+    output = generate_example(False, 1000, timestamp, host)
+    output['source_name'] = 'Unmonitored Event Source'
+
+    return output
+
+
 def keep_on_generating():
     """
     Generate example borg messages for testing purposes.
@@ -367,3 +428,101 @@ def keep_on_generating():
     while True:
         process_citrix_login(choice([generate_failure, generate_success])())
         sleep(5)
+
+
+def _legacy_datetime(date_time):
+    """
+    :returns: the :class:`datetime.datetime` for a date-time string or `None`
+    """
+    if date_time:
+        return parse_datetime(date_time)
+    return None
+
+
+def legacy_process_borg_message(message):
+    """
+    :func:`citrus_borg.locutus.assimilation.process_borg_message` before
+    the parser rewrite; used as the reference for the parser tests and
+    benchmarks
+    """
+    borg_message = collections.namedtuple(
+        'BorgMessage',
+        ['state', 'broker', 'test_result', 'storefront_connection_duration',
+         'receiver_startup_duration', 'connection_achieved_duration',
+         'logon_achieved_duration', 'logoff_achieved_duration',
+         'failure_reason', 'failure_details', 'raw_message'])
+    borg_message.broker = None
+    borg_message.test_result = False
+    borg_message.storefront_connection_duration = None
+    borg_message.receiver_startup_duration = None
+    borg_message.connection_achieved_duration = None
+    borg_message.logon_achieved_duration = None
+    borg_message.logoff_achieved_duration = None
+    borg_message.failure_reason = None
+    borg_message.failure_details = None
+    borg_message.state = 'undetermined'
+
+    borg_message.raw_message = str(message)
+    message = message.split('\n')
+    borg_message.state = message[0].split()[0]
+
+    if borg_message.state.lower() == 'successful':
+        borg_message.broker = message[0].split()[-1]
+        borg_message.test_result = bool(message[4].split()[-1])
+        borg_message.storefront_connection_duration = \
+            parse_duration(message[5].split()[-1])
+        borg_message.receiver_startup_duration = \
+            parse_duration(message[6].split()[-1])
+        borg_message.connection_achieved_duration = \
+            parse_duration(message[7].split()[-1])
+        borg_message.logon_achieved_duration = \
+            parse_duration(message[8].split()[-1])
+        borg_message.logoff_achieved_duration = \
+            parse_duration(message[9].split()[-1])
+    elif borg_message.state.lower() == 'failed':
+        borg_message.failure_reason = message[1].split(': ')[1]
+        borg_message.failure_details = '\n'.join(message[-12:-1])
+
+    return borg_message
+
+
+def legacy_parse_exchange_message(message):
+    """
+    :func:`citrus_borg.locutus.assimilation.parse_exchange_message` before
+    the parser rewrite; used as the reference for the parser tests and
+    benchmarks
+    """
+    ExchangeEvent = collections.namedtuple(  # pylint: disable=invalid-name
+        'ExchangeEvent',
+        ['event_group_id', 'event_type', 'event_status', 'event_message',
+         'event_exception', 'mail_account', 'event_body']
+    )
+    ExchangeMessage = collections.namedtuple(  # pylint: disable=invalid-name
+        'ExchangeMessage',
+        ['sent_from', 'sent_to',
+         'mail_message_identifier', 'received_from', 'received_by',
+         'mail_message_created', 'mail_message_sent', 'mail_message_received']
+    )
+
+    exchange_event = ExchangeEvent(
+        event_group_id=message.get('wm_id'),
+        event_type=message.get('type'),
+        event_status=message.get('status'),
+        event_message=message.get('message'),
+        event_exception=message.get('exception'),
+        mail_account=message.get('account'),
+        event_body=str(message))
+
+    exchange_message = None
+    if message.get('message_uuid', None):
+        exchange_message = ExchangeMessage(
+            sent_from=message.get('from_email'),
+            sent_to=message.get('to_emails'),
+            mail_message_identifier=message.get('message_uuid'),
+            received_from=message.get('from_address'),
+            received_by=message.get('to_addresses'),
+            mail_message_created=_legacy_datetime(message.get('created')),
+            mail_message_sent=_legacy_datetime(message.get('sent')),
+            mail_message_received=_legacy_datetime(message.get('received')))
+
+    return exchange_event, exchange_message
@@ -11,50 +11,36 @@ This module contains tests for the :ref:`Citrus Borg Application`.
 
 :contact:    daniel.busto@phsa.ca
 """
-import collections
+import json
+import threading
+from unittest import mock
 
 from django.conf import settings
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
 from django.utils import timezone
-
-from citrus_borg.locutus.assimilation import create_empty_borg_message
+from dynamic_preferences.registries import global_preferences_registry
+
+from citrus_borg import heartbeat, test_tools
+from citrus_borg.benchmarks import exchange_samples
+from citrus_borg.dynamic_preferences_registry import get_cached_preference
+from citrus_borg.load_test import compare_reports, generate_event, percentile
+from citrus_borg.locutus.assimilation import create_empty_borg_message, \
+    parse_citrix_login_event, parse_exchange_message, process_borg_message
+from citrus_borg.locutus.records import Borg, BorgHost
 from citrus_borg.models import WinlogbeatHost, BorgSite, BorgSiteNotSeen, \
     CitrixHost, KnownBrokeringDevice, EventCluster, WinlogEvent, \
     AllowedEventSource, WindowsLog
 from p_soc_auto_base.test_lib import UserTestCase
 
 
-# TODO this is pretty ugly...
 def _empty_borg():
-    borg = collections.namedtuple('Borg',
-                                  ['source_host', 'record_number', 'opcode',
-                                   'level', 'event_source', 'windows_log',
-                                   'borg_message', 'mail_borg_message',
-                                   'event_id', 'timestamp'])
-
-    borg_host = collections.namedtuple('BorgHost',
-                                       ['host_name', 'ip_address', ])
-
-    borg_host.host_name = 'Test'
-    borg_host.ip_address = '1.1.1.1'
-
     borg_message = create_empty_borg_message()
-
     borg_message.raw_message = 'a message was not provided with this event'
-    borg_message.state = 'undetermined'
     borg_message.broker = 'TestBroker'
 
-    borg.source_host = borg_host
-    borg.record_number = 0
-    borg.opcode = None
-    borg.level = None
-    borg.event_source = None
-    borg.windows_log = None
-    borg.event_id = None
-    borg.timestamp = None
-    borg.borg_message = borg_message
-    borg.mail_borg_message = None
-
-    return borg
+    return Borg(source_host=BorgHost(host_name='Test', ip_address='1.1.1.1'),
+                record_number=0, borg_message=borg_message)
 
 
 class BorgSiteNotSeenTest(UserTestCase):
@@ -224,3 +210,275 @@ class EventClusterTest(UserTestCase):
         test that end time is the latest time recorded in the cluster
         """
         self.assertEqual(self.cluster.end_time, self.times[-1])
+
+
+class LoadTestTest(UserTestCase):
+    """
+    Tests for the helpers in :mod:`citrus_borg.load_test`
+    """
+    def test_generateevent_exchangeparses(self):
+        """
+        test that generated exchange events can be parsed
+        """
+        borg = parse_citrix_login_event(
+            json.loads(generate_event('exchange', failure_ratio=1)))
+
+        self.assertEqual(borg.mail_borg_message[0].event_status, 'FAIL')
+
+    def test_generateevent_citrixparses(self):
+        """
+        test that generated citrix events can be parsed
+        """
+        borg = parse_citrix_login_event(
+            json.loads(generate_event('citrix', failure_ratio=0)))
+
+        self.assertEqual(borg.borg_message.state.lower(), 'successful')
+
+
+class LoadTestReportTest(SimpleTestCase):
+    """
+    Tests for the report functions in :mod:`citrus_borg.load_test`
+    """
+    def test_percentile_nearestrank(self):
+        """
+        test the nearest rank percentile
+        """
+        values = list(range(1, 101))
+
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile([3], 90), 3)
+        self.assertIsNone(percentile([], 50))
+
+    def test_comparereports_relativechange(self):
+        """
+        test that report comparisons show relative changes per stage
+        """
+        baseline = {'stages': {'store_mail_data': {
+            'count': 10, 'errors': 0, 'p50_ms': 10.0}}}
+        current = {'stages': {'store_mail_data': {
+            'count': 10, 'errors': 0, 'p50_ms': 15.0}}}
+
+        self.assertEqual(compare_reports(baseline, current),
+                         {'store_mail_data': {'p50_ms': 0.5}})
+
+
+@override_settings(CACHES={'default': {
+    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class HeartbeatTest(UserTestCase):
+    """
+    Tests for :mod:`citrus_borg.heartbeat`
+    """
+    def setUp(self):
+        cache.clear()
+        self.seen = timezone.now() - timezone.timedelta(hours=1)
+        self.host = WinlogbeatHost.objects.create(
+            host_name='heartbeat-host', last_seen=self.seen,
+            **self.USER_ARGS)
+
+    def test_record_buffersuntilflush(self):
+        """
+        test that recorded heartbeats are only written by flush, with one
+        select and one update for the buffered bot and no queries for the
+        brokers, which have nothing buffered
+        """
+        moment = timezone.now()
+        heartbeat.record(self.host, last_seen=moment,
+                         exchange_last_seen=None)
+
+        self.host.refresh_from_db()
+        self.assertEqual(self.host.last_seen, self.seen)
+
+        with self.assertNumQueries(2):
+            heartbeat.flush()
+
+        self.host.refresh_from_db()
+        self.assertAlmostEqual(self.host.last_seen.timestamp(),
+                               moment.timestamp(), places=3)
+        self.assertIsNone(self.host.exchange_last_seen)
+
+    def test_flush_nevergoesback(self):
+        """
+        test that an older buffered value does not replace a newer one
+        """
+        heartbeat.record(self.host,
+                         last_seen=self.seen - timezone.timedelta(hours=1))
+
+        self.assertEqual(heartbeat.flush()['citrus_borg.WinlogbeatHost'], 0)
+        self.host.refresh_from_db()
+        self.assertEqual(self.host.last_seen, self.seen)
+
+    def test_flush_readsonlybufferedrows(self):
+        """
+        test that flush reads only the rows with buffered heartbeats and
+        does not flush them twice
+        """
+        other = WinlogbeatHost.objects.create(
+            host_name='other-heartbeat-host', last_seen=self.seen,
+            **self.USER_ARGS)
+        heartbeat.record(self.host, last_seen=timezone.now())
+
+        with mock.patch.object(heartbeat, 'pending',
+                               wraps=heartbeat.pending) as pending:
+            heartbeat.flush()
+
+        pending.assert_called_once()
+        self.assertEqual(set(pending.call_args[0][1]), {self.host.pk})
+        self.assertNotIn(other.pk, pending.call_args[0][1])
+
+        with self.assertNumQueries(0):
+            self.assertEqual(heartbeat.flush(), {
+                'citrus_borg.WinlogbeatHost': 0,
+                'citrus_borg.KnownBrokeringDevice': 0})
+
+    def test_flush_waitsforslot(self):
+        """
+        test that flush does not move past a slot that is counted but not
+        filled yet, and reads it on the next flush
+        """
+        slot_key = heartbeat._index_key('citrus_borg.WinlogbeatHost',
+                                        'slot:1')
+        heartbeat.record(self.host, last_seen=timezone.now())
+        cache.delete(slot_key)
+
+        self.assertEqual(heartbeat.flush()['citrus_borg.WinlogbeatHost'], 0)
+
+        cache.set(slot_key, self.host.pk)
+
+        self.assertEqual(heartbeat.flush()['citrus_borg.WinlogbeatHost'], 1)
+
+    def test_flush_skipsevictedslot(self):
+        """
+        test that a slot that is still empty on the next flush does not
+        block the slots after it
+        """
+        other = WinlogbeatHost.objects.create(
+            host_name='other-heartbeat-host', last_seen=self.seen,
+            **self.USER_ARGS)
+        heartbeat.record(self.host, last_seen=timezone.now())
+        cache.delete(heartbeat._index_key('citrus_borg.WinlogbeatHost',
+                                          'slot:1'))
+        heartbeat.record(other, last_seen=timezone.now())
+
+        self.assertEqual(heartbeat.flush()['citrus_borg.WinlogbeatHost'], 0)
+        self.assertEqual(heartbeat.flush()['citrus_borg.WinlogbeatHost'], 1)
+
+        other.refresh_from_db()
+        self.assertGreater(other.last_seen, self.seen)
+
+    def test_flush_touchesupdatedon(self):
+        """
+        test that flushed heartbeats also update the `updated_on` column
+        """
+        updated_on = self.host.updated_on
+        heartbeat.record(self.host, last_seen=timezone.now())
+        heartbeat.flush()
+
+        self.host.refresh_from_db()
+        self.assertGreater(self.host.updated_on, updated_on)
+
+    def test_record_rejectsotherfields(self):
+        """
+        test that only heartbeat fields can be recorded
+        """
+        with self.assertRaises(ValueError):
+            heartbeat.record(self.host, host_name='nope')
+
+
+class ParserTest(SimpleTestCase):
+    """
+    Tests for the parsers in :mod:`citrus_borg.locutus.assimilation`
+
+    The parsers must return the same data as the legacy parsers in
+    :mod:`citrus_borg.test_tools`.
+    """
+    FIELDS = ('state', 'broker', 'storefront_connection_duration',
+              'receiver_startup_duration', 'connection_achieved_duration',
+              'logon_achieved_duration', 'logoff_achieved_duration',
+              'failure_reason', 'failure_details', 'raw_message')
+
+    def test_controlup_parity(self):
+        """
+        test that `ControlUp` messages are parsed the same way as by the
+        legacy parser
+        """
+        for sample in (test_tools.PASS_MSG, test_tools.FAIL_MSG):
+            legacy = test_tools.legacy_process_borg_message(sample)
+            parsed = process_borg_message(sample)
+            for field in self.FIELDS:
+                self.assertEqual(getattr(parsed, field),
+                                 getattr(legacy, field), field)
+
+    def test_controlup_test_result(self):
+        """
+        test that the test result is read from the message instead of being
+        `True` for any value, like in the legacy parser
+        """
+        self.assertTrue(process_borg_message(test_tools.PASS_MSG).test_result)
+        self.assertFalse(process_borg_message(
+            test_tools.PASS_MSG.replace('Result: True', 'Result: False')
+        ).test_result)
+
+    def test_exchange_parity(self):
+        """
+        test that the saved `Exchange` events are parsed the same way as by
+        the legacy parser
+        """
+        samples = exchange_samples()
+        self.assertTrue(samples)
+        for sample in samples:
+            legacy_event, legacy_message = \
+                test_tools.legacy_parse_exchange_message(sample)
+            event, message = parse_exchange_message(sample)
+            self.assertEqual(event._asdict(), dict(legacy_event._asdict()))
+            if legacy_message is None:
+                self.assertIsNone(message)
+            else:
+                self.assertEqual(message._asdict(),
+                                 dict(legacy_message._asdict()))
+
+    def test_records_are_independent(self):
+        """
+        test that messages parsed in concurrent threads do not share their
+        records
+        """
+        results = []
+
+        def parse(sample):
+            results.append((sample, process_borg_message(sample)))
+
+        threads = [threading.Thread(target=parse, args=(sample,))
+                   for sample in (test_tools.PASS_MSG, test_tools.FAIL_MSG)
+                   * 10]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        for sample, parsed in results:
+            self.assertEqual(parsed.raw_message, sample)
+
+
+@override_settings(CACHES={'default': {
+    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class CachedPreferenceTest(TestCase):
+    """
+    Tests for
+    :func:`citrus_borg.dynamic_preferences_registry.get_cached_preference`
+    """
+    key = 'citrusborgux__ux_alert_threshold'
+
+    def setUp(self):
+        cache.clear()
+
+    def test_cached_until_changed(self):
+        """
+        test that the value is read once and reloaded after a change
+        """
+        value = get_cached_preference(self.key)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_cached_preference(self.key), value)
+
+        changed = value + timezone.timedelta(seconds=1)
+        global_preferences_registry.manager()[self.key] = changed
+        self.assertEqual(get_cached_preference(self.key), changed)
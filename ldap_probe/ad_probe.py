@@ -28,6 +28,7 @@ import logging
 import ldap
 
 from ldap_probe import models
+from p_soc_auto_base.metrics import EXTERNAL_CALL_SECONDS
 from p_soc_auto_base.utils import Timer, diagnose_network_problem
 
 
@@ -98,6 +99,10 @@ class ADProbe:
         probe.bind_and_search()
 
         data = dict(probe.elapsed)
+        for operation, elapsed in data.items():
+            EXTERNAL_CALL_SECONDS.observe(
+                elapsed, service='ldap',
+                operation=operation.replace('elapsed_', ''))
 
         data['ad_controller'] = ad_controller
         data['ad_response'] = probe.ad_response
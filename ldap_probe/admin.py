@@ -21,6 +21,10 @@ from rangefilter.filter import DateTimeRangeFilter
 
 from ldap_probe import models
 from p_soc_auto_base import admin as base_admin, utils
+from p_soc_auto_base.changelist import (
+    CachedAllValuesFieldListFilter, CachedRelatedOnlyFieldListFilter,
+    LargeTableAdminMixin,
+)
 
 
 class LdapProbeBaseAdmin(base_admin.BaseAdmin, admin.ModelAdmin):
@@ -266,13 +270,15 @@ class LDAPBindCredAdmin(LdapProbeBaseAdmin, admin.ModelAdmin):
         return super().formfield_for_dbfield(db_field, request, **kwargs)
 
 
-class LdapProbeLogAdminBase(admin.ModelAdmin):
+class LdapProbeLogAdminBase(LargeTableAdminMixin, admin.ModelAdmin):
     """
     :class:`django.contrib.admin.ModelAdmin` base class for admin classes
     used by `proxy models
     <https://docs.djangoproject.com/en/2.2/topics/db/models/#proxy-models>`__
     that inherit from :class:`ldap_probe.models.LdapProbeLog`
     """
+    keyset_field = 'created_on'
+    list_select_related = ('ad_node', 'ad_orion_node__node', )
 
     search_fields = ('ad_node__node_dns', 'ad_orion_node__node__node_dns',
                      'ad_orion_node__node__node_caption',
@@ -315,8 +321,8 @@ class LdapProbeLogFailedAdmin(LdapProbeLogAdminBase, admin.ModelAdmin):
     """
     list_display = ('uuid', 'ad_orion_node', 'ad_node', 'errors', 'created_on')
     list_filter = (
-        ('ad_node', admin.RelatedOnlyFieldListFilter),
-        ('ad_orion_node', admin.RelatedOnlyFieldListFilter),
+        ('ad_node', CachedRelatedOnlyFieldListFilter),
+        ('ad_orion_node', CachedRelatedOnlyFieldListFilter),
         ('created_on', DateTimeRangeFilter),
     )
 
@@ -330,9 +336,9 @@ class LdapProbeFullBindLogAdmin(LdapProbeLogAdminBase, admin.ModelAdmin):
     list_display = ('uuid', 'ad_orion_node', 'ad_node', 'failed',
                     'elapsed_initialize', 'elapsed_bind', 'elapsed_search_ext',
                     'created_on', )
-    list_filter = (('ad_node', admin.RelatedOnlyFieldListFilter),
+    list_filter = (('ad_node', CachedRelatedOnlyFieldListFilter),
                    ('ad_orion_node',
-                    admin.RelatedOnlyFieldListFilter),
+                    CachedRelatedOnlyFieldListFilter),
                    ('created_on', DateTimeRangeFilter), )
 
 
@@ -345,11 +351,12 @@ class LdapProbeAnonBindLogAdmin(LdapProbeLogAdminBase, admin.ModelAdmin):
     list_display = ('uuid', 'ad_orion_node', 'ad_node', 'failed',
                     'elapsed_initialize', 'elapsed_anon_bind',
                     'elapsed_read_root', 'created_on', )
-    list_filter = (('ad_node', admin.RelatedOnlyFieldListFilter),
+    list_filter = (('ad_node', CachedRelatedOnlyFieldListFilter),
                    ('ad_orion_node',
-                    admin.RelatedOnlyFieldListFilter),
+                    CachedRelatedOnlyFieldListFilter),
                    ('created_on', DateTimeRangeFilter),
-                   'ad_orion_node__performance_bucket__name', )
+                   ('ad_orion_node__performance_bucket__name',
+                    CachedAllValuesFieldListFilter), )
 
 
 @admin.register(models.LdapCredError)
@@ -0,0 +1,36 @@
+"""
+ldap_probe.benchmarks
+---------------------
+
+Query benchmarks for the
+:ref:`Active Directory Services Monitoring Application`
+
+See :mod:`p_soc_auto_base.benchmark`.
+
+:copyright:
+
+    Copyright 2018 - 2020 Provincial Health Service Authority
+    of British Columbia
+
+:contact:    daniel.busto@phsa.ca
+"""
+from ldap_probe.models import NonOrionADNode, OrionADNode
+from p_soc_auto_base.benchmark import benchmark
+
+
+@benchmark()
+def probe_aggregates_full_bind():
+    """
+    the query behind the `LDAP` summary report for full binds
+    """
+    for node_class in (OrionADNode, NonOrionADNode):
+        list(node_class.report_probe_aggregates()[3])
+
+
+@benchmark()
+def probe_aggregates_anon_bind():
+    """
+    the query behind the `LDAP` summary report for anonymous binds
+    """
+    for node_class in (OrionADNode, NonOrionADNode):
+        list(node_class.report_probe_aggregates(anon=True)[3])
@@ -30,7 +30,7 @@ from django.utils.translation import gettext_lazy as _
 from citrus_borg.dynamic_preferences_registry import get_preference
 from p_soc_auto_base.models import BaseModel, BaseModelWithDefaultInstance
 from p_soc_auto_base.utils import (
-    get_uuid, get_absolute_admin_change_url, MomentOfTime,
+    get_uuid, get_absolute_admin_change_url, get_fqdn, MomentOfTime,
 )
 
 
@@ -358,7 +358,7 @@ class BaseADNode(BaseModel, models.Model):
         return queryset.annotate(
             probes_url=Concat(
                 Value(settings.SERVER_PROTO), Value('://'),
-                Value(socket.getfqdn()), Value(':'),
+                Value(get_fqdn()), Value(':'),
                 Value(settings.SERVER_PORT),
                 Value('/admin/ldap_probe/'), Value(probes_model_name),
                 Value(cls._details_url_filter()), F('id'),
@@ -930,7 +930,7 @@ class LdapProbeLog(models.Model):
         return cls.objects.filter(failed=True, created_on__gte=since).\
             annotate(probe_url=Concat(
                 Value(settings.SERVER_PROTO), Value('://'),
-                Value(socket.getfqdn()), Value(':'),
+                Value(get_fqdn()), Value(':'),
                 Value(settings.SERVER_PORT),
                 Value('/admin/ldap_probe/ldapprobelogfailed/'), F('id'),
                 Value('/change/'), output_field=TextField())).\
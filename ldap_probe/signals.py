@@ -18,6 +18,17 @@ from django.db.models.signals import post_save
 from django.dispatch import receiver
 
 from ldap_probe import models, tasks
+from p_soc_auto_base.alerts import coalesce_alert
+
+
+def _alert_subject(instance):
+    """
+    :returns: the key identifying the `AD` node probed by an
+        :class:`ldap_probe.models.LdapProbeLog` instance for the purpose of
+        coalescing alerts
+    """
+    return f'{instance.ad_orion_node_id}:{instance.ad_node_id}'
+
 
 # pylint: disable=unused-argument
 
@@ -36,7 +47,8 @@ def invoke_raise_ldap_failed_alert(sender, instance, *args, **kwargs):
     if not instance.failed:
         return
 
-    tasks.raise_ldap_probe_failed_alert.delay(instance.id)
+    coalesce_alert(tasks.raise_ldap_probe_failed_alert,
+                   _alert_subject(instance), instance.id)
 
 
 @receiver(post_save, sender=models.LdapProbeLog)
@@ -51,15 +63,18 @@ def invoke_raise_ldap_perf_alert(sender, instance, *args, **kwargs):
         return
 
     if instance.perf_err:
-        tasks.raise_ldap_probe_perf_err.delay(instance.id)
+        coalesce_alert(tasks.raise_ldap_probe_perf_err,
+                       _alert_subject(instance), instance.id)
         return
 
     if instance.perf_alert:
-        tasks.raise_ldap_probe_perf_alert.delay(instance.id)
+        coalesce_alert(tasks.raise_ldap_probe_perf_alert,
+                       _alert_subject(instance), instance.id)
         return
 
     if instance.perf_warn:
-        tasks.raise_ldap_probe_perf_warn.delay(instance.id)
+        coalesce_alert(tasks.raise_ldap_probe_perf_warn,
+                       _alert_subject(instance), instance.id)
 
     return
 
@@ -25,6 +25,7 @@ from citrus_borg.dynamic_preferences_registry import get_preference
 from ldap_probe.ad_probe import ADProbe
 from ldap_probe.models import LdapProbeLog
 from p_soc_auto_base import utils
+from p_soc_auto_base.archive import ARCHIVES, archive_queryset
 from p_soc_auto_base.utils import get_absolute_admin_change_url, \
     get_or_create_user
 from p_soc_auto_base.email import Email
@@ -237,6 +238,10 @@ def delete_expired_entries(data_source=None):
             f'There are no expired rows in {data_source._meta.model_name}.'
             ' It does not have an is_expired field')
 
+    if get_preference('citrusborgcommon__archive_expired') \
+            and data_source._meta.model_name in ARCHIVES:
+        archive_queryset(data_source.objects.filter(is_expired=True))
+
     count_deleted = data_source.objects.filter(is_expired=True).all().delete()
 
     LOG.info('Deleted %s expired rows from %s',
@@ -301,7 +306,8 @@ def maintain_ad_orion_nodes():
 
 
 @shared_task(queue='email', rate_limit='1/s')
-def raise_ldap_probe_failed_alert(instance_pk=None, subscription=None):
+def raise_ldap_probe_failed_alert(instance_pk=None, subscription=None,
+                                  coalesced=None):
     """
     raise an email alert for a failed instance of the
     :class:`ldap_probe.models.LdapProbeLog` model
@@ -314,6 +320,10 @@ def raise_ldap_probe_failed_alert(instance_pk=None, subscription=None):
         :class:`p_soc_auto_base.models.Subscription` instance required
         for raising this alert via email
 
+    :arg list coalesced: the primary keys of other instances about the same
+        node collected by :func:`p_soc_auto_base.alerts.coalesce_alert`;
+        only their number is shown in the alert
+
     """
     if subscription is None:
         subscription = get_preference('ldapprobe__ldap_error_subscription')
@@ -321,11 +331,13 @@ def raise_ldap_probe_failed_alert(instance_pk=None, subscription=None):
     return _raise_ldap_alert(
         instance_pk=instance_pk,
         subscription=Subscription.get_subscription(subscription),
+        coalesced_count=len(coalesced or []),
         level=get_preference('commonalertargs__error_level'))
 
 
 @shared_task(queue='email', rate_limit='1/s')
-def raise_ldap_probe_perf_err(instance_pk=None, subscription=None):
+def raise_ldap_probe_perf_err(instance_pk=None, subscription=None,
+                              coalesced=None):
     """
     raise an email alert for an instance of the
     :class:`ldap_probe.models.LdapProbeLog` model that shows performance
@@ -339,6 +351,10 @@ def raise_ldap_probe_perf_err(instance_pk=None, subscription=None):
         :class:`p_soc_auto_base.models.Subscription` instance required
         for raising this alert via email
 
+    :arg list coalesced: the primary keys of other instances about the same
+        node collected by :func:`p_soc_auto_base.alerts.coalesce_alert`;
+        only their number is shown in the alert
+
     """
     if subscription is None:
         subscription = get_preference('ldapprobe__ldap_perf_subscription')
@@ -346,11 +362,13 @@ def raise_ldap_probe_perf_err(instance_pk=None, subscription=None):
     return _raise_ldap_alert(
         instance_pk=instance_pk,
         subscription=Subscription.get_subscription(subscription),
+        coalesced_count=len(coalesced or []),
         level=get_preference('commonalertargs__error_level'))
 
 
 @shared_task(queue='email', rate_limit='1/s')
-def raise_ldap_probe_perf_alert(instance_pk=None, subscription=None):
+def raise_ldap_probe_perf_alert(instance_pk=None, subscription=None,
+                                coalesced=None):
     """
     raise an email alert for an instance of the
     :class:`ldap_probe.models.LdapProbeLog` model that shows performance
@@ -364,6 +382,10 @@ def raise_ldap_probe_perf_alert(instance_pk=None, subscription=None):
         :class:`p_soc_auto_base.models.Subscription` instance required
         for raising this alert via email
 
+    :arg list coalesced: the primary keys of other instances about the same
+        node collected by :func:`p_soc_auto_base.alerts.coalesce_alert`;
+        only their number is shown in the alert
+
     """
     if subscription is None:
         subscription = get_preference('ldapprobe__ldap_perf_subscription')
@@ -371,11 +393,13 @@ def raise_ldap_probe_perf_alert(instance_pk=None, subscription=None):
     return _raise_ldap_alert(
         instance_pk=instance_pk,
         subscription=Subscription.get_subscription(subscription),
+        coalesced_count=len(coalesced or []),
         level=get_preference('commonalertargs__warn_level'))
 
 
 @shared_task(queue='email', rate_limit='1/s')
-def raise_ldap_probe_perf_warn(instance_pk=None, subscription=None):
+def raise_ldap_probe_perf_warn(instance_pk=None, subscription=None,
+                               coalesced=None):
     """
     raise an email alert for an instance of the
     :class:`ldap_probe.models.LdapProbeLog` model that shows performance
@@ -389,6 +413,10 @@ def raise_ldap_probe_perf_warn(instance_pk=None, subscription=None):
         :class:`p_soc_auto_base.models.Subscription` instance required
         for raising this alert via email
 
+    :arg list coalesced: the primary keys of other instances about the same
+        node collected by :func:`p_soc_auto_base.alerts.coalesce_alert`;
+        only their number is shown in the alert
+
     """
     if subscription is None:
         subscription = get_preference('ldapprobe__ldap_perf_subscription')
@@ -396,6 +424,7 @@ def raise_ldap_probe_perf_warn(instance_pk=None, subscription=None):
     return _raise_ldap_alert(
         instance_pk=instance_pk,
         subscription=Subscription.get_subscription(subscription),
+        coalesced_count=len(coalesced or []),
         level=get_preference('commonalertargs__info_level'))
 
 
@@ -842,7 +871,7 @@ def dispatch_ldap_report(data_source, anon, perf_filter, **time_delta_args):
                 data_source, anon, perf_filter, time_delta_args)
 
 
-def _raise_ldap_alert(subscription, level, instance_pk):
+def _raise_ldap_alert(subscription, level, instance_pk, coalesced_count=0):
     """
     invoke the email sending mechanism for an `LDAP` alert
 
@@ -861,6 +890,9 @@ def _raise_ldap_alert(subscription, level, instance_pk):
     :arg int instance_pk: the primary key of the
         :class:`ldap_probe.models.LdapProbeLog` that is subject to the alert
 
+    :arg int coalesced_count: the number of similar alerts about the same
+        node that were held back while the coalescing window was open
+
     :returns: an interpretation of the return value of the
         :meth:`ssl_cert_tracker.lib.Email.send` operation
 
@@ -889,6 +921,7 @@ def _raise_ldap_alert(subscription, level, instance_pk):
         ret = Email.send_email(
             data=data, subscription=subscription, add_csv=False,
             level=level, node=ldap_probe.node, errors=ldap_probe.errors,
+            coalesced_count=coalesced_count,
             created_on=ldap_probe.created_on,
             probe_url=ldap_probe.absolute_url,
             orion_url=ldap_probe.ad_node_orion_url,
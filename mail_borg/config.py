@@ -18,6 +18,7 @@ Configuration module for the :ref:`Mail Borg Client Application`
 """
 import collections
 import configparser
+import hashlib
 import json
 import socket
 
@@ -55,6 +56,28 @@ configuration that will be used if loading the configuration from the server
 is disabled
 """
 
+ADDRESS_CACHE = 'mail_borg_addresses.json'
+"""
+:class:`str` ADDRESS_CACHE is the name of the file used to cache the results
+of validating email addresses, see :func:`load_address_cache`. It lives in
+the same directory as the :attr:`LOCAL_CONFIG` file
+"""
+
+ADDRESS_CACHE_TTL = 24 * 60 * 60
+"""
+:class:`int` ADDRESS_CACHE_TTL: how long a valid email address stays in the
+:attr:`ADDRESS_CACHE` file, in seconds
+"""
+
+ADDRESS_CACHE_NEGATIVE_TTL = 10 * 60
+"""
+:class:`int` ADDRESS_CACHE_NEGATIVE_TTL: how long an email address that
+failed the validation stays in the :attr:`ADDRESS_CACHE` file, in seconds
+
+This is much shorter than :attr:`ADDRESS_CACHE_TTL` because the failure
+can be caused by a DNS problem that goes away
+"""
+
 WIN_EVT_CFG = dict(
     app_name='BorgExchangeMonitor',
     log_type='Application',
@@ -89,6 +112,14 @@ clicks on the ``Reset local config`` button
 """
 
 
+class ConfigNotModified(Exception):
+    """
+    raised by :func:`get_config_from_server` when the main configuration on
+    the ``SOC Automation server`` is the same as the one in the
+    :attr:`LOCAL_CONFIG` file
+    """
+
+
 def parse_duration(duration, to_minutes=False):
     """
     cast a duration  to an integer value representing seconds or minutes
@@ -239,6 +270,10 @@ def load_config(current_base_config=None):
     When the main configuration is successfully loaded from the server, this
     function will cache the configuration to the ``mail_borg.json`` file.
 
+    The request to the server carries the `ETag` of the cached
+    configuration. If the configuration on the server has not changed, the
+    server does not send it again and the cached configuration is used.
+
     This function is also responsible for invoking the :func:`parse_duration`
     function in order to de-serialize duration fields to minutes or seconds
     expressed as :class:`int`.
@@ -281,7 +316,19 @@ def load_config(current_base_config=None):
         return config
 
     try:
-        config = get_config_from_server(base_config)
+        local_config = get_config_from_file()
+    except Exception:  # pylint: disable=broad-except
+        local_config = dict()
+
+    try:
+        config = get_config_from_server(
+            base_config, etag=local_config.get('etag'))
+    except ConfigNotModified:
+        local_config['load_status'] = (
+            'Configuration %s not changed on server'
+            % local_config['exchange_client_config']['config_name'])
+
+        return local_config
     except Exception as err:  # pylint: disable=broad-except
         config_err = err
         config = None
@@ -334,7 +381,7 @@ def load_config(current_base_config=None):
     return config
 
 
-def get_config_from_server(base_configuration):
+def get_config_from_server(base_configuration, etag=None):
     """
     Get the configuration from the ``SOC Automation server``
 
@@ -345,22 +392,45 @@ def get_config_from_server(base_configuration):
 
         the basic configuration values required for connecting to the server
 
-    :returns: a JSON encoded :class:`str`
+    :arg str etag:
+
+        the `ETag` of the configuration in the :attr:`LOCAL_CONFIG` file,
+        if any
+
+        If the configuration on the server has the same `ETag`, the server
+        answers with `304 Not Modified` instead of sending it again.
+
+    :returns: a JSON encoded :class:`str`; the `ETag` of the configuration
+        is stored under the ``etag`` key
+
+    :raises: :exc:`ConfigNotModified` if the configuration on the server
+        matches the ``etag`` argument
     """
     rest_endpoint = 'mail_collector/api/get_config'
     SESSION.verify = VERIFY_SSL
 
+    headers = dict()
+    if etag:
+        headers['If-None-Match'] = etag
+
     response = SESSION.get(
         '{}://{}:{}/{}/{}/'.format(
             HTTP_PROTO, base_configuration.get('cfg_srv_ip'),
             base_configuration.get('cfg_srv_port'), rest_endpoint,
             socket.gethostname()),
+        headers=headers,
         timeout=(base_configuration.get('cfg_srv_conn_timeout'),
                  base_configuration.get('cfg_srv_read_timeout')))
 
+    if response.status_code == 304:
+        raise ConfigNotModified()
+
     response.raise_for_status()
 
-    return response.json()[0]
+    config = response.json()[0]
+    config['etag'] = response.headers.get('ETag')
+
+    return config
 
 
 def get_config_from_file(json_file=LOCAL_CONFIG):
@@ -403,3 +473,73 @@ def dump_config_to_file(config, json_file=LOCAL_CONFIG):
     """
     with open(json_file, 'w') as local_config:
         json.dump(config, local_config, indent=4)
+
+
+def address_cache_version(config):
+    """
+    :returns: a hash of the ``exchange_client_config`` part of the main
+        configuration; the :attr:`ADDRESS_CACHE` file is discarded when
+        this value changes
+    :rtype: :class:`str`
+
+    :arg dict config: the main configuration
+    """
+    return hashlib.sha1(json.dumps(
+        config.get('exchange_client_config'), sort_keys=True, default=str
+    ).encode('utf-8')).hexdigest()
+
+
+def load_address_cache(config, json_file=ADDRESS_CACHE):
+    """
+    get the cached results of validating email addresses from a local file
+
+    The results are discarded when the main configuration has changed since
+    they were cached, see :func:`address_cache_version`.
+
+    :arg dict config: the main configuration
+
+    :arg str json_file:
+
+        the relative path and name  of the `JSON <https://www.json.org/>`__
+        file
+
+        The default value is provided via the :attr:`ADDRESS_CACHE` variable
+        value
+
+    :returns: the cached results keyed by email address, or an empty
+        :class:`dict` if the file is missing, cannot be read, or was written
+        for another configuration
+    """
+    try:
+        with open(json_file, 'r') as address_cache:
+            cached = json.load(address_cache)
+    except (OSError, ValueError):
+        return dict()
+
+    if not isinstance(cached, dict) \
+            or cached.get('version') != address_cache_version(config):
+        return dict()
+
+    return cached.get('addresses', dict())
+
+
+def dump_address_cache(addresses, config, json_file=ADDRESS_CACHE):
+    """
+    save the results of validating email addresses to a local file
+
+    :arg dict addresses: the results keyed by email address
+
+    :arg dict config: the main configuration used for the validation
+
+    :arg str json_file:
+
+        the relative path and name  of the `JSON <https://www.json.org/>`__
+        file
+
+        The default value is provided via the :attr:`ADDRESS_CACHE` variable
+        value
+    """
+    with open(json_file, 'w') as address_cache:
+        json.dump(dict(version=address_cache_version(config),
+                       addresses=addresses),
+                  address_cache, indent=4)
@@ -49,6 +49,7 @@ import json
 import socket
 import time
 
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from uuid import uuid4
 
@@ -62,9 +63,18 @@ from exchangelib import (
 from exchangelib.errors import ErrorTooManyObjectsOpened
 from retry import retry
 
-from config import load_config
+from config import (
+    load_config, load_address_cache, dump_address_cache, ADDRESS_CACHE_TTL,
+    ADDRESS_CACHE_NEGATIVE_TTL,
+)
 from logger import LogWinEvent
 
+MAX_WORKERS = 8
+"""
+:class:`int` MAX_WORKERS: the maximum number of Exchange messages that a
+:class:`WitnessMessages` instance sends or looks for at the same time
+"""
+
 
 class _Logger:
     """
@@ -202,6 +212,28 @@ def _get_account(config):
     return '{}\\{}'.format(config.get('domain'), config.get('username'))
 
 
+def _retry_delays(min_wait, step, max_wait):
+    """
+    :returns: the waits between the retries of an Exchange action
+
+        The waits start at ``min_wait`` and are multiplied by the back-off
+        factor ``step`` while they are shorter than ``max_wait``. The last
+        wait is always ``max_wait``; the action is given up after it.
+    :rtype: :class:`list`
+    """
+    delays = []
+    delay = min_wait
+    while 0 < delay < max_wait:
+        delays.append(delay)
+        if delay * step <= delay:
+            break
+        delay *= step
+
+    delays.append(max_wait)
+
+    return delays
+
+
 def validate_email_to_ascii(email_address, **config):
     """
     this function is using the `python-email-validator
@@ -230,6 +262,10 @@ def validate_email_to_ascii(email_address, **config):
 
     The options are provided via the ``config`` argument.
 
+    The address lists seldom change between runs, so the result of the
+    validation is cached in the :attr:`config.ADDRESS_CACHE` file, see
+    :func:`config.load_address_cache`. A cached failure is still logged.
+
     :arg str email_address: the email address to validate
 
     :arg config:
@@ -259,6 +295,44 @@ def validate_email_to_ascii(email_address, **config):
     if not config:
         config = load_config()
 
+    addresses = load_address_cache(config)
+    address = addresses.get(email_address)
+    if address is None or address.get('expires', 0) <= time.time():
+        address = _check_email_address(email_address, config)
+        addresses[email_address] = address
+        try:
+            dump_address_cache(addresses, config)
+        except OSError:
+            # the cache only saves lookups, the address is still validated
+            pass
+
+    if 'error' in address:
+        _Logger().warn(
+            dict(type='configuration', status='FAIL',
+                 wm_id=config.get('wm_id'),
+                 account=email_address,
+                 message='bad email address %s' % email_address,
+                 exception=address.get('error'))
+        )
+        return None
+
+    if config.get('force_ascii_email'):
+        return address.get('email_ascii')
+
+    return address.get('email')
+
+
+def _check_email_address(email_address, config):
+    """
+    validate an email address with the `python-email-validator` package
+
+    :returns: the 'email' and 'email_ascii' forms of a valid address or the
+        'error' raised by the validation, and when this result 'expires'; a
+        failure expires after :attr:`config.ADDRESS_CACHE_NEGATIVE_TTL`
+        seconds, a valid address after :attr:`config.ADDRESS_CACHE_TTL`
+        seconds
+    :rtype: :class:`dict`
+    """
     try:
         email_dict = validate_email(
             email_address,
@@ -270,19 +344,12 @@ def validate_email_to_ascii(email_address, **config):
             check_deliverability=config.get('exchange_client_config').
             get('check_mx'))
     except (EmailSyntaxError, EmailUndeliverableError) as error:
-        _Logger().warn(
-            dict(type='configuration', status='FAIL',
-                 wm_id=config.get('wm_id'),
-                 account=email_address,
-                 message='bad email address %s' % email_address,
-                 exception=str(error))
-        )
-        return None
-
-    if config.get('force_ascii_email'):
-        return email_dict.get('email_ascii')
+        return dict(error=str(error),
+                    expires=time.time() + ADDRESS_CACHE_NEGATIVE_TTL)
 
-    return email_dict.get('email')
+    return dict(email=email_dict.get('email'),
+                email_ascii=email_dict.get('email_ascii'),
+                expires=time.time() + ADDRESS_CACHE_TTL)
 
 
 def get_accounts(**config):
@@ -472,15 +539,26 @@ class WitnessMessages:  # pylint: disable=too-many-instance-attributes
     :meth:`verify_receive` will look for the sent messages in the receiving
     ``inbox``. The :meth:`verify_receive` will also invoke the
     :meth:`send` method when the :attr:`_sent` is ``False``.
+
+    Both methods work on all the messages at the same time, on a thread pool
+    of at most :attr:`max_workers` threads. One slow mailbox does not delay
+    the other messages, and each ``inbox`` is searched for all the messages
+    sent to it at once. The events are logged in the order of the
+    messages once all of them are processed, the same events that
+    processing the messages one after another would log.
     """
 
     def __init__(
-            self, accounts=None, logger=None, console_logger=None, **config):
+            self, accounts=None, logger=None, console_logger=None,
+            max_workers=None, **config):
         """
         :arg list accounts: a list of :class:`exchangelib.Account` objects
             If accounts is ``None``, the constructor will build one using
             the data in the ``config`` argument(s)
 
+        :arg int max_workers: the size of the thread pool used for sending
+            and verifying messages; default is :attr:`MAX_WORKERS`
+
         :arg queue.Queue console_logger:
 
             the queue used to pass messages to a GUI interface running on the
@@ -511,6 +589,15 @@ class WitnessMessages:  # pylint: disable=too-many-instance-attributes
         Aborting happens if there are no messages in the sending queue
         """
 
+        self.max_workers = max_workers or MAX_WORKERS
+        """the size of the thread pool used for sending and verifying"""
+
+        self._sent_at = {}
+        """
+        when each message was sent, keyed by message uuid, as
+        :func:`time.monotonic` values
+        """
+
         if not config:
             config = load_config()
 
@@ -617,6 +704,31 @@ class WitnessMessages:  # pylint: disable=too-many-instance-attributes
 
         return tags
 
+    def _for_each_message(self, func, messages):
+        """
+        call a function for each message on a thread pool of at most
+        :attr:`max_workers` threads
+
+        :returns: a (message, result, error) tuple for each message, in the
+            order of the messages; the error is the exception raised by the
+            function, if any
+        :rtype: list
+        """
+        if not messages:
+            return []
+
+        with ThreadPoolExecutor(
+                max_workers=min(self.max_workers, len(messages))) as executor:
+            futures = [executor.submit(func, message) for message in messages]
+
+        results = []
+        for message, future in zip(messages, futures):
+            error = future.exception()
+            results.append(
+                (message, None if error else future.result(), error))
+
+        return results
+
     def send(self, min_wait_receive=None, step_wait_receive=None,
              max_wait_receive=None):
         """
@@ -630,6 +742,8 @@ class WitnessMessages:  # pylint: disable=too-many-instance-attributes
         :attr:`messages` instance attribute, and keep sending the rest of
         the messages.
 
+        The messages are sent at the same time, see :meth:`_for_each_message`.
+
         This method uses a pattern known as `retry with exponential back-off
         and circuit breaker
         <https://dzone.com/articles/understanding-retry-pattern-with-exponential-back>`__
@@ -683,6 +797,7 @@ class WitnessMessages:  # pylint: disable=too-many-instance-attributes
             contains an `ErrorTooManyObjectsOpened` error.
             """
             message.message.send()
+            self._sent_at[message.message_uuid] = time.monotonic()
 
         if self._abort:
             if self.update_window_queue:
@@ -702,10 +817,11 @@ class WitnessMessages:  # pylint: disable=too-many-instance-attributes
             return 'nothing to send'
 
         # we need to purge the messages that we cannot send, thus
-        messages = self.messages
-        for message in messages:
-            try:
-                send_message(message)
+        sent_messages = []
+        for message, _, error in self._for_each_message(
+                send_message, self.messages):
+            if error is None:
+                sent_messages.append(message)
 
                 self.logger.info(
                     dict(type='send', status='PASS',
@@ -720,7 +836,7 @@ class WitnessMessages:  # pylint: disable=too-many-instance-attributes
                                               message.message.to_recipients]))
                 )
 
-            except Exception as error:
+            else:
                 self.logger.err(
                     dict(type='send', status='FAIL',
                          wm_id=self.config.get('wm_id'),
@@ -735,8 +851,7 @@ class WitnessMessages:  # pylint: disable=too-many-instance-attributes
                          exception=str(error))
                 )
 
-                self.messages.remove(message)
-
+        self.messages = sent_messages
         self._sent = True
 
         return 'sent'
@@ -749,7 +864,10 @@ class WitnessMessages:  # pylint: disable=too-many-instance-attributes
 
         * for each account:
 
-          * open the account.inbox and search for each message by uuid
+          * open the account.inbox and search for all the messages of this
+            instance, i.e. for the ``message_group_id`` in the subject
+
+          * match the messages found by uuid
 
             * if found log the sent_at, received_at for further analysis
 
@@ -757,6 +875,13 @@ class WitnessMessages:  # pylint: disable=too-many-instance-attributes
               cannot communicate from ``message.account.smtp_address``
               to ``account.inbox.smtp_adddress``
 
+        Each ``inbox`` is searched once per retry round, no matter how many
+        messages were sent to it, and only until all of them are found. The
+        ``inbox`` instances are searched at the same time, see
+        :meth:`_for_each_message`. The first search starts
+        ``min_wait_receive`` seconds after the last message to that
+        ``inbox`` was sent.
+
         This method uses a pattern known as `retry with exponential back-off
         and circuit breaker
         <https://dzone.com/articles/understanding-retry-pattern-with-exponential-back>`__
@@ -796,43 +921,67 @@ class WitnessMessages:  # pylint: disable=too-many-instance-attributes
                 self.config.get(
                     'exchange_client_config').get('max_wait_receive'))
 
-        class ErrorMessageNotFound(Exception):
-            """
-            custom exception to be raised in case a message is not found
-            """
+        delays = _retry_delays(
+            min_wait_receive, step_wait_receive, max_wait_receive)
+        subject_filter = 'message_group_id: {}'.format(
+            self.config.get('wm_id'))
 
-        @retry((ErrorTooManyObjectsOpened, ErrorMessageNotFound),
-               delay=int(min_wait_receive), max_delay=int(max_wait_receive),
-               backoff=int(step_wait_receive))
-        def get_from_inbox(message):
+        def search_inbox(messages):
             """
-            look for the message in the destination inbox
-
-            In case of failure, retry if the failure was one of
-            :exc:`exchangelib.ErrorMessageNotFound` or
-            :exc:`exchangelib.ErrorTooManyObjectsOpened`. The latter is
-            typical of cases when the Exchange server is throttling
-            connections.
-
-            The retry operation follows the pattern below:
-
-            * apply the minimal delay
-
-            * try; if it worked, return
-
-            * multiply the current delay by the back-off factor
-
-            * wait for the current delay and try
-
-            * if the current delay has reached the maximum delay, give up
+            look for all the messages sent to the same ``inbox``, one search
+            for each retry round
+
+            The search matches the subject of every message in the group; the
+            messages found are matched by uuid and dropped from the
+            outstanding ones. A round that fails with
+            :exc:`exchangelib.ErrorTooManyObjectsOpened`, typical of cases
+            when the Exchange server is throttling connections, is retried
+            like a round that did not find all the messages.
+
+            The first round starts ``min_wait_receive`` seconds after the
+            last message in the group was sent. The rounds are then
+            separated by the delays returned by :func:`_retry_delays`; the
+            search gives up after the last of them.
+
+            :returns: a (found message, error) tuple keyed by message uuid
+            :rtype: dict
             """
-            found_message = message.account_for_message.inbox.filter(
-                subject__icontains=str(message.message_uuid))
-
-            if found_message.exists():
-                return found_message.get()
-
-            raise ErrorMessageNotFound()
+            inbox = messages[0].account_for_message.inbox
+            outstanding = set()
+            sent_at = 0
+            for message in messages:
+                outstanding.add(str(message.message_uuid))
+                sent_at = max(sent_at, self._sent_at.get(
+                    message.message_uuid, time.monotonic()))
+
+            time.sleep(max(0, sent_at + min_wait_receive - time.monotonic()))
+
+            results = {}
+            error = None
+            for delay in [None] + delays:
+                if delay is not None:
+                    time.sleep(delay)
+
+                try:
+                    for item in inbox.filter(
+                            subject__icontains=subject_filter):
+                        message_uuid = item.subject.rpartition(
+                            'message_id:')[2].strip()
+                        if message_uuid in outstanding:
+                            outstanding.remove(message_uuid)
+                            results[message_uuid] = (item, None)
+                except ErrorTooManyObjectsOpened as too_many:
+                    error = too_many
+                else:
+                    error = None
+
+                if not outstanding:
+                    break
+
+            for message_uuid in outstanding:
+                results[message_uuid] = (None, error)
+
+            return results
 
         if self._abort:
             if self.update_window_queue:
@@ -843,12 +992,26 @@ class WitnessMessages:  # pylint: disable=too-many-instance-attributes
         if not self._sent:
             self.send()
 
-        time.sleep(min_wait_receive)
+        groups = collections.OrderedDict()
+        for message in self.messages:
+            groups.setdefault(
+                message.account_for_message.primary_smtp_address.lower(),
+                []).append(message)
+
+        found = {}
+        for group, results, error in self._for_each_message(
+                search_inbox, list(groups.values())):
+            for message in group:
+                message_uuid = str(message.message_uuid)
+                if error is None:
+                    found[message_uuid] = results[message_uuid]
+                else:
+                    found[message_uuid] = (None, error)
+
         for message in self.messages:
+            found_message, error = found[str(message.message_uuid)]
 
-            try:
-                found_message = get_from_inbox(message)
-            except ErrorTooManyObjectsOpened as error:
+            if isinstance(error, ErrorTooManyObjectsOpened):
                 self.logger.err(
                     dict(type='receive', status='FAIL',
                          wm_id=self.config.get('wm_id'),
@@ -867,9 +1030,7 @@ class WitnessMessages:  # pylint: disable=too-many-instance-attributes
                               message.message.to_recipients]))
                 )
                 continue
-            except ErrorMessageNotFound:
-                found_message = None
-            except Exception as error:
+            if error is not None:
                 self.logger.err(dict(type='receive', status='FAIL',
                                      wm_id=self.config.get('wm_id'),
                                      account=message.
@@ -0,0 +1,552 @@
+"""
+.. _mail_borg_tests:
+
+:module:    mail_borg.tests
+
+:copyright:
+
+    Copyright 2018 - 2020 Provincial Health Service Authority
+    of British Columbia
+
+:contact:    daniel.busto@phsa.ca
+
+Tests for the :ref:`Mail Borg Client Application`
+
+The Exchange accounts and messages are replaced with in-memory fakes. The
+application modules are imported the way the application imports them, from
+the `mail_borg` directory. The tests need the client requirements and are
+skipped on hosts without them, e.g. by ``python manage.py test`` on the
+server. On a client host, run them from the `mail_borg` directory::
+
+    python -m unittest tests
+"""
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from datetime import datetime, timedelta
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# pylint: disable=wrong-import-position
+try:
+    import config
+    import mailer
+except ImportError as error:
+    raise unittest.SkipTest(
+        f'the mail borg client requirements are not installed: {error}')
+# pylint: enable=wrong-import-position
+
+
+class FakeEventLogger:
+    """
+    stand-in for :class:`logger.LogWinEvent` that keeps the events
+    """
+    def __init__(self):
+        self.events = []
+
+    def _log(self, level, strings):
+        self.events.append((level, json.loads(strings[0])))
+
+    def info(self, strings):
+        self._log('info', strings)
+
+    def warn(self, strings):
+        self._log('warn', strings)
+
+    def err(self, strings):
+        self._log('err', strings)
+
+
+class FakeMailbox:
+    """
+    stand-in for :class:`exchangelib.Mailbox`
+    """
+    def __init__(self, email_address):
+        self.email_address = email_address
+
+
+class FakeQuery:
+    """
+    stand-in for the :class:`exchangelib.queryset.QuerySet` returned by
+    :meth:`FakeInbox.filter`
+    """
+    def __init__(self, messages):
+        self.messages = messages
+
+    def __iter__(self):
+        return iter(self.messages)
+
+    def exists(self):
+        return bool(self.messages)
+
+    def get(self):
+        return self.messages[0]
+
+
+class FakeInbox:
+    """
+    stand-in for the `inbox` folder of an :class:`exchangelib.Account`; each
+    search takes :attr:`delay` seconds and the messages show up in the
+    search results :attr:`latency` seconds after they are sent
+    """
+    delay = 0.1
+    latency = 0
+
+    def __init__(self):
+        self.messages = []
+        self.searches = 0
+        self.lock = threading.Lock()
+
+    def filter(self, subject__icontains):
+        time.sleep(self.delay)
+        with self.lock:
+            self.searches += 1
+            return FakeQuery([
+                message for message in self.messages
+                if subject__icontains in message.subject
+                and message.visible_at <= time.monotonic()])
+
+
+class FakeAccount:
+    """
+    stand-in for :class:`exchangelib.Account`
+    """
+    def __init__(self, primary_smtp_address):
+        self.primary_smtp_address = primary_smtp_address
+        self.inbox = FakeInbox()
+
+
+class FakeMessage:
+    """
+    stand-in for :class:`exchangelib.Message`; sending takes :attr:`delay`
+    seconds and delivers the message to the inbox of the sending account
+    """
+    delay = 0.1
+
+    def __init__(self, account, subject, body, to_recipients,
+                 cc_recipients=None):
+        self.account = account
+        self.subject = subject
+        self.body = body
+        self.author = FakeMailbox(account.primary_smtp_address)
+        self.to_recipients = [FakeMailbox(address)
+                              for address in to_recipients]
+        self.cc_recipients = cc_recipients
+        self.datetime_created = self.datetime_sent = \
+            self.datetime_received = None
+        self.visible_at = None
+
+    def send(self):
+        self.datetime_created = datetime.now()
+        time.sleep(self.delay)
+        self.datetime_sent = datetime.now()
+        self.datetime_received = self.datetime_sent + timedelta(
+            seconds=self.account.inbox.latency)
+        self.visible_at = time.monotonic() + self.account.inbox.latency
+        with self.account.inbox.lock:
+            self.account.inbox.messages.append(self)
+
+    def delete(self):
+        with self.account.inbox.lock:
+            self.account.inbox.messages.remove(self)
+
+
+def make_config(**exchange_client_config):
+    """
+    :returns: a minimal main configuration, see :ref:`borg_client_config`;
+        the keyword arguments override the `exchange_client_config` values
+    """
+    config = {
+        'host_name': 'test-bot',
+        'site': {'site': 'test-site'},
+        'exchange_client_config': {
+            'min_wait_receive': 0, 'backoff_factor': 1,
+            'max_wait_receive': 1, 'debug': False, 'tags': '[TEST]',
+            'email_subject': 'exchange monitoring message',
+            'witness_addresses': None,
+        },
+    }
+    config['exchange_client_config'].update(exchange_client_config)
+
+    return config
+
+
+def normalize(events):
+    """
+    drop the values that change with each run from the events
+    """
+    volatile = {'wm_id', 'message_uuid', 'created', 'sent', 'received'}
+    return [
+        (level, {key: value for key, value in event.items()
+                 if key not in volatile})
+        for level, event in events
+    ]
+
+
+class WitnessMessagesTest(unittest.TestCase):
+    """
+    Tests for :class:`mailer.WitnessMessages`
+    """
+    def setUp(self):
+        for name, fake in (('Account', FakeAccount), ('Message', FakeMessage)):
+            patcher = mock.patch.object(mailer, name, fake)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    @staticmethod
+    def run_cycle(accounts, max_workers):
+        """
+        send and verify a message for each account
+
+        :returns: the events and the duration of the cycle
+        """
+        event_logger = FakeEventLogger()
+        witness_messages = mailer.WitnessMessages(
+            accounts=accounts, logger=event_logger, max_workers=max_workers,
+            **make_config())
+
+        start = time.perf_counter()
+        witness_messages.verify_receive()
+
+        return event_logger.events, time.perf_counter() - start
+
+    def test_same_events_as_sequential(self):
+        """
+        test that the events match those of processing the messages one
+        after another
+        """
+        sequential, _ = self.run_cycle(
+            [FakeAccount(f'bot{index}@example.com') for index in range(5)],
+            max_workers=1)
+        concurrent, _ = self.run_cycle(
+            [FakeAccount(f'bot{index}@example.com') for index in range(5)],
+            max_workers=5)
+
+        self.assertEqual(normalize(concurrent), normalize(sequential))
+        self.assertEqual(
+            [(event['type'], event['status']) for _, event in concurrent],
+            [('send', 'PASS')] * 5 + [('receive', 'PASS')] * 5)
+
+    def test_failed_send_is_not_verified(self):
+        """
+        test that a message that cannot be sent is dropped
+        """
+        accounts = [FakeAccount(f'bot{index}@example.com')
+                    for index in range(3)]
+
+        def broken_send():
+            raise ValueError('cannot send')
+
+        witness_messages = mailer.WitnessMessages(
+            accounts=accounts, logger=FakeEventLogger(), **make_config())
+        witness_messages.messages[1].message.send = broken_send
+        witness_messages.verify_receive()
+
+        events = [(event['type'], event['status'], event['account'])
+                  for _, event in witness_messages.logger.event_logger.events]
+        self.assertEqual(events, [
+            ('send', 'PASS', 'bot0@example.com'),
+            ('send', 'FAIL', 'bot1@example.com'),
+            ('send', 'PASS', 'bot2@example.com'),
+            ('receive', 'PASS', 'bot0@example.com'),
+            ('receive', 'PASS', 'bot2@example.com'),
+        ])
+
+    def test_cycle_time(self):
+        """
+        test that the cycle is shorter when the messages are processed at
+        the same time
+        """
+        _, sequential = self.run_cycle(
+            [FakeAccount(f'bot{index}@example.com') for index in range(8)],
+            max_workers=1)
+        _, concurrent = self.run_cycle(
+            [FakeAccount(f'bot{index}@example.com') for index in range(8)],
+            max_workers=8)
+
+        self.assertLess(concurrent, sequential / 2)
+
+
+class InboxSearchTest(unittest.TestCase):
+    """
+    Tests for the inbox searches of
+    :meth:`mailer.WitnessMessages.verify_receive`
+    """
+    def setUp(self):
+        for name, fake in (('Account', FakeAccount), ('Message', FakeMessage)):
+            patcher = mock.patch.object(mailer, name, fake)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        # all the messages are sent to the same inbox
+        self.account = FakeAccount('bot@example.com')
+        self.inbox = self.account.inbox
+
+    def verify(self, messages, **waits):
+        """
+        send and verify `messages` messages to :attr:`inbox`; the keyword
+        arguments are passed to the
+        :meth:`mailer.WitnessMessages.verify_receive` method
+
+        :returns: the receive events and the searches they took
+        """
+        event_logger = FakeEventLogger()
+        mailer.WitnessMessages(
+            accounts=[self.account] * messages, logger=event_logger,
+            **make_config(debug=True)
+        ).verify_receive(**waits)
+
+        return (
+            [event for _, event in event_logger.events
+             if event['type'] == 'receive'],
+            self.inbox.searches)
+
+    def test_retry_delays(self):
+        """
+        test the waits between the search rounds
+        """
+        retry_delays = mailer._retry_delays  # pylint: disable=protected-access
+
+        self.assertEqual(retry_delays(0.1, 2, 1), [0.1, 0.2, 0.4, 0.8, 1])
+        self.assertEqual(retry_delays(1, 1, 5), [1, 5])
+        self.assertEqual(retry_delays(0, 2, 5), [5])
+
+    def test_one_search_for_all_messages(self):
+        """
+        test that the messages in the inbox are found with one search
+        """
+        events, searches = self.verify(5)
+
+        self.assertEqual(searches, 1)
+        self.assertEqual([event['status'] for event in events],
+                         ['PASS'] * 5)
+
+    def test_same_received_as_per_message_search(self):
+        """
+        test that the messages found by the search rounds are the ones a
+        search for each message uuid finds
+        """
+        self.inbox.latency = 0.25
+        events, searches = self.verify(
+            5, min_wait_receive=0.1, step_wait_receive=2, max_wait_receive=1)
+
+        self.assertGreater(searches, 1)
+        self.assertLess(searches, 5)
+        self.assertEqual([event['status'] for event in events],
+                         ['PASS'] * 5)
+        for event in events:
+            found = self.inbox.filter(
+                subject__icontains=event['message_uuid']).get()
+            self.assertEqual(event['received'], str(found.datetime_received))
+
+    def test_give_up_after_max_wait(self):
+        """
+        test that the search gives up after the last retry round
+        """
+        self.inbox.latency = 60
+        events, searches = self.verify(
+            3, min_wait_receive=0.1, step_wait_receive=2,
+            max_wait_receive=0.3)
+
+        # a first round, then one after each of the 0.1, 0.2 and 0.3 waits
+        self.assertEqual(searches, 4)
+        self.assertEqual([event['status'] for event in events],
+                         ['FAIL'] * 3)
+
+
+class FakeResolver:
+    """
+    stand-in for :func:`email_validator.validate_email` that counts the
+    lookups; the addresses in the `nomx.example.com` domain are undeliverable
+    """
+    def __init__(self):
+        self.lookups = []
+
+    def __call__(self, email_address, **kwargs):
+        self.lookups.append(email_address)
+        if email_address.endswith('@nomx.example.com'):
+            raise mailer.EmailUndeliverableError('no MX record')
+
+        return {'email': email_address, 'email_ascii': email_address}
+
+
+class AddressCacheTest(unittest.TestCase):
+    """
+    Tests for the cached validation in :func:`mailer.validate_email_to_ascii`
+    """
+    addresses = ['bot0@example.com', 'bot1@example.com',
+                 'witness@nomx.example.com']
+
+    def setUp(self):
+        # the cache file is written next to the local configuration, i.e. in
+        # the current directory
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.addCleanup(os.chdir, os.getcwd())
+        os.chdir(directory.name)
+
+        self.resolver = FakeResolver()
+        self.event_logger = FakeEventLogger()
+        for name, fake in (('validate_email', self.resolver),
+                           ('LogWinEvent', lambda: self.event_logger)):
+            patcher = mock.patch.object(mailer, name, fake)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def run_cycles(self, cycles, config):
+        """
+        validate :attr:`addresses` once per cycle
+
+        :returns: the results of the last cycle
+        """
+        for _ in range(cycles):
+            results = [mailer.validate_email_to_ascii(address, **config)
+                       for address in self.addresses]
+
+        return results
+
+    def test_lookups_are_cached(self):
+        """
+        test that each address is looked up once across cycles and that the
+        cached failures are still logged
+        """
+        results = self.run_cycles(3, make_config(check_mx=True))
+
+        self.assertEqual(results, self.addresses[:2] + [None])
+        self.assertEqual(sorted(self.resolver.lookups),
+                         sorted(self.addresses))
+        self.assertEqual(
+            [(level, event['account'])
+             for level, event in self.event_logger.events],
+            [('warn', 'witness@nomx.example.com')] * 3)
+
+    def test_failures_expire_first(self):
+        """
+        test that the failures are looked up again once their shorter time
+        to live is over
+        """
+        with mock.patch.object(mailer, 'ADDRESS_CACHE_NEGATIVE_TTL', 0):
+            self.run_cycles(3, make_config(check_mx=True))
+
+        self.assertEqual(len(self.resolver.lookups), 2 + 3)
+        self.assertEqual(
+            self.resolver.lookups.count('witness@nomx.example.com'), 3)
+
+    def test_valid_addresses_expire(self):
+        """
+        test that the valid addresses are looked up again once their time
+        to live is over
+        """
+        with mock.patch.object(mailer, 'ADDRESS_CACHE_TTL', 0):
+            self.run_cycles(3, make_config(check_mx=True))
+
+        self.assertEqual(len(self.resolver.lookups), 2 * 3 + 1)
+
+    def test_config_change_invalidates(self):
+        """
+        test that the addresses are looked up again when the configuration
+        from the server changes
+        """
+        self.run_cycles(2, make_config(check_mx=True))
+        self.run_cycles(2, make_config(check_mx=True, check_mx_timeout=5))
+
+        self.assertEqual(len(self.resolver.lookups), 3 * 2)
+
+
+class FakeResponse:
+    """
+    stand-in for :class:`requests.Response`
+    """
+    def __init__(self, status_code, payload=None, etag=None):
+        self.status_code = status_code
+        self.payload = payload
+        self.headers = {'ETag': etag} if etag else {}
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise ValueError(self.status_code)
+
+    def json(self):
+        return self.payload
+
+
+class FakeConfigServer:
+    """
+    stand-in for the `get_config` end-point of the `SOC Automation server`;
+    it answers with `304 Not Modified` to requests with the current ETag
+    """
+    def __init__(self):
+        self.etag = '"v1"'
+        self.requests = []
+
+    def get(self, url, headers=None, timeout=None):
+        self.requests.append(headers)
+        if (headers or {}).get('If-None-Match') == self.etag:
+            return FakeResponse(304)
+
+        payload = make_config(
+            config_name='test-config', mail_check_period='1:00:00',
+            check_mx_timeout='0:00:05', min_wait_receive='0:00:03',
+            max_wait_receive='0:02:00')
+
+        return FakeResponse(200, [payload], self.etag)
+
+
+class ConfigFromServerTest(unittest.TestCase):
+    """
+    Tests for :func:`config.load_config`
+    """
+    base_config = dict(config.INI_DEFAULTS)
+
+    def setUp(self):
+        # the configuration is cached in the current directory
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.addCleanup(os.chdir, os.getcwd())
+        os.chdir(directory.name)
+
+        self.server = FakeConfigServer()
+        patcher = mock.patch.object(config, 'SESSION', mock.Mock())
+        patcher.start().get.side_effect = self.server.get
+        self.addCleanup(patcher.stop)
+
+    def test_not_modified_keeps_local_file(self):
+        """
+        test that the ETag of the cached configuration is sent and that the
+        cached configuration is used when the server answers with a 304
+        """
+        first = config.load_config(self.base_config)
+        with open(config.LOCAL_CONFIG) as local_config:
+            cached = local_config.read()
+
+        second = config.load_config(self.base_config)
+
+        self.assertEqual(self.server.requests, [{}, {'If-None-Match': '"v1"'}])
+        self.assertEqual(first['etag'], '"v1"')
+        self.assertEqual(second['exchange_client_config'],
+                         first['exchange_client_config'])
+        self.assertEqual(second['load_status'],
+                         'Configuration test-config not changed on server')
+        with open(config.LOCAL_CONFIG) as local_config:
+            self.assertEqual(local_config.read(), cached)
+
+    def test_changed_config_is_downloaded(self):
+        """
+        test that a configuration with a new ETag replaces the cached one
+        """
+        config.load_config(self.base_config)
+        self.server.etag = '"v2"'
+
+        reloaded = config.load_config(self.base_config)
+
+        self.assertEqual(reloaded['etag'], '"v2"')
+        self.assertEqual(config.get_config_from_file()['etag'], '"v2"')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -26,6 +26,9 @@ from mail_collector.models import (
     ExchangeAccount, WitnessEmail, ExchangeConfiguration,
 )
 from p_soc_auto_base.admin import BaseAdmin
+from p_soc_auto_base.changelist import (
+    CachedAllValuesFieldListFilter, LargeTableAdminMixin,
+)
 
 
 class MailConfigAdminBase(BaseAdmin, admin.ModelAdmin):
@@ -268,10 +271,13 @@ class MailBetweenDomainsAdmin(MailBotAdmin, admin.ModelAdmin):
 
 
 @admin.register(MailBotLogEvent)
-class MailBotLogEventAdmin(MailBotAdmin, admin.ModelAdmin):
+class MailBotLogEventAdmin(
+        LargeTableAdminMixin, MailBotAdmin, admin.ModelAdmin):
     """
     admin forms for mail bot log events
     """
+    keyset_field = 'event_registered_on'
+    list_select_related = ('source_host__site', )
     list_display_links = ('uuid',)
     list_display = ('uuid', 'event_group_id', 'event_type', 'event_status',
                     'mail_account', 'event_message', 'event_exception',
@@ -279,8 +285,10 @@ class MailBotLogEventAdmin(MailBotAdmin, admin.ModelAdmin):
     readonly_fields = ('uuid', 'event_type', 'event_status', 'source_host',
                        'event_registered_on', 'show_site', 'event_message',
                        'event_exception', 'event_group_id', 'mail_account',)
-    list_filter = ('event_status', 'event_type',
-                   'source_host__host_name', 'source_host__site__site',
+    list_filter = (('event_status', CachedAllValuesFieldListFilter),
+                   ('event_type', CachedAllValuesFieldListFilter),
+                   ('source_host__host_name', CachedAllValuesFieldListFilter),
+                   ('source_host__site__site', CachedAllValuesFieldListFilter),
                    ('event_registered_on', DateTimeRangeFilter),)
 
     def show_site(self, obj):  # pylint: disable=no-self-use
@@ -331,10 +339,13 @@ class MailHostAdmin(CitrusBorgBaseAdmin, admin.ModelAdmin):
 
 
 @admin.register(MailBotMessage)
-class MailBotMessageAdmin(MailBotAdmin, admin.ModelAdmin):
+class MailBotMessageAdmin(
+        LargeTableAdminMixin, MailBotAdmin, admin.ModelAdmin):
     """
     admin forms for exchange monitoring events that include a mail message
     """
+    keyset_field = 'event__event_registered_on'
+    list_select_related = ('event__source_host__site', )
     list_display_links = ('event_uuid',)
     list_display = ('event_uuid', 'event_group_id', 'mail_message_identifier',
                     'event_type', 'event_status', 'mail_account',
@@ -349,9 +360,12 @@ class MailBotMessageAdmin(MailBotAdmin, admin.ModelAdmin):
                        'mail_message_received', 'mail_account',
                        'sent_from', 'sent_to', 'event_registered_on')
 
-    list_filter = ('event__event_status', 'event__event_type',
-                   'event__source_host__host_name',
-                   'event__source_host__site__site',
+    list_filter = (('event__event_status', CachedAllValuesFieldListFilter),
+                   ('event__event_type', CachedAllValuesFieldListFilter),
+                   ('event__source_host__host_name',
+                    CachedAllValuesFieldListFilter),
+                   ('event__source_host__site__site',
+                    CachedAllValuesFieldListFilter),
                    ('event__event_registered_on', DateTimeRangeFilter),)
 
 # pylint: disable=no-self-use
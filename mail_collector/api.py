@@ -13,13 +13,15 @@
 REST end-points for the :ref:`Mail Collector Application`
 
 """
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
 from rest_framework import status
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 
 from citrus_borg.models import WinlogbeatHost
+from mail_collector.lib import get_bot_config_payload, get_bot_config_version
 from mail_collector.models import ExchangeConfiguration
-from mail_collector.serializers import BotConfigSerializer
 
 
 @api_view(['GET', ])
@@ -27,6 +29,12 @@ def get_bot_config(request, host_name):
     """
     get the exchange client configuration
 
+    The response carries an `ETag` with the version of the configuration,
+    see :func:`mail_collector.lib.get_bot_config_version`. Requests with a
+    matching `If-None-Match` header get an empty `304 Not Modified`
+    response. Otherwise the configuration is served from the cache, see
+    :func:`mail_collector.lib.get_bot_config_payload`.
+
     :param request: an HTTP GET request
     :param host_name: the short host name for the bot that is
                           requesting a configuration
@@ -44,13 +52,12 @@ def get_bot_config(request, host_name):
     """
     queryset = WinlogbeatHost.objects.filter(host_name__iexact=host_name)
 
-    if not queryset.exists():
+    bot = queryset.select_related('site', 'exchange_client_config').first()
+    if bot is None:
         return Response(f'Bot at {host_name} is not recognized by the '
                         f'Exchange monitoring client.',
                         status=status.HTTP_404_NOT_FOUND)
 
-    bot = queryset.get()
-
     if bot.exchange_client_config is None:
         try:
             exchange_client_config = ExchangeConfiguration.objects.filter(
@@ -64,5 +71,13 @@ def get_bot_config(request, host_name):
         bot.exchange_client_config = exchange_client_config
         bot.save()
 
-    serializer = BotConfigSerializer(queryset, many=True)
-    return Response(serializer.data, status=status.HTTP_200_OK)
+    version = get_bot_config_version(bot)
+
+    response = get_conditional_response(request, etag=quote_etag(version))
+    if response is None:
+        response = Response(get_bot_config_payload(queryset, version),
+                            status=status.HTTP_200_OK)
+
+    response['ETag'] = quote_etag(version)
+
+    return response
@@ -0,0 +1,25 @@
+"""
+mail_collector.benchmarks
+-------------------------
+
+Query benchmarks for the :ref:`Mail Collector Application`
+
+See :mod:`p_soc_auto_base.benchmark`.
+
+:copyright:
+
+    Copyright 2018 - 2020 Provincial Health Service Authority
+    of British Columbia
+
+:contact:    daniel.busto@phsa.ca
+"""
+from mail_collector.queries import dead_mail_sites
+from p_soc_auto_base.benchmark import benchmark
+
+
+@benchmark()
+def dead_mail_sites_default():
+    """
+    the query behind the dead `Exchange` client sites alerts
+    """
+    list(dead_mail_sites())
@@ -13,7 +13,19 @@ various utility functions for the mail_collector app
 :contact:    daniel.busto@phsa.ca
 
 """
+import hashlib
+import json
+
 from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+
+from mail_collector.models import ExchangeAccount, WitnessEmail
+from mail_collector.serializers import BotConfigSerializer
+
+
+BOT_CONFIG_KEY = 'mail_collector:bot_config:{}'
+"""cache key template for the serialized bot configurations"""
 
 
 def event_sort_code(event_type):
@@ -34,3 +46,63 @@ def event_sort_code(event_type):
     if event_type in mapper:
         return mapper.get(event_type)
     return mapper.get('unknown')
+
+
+def get_bot_config_version(bot):
+    """
+    calculate the version of the main configuration of an `Exchange`
+    monitoring bot
+
+    The version is a hash of the host name, the site, the `Exchange`
+    configuration, and the `Exchange` accounts, domain accounts and witness
+    addresses of the configuration that
+    :class:`mail_collector.serializers.BotConfigSerializer` puts in the
+    main configuration. It changes when any of them is saved.
+
+    :arg bot: the bot with its `site` and `exchange_client_config` fields
+        already loaded, e.g. with
+        :meth:`django.db.models.query.QuerySet.select_related`
+    :type bot: :class:`citrus_borg.models.WinlogbeatHost`
+
+    :returns: the version of the configuration
+    :rtype: str
+    """
+    config = bot.exchange_client_config
+
+    accounts = ExchangeAccount.objects.filter(
+        exchangeconfiguration=config).order_by('id').values_list(
+            'id', 'updated_on', 'domain_account_id',
+            'domain_account__updated_on')
+    witnesses = WitnessEmail.objects.filter(
+        exchangeconfiguration=config).order_by('id').values_list(
+            'id', 'updated_on')
+
+    return hashlib.sha1(json.dumps(
+        [bot.host_name, bot.site.site if bot.site else None,
+         config.id, config.updated_on, list(accounts), list(witnesses)],
+        cls=DjangoJSONEncoder).encode('utf-8')).hexdigest()
+
+
+def get_bot_config_payload(queryset, version):
+    """
+    get the serialized main configuration of an `Exchange` monitoring bot
+    from the cache, or serialize it and store it in the cache
+
+    :arg queryset: the bot, see :func:`mail_collector.api.get_bot_config`
+    :type queryset: :class:`django.db.models.query.QuerySet`
+
+    :arg str version: the version of the configuration, see
+        :func:`get_bot_config_version`
+
+    :returns: the data of a
+        :class:`mail_collector.serializers.BotConfigSerializer` instance
+    :rtype: list
+    """
+    key = BOT_CONFIG_KEY.format(version)
+
+    payload = cache.get(key)
+    if payload is None:
+        payload = BotConfigSerializer(queryset, many=True).data
+        cache.set(key, payload, settings.BOT_CONFIG_CACHE_TTL)
+
+    return payload
@@ -0,0 +1,34 @@
+# Generated by Django 2.2.6 on 2020-05-06 09:43
+from django.db import migrations
+
+import p_soc_auto_base.fields
+
+
+def compress(apps, schema_editor):
+    p_soc_auto_base.fields.rewrite_compressed_columns(
+        apps.get_model('mail_collector', 'MailBotLogEvent'), ['event_body'],
+        connection=schema_editor.connection)
+
+
+def decompress(apps, schema_editor):
+    p_soc_auto_base.fields.rewrite_compressed_columns(
+        apps.get_model('mail_collector', 'MailBotLogEvent'), ['event_body'],
+        to_compressed=False, connection=schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('mail_collector', '0045_auto_20200420_0928'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='mailbotlogevent',
+            name='event_body',
+            field=p_soc_auto_base.fields.CompressedTextField(blank=True, help_text='The full event information as collected from the wire', null=True, verbose_name='Raw Data'),
+        ),
+        migrations.RunPython(compress, reverse_code=decompress),
+    ]
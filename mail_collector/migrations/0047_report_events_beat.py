@@ -0,0 +1,38 @@
+# Generated by Django 2.2.13 on 2026-10-18 17:15
+
+from django.db import migrations
+
+from p_soc_auto_base.migrations import add_beats, remove_beats
+
+
+# each of these tasks runs mail_collector.tasks.report_events for half of
+# the reports, so the events were read twice
+LEGACY_TASKS = [
+    ({'name': 'Exchange send receive by site report',
+      'task': 'mail_collector.tasks.invoke_report_events_by_site', },
+     {'minute': '45', 'hour': '07,15,23', }, ),
+    ({'name': 'Exchange send receive by bot report',
+      'task': 'mail_collector.tasks.invoke_report_events_by_bot', },
+     {'minute': '45', 'hour': '07,15,23', }, ),
+]
+
+TASKS = [
+    ({'name': 'Exchange send receive by site and by bot reports',
+      'task': 'mail_collector.tasks.report_events', },
+     {'minute': '45', 'hour': '07,15,23', }, ),
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mail_collector', '0046_compress_event_body'),
+        ('p_soc_auto_base', '0001_beats'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            remove_beats(LEGACY_TASKS), reverse_code=add_beats(LEGACY_TASKS)),
+        migrations.RunPython(
+            add_beats(TASKS), reverse_code=remove_beats(TASKS)),
+    ]
@@ -19,6 +19,7 @@ from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
 from citrus_borg.models import get_uuid, WinlogbeatHost, BorgSite
+from p_soc_auto_base.fields import CompressedTextField
 from p_soc_auto_base.models import BaseModel, BaseModelWithDefaultInstance
 
 
@@ -317,7 +318,7 @@ class MailBotLogEvent(models.Model):
             'connect (1) before sent (2) before received (3) and so on'))
     event_message = models.TextField(_('Message'), blank=True, null=True)
     event_exception = models.TextField(_('Exception'), blank=True, null=True)
-    event_body = models.TextField(
+    event_body = CompressedTextField(
         _('Raw Data'), blank=True, null=True,
         help_text=_('The full event information as collected from the wire'))
     is_expired = models.BooleanField(
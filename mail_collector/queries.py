@@ -17,6 +17,7 @@ import datetime
 from django.db.models import Max
 from django.db.models.query import QuerySet
 
+from citrus_borg import heartbeat
 from citrus_borg.dynamic_preferences_registry import get_preference
 from p_soc_auto_base.utils import (
     MomentOfTime, get_base_queryset,
@@ -124,6 +125,9 @@ def dead_mail_sites(not_seen_after=None):
             'Invalid object type %s, was expecting datetime'
             % type(not_seen_after))
 
+    # merge the buffered exchange_last_seen values first
+    heartbeat.flush()
+
     queryset = get_base_queryset('mail_collector.mailhost', enabled=True)
 
     queryset = queryset.values('site__site').\
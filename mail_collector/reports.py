@@ -0,0 +1,271 @@
+"""
+.. _reports:
+
+:module:    mail_collector.reports
+
+:copyright:
+
+    Copyright 2018 - 2020 Provincial Health Service Authority
+    of British Columbia
+
+:contact:    daniel.busto@phsa.ca
+
+One pass report engine for the `Exchange` send and receive events of the
+:ref:`Mail Collector Application`
+
+The send and receive events used to be reported by one task for each site
+and one task for each bot. Each of these tasks ran its own query over the
+:class:`mail_collector.models.MailBotMessage` instances of the reporting
+window, and :class:`p_soc_auto_base.email.Email` queried the data again
+for each message.
+
+:func:`collect_event_reports` reads the events of the reporting window
+with one query, groups them by site, bot and event status, and splits them
+into the datasets of the same reports: all the events and the failed
+events of each site and of each bot. :func:`send_event_reports` sends the
+datasets with :class:`p_soc_auto_base.email.Email`, as
+:class:`p_soc_auto_base.email.RowSet` instances, so the number of queries
+does not grow with the number of sites and bots.
+
+The datasets that cannot be sent because the `SMTP` server refused the
+connection are handed back to the caller, see :func:`send_event_reports`.
+"""
+import collections
+from logging import getLogger
+from smtplib import SMTPConnectError
+
+from citrus_borg.dynamic_preferences_registry import get_preference
+from mail_collector import queries
+from mail_collector.models import MailBotMessage
+from p_soc_auto_base import utils as base_utils
+from p_soc_auto_base.email import Email, RowSet
+from p_soc_auto_base.models import Subscription
+
+
+LOG = getLogger(__name__)
+
+SITE = 'event__source_host__site__site'
+"""the field with the site of an event"""
+
+BOT = 'event__source_host__host_name'
+"""the field with the bot of an event"""
+
+STATUS = 'event__event_status'
+"""the field with the status of an event"""
+
+FAILED = 'fail'
+"""the status of the events in the failed events reports, in lower case"""
+
+SITE_REPORT = 'Exchange Send Receive By Site'
+"""the subscription for the events by site report"""
+
+FAILED_SITE_REPORT = 'Exchange Failed Send Receive By Site'
+"""the subscription for the failed events by site report"""
+
+BOT_REPORT = 'Exchange Send Receive By Bot'
+"""the subscription for the events by bot report"""
+
+FAILED_BOT_REPORT = 'Exchange Failed Send Receive By Bot'
+"""the subscription for the failed events by bot report"""
+
+
+class EventReports:
+    """
+    the events of a reporting window, split by site and by bot
+
+    The datasets are :class:`list` instances of
+    :class:`dictionaries <dict>`, one for each event, in the order of the
+    per-entity reports: by message, then by event type.
+    """
+    def __init__(self):
+        self.counts = collections.Counter()
+        """the number of events by (site, bot, event status)"""
+
+        self.by_site = collections.defaultdict(list)
+        """the events keyed by site"""
+
+        self.failed_by_site = collections.defaultdict(list)
+        """the failed events keyed by site"""
+
+        self.by_bot = collections.defaultdict(list)
+        """the events keyed by bot"""
+
+        self.failed_by_bot = collections.defaultdict(list)
+        """the failed events keyed by bot"""
+
+    def add(self, row):
+        """
+        add an event to the datasets of its site and of its bot
+        """
+        status = row[STATUS]
+        self.counts[(row[SITE], row[BOT], status)] += 1
+
+        failed = status is not None and status.lower() == FAILED
+
+        self.by_site[row[SITE]].append(row)
+        self.by_bot[row[BOT]].append(row)
+        if failed:
+            self.failed_by_site[row[SITE]].append(row)
+            self.failed_by_bot[row[BOT]].append(row)
+
+
+def collect_event_reports(report_interval, fields):
+    """
+    read the events of the reporting window with one query and split them
+    into the per-site and per-bot datasets
+
+    :arg `object` report_interval: the time interval for which the reports
+        are calculated. it is either a :class:`datetime.timedelta` instance
+        or a :class:`dict` suitable for constructing a
+        :class:`datetime.timedelta` instance
+
+    :arg fields: the fields to read for each event; the site, bot and status
+        fields are always read
+
+    :returns: the datasets
+    :rtype: :class:`EventReports`
+    """
+    fields = list(dict.fromkeys(list(fields) + [SITE, BOT, STATUS]))
+
+    events = queries.dead_bodies(
+        data_source='mail_collector.mailbotmessage',
+        filter_exp='event__event_registered_on__gte',
+        not_seen_after=base_utils.MomentOfTime.past(
+            time_delta=report_interval)).\
+        order_by('-mail_message_identifier', 'event__event_type_sort').\
+        values(*fields)
+
+    reports = EventReports()
+    for row in events:
+        reports.add(row)
+
+    LOG.debug('exchange events by site, bot and status: %s',
+              dict(reports.counts))
+
+    return reports
+
+
+def _send(subscription, rows, **extra_context):
+    """
+    email one dataset; an error is logged so that it does not stop the
+    other datasets
+
+    :returns: `True` if the dataset was sent
+
+    :raises: :exc:`smtplib.SMTPConnectError` if the `SMTP` server refused
+        the connection; the dataset can be sent again later
+    """
+    try:
+        sent = Email.send_email(
+            data=RowSet(MailBotMessage, rows), subscription=subscription,
+            **extra_context)
+    except SMTPConnectError:
+        raise
+    except Exception:  # pylint: disable=broad-except
+        LOG.exception('could not email %s for %s', subscription.subscription,
+                      extra_context)
+        return False
+
+    if not sent:
+        LOG.warning('could not email %s for %s', subscription.subscription,
+                    extra_context)
+
+    return bool(sent)
+
+
+def send_event_reports(report_interval, report_level, by_site=True,
+                       by_bot=True, retry=None):
+    """
+    email the events and the failed events reports for each enabled site
+    and for each enabled bot
+
+    The reports are the same as the ones sent by
+    :func:`mail_collector.tasks.report_events_by_site`,
+    :func:`mail_collector.tasks.report_failed_events_by_site`,
+    :func:`mail_collector.tasks.report_events_by_bot`, and
+    :func:`mail_collector.tasks.report_failed_events_by_bot`.
+
+    :arg `object` report_interval: see :func:`collect_event_reports`
+
+    :arg str report_level: INFO|WARN|ERROR, for the events reports; the
+        failed events reports use the `exchange__server_error` preference
+
+    :arg bool by_site: send the reports for each site
+
+    :arg bool by_bot: send the reports for each bot
+
+    :arg retry: called as `retry(subscription, **extra_context)` for each
+        report that could not be sent because the `SMTP` server refused the
+        connection; `subscription` is the name of the subscription and
+        `extra_context` has the `time_delta`, `level`, and `site` or `bot`
+        of the report
+
+        If it is `None`, the first :exc:`smtplib.SMTPConnectError` is raised
+        after all the other reports were sent.
+
+    :returns: the number of reports sent, of reports that could not be
+        sent, and of reports handed to `retry`, keyed by 'sent', 'failed',
+        and 'retried'
+    :rtype: dict
+
+    :raises: :exc:`smtplib.SMTPConnectError`, see `retry`
+    """
+    subscriptions = []
+    if by_site:
+        subscriptions += [SITE_REPORT, FAILED_SITE_REPORT]
+    if by_bot:
+        subscriptions += [BOT_REPORT, FAILED_BOT_REPORT]
+    subscriptions = {name: Subscription.get_subscription(name)
+                     for name in subscriptions}
+
+    fields = []
+    for subscription in subscriptions.values():
+        fields += subscription.headers.split(',')
+
+    reports = collect_event_reports(report_interval, fields)
+    failed_level = get_preference('exchange__server_error')
+
+    results = collections.Counter(sent=0, failed=0, retried=0)
+    connect_errors = []
+
+    def send(subscription, rows, **extra_context):
+        try:
+            sent = _send(subscription, rows, **extra_context)
+        except SMTPConnectError as error:
+            LOG.warning('could not connect to the SMTP server to email %s'
+                        ' for %s', subscription.subscription, extra_context)
+            connect_errors.append(error)
+            if retry is not None:
+                retry(subscription.subscription, **extra_context)
+                results['retried'] += 1
+            return
+
+        results['sent' if sent else 'failed'] += 1
+
+    if by_site:
+        for site in base_utils.get_base_queryset(
+                'mail_collector.mailsite', enabled=True).\
+                values_list('site', flat=True):
+            send(subscriptions[SITE_REPORT], reports.by_site[site],
+                 time_delta=report_interval, level=report_level, site=site)
+            send(subscriptions[FAILED_SITE_REPORT],
+                 reports.failed_by_site[site],
+                 time_delta=report_interval, level=failed_level, site=site)
+
+    if by_bot:
+        for bot in base_utils.get_base_queryset(
+                'mail_collector.mailhost', enabled=True).\
+                values_list('host_name', flat=True):
+            send(subscriptions[BOT_REPORT], reports.by_bot[bot],
+                 time_delta=report_interval, level=report_level, bot=bot)
+            send(subscriptions[FAILED_BOT_REPORT],
+                 reports.failed_by_bot[bot],
+                 time_delta=report_interval, level=failed_level, bot=bot)
+
+    LOG.info('emailed exchange send receive events reports: %s',
+             dict(results))
+
+    if connect_errors and retry is None:
+        raise connect_errors[0]
+
+    return dict(results)
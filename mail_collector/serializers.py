@@ -63,7 +63,7 @@ class WitnessEmailSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = WitnessEmail
-        fields = ('smtp_address')
+        fields = ('smtp_address', )
 
 
 class ExchangeConfigurationSerializer(serializers.ModelSerializer):
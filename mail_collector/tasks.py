@@ -15,7 +15,7 @@ Celery Tasks for the :ref:`Mail Collector Application`
 """
 from smtplib import SMTPConnectError
 
-from celery import shared_task, group
+from celery import shared_task
 from celery.utils.log import get_task_logger
 
 from django.db.models import Q
@@ -24,8 +24,10 @@ from django.utils import timezone
 from citrus_borg.dynamic_preferences_registry import get_preference
 from citrus_borg.locutus.assimilation import parse_citrix_login_event
 from citrus_borg.models import WinlogbeatHost
-from mail_collector import exceptions, models, lib, queries
-from p_soc_auto_base import utils as base_utils
+from mail_collector import exceptions, models, lib, queries, reports
+from p_soc_auto_base import metrics as base_metrics, utils as base_utils
+from p_soc_auto_base.alerts import coalesce_alert
+from p_soc_auto_base.archive import archive_queryset
 from p_soc_auto_base.email import Email
 from p_soc_auto_base.models import Subscription
 
@@ -59,7 +61,8 @@ def store_mail_data(body):
 
     """
     try:
-        exchange_borg = parse_citrix_login_event(body)
+        with base_metrics.EVENT_PARSE_SECONDS.time(source='exchange'):
+            exchange_borg = parse_citrix_login_event(body)
     except Exception as error:
         raise exceptions.BadEventDataError(
             'cannot process event data from %s, error: %s'
@@ -85,12 +88,19 @@ def store_mail_data(body):
         event_message=event_data.event_message,
         event_body=event_data.event_body,
         event_exception=event_data.event_exception)
-    event.save()
+    with base_metrics.DB_WRITE_SECONDS.time(model='mailbotlogevent'):
+        event.save()
+
+    base_metrics.EVENTS_TOTAL.inc(source='exchange')
+    if exchange_borg.timestamp:
+        base_metrics.EVENT_QUEUE_LAG_SECONDS.observe(
+            (timezone.now() - exchange_borg.timestamp).total_seconds(),
+            source='exchange')
 
     if event.event_status == 'FAIL':
         try:
-            raise_failed_event_by_mail.apply_async(
-                kwargs={'event_pk': event.pk})
+            coalesce_alert(raise_failed_event_by_mail,
+                           source_host.host_name, event.pk)
         except Exception as error:
             # log and swallow the exception because we need to finish
             # processing this event if it comes with a mail message
@@ -118,7 +128,7 @@ def store_mail_data(body):
 
 @shared_task(queue='mail_collector', rate_limit='3/s', max_retries=3,
              retry_backoff=True, autoretry_for=(SMTPConnectError,))
-def raise_failed_event_by_mail(event_pk):
+def raise_failed_event_by_mail(event_pk, coalesced=None):
     """
     send an alert email for failed events
 
@@ -127,23 +137,29 @@ def raise_failed_event_by_mail(event_pk):
         the primary key of the :class:`mail_collector.models.MailBotLogEvent`
         instance with the failed event
 
+    :arg list coalesced: the primary keys of other failed events from the
+        same bot collected by :func:`p_soc_auto_base.alerts.coalesce_alert`;
+        they are included in the same email
+
     :returns: the result of the email operation
     :rtype: str
 
     :raises: :exc:`Exception` if an error is thrown by the email send op
 
     """
-    data = models.MailBotLogEvent.objects.filter(pk=event_pk)
+    coalesced = coalesced or []
+    data = models.MailBotLogEvent.objects.filter(pk__in=[event_pk, *coalesced])
     subscription = Subscription.get_subscription('Exchange Client Error')
 
     # let's cache some data to avoid evaluating the queryset multiple times
-    data_extract = data.values(
+    data_extract = data.filter(pk=event_pk).values(
         'uuid', 'event_type',
         'source_host__site__site', 'source_host__host_name')[0]
 
     if Email.send_email(
             data=data, subscription=subscription,
             level=get_preference('commonalertargs__error_level'),
+            coalesced_count=len(coalesced),
             event_type=data_extract.get('event_type'),
             site=data_extract.get('source_host__site__site'),
             bot=data_extract.get('source_host__host_name')):
@@ -170,6 +186,10 @@ def expire_events():
         event_registered_on__lte=moment).update(is_expired=True)
 
     if get_preference('exchange__delete_expired'):
+        if get_preference('citrusborgcommon__archive_expired'):
+            archive_queryset(
+                models.MailBotLogEvent.objects.filter(is_expired=True))
+
         count_deleted_messages = models.MailBotMessage.objects.filter(
             event__is_expired=True).all().delete()
 
@@ -376,9 +396,16 @@ def dead_mail_sites(subscription, time_delta_pref=None, level=None):
 
 
 @shared_task(queue='mail_collector', serializer='pickle')
-def invoke_report_events_by_site(report_interval=None, report_level=None):
+def report_events(report_interval=None, report_level=None, by_site=True,
+                  by_bot=True):
     """
-    invoke tasks for mailing the events by site reports
+    mail the events by site and the events by bot reports in one pass
+
+    The events are read once for all the sites and bots, see
+    :func:`mail_collector.reports.send_event_reports`. The reports that
+    cannot be sent because the `SMTP` server refused the connection are
+    sent again by the per-site and per-bot tasks, see
+    :func:`_retry_event_report`; the other reports are not sent again.
 
     :arg `object` report_interval:
 
@@ -396,11 +423,12 @@ def invoke_report_events_by_site(report_interval=None, report_level=None):
         :class:`citrus_borg.dynamic_preferences_registry."""\
             """ExchangeDefaultErrorLevel`
 
+    :arg bool by_site: send the reports for each site
 
-    :returns: the sites for which the report tasks have been invoked
-    :rtype: str
-
+    :arg bool by_bot: send the reports for each bot
 
+    :returns: see :func:`mail_collector.reports.send_event_reports`
+    :rtype: dict
     """
     if report_interval is None:
         report_interval = get_preference('exchange__report_interval')
@@ -408,19 +436,54 @@ def invoke_report_events_by_site(report_interval=None, report_level=None):
     if report_level is None:
         report_level = get_preference('exchange__report_level')
 
-    sites = list(
-        base_utils.get_base_queryset('mail_collector.mailsite', enabled=True).
-        values_list('site', flat=True)
-    )
+    return reports.send_event_reports(
+        report_interval, report_level, by_site=by_site, by_bot=by_bot,
+        retry=_retry_event_report)
+
 
-    group(report_events_by_site.s(site, report_interval, report_level)
-          for site in sites)()
+def _retry_event_report(subscription, time_delta, level, site=None,
+                        bot=None):
+    """
+    queue the per-site or per-bot task for a report that
+    :func:`report_events` could not send
 
-    group(report_failed_events_by_site.s(site, report_interval)
-          for site in sites)()
+    These tasks are rate limited and retry with backoff when the `SMTP`
+    server refuses the connection.
 
-    LOG.info('launched report tasks for exchange events by site for sites: %s',
-             ', '.join(sites))
+    :arg str subscription: the name of the subscription of the report, one
+        of the subscriptions in :mod:`mail_collector.reports`
+    """
+    if subscription == reports.SITE_REPORT:
+        report_events_by_site.delay(site, time_delta, level)
+    elif subscription == reports.FAILED_SITE_REPORT:
+        report_failed_events_by_site.delay(site, time_delta)
+    elif subscription == reports.BOT_REPORT:
+        report_events_by_bot.delay(bot, time_delta, level)
+    else:
+        report_failed_events_by_bot.delay(bot, time_delta)
+
+
+@shared_task(queue='mail_collector', serializer='pickle')
+def invoke_report_events_by_site(report_interval=None, report_level=None):
+    """
+    mail the events by site reports
+
+    The reports for all the sites are built from one query, see
+    :func:`report_events`. :func:`report_events_by_site` and
+    :func:`report_failed_events_by_site` send the same reports for one
+    site.
+
+    The beat runs :func:`report_events` for the reports by site and by bot
+    together; this task is kept for on-demand runs.
+
+    :arg `object` report_interval: see :func:`report_events`
+
+    :arg str report_level: see :func:`report_events`
+
+    :returns: see :func:`report_events`
+    :rtype: dict
+    """
+    return report_events(report_interval, report_level, by_bot=False)
 
 
 @shared_task(queue='mail_collector', rate_limit='3/s', max_retries=3,
@@ -517,48 +580,23 @@ def report_failed_events_by_site(site, report_interval):
 @shared_task(queue='mail_collector', serializer='pickle')
 def invoke_report_events_by_bot(report_interval=None, report_level=None):
     """
-    invoke tasks for mailing the events by bot reports
+    mail the events by bot reports
 
-    :arg `object` report_interval:
-
-        the time interval for which the report is calculated
-
-        it is either a :class:`datetime.timedelta` instance or a
-        :class:`dict` suitable for constructing a :class:`datetime.timedelta`
-        instance. it defaults to ``None`` and  when it is ``None``,
-        the value is picked from
-        :class:`citrus_borg.dynamic_preferences_registry.ExchangeReportInterval`
-
-    :arg str report_level: similar to a log level, defaults to ``None``
+    The reports for all the bots are built from one query, see
+    :func:`report_events`. :func:`report_events_by_bot` and
+    :func:`report_failed_events_by_bot` send the same reports for one bot.
 
-        when ``None``, the value is picked from
-        :class:`citrus_borg.dynamic_preferences_registry"""\
-        """.ExchangeDefaultErrorLevel`
+    The beat runs :func:`report_events` for the reports by site and by bot
+    together; this task is kept for on-demand runs.
 
+    :arg `object` report_interval: see :func:`report_events`
 
-    :returns: the bots for which the report tasks have been invoked
-    :rtype: str
+    :arg str report_level: see :func:`report_events`
 
+    :returns: see :func:`report_events`
+    :rtype: dict
     """
-    if report_interval is None:
-        report_interval = get_preference('exchange__report_interval')
-
-    if report_level is None:
-        report_level = get_preference('exchange__report_level')
-
-    bots = list(
-        base_utils.get_base_queryset('mail_collector.mailhost', enabled=True).
-        values_list('host_name', flat=True)
-    )
-
-    group(report_events_by_bot.s(bot, report_interval, report_level)
-          for bot in bots)()
-
-    group(report_failed_events_by_bot.s(bot, report_interval)
-          for bot in bots)()
-
-    LOG.info('launched report tasks for exchange events by bot for bots: %s',
-             ', '.join(bots))
+    return report_events(report_interval, report_level, by_site=False)
 
 
 @shared_task(queue='mail_collector', rate_limit='3/s', max_retries=3,
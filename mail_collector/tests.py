@@ -10,11 +10,28 @@ This module contains tests for the :ref:`Mail Collector Application`.
 
 :contact:    daniel.busto@phsa.ca
 """
+import shutil
+import tempfile
+from smtplib import SMTPConnectError
+from unittest import mock
+from uuid import uuid4
+
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 from hypothesis import given
 from hypothesis.strategies import text, characters
 
-from mail_collector.models import DomainAccount, ExchangeConfiguration
+from citrus_borg.models import BorgSite, WinlogbeatHost
+from mail_collector import reports, tasks
+from mail_collector.models import (
+    DomainAccount, ExchangeAccount, ExchangeConfiguration, MailBotLogEvent,
+    MailBotMessage, WitnessEmail,
+)
+from p_soc_auto_base.email import Email
 from p_soc_auto_base.test_lib import UserTestCase
+from p_soc_auto_base.utils import get_base_queryset
 
 
 # TODO tests for all proxymanagers? (is this just testing Django?)
@@ -59,3 +76,258 @@ class ExchangeConfigurationTest(UserTestCase):
         )
         self.assertNotIn('\r', config.email_subject)
         self.assertNotIn('\n', config.email_subject)
+
+
+class BotConfigApiTest(UserTestCase):
+    """
+    Tests for :func:`mail_collector.api.get_bot_config`
+    """
+    url = '/mail_collector/api/get_config/test-bot/'
+
+    def setUp(self):
+        self.addCleanup(cache.clear)
+
+        domain_account = DomainAccount.objects.create(
+            domain='TEST', username='bot', password='word', **self.USER_ARGS)
+        self.config = ExchangeConfiguration.objects.create(
+            config_name='test-config', **self.USER_ARGS)
+        self.config.exchange_accounts.add(ExchangeAccount.objects.create(
+            smtp_address='bot@example.com', domain_account=domain_account,
+            **self.USER_ARGS))
+        self.config.witness_addresses.add(WitnessEmail.objects.create(
+            smtp_address='witness@example.com', **self.USER_ARGS))
+
+        WinlogbeatHost.objects.create(
+            host_name='test-bot', exchange_client_config=self.config,
+            site=BorgSite.objects.create(site='test-site', **self.USER_ARGS),
+            **self.USER_ARGS)
+
+    def test_config(self):
+        """
+        test that the configuration is served with an ETag
+        """
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.has_header('ETag'))
+
+        config = response.json()[0]
+        self.assertEqual(config['host_name'], 'test-bot')
+        self.assertEqual(config['site'], {'site': 'test-site'})
+        self.assertEqual(
+            config['exchange_client_config']['witness_addresses'],
+            [{'smtp_address': 'witness@example.com'}])
+
+    def test_conditional_hit_is_not_serialized(self):
+        """
+        test that a request with the current ETag gets a 304 response
+        without serializing the configuration; the only queries are the
+        ones for the version of the configuration
+        """
+        etag = self.client.get(self.url)['ETag']
+
+        with mock.patch('mail_collector.lib.BotConfigSerializer') as \
+                serializer, self.assertNumQueries(3):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        serializer.assert_not_called()
+
+    def test_served_from_cache(self):
+        """
+        test that an unchanged configuration is not serialized again
+        """
+        expected = self.client.get(self.url).json()
+
+        with mock.patch('mail_collector.lib.BotConfigSerializer') as \
+                serializer:
+            response = self.client.get(self.url)
+
+        self.assertEqual(response.json(), expected)
+        serializer.assert_not_called()
+
+    def test_change_invalidates(self):
+        """
+        test that changing the configuration changes the ETag
+        """
+        etag = self.client.get(self.url)['ETag']
+
+        self.config.witness_addresses.add(WitnessEmail.objects.create(
+            smtp_address='other@example.com', **self.USER_ARGS))
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(
+            len(response.json()[0]['exchange_client_config'][
+                'witness_addresses']), 2)
+
+
+class ReportEngineTest(UserTestCase):
+    """
+    Tests for :mod:`mail_collector.reports`
+    """
+    report_interval = timezone.timedelta(hours=1)
+
+    def setUp(self):
+        for index in range(2):
+            self.add_site(f'site-{index}', bots=2)
+
+        csv_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, csv_root)
+        csv_settings = self.settings(CSV_MEDIA_ROOT=f'{csv_root}/')
+        csv_settings.enable()
+        self.addCleanup(csv_settings.disable)
+
+        # the reports show when they were made
+        now = mock.patch.object(
+            timezone, 'now', return_value=timezone.now())
+        now.start()
+        self.addCleanup(now.stop)
+
+        self.sent = []
+        send = mock.patch.object(
+            Email, '_send', autospec=True, side_effect=self.record)
+        self.send = send.start()
+        self.addCleanup(send.stop)
+
+    def record(self, email):
+        """
+        stand-in for :meth:`p_soc_auto_base.email.Email._send` that keeps
+        the rendered message instead of handing it to the mail spool
+        """
+        # the link to the saved copy of the message is unique per message
+        email_uuid = email.context.get('email_uuid') or '<no uuid>'
+        self.sent.append((
+            email.subscription_obj.subscription,
+            email.context.get('site') or email.context.get('bot'),
+            email.context['level'],
+            email.email.body.replace(email_uuid, ''),
+            [content.replace(email_uuid, '')
+             for content, _ in email.email.alternatives],
+            [(content, mimetype)
+             for _, content, mimetype in email.email.attachments]))
+        return 1
+
+    def add_site(self, name, bots):
+        """
+        add a site with `bots` bots; each bot has a passed and a failed
+        exchange message
+
+        The messages use the z-$ServerName-$DatabaseName@mx_domain.ca
+        account convention expected by the
+        :mod:`mail_collector.signals` handlers.
+        """
+        site = BorgSite.objects.create(site=name, **self.USER_ARGS)
+        for index in range(bots):
+            bot = WinlogbeatHost.objects.create(
+                host_name=f'{name}-bot-{index}', site=site,
+                exchange_last_seen=timezone.now(), **self.USER_ARGS)
+            for sort, status in enumerate(('PASS', 'FAIL')):
+                MailBotMessage.objects.create(
+                    mail_message_identifier=str(uuid4()),
+                    event=MailBotLogEvent.objects.create(
+                        event_group_id=f'{bot.host_name}+group',
+                        source_host=bot, event_status=status,
+                        event_type='send', event_type_sort=sort,
+                        mail_account='z-srv-db@example.ca'))
+
+    def per_entity_reports(self):
+        """
+        send the reports with the per-site and per-bot tasks
+        """
+        for site in get_base_queryset(
+                'mail_collector.mailsite', enabled=True).values_list(
+                    'site', flat=True):
+            tasks.report_events_by_site(site, self.report_interval, 'INFO')
+            tasks.report_failed_events_by_site(site, self.report_interval)
+
+        for bot in get_base_queryset(
+                'mail_collector.mailhost', enabled=True).values_list(
+                    'host_name', flat=True):
+            tasks.report_events_by_bot(bot, self.report_interval, 'INFO')
+            tasks.report_failed_events_by_bot(bot, self.report_interval)
+
+    def test_same_reports_as_per_entity_tasks(self):
+        """
+        test that the one pass reports render the same messages and csv
+        attachments from a :class:`p_soc_auto_base.email.RowSet` as the
+        per-site and per-bot tasks render from a
+        :class:`django.db.models.query.QuerySet`
+        """
+        def by_report(report):
+            return report[:2]
+
+        self.per_entity_reports()
+        expected = sorted(self.sent, key=by_report)
+
+        self.sent.clear()
+        result = reports.send_event_reports(self.report_interval, 'INFO')
+
+        self.assertEqual(sorted(self.sent, key=by_report), expected)
+        self.assertEqual(
+            result, {'sent': len(expected), 'failed': 0, 'retried': 0})
+        self.assertTrue(any(attachments
+                            for *_, attachments in self.sent))
+
+    def test_connect_error_retries_report(self):
+        """
+        test that a report that cannot be sent because the SMTP server
+        refused the connection is handed to the per-site task and that the
+        other reports are still sent
+        """
+        def refuse_site_0(email):
+            if (email.subscription_obj.subscription == reports.SITE_REPORT
+                    and email.context.get('site') == 'site-0'):
+                raise SMTPConnectError(421, 'try again later')
+            return self.record(email)
+
+        self.send.side_effect = refuse_site_0
+
+        with mock.patch.object(tasks, 'report_events_by_site') as by_site:
+            result = tasks.report_events(self.report_interval, 'INFO')
+
+        by_site.delay.assert_called_once_with(
+            'site-0', self.report_interval, 'INFO')
+        self.assertEqual(result['retried'], 1)
+        self.assertEqual(result['sent'], len(self.sent))
+
+    def test_connect_error_raised_without_retry(self):
+        """
+        test that a refused connection is raised after the other reports
+        were sent if the caller does not retry the reports
+        """
+        self.send.side_effect = SMTPConnectError(421, 'try again later')
+
+        with self.assertRaises(SMTPConnectError):
+            reports.send_event_reports(self.report_interval, 'INFO')
+
+        self.assertEqual(self.send.call_count, 2 * (2 + 2 * 2))
+
+    def test_query_count_is_constant(self):
+        """
+        test that the number of queries does not grow with the number of
+        sites and bots
+        """
+        def report_queries(queries):
+            # each message saves a copy of itself for its link
+            return [query for query in queries
+                    if 'templated_email_savedemail' not in query['sql']]
+
+        # warm up the subscription and preference caches
+        reports.send_event_reports(self.report_interval, 'INFO')
+
+        with CaptureQueriesContext(connection) as few:
+            reports.send_event_reports(self.report_interval, 'INFO')
+
+        for index in range(2, 6):
+            self.add_site(f'site-{index}', bots=3)
+
+        self.sent.clear()
+        with CaptureQueriesContext(connection) as many:
+            reports.send_event_reports(self.report_interval, 'INFO')
+
+        self.assertEqual(len(self.sent), 2 * (6 + 2 * 2 + 4 * 3))
+        self.assertEqual(len(report_queries(many)),
+                         len(report_queries(few)))
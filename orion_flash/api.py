@@ -17,7 +17,6 @@ from citrus_borg.locutus.communication import (
     get_dead_bots as _get_dead_bots, raise_failed_logins_alarm,
     raise_ux_alarm, GroupBy,
 )
-from citrus_borg.dynamic_preferences_registry import get_preference
 from p_soc_auto_base import utils as base_utils
 
 
@@ -58,12 +57,14 @@ def get_failed_logons(
 
 
 def get_ux_alarms(  # pylint: disable=too-many-arguments
-        now=None,  group_by=GroupBy.NONE,
-        time_delta=get_preference('citrusborgux__ux_alert_interval'),
-        ux_alert_threshold=get_preference('citrusborgux__ux_alert_threshold'),
-        annotate_url=True, annotate_details_url=True, **details):
+        now=None,  group_by=GroupBy.NONE, time_delta=None,
+        ux_alert_threshold=None, annotate_url=True, annotate_details_url=True,
+        **details):
     """
     get the user experience alert data
+
+    The `time_delta` and `ux_alert_threshold` arguments default to the
+    values used by :func:`citrus_borg.locutus.communication.raise_ux_alarm`.
     """
     queryset = raise_ux_alarm(
         now=now, group_by=group_by, time_delta=time_delta,
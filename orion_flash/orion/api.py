@@ -24,7 +24,9 @@ from orionsdk import SwisClient
 
 from django.conf import settings
 
-from citrus_borg.dynamic_preferences_registry import get_preference
+from citrus_borg.dynamic_preferences_registry import (
+    get_cached_preference, get_preference,
+)
 
 from .qv import (ALL_CUSTOM_PROPS_QUERY, FILTERED_CUSTOM_PROPS_QUERY,
                  CUSTOM_PROPS_VALS_VERB, CUSTOM_PROPS_VALS_INVOKE_ARGS,
@@ -38,10 +40,17 @@ LOG = logging.getLogger(__name__)
 
 SRC_DEFAULTS = (settings.ORION_HOSTNAME,
                 settings.ORION_USER, settings.ORION_PASSWORD)
-DST_DEFAULTS = (
-    get_preference('orionserverconn__orion_hostname'),
-    get_preference('orionserverconn__orion_user'),
-    get_preference('orionserverconn__orion_password'))
+
+
+def dst_defaults():
+    """
+    :returns: the (host, user, password) for the `Orion` server updated by
+        :class:`DestSwis`, read from the dynamic preferences
+    """
+    return (get_cached_preference('orionserverconn__orion_hostname'),
+            get_cached_preference('orionserverconn__orion_user'),
+            get_cached_preference('orionserverconn__orion_password'))
+
 
 if not settings.ORION_VERIFY_SSL_CERT:
     urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
@@ -112,15 +121,17 @@ class DestSwis(SourceSwis):
     need them
     """
 
-    def __init__(
-            self, *args,
-            verify=get_preference('orionserverconn__orion_verify_ssl_cert')):
+    def __init__(self, *args, verify=None):
         """
         override the parent constructor to prefer defaults specific to the
         target server
         """
         if not args:
-            args = DST_DEFAULTS
+            args = dst_defaults()
+
+        if verify is None:
+            verify = get_cached_preference(
+                'orionserverconn__orion_verify_ssl_cert')
 
         super().__init__(*args, verify=verify)
 
@@ -12,7 +12,9 @@ Application`.
 
 :contact:    daniel.busto@phsa.ca
 """
-from citrus_borg.dynamic_preferences_registry import get_preference
+from citrus_borg.dynamic_preferences_registry import (
+    get_cached_preference, get_preference,
+)
 
 from .models import OrionNode, OrionCernerCSTNode
 
@@ -22,15 +24,16 @@ class OrionSslNode:
     Class with methods for retrieving `Orion` data cached by the :ref:`Orion
     Integration Application`
     '''
-    ssl_filters = dict(
-        orionapmapplication__application_name__icontains=get_preference(
-            'orionfilters__ssl_app'))
-    """
-    `Django field lookups
-    <https://docs.djangoproject.com/en/2.1/ref/models/querysets/#field-lookups>`__
-    that can be used by any method in this class
-
-    """
+    @staticmethod
+    def ssl_filters():
+        """
+        :returns: the `Django field lookups
+            <https://docs.djangoproject.com/en/2.1/ref/models/querysets/#field-lookups>`__
+            that can be used by any method in this class
+        """
+        return dict(
+            orionapmapplication__application_name__icontains=(
+                get_cached_preference('orionfilters__ssl_app')))
 
     @classmethod
     def nodes(cls, cerner_cst=None, orion_ssl=None, servers_only=None):
@@ -130,7 +133,7 @@ class OrionSslNode:
                     'orionfilters__server_node'))
 
         if orion_ssl:
-            queryset = queryset.filter(**cls.ssl_filters)
+            queryset = queryset.filter(**cls.ssl_filters())
 
         return queryset
 
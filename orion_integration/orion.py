@@ -20,6 +20,7 @@ from datetime import datetime, timedelta
 from requests import Session, urllib3
 
 from citrus_borg.dynamic_preferences_registry import get_preference
+from p_soc_auto_base.metrics import EXTERNAL_CALL_SECONDS
 
 SESSION = Session()
 """
@@ -95,15 +96,16 @@ class OrionClient:
         SESSION.verify = get_preference(
             'orionserverconn__orion_verify_ssl_cert')
 
-        response = SESSION.post(
-            '{}/Query'.format(
-                get_preference('orionserverconn__orion_rest_url')),
-            data=json.dumps(
-                dict(query=orion_query, parameters=params),
-                default=serialize_custom_json),
-            timeout=(get_preference('orionserverconn__orion_conn_timeout'),
-                     get_preference('orionserverconn__orion_read_timeout'))
-        )
+        with EXTERNAL_CALL_SECONDS.time(service='orion', operation='query'):
+            response = SESSION.post(
+                '{}/Query'.format(
+                    get_preference('orionserverconn__orion_rest_url')),
+                data=json.dumps(
+                    dict(query=orion_query, parameters=params),
+                    default=serialize_custom_json),
+                timeout=(get_preference('orionserverconn__orion_conn_timeout'),
+                         get_preference('orionserverconn__orion_read_timeout'))
+            )
 
         response.raise_for_status()
 
@@ -8,7 +8,7 @@ configuration.
 
 :copyright:
 
-    Copyright 2018 - 2019 Provincial Health Service Authority
+    Copyright 2018 - 2020 Provincial Health Service Authority
     of British Columbia
 
 :contact:    daniel.busto@phsa.ca
@@ -17,6 +17,7 @@ configuration.
 import os
 
 from celery import Celery
+from celery.signals import worker_init, worker_process_init
 from django.apps import apps
 from django.conf import settings
 from event_consumer.handlers import AMQPRetryConsumerStep
@@ -30,3 +31,32 @@ app = Celery('p_soc_auto')
 app.config_from_object('django.conf:settings', namespace='CELERY')
 app.steps['consumer'].add(AMQPRetryConsumerStep)
 app.autodiscover_tasks()
+
+
+@worker_init.connect
+def preload_worker(**kwargs):  # pylint: disable=unused-argument
+    """
+    warm up the main worker process before it forks the pool processes, see
+    :mod:`p_soc_auto_base.preload`
+    """
+    if not settings.WORKER_PRELOAD:
+        return
+
+    # Django is not set up when this module is imported
+    # pylint: disable=import-outside-toplevel
+    from p_soc_auto_base.preload import preload
+    preload()
+
+
+@worker_process_init.connect
+def preload_pool_process(**kwargs):  # pylint: disable=unused-argument
+    """
+    renew what a pool process inherited from :func:`preload_worker`, see
+    :func:`p_soc_auto_base.preload.preload_pool_process`
+    """
+    if not settings.WORKER_PRELOAD:
+        return
+
+    # pylint: disable=import-outside-toplevel
+    from p_soc_auto_base import preload
+    preload.preload_pool_process()
@@ -9,20 +9,53 @@ See the `Grappelli Dashboard
 <https://django-grappelli.readthedocs.io/en/latest/index.html#dashboard>`__
 documentation for details.
 
+The modules showing live data or remote content read it from the cache; see
+:mod:`p_soc_auto_base.dashboard`. Nothing on this page may wait for the
+network or for a slow query.
+
 :copyright:
 
-    Copyright 2018 - 2019 Provincial Health Service Authority
+    Copyright 2018 - 2020 Provincial Health Service Authority
     of British Columbia
 
 :contact:    daniel.busto@phsa.ca
 
 """
 
+from django.conf import settings
+from django.utils import timezone
 from django.utils.translation import ugettext_lazy as _
-from django.urls import reverse
 
 from grappelli.dashboard import modules, Dashboard
-from grappelli.dashboard.utils import get_admin_site_name
+
+from p_soc_auto_base import dashboard
+
+
+class CachedLinkList(modules.LinkList):
+    """
+    link list module with the links read from the cache
+
+    The :attr:`loader` returns a :class:`dict` with the 'generated_on' and
+    'children' keys or `None` if the links are not in the cache yet.
+    """
+    loader = None
+    """the function returning the cached links"""
+
+    def init_with_context(self, context):
+        if self._initialized:
+            return
+
+        cached = self.loader()
+        if cached is None:
+            self.pre_content = _('Not available yet, please reload the page'
+                                 ' in a minute.')
+        else:
+            self.children = cached['children']
+            self.post_content = _('Updated at %(moment)s') % {
+                'moment': timezone.localtime(
+                    cached['generated_on']).strftime('%H:%M:%S')}
+
+        super().init_with_context(context)
 
 
 class CustomIndexDashboard(Dashboard):
@@ -31,7 +64,9 @@ class CustomIndexDashboard(Dashboard):
     """
 
     def init_with_context(self, context):
-        site_name = get_admin_site_name(context)
+        self.children.append(CachedLinkList(
+            _('Live Summary'), column=1, collapsible=True,
+            loader=dashboard.get_summary))
 
         self.children.append(modules.Group(
             _('PHSA Service Operations Center Applications'),
@@ -134,6 +169,7 @@ class CustomIndexDashboard(Dashboard):
                     'url': 'http://code.google.com/p/django-grappelli/',
                     'external': True, }, ]))
 
-        self.children.append(modules.Feed(
-            _('Latest Django News'), column=3, limit=5,
-            feed_url='http://www.djangoproject.com/rss/weblog/'))
+        if settings.DASHBOARD_FEED_URL:
+            self.children.append(CachedLinkList(
+                _('News'), column=3, collapsible=True,
+                loader=dashboard.get_feed))
@@ -310,6 +310,71 @@ be placed under this directory
 """
 pathlib.Path(EXPORT_CSV_MEDIA_ROOT).mkdir(parents=True, exist_ok=True)
 
+ARCHIVE_ROOT = os.path.join(MEDIA_ROOT, 'archive/')
+"""
+compressed archive files for expired events are placed under this directory
+
+See :mod:`p_soc_auto_base.archive`.
+"""
+pathlib.Path(ARCHIVE_ROOT).mkdir(parents=True, exist_ok=True)
+
+BENCHMARK_ROOT = os.path.join(MEDIA_ROOT, 'benchmarks/')
+"""
+query benchmark results and the benchmark baseline are saved under this
+directory
+
+See :mod:`p_soc_auto_base.benchmark`.
+"""
+
+BENCHMARK_REPEAT = 5
+"""
+how many times each query benchmark is timed
+"""
+
+BENCHMARK_TOLERANCE = 0.2
+"""
+relative increase of the median time of a query benchmark over its baseline
+that is reported as a regression
+"""
+
+STARTUP_BUDGET = 15.0
+"""
+number of seconds a new process may take to set up `Django` and to import
+the `Celery` tasks
+
+See :mod:`p_soc_auto_base.startup`.
+"""
+
+STARTUP_RUNS = 3
+"""
+how many processes are started to measure the startup time
+"""
+
+PREFERENCE_CACHE_TTL = 60
+"""
+number of seconds the dynamic preferences read with
+:func:`citrus_borg.dynamic_preferences_registry.get_cached_preference` are
+kept in the cache
+"""
+
+WORKER_PRELOAD = True
+"""
+warm up the `Celery` worker processes before they fork their pool processes
+
+See :mod:`p_soc_auto_base.preload`.
+"""
+
+PRELOAD_MODULES = [
+    'django.core.mail.backends.smtp',
+    'templated_email.backends.vanilla_django',
+    'encodings.idna',
+]
+"""
+modules imported by the `Celery` worker processes before they fork their
+pool processes, in addition to the task modules; these are the modules that
+are otherwise imported when they are first used
+"""
+
 
 ORION_HOSTNAME = 'orion.vch.ca'
 """
@@ -595,6 +660,190 @@ EMAIL_HOST_USER = ''
 EMAIL_HOST_PASSWORD = ''
 """SMTP relay user password"""
 
+EMAIL_SPOOL_CONNECTIONS = 2
+"""
+maximum number of concurrent connections to the SMTP relay opened by the
+outbound mail spool in each process
+
+See :class:`p_soc_auto_base.spool.MailSpool`.
+"""
+
+EMAIL_SPOOL_BATCH_SIZE = 20
+"""maximum number of email messages sent over one connection in one batch"""
+
+EMAIL_SPOOL_MAX_RETRIES = 3
+"""how many times the mail spool will retry a batch of email messages"""
+
+EMAIL_SPOOL_RETRY_DELAY = 2
+"""
+delay in seconds before the mail spool retries a batch; the delay is doubled
+with each retry
+"""
+
+EMAIL_SPOOL_IDLE_TIMEOUT = 60
+"""
+connections to the SMTP relay that have been idle for longer than this many
+seconds are re-opened before being used by the mail spool
+"""
+
+METRICS_FLUSH_INTERVAL = 10
+"""
+number of seconds between flushes of the metrics recorded by each process to
+the cache
+
+See :class:`p_soc_auto_base.metrics.Registry`.
+"""
+
+QUERY_PROFILER_SAMPLE_RATE = 0.01
+"""
+fraction of the `Celery` task runs that will have their database queries
+profiled; set to 0 to disable the profiler
+
+See :mod:`p_soc_auto_base.profiler`.
+"""
+
+QUERY_PROFILER_MAX_QUERIES = 100
+"""
+profiled task runs with more queries than this are flagged in
+:class:`p_soc_auto_base.models.TaskQueryProfile` while their task does not
+have enough profiles for a baseline
+"""
+
+QUERY_PROFILER_MAX_QUERY_TIME = 5.0
+"""
+profiled task runs that spend more than this many seconds in database queries
+are flagged in :class:`p_soc_auto_base.models.TaskQueryProfile` while their
+task does not have enough profiles for a baseline
+"""
+
+QUERY_PROFILER_BASELINE_RUNS = 50
+"""
+number of recent profiles of a task used to calculate its baseline query
+count and query time
+
+See :meth:`p_soc_auto_base.profiler.QueryProfiler.limits`.
+"""
+
+QUERY_PROFILER_BASELINE_MIN_RUNS = 5
+"""
+minimum number of profiles of a task needed for a baseline
+"""
+
+QUERY_PROFILER_REGRESSION_FACTOR = 2.0
+"""
+profiled task runs with a query count or a query time larger than the
+baseline of their task multiplied by this value are flagged
+"""
+
+QUERY_PROFILER_RETENTION = {'days': 30}
+"""
+task query profiles older than this are deleted by
+:func:`p_soc_auto_base.tasks.delete_query_profiles`
+"""
+
+QUERY_PROFILER_REPEAT_THRESHOLD = 10
+"""
+queries with the same fingerprint executed at least this many times during a
+task run are reported as repeated queries and the task run is flagged
+"""
+
+SUBSCRIPTION_CACHE_TTL = 300
+"""
+number of seconds a :class:`p_soc_auto_base.models.Subscription` instance is
+cached in each process
+
+See :meth:`p_soc_auto_base.models.Subscription.get_subscription`.
+"""
+
+IDENTITY_MAP_TTL = 300
+"""
+number of seconds an instance is kept in the process-local identity maps
+before it is read again from the database
+
+See :mod:`p_soc_auto_base.identity`.
+"""
+
+IDENTITY_MAP_NEGATIVE_TTL = 60
+"""
+number of seconds an unknown name (e.g. an event source that is not
+monitored) is remembered as unknown by the identity maps
+"""
+
+HEARTBEAT_BUFFER_TTL = 3600
+"""
+number of seconds the buffered `last seen` values of the bots and brokers are
+kept in the cache; they must survive at least until the next flush
+
+See :mod:`citrus_borg.heartbeat`.
+"""
+
+ADMIN_EXACT_COUNT_LIMIT = 10000
+"""
+filtered `Django admin` changelists for large tables count at most this many
+rows
+
+See :mod:`p_soc_auto_base.changelist`.
+"""
+
+ADMIN_FILTER_CHOICES_TTL = 600
+"""
+number of seconds the choices of the cached `Django admin` list filters and
+the table size estimates are kept in the cache
+
+See :mod:`p_soc_auto_base.changelist`.
+"""
+
+HEALTH_SNAPSHOT_TTL = 300
+"""
+number of seconds the live health snapshot is kept in the cache; the
+snapshot is refreshed every minute
+
+See :mod:`p_soc_auto_base.health`.
+"""
+
+HEALTH_RETRY_AFTER = 30
+"""
+number of seconds the clients of the live health endpoint are asked to wait
+between requests
+"""
+
+HEALTH_SSL_EXPIRES_IN_DAYS = 30
+"""
+`SSL` certificates expiring in fewer days are listed in the live health
+snapshot
+"""
+
+DASHBOARD_SUMMARY_TTL = 300
+"""
+number of seconds the live summary shown on the `Django Admin` dashboard is
+kept in the cache; the summary is refreshed every minute
+
+See :mod:`p_soc_auto_base.dashboard`.
+"""
+
+DASHBOARD_FEED_URL = None
+"""
+`RSS` feed shown on the `Django Admin` dashboard
+
+The feed module is not shown if this is `None`.
+"""
+
+DASHBOARD_FEED_TIMEOUT = 5
+"""
+number of seconds to wait for the dashboard feed before giving up
+"""
+
+DASHBOARD_FEED_LIMIT = 5
+"""
+number of dashboard feed entries to show
+"""
+
+DASHBOARD_FEED_TTL = 6 * 3600
+"""
+number of seconds the dashboard feed entries are kept in the cache; the feed
+is fetched every half hour
+"""
+
 # ===========================================================================
 
 DEFAULT_FROM_EMAIL = 'TSCST-Support@hssbc.ca'
@@ -836,6 +1085,46 @@ SSL_DEFAULT_PORT = 443
 default network port for ``SSL`` `nmap <https://nmap.org/>`__ probes
 """
 
+NMAP_PROBE_WORKERS = 8
+"""
+how many `nmap <https://nmap.org/>`__ probes
+:func:`ssl_cert_tracker.nmap.probe_for_state` and
+:func:`ssl_cert_tracker.nmap.probe_for_certs` run at the same time
+"""
+
+NMAP_PROBE_POOL = 'thread'
+"""
+the kind of worker pool used by :func:`ssl_cert_tracker.nmap.run_probes`:
+'thread' or 'process'
+
+The probes spend their time waiting for `nmap` to finish, threads are
+enough unless parsing the results becomes the bottleneck.
+"""
+
+NMAP_PROBE_TIMEOUT = 300
+"""
+how long, in seconds, :func:`ssl_cert_tracker.nmap.probe_for_state` and
+:func:`ssl_cert_tracker.nmap.probe_for_certs` wait for each `nmap` probe
+"""
+
+SSL_SWEEP_FRESHNESS = 3600
+"""
+how long, in seconds, the result of an ``SSL`` `nmap <https://nmap.org/>`__
+probe is reused instead of probing the same network address and port again
+
+See :mod:`ssl_cert_tracker.sweep`.
+"""
+
+BOT_CONFIG_CACHE_TTL = 24 * 3600
+"""
+how long, in seconds, the main configuration of an `Exchange` monitoring bot
+is kept in the cache once serialized
+
+The cached configuration is keyed on a version hash of the data it is built
+from, so a configuration that has changed is never served from the cache.
+See :func:`mail_collector.lib.get_bot_config_payload`.
+"""
+
 EVENT_TYPE_SORT = {
     'unknown':       0,
     'configuration': 1,
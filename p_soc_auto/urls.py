@@ -39,5 +39,6 @@ urlpatterns = [
     path(r'grappelli/', include('grappelli.urls')),
     path(r'admin/', admin.site.urls),
     path(r'mail_collector/', include('mail_collector.urls')),
+    path(r'', include('p_soc_auto_base.urls')),
     url(r'^', include('templated_email.urls', namespace='templated_email')),
 ]
@@ -24,10 +24,11 @@ from django.core.exceptions import FieldDoesNotExist
 from django.utils import timezone
 
 from djqscsv import write_csv
+from rangefilter.filter import DateTimeRangeFilter
 
 from citrus_borg.models import BorgSite
 from mail_collector.models import ExchangeConfiguration
-from p_soc_auto_base.models import Subscription
+from p_soc_auto_base.models import Subscription, TaskQueryProfile
 
 admin.site.site_header = 'SOC Automation Server'
 admin.site.index_title = 'SOC Automation Server Administration'
@@ -335,3 +336,31 @@ class SubscriptionAdmin(BaseAdmin, admin.ModelAdmin):
     readonly_fields = ('created_on', 'updated_on', )
     list_filter = ('enabled', )
     search_fields = ('subscription', )
+
+
+@admin.register(TaskQueryProfile)
+class TaskQueryProfileAdmin(admin.ModelAdmin):
+    """
+    :class:`django.contrib.admin.ModelAdmin` class for the
+    :class:`p_soc_auto_base.models.TaskQueryProfile` model
+
+    The flagged task runs are the ones that exceeded the query profiler
+    thresholds defined in :mod:`p_soc_auto.settings.common`.
+    """
+    list_display = ('task_name', 'flagged', 'query_count', 'query_time',
+                    'distinct_queries', 'created_on')
+    list_filter = ('flagged', 'task_name', ('created_on', DateTimeRangeFilter))
+    search_fields = ('task_name', 'repeated_queries')
+
+    def has_add_permission(self, request):
+        """
+        :class:`p_soc_auto_base.models.TaskQueryProfile` instances are
+        created automatically by the query profiler
+        """
+        return False
+
+    def get_readonly_fields(self, request, obj=None):
+        """
+        all the fields on the `Django admin` forms must be read only
+        """
+        return [field.name for field in self.model._meta.fields]
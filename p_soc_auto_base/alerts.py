@@ -0,0 +1,218 @@
+"""
+p_soc_auto_base.alerts
+----------------------
+
+This module contains the alert coalescing layer used by the per event
+alert tasks.
+
+Alerts are keyed by the `Celery` task that sends them (each task is tied to
+one subscription) and by the entity the alert is about (a bot, an `AD`
+node, etc.). The first alert for a key is sent right away and opens a
+coalescing window. Alerts for the same key that arrive while the window is
+open are recorded in the cache and are sent as a single digest when the
+window closes.
+
+All the state is kept in the `Django` cache. The layer never queries the
+database.
+
+:copyright:
+
+    Copyright 2018 - 2020 Provincial Health Service Authority
+    of British Columbia
+
+:contact:    daniel.busto@phsa.ca
+"""
+import hashlib
+import uuid
+from logging import getLogger
+
+from django.core.cache import cache
+
+from citrus_borg.dynamic_preferences_registry import get_preference
+
+
+LOG = getLogger(__name__)
+
+KEY_PREFIX = 'coalesced_alert'
+
+
+def _alert_key(task_name, subject):
+    """
+    :returns: a `memcached` safe cache key for a (task, subject) pair
+    """
+    digest = hashlib.md5(f'{task_name}|{subject}'.encode()).hexdigest()
+
+    return f'{KEY_PREFIX}:{digest}'
+
+
+def _open_window(key, timeout):
+    """
+    open the coalescing window for `key` unless it is already open
+
+    :returns: a `(generation, opened)` tuple where `generation` identifies
+        the window and `opened` is `True` if the window was opened by this
+        call
+    """
+    for _ in range(2):
+        generation = uuid.uuid4().hex
+        if cache.add(f'{key}:window', generation, timeout=timeout):
+            return generation, True
+
+        current = cache.get(f'{key}:window')
+        if current is not None:
+            return current, False
+
+    # the window keeps expiring under us; treat this as a new window
+    cache.set(f'{key}:window', generation, timeout=timeout)
+    return generation, True
+
+
+def _close_window(key, generation):
+    """
+    retire the coalescing window `generation` for `key`
+
+    Alerts that arrive after this call open a new window instead of being
+    added to a digest that has already been collected.
+    """
+    cache.set(f'{key}:{generation}:closed', True)
+    if cache.get(f'{key}:window') == generation:
+        cache.delete(f'{key}:window')
+
+
+def _claim(item_key):
+    """
+    claim a recorded alert for either the digest or for its own recorder
+
+    :returns: `True` if the caller is the first to claim the alert
+    """
+    return cache.add(f'{item_key}:claimed', True)
+
+
+def _record(key, generation, instance_pk, timeout):
+    """
+    add `instance_pk` to the digest for the window `generation`
+
+    The digest may be collected by :func:`pop_coalesced` while the alert is
+    recorded. If that happens, the alert and the digest race to claim the
+    entry and exactly one of them keeps it.
+
+    :returns: `True` if the alert belongs to the digest, `False` if the
+        window was closed and the alert must be sent some other way
+    """
+    closed_key = f'{key}:{generation}:closed'
+    if cache.get(closed_key):
+        return False
+
+    count_key = f'{key}:{generation}:count'
+    cache.add(count_key, 0, timeout=2 * timeout)
+    try:
+        index = cache.incr(count_key)
+    except ValueError:
+        # the counter expired between the add and the incr
+        cache.set(count_key, 1, timeout=2 * timeout)
+        index = 1
+
+    item_key = f'{key}:{generation}:{index}'
+    cache.set(item_key, instance_pk, timeout=2 * timeout)
+
+    if not cache.get(closed_key):
+        # the digest has not been collected yet so it will see this entry
+        return True
+
+    return not _claim(item_key)
+
+
+def coalesce_alert(task, subject, instance_pk, **task_kwargs):
+    """
+    dispatch an alert task for `instance_pk` unless an alert about the same
+    `subject` has already been sent by the same `task` within the coalescing
+    window
+
+    The coalescing window is configured by the
+    :class:`citrus_borg.dynamic_preferences_registry.AlertCoalesceWindow`
+    dynamic preference. A window of 0 disables coalescing.
+
+    :arg task: the `Celery` task that sends the alert
+
+        The task must accept the primary key of the alert subject as its
+        first argument and a `coalesced` keyword argument with the list of
+        primary keys collected while the window was open.
+
+    :arg str subject: identifies the entity the alert is about
+
+    :arg int instance_pk: the primary key of the row that triggered the
+        alert
+
+    :arg task_kwargs: other keyword arguments for the task
+
+    :returns: `True` if the alert task was dispatched right away, `False` if
+        the alert was added to the digest for the current window
+    """
+    window = get_preference('commonalertargs__coalesce_window')
+    if not window:
+        task.delay(instance_pk, **task_kwargs)
+        return True
+
+    timeout = int(window.total_seconds())
+    key = _alert_key(task.name, subject)
+
+    for _ in range(2):
+        generation, opened = _open_window(key, timeout)
+
+        # keep the entries around long enough for the digest task to find
+        # them even if it starts late
+        if not cache.add(f'{key}:{generation}:pk:{instance_pk}', True,
+                         timeout=2 * timeout):
+            LOG.debug('suppressed duplicate alert %s for %s', task.name,
+                      subject)
+            return False
+
+        if opened:
+            task.delay(instance_pk, **task_kwargs)
+            # imported here to avoid a circular import with the tasks module
+            # pylint: disable=import-outside-toplevel
+            from p_soc_auto_base.tasks import dispatch_coalesced_alert
+            dispatch_coalesced_alert.apply_async(
+                args=(task.name, key, generation), kwargs=task_kwargs,
+                countdown=timeout)
+            return True
+
+        if _record(key, generation, instance_pk, timeout):
+            LOG.debug('coalesced alert %s for %s into digest %s', task.name,
+                      subject, generation)
+            return False
+
+        # the digest was collected while this alert was recorded
+        _close_window(key, generation)
+
+    # the windows keep closing under us; don't lose the alert
+    task.delay(instance_pk, **task_kwargs)
+    return True
+
+
+def pop_coalesced(key, generation):
+    """
+    collect and forget the primary keys recorded for a coalescing window
+
+    The window is closed first, so that the alerts that arrive from now on
+    open a new window instead of being recorded for a digest that will
+    never be sent.
+
+    :arg str key: the cache key for the (task, subject) pair
+    :arg str generation: the identifier of the window
+
+    :returns: the primary keys in the order in which they were recorded
+    :rtype: list
+    """
+    _close_window(key, generation)
+
+    count_key = f'{key}:{generation}:count'
+    count = cache.get(count_key) or 0
+
+    item_keys = [f'{key}:{generation}:{index}'
+                 for index in range(1, count + 1)]
+    items = cache.get_many(item_keys)
+    cache.delete_many(item_keys + [count_key])
+
+    return [items[item_key] for item_key in item_keys
+            if item_key in items and _claim(item_key)]
@@ -27,3 +27,15 @@ class PSocAutoBaseConfig(AppConfig):
     """
     name = 'p_soc_auto_base'
     verbose_name = _('PHSA Service Operations Center Base Application')
+
+    def ready(self):
+        """
+        use this method for initialization purposes and to avoid `Django`
+        circular import errors
+
+        See `AppConfig.ready()
+        <https://docs.djangoproject.com/en/2.2/ref/applications/#django.apps.AppConfig.ready>`__.
+        """
+        # These imports are required for Django to set up correctly.
+        # pylint: disable=import-outside-toplevel, unused-import
+        import p_soc_auto_base.signals
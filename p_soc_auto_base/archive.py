@@ -0,0 +1,293 @@
+"""
+p_soc_auto_base.archive
+-----------------------
+
+This module contains the archive tier used for keeping expired event data
+around after it has been deleted from the database.
+
+Rows are written to compressed, column oriented, date partitioned files
+under :attr:`p_soc_auto.settings.common.ARCHIVE_ROOT`. The layout is::
+
+    ARCHIVE_ROOT/<archive name>/<YYYY>/<MM>/<DD>/<batch uuid>.json.gz
+
+where the date components come from the partition field of the archived
+rows. Each file contains a single `JSON` object with a list of column names
+and one list of values per column.
+
+The reader functions in this module only look at the files on disk and
+never touch the database.
+
+:copyright:
+
+    Copyright 2018 - 2020 Provincial Health Service Authority
+    of British Columbia
+
+:contact:    daniel.busto@phsa.ca
+
+"""
+import datetime
+import gzip
+import json
+import os
+import uuid
+from collections import defaultdict
+from logging import getLogger
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+
+LOG = getLogger(__name__)
+
+ARCHIVES = {
+    'winlogevent': {
+        'partition_field': 'created_on',
+        'fields': [
+            'uuid', 'source_host__host_name', 'source_host__site__site',
+            'event_state', 'xml_broker__broker_name', 'event_test_result',
+            'storefront_connection_duration', 'receiver_startup_duration',
+            'connection_achieved_duration', 'logon_achieved_duration',
+            'logoff_achieved_duration', 'failure_reason', 'event_id',
+            'timestamp', 'created_on',
+        ],
+    },
+    'mailbotlogevent': {
+        'partition_field': 'event_registered_on',
+        'fields': [
+            'uuid', 'event_group_id', 'source_host__host_name',
+            'source_host__site__site', 'event_status', 'event_type',
+            'event_message', 'event_exception', 'mail_account',
+            'event_registered_on',
+        ],
+    },
+    'ldapprobelog': {
+        'partition_field': 'created_on',
+        'fields': [
+            'uuid', 'ad_orion_node_id', 'ad_node_id', 'elapsed_initialize',
+            'elapsed_bind', 'elapsed_anon_bind', 'elapsed_read_root',
+            'elapsed_search_ext', 'errors', 'failed', 'created_on',
+        ],
+    },
+}
+"""
+the archive definitions, keyed by the lower case name of the model
+
+Each definition lists the field that drives the date partitioning of the
+archive files and the fields (including related lookups) that will be
+written to the archive. Large text fields like raw messages are
+deliberately left out.
+"""
+
+ARCHIVE_CHUNK_SIZE = 5000
+"""number of rows read from the database at a time while archiving"""
+
+
+class ArchiveError(Exception):
+    """
+    raised when a queryset cannot be archived
+    """
+
+
+def _archive_path(archive_name, day=None):
+    """
+    :returns: the directory for an archive or for one of its daily partitions
+    """
+    path = os.path.join(settings.ARCHIVE_ROOT, archive_name)
+    if day is not None:
+        path = os.path.join(
+            path, f'{day.year:04d}', f'{day.month:02d}', f'{day.day:02d}')
+
+    return path
+
+
+def _write_partition(archive_name, day, columns, rows):
+    """
+    write one batch of rows to a new file in the daily partition
+
+    :returns: the path to the new file
+    """
+    path = _archive_path(archive_name, day)
+    os.makedirs(path, exist_ok=True)
+
+    file_name = os.path.join(path, f'{uuid.uuid4()}.json.gz')
+    payload = {
+        'columns': columns,
+        'data': [[row[column] for row in rows] for column in columns],
+    }
+    with gzip.open(file_name, 'wt', encoding='utf-8') as archive_file:
+        json.dump(payload, archive_file, cls=DjangoJSONEncoder)
+
+    return file_name
+
+
+def archive_queryset(queryset, archive_name=None):
+    """
+    write the rows in a :class:`django.db.models.query.QuerySet` to the
+    archive
+
+    The rows are read in chunks of :attr:`ARCHIVE_CHUNK_SIZE` and are
+    grouped by the date of their partition field. This function will not
+    delete anything, that is left to the caller.
+
+    :arg queryset: the rows to archive
+
+    :arg str archive_name: the key in :attr:`ARCHIVES`; by default it is the
+        lower case name of the model behind the `queryset`
+
+    :returns: the number of archived rows
+    :rtype: int
+
+    :raises: :exc:`ArchiveError` if there is no archive definition for the
+        `queryset` model
+    """
+    if archive_name is None:
+        archive_name = queryset.model._meta.model_name
+
+    try:
+        definition = ARCHIVES[archive_name]
+    except KeyError:
+        raise ArchiveError(f'there is no archive defined for {archive_name}')
+
+    columns = definition['fields']
+    partition_field = definition['partition_field']
+
+    partitions = defaultdict(list)
+    count = 0
+    for row in queryset.values(*columns).iterator(
+            chunk_size=ARCHIVE_CHUNK_SIZE):
+        partitions[timezone.localtime(row[partition_field]).date()].append(
+            row)
+        count += 1
+
+        if count % ARCHIVE_CHUNK_SIZE == 0:
+            for day, rows in partitions.items():
+                _write_partition(archive_name, day, columns, rows)
+            partitions.clear()
+
+    for day, rows in partitions.items():
+        _write_partition(archive_name, day, columns, rows)
+
+    LOG.info('archived %s rows to %s', count, _archive_path(archive_name))
+
+    return count
+
+
+def _partition_days(archive_name, since=None, until=None):
+    """
+    :returns: the `(day, path)` pairs for the daily partitions of an
+        archive that fall between `since` and `until` (both inclusive)
+    """
+    root = _archive_path(archive_name)
+    if not os.path.isdir(root):
+        return
+
+    for year in sorted(os.listdir(root)):
+        for month in sorted(os.listdir(os.path.join(root, year))):
+            for day in sorted(os.listdir(os.path.join(root, year, month))):
+                try:
+                    partition = datetime.date(int(year), int(month), int(day))
+                except ValueError:
+                    LOG.warning('ignoring unexpected archive path %s',
+                                os.path.join(root, year, month, day))
+                    continue
+
+                if since is not None and partition < since:
+                    continue
+                if until is not None and partition > until:
+                    continue
+
+                yield partition, os.path.join(root, year, month, day)
+
+
+def read_archive(archive_name, since=None, until=None, columns=None):
+    """
+    read rows back from the archive
+
+    Only the daily partitions between `since` and `until` are opened.
+
+    :arg str archive_name: the key in :attr:`ARCHIVES`
+
+    :arg datetime.date since: the first day to read
+
+    :arg datetime.date until: the last day to read
+
+    :arg list columns: only return these columns; all the archived columns
+        are returned by default
+
+    :returns: a generator of :class:`dict` objects, one per archived row.
+        date and time values are returned as strings in `ISO 8601` format
+    """
+    for _, path in _partition_days(archive_name, since, until):
+        for file_name in sorted(os.listdir(path)):
+            with gzip.open(
+                    os.path.join(path, file_name), 'rt',
+                    encoding='utf-8') as archive_file:
+                payload = json.load(archive_file)
+
+            wanted = columns or payload['columns']
+            data = {
+                column: values for column, values in
+                zip(payload['columns'], payload['data'])
+                if column in wanted
+            }
+            if not data:
+                continue
+
+            for values in zip(*data.values()):
+                yield dict(zip(data.keys(), values))
+
+
+def monthly_stats(archive_name, group_by, since=None, until=None,
+                  failed=None):
+    """
+    count the archived rows by month and by the values in the `group_by`
+    columns
+
+    For example, the monthly per site stats for `Citrix` logon events are
+    returned by::
+
+        monthly_stats('winlogevent', ['source_host__site__site'],
+                      failed=('event_state', 'failed'))
+
+    :arg str archive_name: the key in :attr:`ARCHIVES`
+
+    :arg list group_by: the columns used for grouping
+
+    :arg datetime.date since: see :func:`read_archive`
+
+    :arg datetime.date until: see :func:`read_archive`
+
+    :arg tuple failed: optional `(column, value)` pair; when present, the
+        rows where `column` equals `value` are also counted separately
+
+    :returns: a :class:`list` of :class:`dict` objects sorted by month and
+        group, each with a `month` key in `YYYY-MM` format, one key for each
+        `group_by` column, a `count` key and, if so requested, a `failed`
+        key
+    """
+    partition_field = ARCHIVES[archive_name]['partition_field']
+    columns = [partition_field, *group_by]
+    if failed is not None:
+        columns.append(failed[0])
+
+    stats = defaultdict(lambda: {'count': 0, 'failed': 0})
+    for row in read_archive(archive_name, since, until, columns):
+        month = timezone.localtime(
+            parse_datetime(row[partition_field])).strftime('%Y-%m')
+        key = (month, *[row[column] for column in group_by])
+
+        stats[key]['count'] += 1
+        if failed is not None and row[failed[0]] == failed[1]:
+            stats[key]['failed'] += 1
+
+    result = []
+    for key in sorted(stats, key=lambda item: [str(part) for part in item]):
+        item = {'month': key[0], **dict(zip(group_by, key[1:])),
+                'count': stats[key]['count']}
+        if failed is not None:
+            item['failed'] = stats[key]['failed']
+        result.append(item)
+
+    return result
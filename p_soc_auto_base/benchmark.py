@@ -0,0 +1,299 @@
+"""
+p_soc_auto_base.benchmark
+-------------------------
+
+This module contains the query benchmark framework for the
+:ref:`SOC Automation Server`.
+
+Benchmarks are plain functions registered with the :func:`benchmark`
+decorator in a `benchmarks` module of a `Django` application. They are
+discovered the same way the `Django` admin discovers `admin` modules.
+A benchmark must fully evaluate the querysets it builds, otherwise nothing
+reaches the database.
+
+:func:`run_benchmarks` runs each benchmark once to capture its database
+queries and the query plans for the `SELECT` statements, and then runs it
+:attr:`p_soc_auto.settings.common.BENCHMARK_REPEAT` more times to time it.
+The results are written to a `JSON` file under
+:attr:`p_soc_auto.settings.common.BENCHMARK_ROOT` and compared with the
+stored baseline. A benchmark regresses if its median time grows by more
+than :attr:`p_soc_auto.settings.common.BENCHMARK_TOLERANCE`, if it runs
+more queries, or if one of its query plans changes.
+
+The benchmarks are meant to run against a database seeded with
+:func:`p_soc_auto_base.seed.seed`.
+
+Example, from `python manage.py shell`::
+
+    from p_soc_auto_base.benchmark import run_benchmarks
+    results = run_benchmarks()
+    results['regressions']
+
+    # accept the current numbers
+    run_benchmarks(save_baseline=True)
+
+:copyright:
+
+    Copyright 2018 - 2020 Provincial Health Service Authority
+    of British Columbia
+
+:contact:    daniel.busto@phsa.ca
+"""
+import json
+import os
+import statistics
+import time
+from datetime import datetime
+from logging import getLogger
+
+from django.conf import settings
+from django.db import connection
+from django.utils.module_loading import autodiscover_modules
+
+from p_soc_auto_base.profiler import fingerprint
+
+
+LOG = getLogger(__name__)
+
+BENCHMARKS = {}
+"""the registered benchmarks keyed by name"""
+
+BASELINE_FILE = 'baseline.json'
+"""name of the baseline file under the benchmark directory"""
+
+_PLAN_KEYS = ('table', 'type', 'key')
+"""
+the columns of a `MySQL` `EXPLAIN` row that make up the plan signature;
+row estimates change with the data and are left out
+"""
+
+
+def benchmark(name=None):
+    """
+    decorator that registers a benchmark function
+
+    :arg str name: the name of the benchmark; by default, the module and
+        name of the decorated function
+
+    :raises: :exc:`ValueError` if a benchmark with the same name is already
+        registered
+    """
+    def register(func):
+        bench_name = name or f'{func.__module__}.{func.__name__}'
+        if bench_name in BENCHMARKS:
+            raise ValueError(f'benchmark {bench_name} is already registered')
+
+        BENCHMARKS[bench_name] = func
+        return func
+
+    return register
+
+
+class _QueryCapture:
+    """
+    `database instrumentation wrapper
+    <https://docs.djangoproject.com/en/2.2/topics/db/instrumentation/>`__
+    that records the statements executed while it is installed
+    """
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        self.queries.append((sql, params))
+        return execute(sql, params, many, context)
+
+
+def explain(sql, params=None):
+    """
+    :returns: the query plan for an `SQL` statement as a :class:`list` of
+        :class:`dict` objects, one per plan row
+    """
+    prefix = 'EXPLAIN QUERY PLAN' if connection.vendor == 'sqlite' \
+        else 'EXPLAIN'
+
+    with connection.cursor() as cursor:
+        cursor.execute(f'{prefix} {sql}', params)
+        columns = [column[0] for column in cursor.description]
+        return [
+            {column: None if value is None else str(value)
+             for column, value in zip(columns, row)}
+            for row in cursor.fetchall()
+        ]
+
+
+def plan_signature(plan):
+    """
+    :returns: the parts of a query plan that should not change between runs
+        unless the way the database accesses the data changes
+    :rtype: list
+    """
+    signature = []
+    for row in plan:
+        if all(key in row for key in _PLAN_KEYS):
+            signature.append(':'.join(str(row[key]) for key in _PLAN_KEYS))
+        else:
+            signature.append(row.get('detail') or str(sorted(row.items())))
+
+    return signature
+
+
+def _run_one(func, repeat):
+    """
+    run one benchmark
+
+    :returns: the timings, query count and query plans of the benchmark
+    :rtype: dict
+    """
+    capture = _QueryCapture()
+    with connection.execute_wrapper(capture):
+        func()
+
+    plans = {}
+    for sql, params in capture.queries:
+        if not sql.lstrip().upper().startswith('SELECT'):
+            continue
+
+        shape = fingerprint(sql)
+        if shape in plans:
+            continue
+
+        try:
+            plans[shape] = explain(sql, params)
+        except Exception as error:  # pylint: disable=broad-except
+            LOG.warning('cannot explain %s: %s', shape, error)
+            plans[shape] = []
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+
+    return {
+        'min_ms': round(min(timings) * 1000, 3),
+        'median_ms': round(statistics.median(timings) * 1000, 3),
+        'max_ms': round(max(timings) * 1000, 3),
+        'query_count': len(capture.queries),
+        'plans': plans,
+    }
+
+
+def compare(baseline, current, tolerance=None):
+    """
+    compare benchmark results with a baseline
+
+    :arg dict baseline: the baseline results keyed by benchmark name
+    :arg dict current: the current results keyed by benchmark name
+    :arg float tolerance: the accepted relative increase of the median time;
+        defaults to :attr:`p_soc_auto.settings.common.BENCHMARK_TOLERANCE`
+
+    :returns: the regressions keyed by benchmark name; each regression is a
+        :class:`list` of messages
+    :rtype: dict
+    """
+    if tolerance is None:
+        tolerance = settings.BENCHMARK_TOLERANCE
+
+    regressions = {}
+    for name, after in current.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+
+        messages = []
+        if after['median_ms'] > before['median_ms'] * (1 + tolerance):
+            messages.append(
+                f'median time went from {before["median_ms"]} ms'
+                f' to {after["median_ms"]} ms')
+
+        if after['query_count'] > before['query_count']:
+            messages.append(
+                f'query count went from {before["query_count"]}'
+                f' to {after["query_count"]}')
+
+        for shape, plan in after['plans'].items():
+            if shape in before['plans'] and plan_signature(plan) \
+                    != plan_signature(before['plans'][shape]):
+                messages.append(f'query plan changed for {shape}')
+
+        if messages:
+            regressions[name] = messages
+
+    return regressions
+
+
+def _load(path):
+    """
+    :returns: the benchmark results saved in the `JSON` file at `path`
+    """
+    with open(path) as file_handle:
+        return json.load(file_handle)
+
+
+def run_benchmarks(names=None, repeat=None, tolerance=None,
+                   save_baseline=False):
+    """
+    run the registered benchmarks, save the results and compare them with
+    the baseline
+
+    :arg names: run only the benchmarks with these names
+    :type names: :class:`list` of :class:`str`
+
+    :arg int repeat: how many timed runs for each benchmark; defaults to
+        :attr:`p_soc_auto.settings.common.BENCHMARK_REPEAT`
+
+    :arg float tolerance: see :func:`compare`
+
+    :arg bool save_baseline: also save the results as the new baseline
+
+    :returns: the results keyed by benchmark name under 'benchmarks', the
+        regressions under 'regressions' and the path of the results file
+        under 'results_file'
+    :rtype: dict
+
+    :raises: :exc:`KeyError` if one of the `names` is not a registered
+        benchmark
+    """
+    autodiscover_modules('benchmarks')
+
+    repeat = repeat or settings.BENCHMARK_REPEAT
+    names = names or sorted(BENCHMARKS)
+
+    results = {}
+    for name in names:
+        LOG.info('running benchmark %s', name)
+        results[name] = _run_one(BENCHMARKS[name], repeat)
+
+    os.makedirs(settings.BENCHMARK_ROOT, exist_ok=True)
+    baseline_file = os.path.join(settings.BENCHMARK_ROOT, BASELINE_FILE)
+
+    baseline = {}
+    if os.path.exists(baseline_file):
+        baseline = _load(baseline_file)['benchmarks']
+    regressions = compare(baseline, results, tolerance)
+
+    report = {
+        'created_on': datetime.now().isoformat(),
+        'vendor': connection.vendor,
+        'repeat': repeat,
+        'benchmarks': results,
+    }
+
+    results_file = os.path.join(
+        settings.BENCHMARK_ROOT,
+        f'{datetime.now():%Y_%m_%d-%H_%M_%S}-benchmarks.json')
+    with open(results_file, 'w') as file_handle:
+        json.dump(report, file_handle, indent=2)
+
+    if save_baseline:
+        # benchmarks that were not run keep their old baseline
+        baseline.update(results)
+        with open(baseline_file, 'w') as file_handle:
+            json.dump(dict(report, benchmarks=baseline), file_handle,
+                      indent=2)
+
+    for name, messages in regressions.items():
+        LOG.warning('benchmark %s regressed: %s', name, '; '.join(messages))
+
+    return {'benchmarks': results, 'regressions': regressions,
+            'results_file': results_file}
@@ -0,0 +1,26 @@
+"""
+p_soc_auto_base.benchmarks
+--------------------------
+
+Benchmarks shared by the :ref:`SOC Automation Server` applications
+
+See :mod:`p_soc_auto_base.benchmark`.
+
+:copyright:
+
+    Copyright 2018 - 2020 Provincial Health Service Authority
+    of British Columbia
+
+:contact:    daniel.busto@phsa.ca
+"""
+from p_soc_auto_base.benchmark import benchmark
+from p_soc_auto_base.startup import measure_startup
+
+
+@benchmark()
+def process_startup():
+    """
+    set up `Django` and import the `Celery` tasks in a new process, see
+    :mod:`p_soc_auto_base.startup`
+    """
+    measure_startup(runs=1)
@@ -0,0 +1,282 @@
+"""
+p_soc_auto_base.changelist
+--------------------------
+
+This module contains the `Django admin` changelist classes for the models
+with millions of rows, e.g. :class:`citrus_borg.models.WinlogEvent`,
+:class:`mail_collector.models.MailBotLogEvent` and
+:class:`ldap_probe.models.LdapProbeLog`.
+
+The default changelists run a full `COUNT(*)` for each page, compute the
+choices of some list filters by scanning the whole table, use `OFFSET`
+pagination and compute some columns with one query per row. This module
+provides:
+
+* :class:`EstimatedCountPaginator`: uses the table statistics for
+  unfiltered changelists and a bounded count for filtered ones
+
+* :class:`LargeTableAdminMixin`: keyset pagination on a time stamp field;
+  each page after the first one starts after the last row of the previous
+  page instead of at an `OFFSET`
+
+* :class:`CachedAllValuesFieldListFilter` and
+  :class:`CachedRelatedOnlyFieldListFilter`: list filters with choices kept
+  in the cache for
+  :attr:`p_soc_auto.settings.common.ADMIN_FILTER_CHOICES_TTL` seconds
+
+* :class:`ComputedColumnsMixin`: annotations and prefetches for the
+  computed columns of a changelist
+
+:copyright:
+
+    Copyright 2018 - 2020 Provincial Health Service Authority
+    of British Columbia
+
+:contact:    daniel.busto@phsa.ca
+"""
+import functools
+from logging import getLogger
+
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.contrib.admin.views.main import PAGE_VAR, ChangeList
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.db.models.query import QuerySet
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+
+
+LOG = getLogger(__name__)
+
+CURSOR_VAR = 'after'
+"""the query string parameter holding the keyset pagination cursor"""
+
+
+def estimated_row_count(model, using='default'):
+    """
+    :returns: the number of rows in the table of a model according to the
+        database statistics, or `None` if the database does not keep such
+        statistics
+
+    The estimate is cached for
+    :attr:`p_soc_auto.settings.common.ADMIN_FILTER_CHOICES_TTL` seconds.
+    """
+    key = f'admin_row_estimate:{using}:{model._meta.db_table}'
+    estimate = cache.get(key)
+    if estimate is not None:
+        return estimate
+
+    connection = connections[using]
+    if connection.vendor == 'mysql':
+        sql = ('SELECT TABLE_ROWS FROM information_schema.TABLES'
+               ' WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s')
+    elif connection.vendor == 'postgresql':
+        sql = 'SELECT reltuples::bigint FROM pg_class WHERE relname = %s'
+    else:
+        return None
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [model._meta.db_table])
+        row = cursor.fetchone()
+
+    if row is None or row[0] is None:
+        return None
+
+    estimate = int(row[0])
+    cache.set(key, estimate, settings.ADMIN_FILTER_CHOICES_TTL)
+
+    return estimate
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    :class:`django.core.paginator.Paginator` that avoids full table counts
+
+    Unfiltered querysets over large tables use the table statistics.
+    Other querysets are counted up to
+    :attr:`p_soc_auto.settings.common.ADMIN_EXACT_COUNT_LIMIT` rows; bigger
+    results are reported with that many rows and the rest of the rows are
+    reached with the keyset pagination links of
+    :class:`LargeTableAdminMixin`.
+    """
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not isinstance(queryset, QuerySet):
+            return super().count
+
+        limit = settings.ADMIN_EXACT_COUNT_LIMIT
+        if not queryset.query.where:
+            estimate = estimated_row_count(queryset.model, queryset.db)
+            if estimate is not None and estimate > limit:
+                return estimate
+
+        # the slice makes the database stop counting at the limit
+        return queryset.order_by()[:limit].count()
+
+
+def _keyset_value(obj, field_path):
+    return functools.reduce(getattr, field_path.split('__'), obj)
+
+
+class KeysetChangeList(ChangeList):
+    """
+    :class:`django.contrib.admin.views.main.ChangeList` with keyset
+    pagination on the :attr:`LargeTableAdminMixin.keyset_field` of the
+    model admin
+
+    The keyset pagination is only used while the changelist is sorted by the
+    keyset field, newest first; sorting by another column falls back to the
+    regular pagination.
+    """
+    def __init__(self, request, *args, **kwargs):
+        self.cursor = request.GET.get(CURSOR_VAR)
+        if self.cursor is not None:
+            # the cursor is not a lookup, the list filters must not see it
+            data = request.GET.copy()
+            del data[CURSOR_VAR]
+            request.GET = data
+
+        self.next_page_url = None
+        self.first_page_url = None
+
+        super().__init__(request, *args, **kwargs)
+
+    def _parse_cursor(self):
+        moment, _, pk = self.cursor.rpartition('_')
+        try:
+            moment, pk = parse_datetime(moment), int(pk)
+        except ValueError as error:
+            raise IncorrectLookupParameters(error)
+
+        if moment is None:
+            raise IncorrectLookupParameters(f'bad cursor {self.cursor}')
+
+        return moment, pk
+
+    def get_results(self, request):
+        keyset_field = self.model_admin.keyset_field
+        keyset_active = [str(field) for field in self.queryset.query.order_by[
+            :1]] == [f'-{keyset_field}']
+
+        if keyset_active and self.cursor is not None:
+            self.page_num = 0
+
+        super().get_results(request)
+
+        if not keyset_active or self.show_all:
+            return
+
+        if self.cursor is not None:
+            moment, pk = self._parse_cursor()
+            self.result_list = self.queryset.filter(
+                Q(**{f'{keyset_field}__lt': moment})
+                | Q(**{keyset_field: moment, 'pk__lt': pk})
+            )[:self.list_per_page]
+            self.multi_page = True
+            self.first_page_url = self.get_query_string(remove=[PAGE_VAR])
+
+        # evaluates and caches the page; the templates reuse the rows
+        if len(self.result_list) == self.list_per_page:
+            last = self.result_list[self.list_per_page - 1]
+            cursor = (f'{_keyset_value(last, keyset_field).isoformat()}'
+                      f'_{last.pk}')
+            self.next_page_url = self.get_query_string(
+                {CURSOR_VAR: cursor}, [PAGE_VAR])
+
+
+class LargeTableAdminMixin:
+    """
+    mixin for :class:`django.contrib.admin.ModelAdmin` classes of models with
+    millions of rows
+
+    Set :attr:`keyset_field` to the time stamp field used for the keyset
+    pagination.
+    """
+    keyset_field = None
+    """
+    the time stamp field used for the keyset pagination, the changelist is
+    sorted by this field, newest first, unless :attr:`ordering` is set
+    """
+
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    change_list_template = 'admin/keyset_change_list.html'
+
+    def get_ordering(self, request):
+        """
+        override :meth:`django.contrib.admin.ModelAdmin.get_ordering`
+        """
+        return self.ordering or (f'-{self.keyset_field}', )
+
+    def get_changelist(self, request, **kwargs):
+        """
+        override :meth:`django.contrib.admin.ModelAdmin.get_changelist`
+        """
+        return KeysetChangeList
+
+
+class ComputedColumnsMixin:
+    """
+    mixin for :class:`django.contrib.admin.ModelAdmin` classes with computed
+    columns
+
+    The computed columns must read the annotations or the prefetched
+    objects instead of running their own queries.
+    """
+    list_annotations = {}
+    """the annotations added to the queryset, keyed by name"""
+
+    list_prefetch_related = ()
+    """
+    lookups or :class:`django.db.models.Prefetch` objects for the queryset
+    """
+
+    def get_queryset(self, request):
+        """
+        override :meth:`django.contrib.admin.ModelAdmin.get_queryset`
+        """
+        queryset = super().get_queryset(request)
+        if self.list_annotations:
+            queryset = queryset.annotate(**self.list_annotations)
+        if self.list_prefetch_related:
+            queryset = queryset.prefetch_related(*self.list_prefetch_related)
+
+        return queryset
+
+
+def _choices_key(model, field_path, kind):
+    return f'admin_filter:{model._meta.label}:{field_path}:{kind}'
+
+
+class CachedAllValuesFieldListFilter(admin.AllValuesFieldListFilter):
+    """
+    :class:`django.contrib.admin.AllValuesFieldListFilter` with cached
+    choices
+    """
+    def __init__(self, field, request, params, model, model_admin,
+                 field_path):
+        super().__init__(
+            field, request, params, model, model_admin, field_path)
+        choices = self.lookup_choices
+        self.lookup_choices = cache.get_or_set(
+            _choices_key(model, field_path, 'values'),
+            lambda: list(choices), settings.ADMIN_FILTER_CHOICES_TTL)
+
+
+class CachedRelatedOnlyFieldListFilter(admin.RelatedOnlyFieldListFilter):
+    """
+    :class:`django.contrib.admin.RelatedOnlyFieldListFilter` with cached
+    choices
+    """
+    def field_choices(self, field, request, model_admin):
+        return cache.get_or_set(
+            _choices_key(model_admin.model, self.field_path, 'related'),
+            lambda: [(pk, str(label)) for pk, label in super(
+                CachedRelatedOnlyFieldListFilter, self).field_choices(
+                    field, request, model_admin)],
+            settings.ADMIN_FILTER_CHOICES_TTL)
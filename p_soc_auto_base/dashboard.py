@@ -0,0 +1,229 @@
+"""
+p_soc_auto_base.dashboard
+-------------------------
+
+This module contains the data shown by the custom modules of the
+`Django Admin` dashboard in :mod:`p_soc_auto.dashboard`.
+
+The admin home page is the most visited page of the :ref:`SOC Automation
+Server`. The dashboard modules must never run expensive queries or fetch
+anything over the network while the page is rendered. They read their
+links from the cache; the links are computed by the
+:func:`p_soc_auto_base.tasks.refresh_dashboard_summary` and
+:func:`p_soc_auto_base.tasks.refresh_dashboard_feed` periodic tasks.
+
+If the cache is empty, the dashboard asks for a refresh in the background
+and renders without the data.
+
+:copyright:
+
+    Copyright 2018 - 2020 Provincial Health Service Authority
+    of British Columbia
+
+:contact:    daniel.busto@phsa.ca
+"""
+import datetime
+from logging import getLogger
+
+import feedparser
+import requests
+from celery import current_app
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.urls import reverse
+from django.utils import timezone
+
+from citrus_borg.locutus.communication import (
+    get_dead_bots, get_dead_brokers, get_dead_sites,
+)
+from citrus_borg.models import WinlogEvent
+from mail_collector.models import MailBotLogEvent
+from mail_collector.queries import dead_mail_sites
+
+
+LOG = getLogger(__name__)
+
+SUMMARY_KEY = 'dashboard_summary'
+
+FEED_KEY = 'dashboard_feed'
+
+REFRESH_LOCK_KEY = 'dashboard_refresh_lock'
+
+
+def _last_hour():
+    return timezone.now() - datetime.timedelta(hours=1)
+
+
+def _pending_alerts(*alert_models):
+    return sum(
+        apps.get_model('orion_flash', model).objects.filter(
+            silenced=False).count()
+        for model in alert_models)
+
+
+SUMMARIES = [
+    ('Windows log events in the last hour',
+     'admin:citrus_borg_winlogevent_changelist',
+     lambda: WinlogEvent.objects.filter(
+         created_on__gte=_last_hour()).count()),
+    ('Exchange log events in the last hour',
+     'admin:mail_collector_mailbotlogevent_changelist',
+     lambda: MailBotLogEvent.objects.filter(
+         event_registered_on__gte=_last_hour()).count()),
+    ('Dead Citrix bots', 'admin:citrus_borg_winlogbeathostnotseen_changelist',
+     lambda: get_dead_bots().count()),
+    ('Dead Citrix sites', 'admin:citrus_borg_borgsitenotseen_changelist',
+     lambda: get_dead_sites().order_by('site').values('site').distinct()
+     .count()),
+    ('Dead Citrix session hosts',
+     'admin:citrus_borg_knownbrokeringdevicenotseen_changelist',
+     lambda: get_dead_brokers().count()),
+    ('Dead Exchange sites', 'admin:mail_collector_mailsite_changelist',
+     lambda: dead_mail_sites().count()),
+]
+"""
+the summary lines shown on the dashboard as (title, admin url name, count
+function) tuples
+"""
+
+ALERT_SUMMARIES = [
+    ('Pending Citrix bot alerts',
+     'admin:orion_flash_deadcitrusbotalert_changelist',
+     lambda: _pending_alerts(
+         'DeadCitrusBotAlert', 'CitrusBorgLoginAlert', 'CitrusBorgUxAlert')),
+    ('Pending SSL alerts', 'admin:orion_flash_expiressoonsslalert_changelist',
+     lambda: _pending_alerts(
+         'ExpiresSoonSslAlert', 'ExpiredSslAlert', 'InvalidSslAlert',
+         'UntrustedSslAlert')),
+]
+"""
+the summary lines for the pending `Orion` alerts; they are only shown if the
+`orion_flash` application is installed
+"""
+
+
+def summaries():
+    """
+    :returns: the summary lines shown on the dashboard, see
+        :attr:`SUMMARIES` and :attr:`ALERT_SUMMARIES`
+    :rtype: list
+    """
+    if apps.is_installed('orion_flash'):
+        return SUMMARIES + ALERT_SUMMARIES
+
+    return SUMMARIES
+
+
+def _summary_link(title, url_name, count):
+    try:
+        value = count()
+    except Exception:  # pylint: disable=broad-except
+        LOG.exception('cannot compute the %s dashboard summary', title)
+        value = 'not available'
+
+    return {'title': f'{title}: {value}', 'url': reverse(url_name),
+            'external': False, }
+
+
+def refresh_summary():
+    """
+    compute the dashboard summary and store it in the cache
+
+    A summary line that fails is shown as not available and does not stop
+    the other lines.
+
+    :returns: the stored summary with the 'generated_on' and 'children'
+        keys; 'children' is a list of links for a
+        :class:`grappelli.dashboard.modules.LinkList`
+    :rtype: dict
+    """
+    summary = {
+        'generated_on': timezone.now(),
+        'children': [_summary_link(*line) for line in summaries()],
+    }
+    cache.set(SUMMARY_KEY, summary, settings.DASHBOARD_SUMMARY_TTL)
+
+    return summary
+
+
+def refresh_feed():
+    """
+    fetch the news feed and store its most recent entries in the cache
+
+    The feed is at :attr:`p_soc_auto.settings.common.DASHBOARD_FEED_URL`.
+
+    The request gives up after
+    :attr:`p_soc_auto.settings.common.DASHBOARD_FEED_TIMEOUT` seconds. If
+    the feed cannot be fetched, the previous entries are kept.
+
+    :returns: the stored feed, like :func:`refresh_summary`, or `None` if
+        there is no feed configured or it cannot be fetched
+    """
+    if not settings.DASHBOARD_FEED_URL:
+        return None
+
+    try:
+        response = requests.get(
+            settings.DASHBOARD_FEED_URL,
+            timeout=settings.DASHBOARD_FEED_TIMEOUT)
+        response.raise_for_status()
+    except requests.RequestException as error:
+        LOG.warning('cannot fetch the dashboard feed %s: %s',
+                    settings.DASHBOARD_FEED_URL, error)
+        return None
+
+    entries = feedparser.parse(response.content).entries
+    feed = {
+        'generated_on': timezone.now(),
+        'children': [
+            {'title': entry.get('title', ''), 'url': entry.get('link', ''),
+             'external': True, }
+            for entry in entries[:settings.DASHBOARD_FEED_LIMIT]],
+    }
+    cache.set(FEED_KEY, feed, settings.DASHBOARD_FEED_TTL)
+
+    return feed
+
+
+def _request_refresh():
+    """
+    ask for the dashboard tasks to run, at most once per
+    :attr:`p_soc_auto.settings.common.DASHBOARD_SUMMARY_TTL` seconds
+    """
+    if not cache.add(REFRESH_LOCK_KEY, True, settings.DASHBOARD_SUMMARY_TTL):
+        return
+
+    for task in ('refresh_dashboard_summary', 'refresh_dashboard_feed'):
+        try:
+            current_app.send_task(f'p_soc_auto_base.tasks.{task}',
+                                  queue='shared')
+        except Exception:  # pylint: disable=broad-except
+            LOG.exception('cannot schedule %s', task)
+
+
+def get_summary():
+    """
+    :returns: the cached summary, see :func:`refresh_summary`, or `None`
+
+        This function never computes the summary; if it is not in the
+        cache, a refresh is requested in the background.
+    """
+    summary = cache.get(SUMMARY_KEY)
+    if summary is None:
+        _request_refresh()
+
+    return summary
+
+
+def get_feed():
+    """
+    :returns: the cached feed, see :func:`refresh_feed`, or `None`
+
+        Like :func:`get_summary`, this function never fetches the feed.
+    """
+    feed = cache.get(FEED_KEY)
+    if feed is None and settings.DASHBOARD_FEED_URL:
+        _request_refresh()
+
+    return feed
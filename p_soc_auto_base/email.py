@@ -15,21 +15,76 @@ application to send email alerts.
 
 :contact:    daniel.busto@phsa.ca
 """
+import csv
+import datetime
 from logging import getLogger
 from smtplib import SMTPConnectError
-import socket
 
 from django.conf import settings
+from django.db.models.query import QuerySet
 from django.utils import timezone
 from djqscsv import write_csv
 from templated_email import get_templated_mail
 
 from citrus_borg.dynamic_preferences_registry import get_preference, \
     get_list_preference
+from p_soc_auto_base.spool import get_spool
+from p_soc_auto_base.utils import get_fqdn
 
 LOG = getLogger(__name__)
 
 
+class RowSet:
+    """
+    rows already read from the database, for sending them with :class:`Email`
+    instead of a :class:`django.db.models.query.QuerySet`
+
+    Reports that split the result of one query into many email messages
+    use this class so that each message does not query the database again.
+    """
+    def __init__(self, model, rows):
+        """
+        :arg model: the :class:`django.db.models.Model` the rows were read
+            from; it provides the column names, see
+            :meth:`Email._get_headers_with_titles`
+
+        :arg list rows: :class:`dictionaries <dict>` with (at least) the
+            fields in the headers of the subscription used to send them
+        """
+        self.model = model
+        self.rows = rows
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def values(self, *fields):
+        """
+        :returns: the rows with only the fields in the arguments, like
+            :meth:`django.db.models.query.QuerySet.values`
+        :rtype: list
+        """
+        return [{field: row[field] for field in fields} for row in self.rows]
+
+
+def _csv_value(value):
+    """
+    :returns: a value of a :class:`RowSet` the way :func:`djqscsv.write_csv`
+        writes the same value from a
+        :class:`django.db.models.query.QuerySet`
+    :rtype: str
+    """
+    if value is None:
+        return ''
+
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+
+    return str(value)
+
+
 class Email:
     """
     Subclass of :class:`django.core.mail.EmailMultiAlternatives`; (see `Sending
@@ -59,7 +114,8 @@ class Email:
     def __init__(self, data, subscription_obj, add_csv=True,
                  **extra_context):
         """
-        :arg data: a :class:`django.db.models.query.QuerySet`
+        :arg data: a :class:`django.db.models.query.QuerySet` or a
+            :class:`RowSet`
 
         :arg subscription_obj: :class:`p_soc_auto_base.models.Subscription`
             instance
@@ -141,9 +197,9 @@ class Email:
         self.context = dict(
             report_date_time=timezone.now(),
             headers=self.headers, data=self.prepared_data,
-            source_host_name='http://%s:%s' % (socket.getfqdn(),
+            source_host_name='http://%s:%s' % (get_fqdn(),
                                                settings.SERVER_PORT),
-            source_host=socket.getfqdn(),
+            source_host=get_fqdn(),
             tags=self._set_tags(),
             email_subject=self.subscription_obj.email_subject,
             alternate_email_subject=self.subscription_obj.
@@ -287,9 +343,19 @@ class Email:
             settings.CSV_MEDIA_ROOT,
             timezone.localtime(value=timezone.now()), filename)
 
-        with open(filename, 'wb') as csv_file:
-            write_csv(self.data.values(*self.headers.keys()),
-                      csv_file, field_header_map=self.headers)
+        if isinstance(self.data, QuerySet):
+            with open(filename, 'wb') as csv_file:
+                write_csv(self.data.values(*self.headers.keys()),
+                          csv_file, field_header_map=self.headers)
+        else:
+            # the byte order mark is also written by djqscsv.write_csv
+            with open(filename, 'w', newline='',
+                      encoding='utf-8-sig') as csv_file:
+                writer = csv.writer(csv_file)
+                writer.writerow(self.headers.values())
+                for row in self.data.values(*self.headers.keys()):
+                    writer.writerow(
+                        [_csv_value(value) for value in row.values()])
 
         LOG.debug('attachment %s ready', filename)
 
@@ -318,7 +384,7 @@ class Email:
             for tag in self.subscription_obj.tags.split(','):
                 tags += '[{}]'.format(tag)
 
-        tags = '[{}]{}'.format(socket.getfqdn(), tags)
+        tags = '[{}]{}'.format(get_fqdn(), tags)
 
         if settings.DEBUG:
             tags = '[DEBUG]{}'.format(tags)
@@ -327,8 +393,15 @@ class Email:
         return tags
 
     def _send(self):
+        """
+        send the email message through the process wide
+        :class:`p_soc_auto_base.spool.MailSpool`
+
+        The spool keeps the connection to the `SMTP` relay open between
+        messages and retries the delivery if the relay drops the connection.
+        """
         try:
-            sent = self.email.send()
+            sent = get_spool().send(self.email)
         except SMTPConnectError as err:
             LOG.exception(str(err))
             raise err
@@ -346,6 +419,7 @@ class Email:
         send an email message
 
         :arg data: a :class:`Django queryset <django.db.models.query.QuerySet>`
+            or a :class:`RowSet`
 
         :arg str subscription: the key for retrieving the :class:`Subscription
             <p_soc_auto_base.models.Subscription>` instance that will be used
@@ -366,4 +440,4 @@ class Email:
 
         :returns: '1' if the email message was sent, and '0' if not
         """
-        cls(data, subscription, add_csv, **extra_context)._send()
+        return cls(data, subscription, add_csv, **extra_context)._send()
@@ -0,0 +1,199 @@
+"""
+p_soc_auto_base.fields
+----------------------
+
+This module contains custom model fields for the :ref:`SOC Automation
+Server`.
+
+:class:`CompressedTextField` stores text as a `zlib` compressed binary
+column. It is used for the large payload columns of the event tables that
+are written for every event but rarely read, e.g.
+:attr:`citrus_borg.models.WinlogEvent.raw_message` and
+:attr:`mail_collector.models.MailBotLogEvent.event_body`.
+
+Values are decompressed when they are read from the database, so model
+instances, :meth:`django.db.models.query.QuerySet.values` and
+:meth:`django.db.models.query.QuerySet.values_list` all return plain
+:class:`str` values. Use :meth:`django.db.models.query.QuerySet.defer` or
+:meth:`django.db.models.query.QuerySet.only` to avoid reading and
+decompressing the payload columns where they are not needed.
+
+Compressed columns cannot be searched with `LIKE` lookups; only `exact`
+and `isnull` lookups work as expected.
+
+:copyright:
+
+    Copyright 2018 - 2020 Provincial Health Service Authority
+    of British Columbia
+
+:contact:    daniel.busto@phsa.ca
+"""
+import zlib
+from logging import getLogger
+
+from django import forms
+from django.db import connection as default_connection, models, transaction
+from django.utils.translation import gettext_lazy as _
+
+
+LOG = getLogger(__name__)
+
+MAGIC = b'\x00z'
+"""
+prefix of compressed values; values without it are plain `UTF-8` text,
+which is what the column holds right after the migration from a text
+column
+"""
+
+MIN_LENGTH = 64
+"""values shorter than this many bytes are stored as plain `UTF-8`"""
+
+LEVEL = 6
+"""the `zlib` compression level"""
+
+
+def compress(text):
+    """
+    :returns: the stored form of a text value
+    :rtype: bytes
+    """
+    data = str(text).encode('utf-8')
+    if len(data) < MIN_LENGTH and not data.startswith(MAGIC):
+        return data
+
+    return MAGIC + zlib.compress(data, LEVEL)
+
+
+def decompress(data):
+    """
+    :returns: the text value of a stored value, compressed or not
+    :rtype: str
+    """
+    data = bytes(data)
+    if data.startswith(MAGIC):
+        return zlib.decompress(data[len(MAGIC):]).decode('utf-8')
+
+    return data.decode('utf-8')
+
+
+class CompressedTextField(models.Field):
+    """
+    text field stored as a `zlib` compressed binary column
+    """
+    description = _('Compressed text')
+
+    def get_internal_type(self):
+        return 'BinaryField'
+
+    def get_placeholder(self, value, compiler, connection):
+        return connection.ops.binary_placeholder_sql(value)
+
+    def to_python(self, value):
+        if value is None or isinstance(value, str):
+            return value
+
+        if isinstance(value, (bytes, bytearray, memoryview)):
+            return decompress(value)
+
+        return str(value)
+
+    def get_db_prep_value(self, value, connection, prepared=False):
+        if value is None:
+            return None
+
+        return connection.Database.Binary(compress(value))
+
+    def from_db_value(self, value, expression, connection):
+        if value is None:
+            return None
+
+        return decompress(value)
+
+    def value_to_string(self, obj):
+        return self.to_python(self.value_from_object(obj))
+
+    def formfield(self, **kwargs):
+        return super().formfield(**{
+            'form_class': forms.CharField, 'widget': forms.Textarea,
+            **kwargs,
+        })
+
+
+def rewrite_compressed_columns(model, field_names, to_compressed=True,
+                               batch_size=1000, connection=None):
+    """
+    rewrite the values in :class:`CompressedTextField` columns in batches
+
+    This function is used by the migrations that convert text columns to
+    compressed columns. Each batch is committed on its own so the
+    migrations using it must not be atomic. Values that are already in the
+    requested form are left alone, it is safe to run this function more
+    than once.
+
+    :arg model: the model, usually the historical model from the migration
+        state; the model must have an integer primary key
+
+    :arg field_names: the names of the columns to rewrite
+    :type field_names: :class:`list` of :class:`str`
+
+    :arg bool to_compressed: compress the values if `True`, store them as
+        plain `UTF-8` otherwise; the latter is needed before converting the
+        columns back to text
+
+    :arg int batch_size: rows per batch
+
+    :returns: the number of rewritten rows
+    :rtype: int
+    """
+    connection = connection or default_connection
+    quote = connection.ops.quote_name
+    table = quote(model._meta.db_table)
+    pk_column = quote(model._meta.pk.column)
+    columns = [quote(model._meta.get_field(name).column)
+               for name in field_names]
+
+    select = (f'SELECT {pk_column}, {", ".join(columns)} FROM {table}'
+              f' WHERE {pk_column} > %s ORDER BY {pk_column} LIMIT %s')
+    update = (f'UPDATE {table} SET'
+              f' {", ".join(f"{column} = %s" for column in columns)}'
+              f' WHERE {pk_column} = %s')
+
+    def stored(data):
+        if isinstance(data, str):
+            return data.encode('utf-8')
+
+        return None if data is None else bytes(data)
+
+    def convert(data):
+        if data is None:
+            return None
+
+        if to_compressed:
+            return compress(decompress(data))
+
+        return decompress(data).encode('utf-8')
+
+    last_pk, rewritten = 0, 0
+    while True:
+        with transaction.atomic(using=connection.alias):
+            with connection.cursor() as cursor:
+                cursor.execute(select, [last_pk, batch_size])
+                rows = cursor.fetchall()
+                if not rows:
+                    break
+
+                updates = []
+                for pk, *values in rows:
+                    values = [stored(value) for value in values]
+                    converted = [convert(value) for value in values]
+                    if converted != values:
+                        updates.append([*converted, pk])
+
+                if updates:
+                    cursor.executemany(update, updates)
+
+        rewritten += len(updates)
+        last_pk = rows[-1][0]
+        LOG.info('rewrote %s %s rows', rewritten, model._meta.model_name)
+
+    return rewritten
@@ -0,0 +1,161 @@
+"""
+p_soc_auto_base.health
+----------------------
+
+This module contains the live health snapshot used by the `NOC` wall
+displays.
+
+The snapshot lists everything that is unhealthy right now: the dead
+`Citrix` bots, sites and session hosts, the dead `Exchange` client sites,
+the `AD` controllers with failed `LDAP` probes, and the `SSL` certificates
+that are about to expire. It is built by the
+:func:`p_soc_auto_base.tasks.refresh_health_snapshot` periodic task and
+kept in the cache as a ready to serve `JSON` document, so polling it with
+:func:`p_soc_auto_base.views.health` costs the same no matter how many
+screens are watching.
+
+Each section is built on its own; a section that fails is reported with
+its error and does not stop the other sections.
+
+:copyright:
+
+    Copyright 2018 - 2020 Provincial Health Service Authority
+    of British Columbia
+
+:contact:    daniel.busto@phsa.ca
+"""
+import hashlib
+import json
+from logging import getLogger
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Count, Max
+from django.utils import timezone
+
+from citrus_borg.dynamic_preferences_registry import get_preference
+from citrus_borg.locutus.communication import (
+    get_dead_bots, get_dead_brokers, get_dead_sites,
+)
+from ldap_probe.models import LdapProbeLog
+from mail_collector.queries import dead_mail_sites
+from ssl_cert_tracker.lib import expires_in
+
+
+LOG = getLogger(__name__)
+
+CACHE_KEY = 'health_snapshot'
+
+LOCK_KEY = 'health_snapshot_lock'
+
+
+def _dead_bots():
+    return list(get_dead_bots().values(
+        'host_name', 'site__site', 'last_seen'))
+
+
+def _dead_sites():
+    return list(get_dead_sites().order_by('site').values('site').distinct())
+
+
+def _dead_brokers():
+    return list(get_dead_brokers().values('broker_name', 'last_seen'))
+
+
+def _dead_mail_sites():
+    return list(dead_mail_sites().values('site__site', 'most_recent'))
+
+
+def _ldap_errors():
+    return list(
+        LdapProbeLog.error_report(
+            get_preference('ldapprobe__ldap_reports_period'))
+        .order_by().values('domain_controller_fqdn')
+        .annotate(failed_probes=Count('id'), last_failure=Max('created_on'))
+        .order_by('-last_failure'))
+
+
+def _expiring_certificates():
+    return list(
+        expires_in(lt_days=settings.HEALTH_SSL_EXPIRES_IN_DAYS).values(
+            'common_name', 'port__port', 'not_after', 'expires_in_x_days'))
+
+
+SECTIONS = {
+    'dead_bots': _dead_bots,
+    'dead_sites': _dead_sites,
+    'dead_brokers': _dead_brokers,
+    'dead_mail_sites': _dead_mail_sites,
+    'ldap_errors': _ldap_errors,
+    'expiring_ssl_certificates': _expiring_certificates,
+}
+"""the functions building each section of the snapshot, keyed by name"""
+
+
+def build_snapshot():
+    """
+    run the queries behind the snapshot
+
+    :returns: the snapshot; each section has a 'count' and an 'items' key,
+        or an 'error' key if the section could not be built
+    :rtype: dict
+    """
+    sections = {}
+    for name, builder in SECTIONS.items():
+        try:
+            items = builder()
+        except Exception as error:  # pylint: disable=broad-except
+            LOG.exception('cannot build the %s health section', name)
+            sections[name] = {'error': str(error)}
+        else:
+            sections[name] = {'count': len(items), 'items': items}
+
+    return sections
+
+
+def refresh_snapshot():
+    """
+    build the snapshot and store it in the cache
+
+    The `ETag` is computed over the sections only, so it only changes when
+    the data changes.
+
+    :returns: the stored snapshot with the 'etag' and 'body' keys
+    :rtype: dict
+    """
+    sections = build_snapshot()
+    etag = hashlib.sha1(json.dumps(
+        sections, cls=DjangoJSONEncoder, sort_keys=True).encode('utf-8')
+    ).hexdigest()
+
+    snapshot = {
+        'etag': etag,
+        'body': json.dumps(
+            {'generated_on': timezone.now(), 'sections': sections},
+            cls=DjangoJSONEncoder),
+    }
+    cache.set(CACHE_KEY, snapshot, settings.HEALTH_SNAPSHOT_TTL)
+
+    return snapshot
+
+
+def get_snapshot():
+    """
+    :returns: the cached snapshot, see :func:`refresh_snapshot`
+
+        If the cache is empty, only one caller builds the snapshot and the
+        others get `None` until it is ready.
+    :rtype: dict
+    """
+    snapshot = cache.get(CACHE_KEY)
+    if snapshot is not None:
+        return snapshot
+
+    if not cache.add(LOCK_KEY, True, settings.HEALTH_SNAPSHOT_TTL):
+        return None
+
+    try:
+        return refresh_snapshot()
+    finally:
+        cache.delete(LOCK_KEY)
@@ -0,0 +1,249 @@
+"""
+p_soc_auto_base.identity
+------------------------
+
+This module contains the process-local identity maps for the small
+reference tables used on the event ingestion path.
+
+Each event handled by :func:`citrus_borg.consumers.process_win_event`,
+:func:`citrus_borg.tasks.process_citrix_login` and
+:func:`mail_collector.tasks.store_mail_data` needs the event source, the
+`Windows` log, the service user, the bot host and the `Citrix` broker.
+These rows almost never change, so each process keeps them in memory:
+
+* the maps are warmed when a `Celery` worker process starts, see
+  :func:`p_soc_auto_base.signals.warm_identity_maps`
+
+* keys are normalized (stripped and lower case) to match the case
+  insensitive lookups used before
+
+* saving or deleting an instance clears it from the maps of the current
+  process, see :func:`p_soc_auto_base.signals.invalidate_identity_maps`;
+  the other processes pick up the change after
+  :attr:`p_soc_auto.settings.common.IDENTITY_MAP_TTL` seconds
+
+* misses can be cached for
+  :attr:`p_soc_auto.settings.common.IDENTITY_MAP_NEGATIVE_TTL` seconds;
+  this is used for unknown event sources
+
+Entries are only added outside of database transactions so that the maps
+never hold rows that may still be rolled back.
+
+:copyright:
+
+    Copyright 2018 - 2020 Provincial Health Service Authority
+    of British Columbia
+
+:contact:    daniel.busto@phsa.ca
+"""
+import os
+import threading
+import time
+from logging import getLogger
+
+from django.apps import apps
+from django.conf import settings
+from django.db import connection
+
+from p_soc_auto_base.utils import get_or_create_user
+
+LOG = getLogger(__name__)
+
+_MISSING = object()
+"""marks negative cache entries"""
+
+
+def normalize(value):
+    """
+    :returns: the identity map key for a name
+    """
+    return str(value).strip().lower()
+
+
+class IdentityMap:
+    """
+    read-through, process-local map of model instances keyed by the
+    normalized value of one of their unique fields
+    """
+    def __init__(self, model_label, field, negative=False):
+        """
+        :arg str model_label: the model as 'app_label.ModelName'; the model
+            is resolved on first use to avoid import cycles
+
+        :arg str field: the unique field used as key
+
+        :arg bool negative: cache misses as well as hits
+        """
+        self.model_label = model_label
+        self.field = field
+        self.negative = negative
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+
+    @property
+    def model(self):
+        """
+        the :class:`django.db.models.Model` for this map
+        """
+        return apps.get_model(self.model_label)
+
+    @staticmethod
+    def _can_cache():
+        # rows read inside a transaction may still be rolled back
+        return not connection.in_atomic_block
+
+    def _lookup(self, key):
+        with self._lock:
+            if self._pid != os.getpid():
+                # forked; the parent's entries may already be stale
+                self._entries = {}
+                self._pid = os.getpid()
+
+            entry = self._entries.get(key)
+
+        if entry is None or entry[0] < time.monotonic():
+            return None
+
+        return entry[1]
+
+    def _store(self, key, value, ttl):
+        if ttl and self._can_cache():
+            with self._lock:
+                self._entries[key] = (time.monotonic() + ttl, value)
+
+    def put(self, instance):
+        """
+        add an instance to the map
+        """
+        self._store(normalize(getattr(instance, self.field)), instance,
+                    settings.IDENTITY_MAP_TTL)
+
+    def get(self, value):
+        """
+        :returns: the instance whose key field matches `value`, ignoring case
+
+        :raises: the `DoesNotExist` exception of the model if there is no
+            match
+        """
+        key = normalize(value)
+        cached = self._lookup(key)
+        if cached is _MISSING:
+            raise self.model.DoesNotExist(
+                f'{self.model_label} {value} does not exist (cached)')
+
+        if cached is not None:
+            return cached
+
+        try:
+            instance = self.model.objects.get(
+                **{f'{self.field}__iexact': key})
+        except self.model.DoesNotExist:
+            if self.negative:
+                self._store(key, _MISSING,
+                            settings.IDENTITY_MAP_NEGATIVE_TTL)
+            raise
+
+        self._store(key, instance, settings.IDENTITY_MAP_TTL)
+
+        return instance
+
+    def get_or_none(self, value):
+        """
+        same as :meth:`get` but returns `None` if there is no match
+        """
+        try:
+            return self.get(value)
+        except self.model.DoesNotExist:
+            return None
+
+    def warm(self):
+        """
+        load all the instances of the model in one query
+        """
+        for instance in self.model.objects.all():
+            self.put(instance)
+
+    def invalidate(self, instance=None):
+        """
+        remove an instance from the map, or clear the map
+
+        Entries for the instance under an old key (before a rename) and any
+        negative entry for its current key are removed as well.
+        """
+        with self._lock:
+            if instance is None:
+                self._entries = {}
+                return
+
+            self._entries.pop(normalize(getattr(instance, self.field)), None)
+            for key, (_, value) in list(self._entries.items()):
+                if value is not _MISSING and value.pk == instance.pk:
+                    del self._entries[key]
+
+
+EVENT_SOURCES = IdentityMap(
+    'citrus_borg.AllowedEventSource', 'source_name', negative=True)
+"""
+:class:`citrus_borg.models.AllowedEventSource` instances; unknown sources
+are cached as well because most of the traffic from unmonitored sources
+repeats the same few names
+"""
+
+WINDOWS_LOGS = IdentityMap('citrus_borg.WindowsLog', 'log_name')
+"""
+:class:`citrus_borg.models.WindowsLog` instances
+"""
+
+HOSTS = IdentityMap('citrus_borg.WinlogbeatHost', 'host_name')
+"""
+:class:`citrus_borg.models.WinlogbeatHost` instances
+"""
+
+BROKERS = IdentityMap('citrus_borg.KnownBrokeringDevice', 'broker_name')
+"""
+:class:`citrus_borg.models.KnownBrokeringDevice` instances
+"""
+
+USERS = IdentityMap(settings.AUTH_USER_MODEL, 'username')
+"""
+user instances, mostly the service user
+"""
+
+IDENTITY_MAPS = (EVENT_SOURCES, WINDOWS_LOGS, HOSTS, BROKERS, USERS)
+
+
+def get_user(username):
+    """
+    :returns: the user with this name, created if needed; a replacement for
+        :func:`p_soc_auto_base.utils.get_or_create_user` on hot paths
+    """
+    user = USERS.get_or_none(username)
+    if user is None:
+        user = get_or_create_user(username)
+        USERS.put(user)
+
+    return user
+
+
+def warm():
+    """
+    load all the identity maps
+    """
+    for identity_map in IDENTITY_MAPS:
+        try:
+            identity_map.warm()
+        except Exception:  # pylint: disable=broad-except
+            LOG.exception('cannot warm identity map for %s',
+                          identity_map.model_label)
+
+
+def invalidate(model, instance=None):
+    """
+    remove an instance of `model` from the maps for that model, or clear
+    them if `instance` is `None`
+    """
+    label = model._meta.concrete_model._meta.label
+    for identity_map in IDENTITY_MAPS:
+        if identity_map.model_label == label:
+            identity_map.invalidate(instance)
@@ -0,0 +1,356 @@
+"""
+p_soc_auto_base.metrics
+-----------------------
+
+This module contains the metrics registry for the
+:ref:`SOC Automation Server` and the built-in metrics used to instrument
+event ingestion, external calls and `Celery` tasks.
+
+Metrics are recorded in memory by each process and are periodically
+flushed to the `Django` cache (`memcached` in production) where they are
+aggregated across all the web server and `Celery` worker processes. The
+:func:`p_soc_auto_base.views.metrics` view renders the aggregated values in
+the `Prometheus text format
+<https://prometheus.io/docs/instrumenting/exposition_formats/>`__.
+
+Only counters and histograms are supported. Values are stored in the cache
+as integers so that they can be updated with atomic increments; sums of
+observations are stored in microseconds.
+
+:copyright:
+
+    Copyright 2018 - 2020 Provincial Health Service Authority
+    of British Columbia
+
+:contact:    daniel.busto@phsa.ca
+"""
+import atexit
+import hashlib
+import os
+import threading
+import time
+from contextlib import contextmanager
+from logging import getLogger
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+LOG = getLogger(__name__)
+
+KEY_PREFIX = 'metrics'
+
+SUM_SCALE = 1000000
+"""
+observation sums are stored as integers after being multiplied by this value
+"""
+
+DEFAULT_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+    60.0, 300.0)
+"""default histogram buckets, in seconds"""
+
+
+class _Metric:
+    """
+    base class for metrics
+    """
+    metric_type = None
+
+    def __init__(self, name, documentation, labelnames=(), registry=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+        if registry is None:
+            registry = REGISTRY
+        self.registry = registry
+        registry.register(self)
+
+    def _label_values(self, labels):
+        """
+        :returns: the label values in the order of :attr:`labelnames`
+
+        :raises: :exc:`ValueError` if the labels do not match
+            :attr:`labelnames`
+        """
+        if set(labels) != set(self.labelnames):
+            raise ValueError(
+                f'{self.name} expects labels {self.labelnames},'
+                f' got {tuple(labels)}')
+
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+
+class Counter(_Metric):
+    """
+    a value that only goes up
+    """
+    metric_type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        """
+        increment the counter
+
+        :arg int amount: the increment
+        :arg labels: the label values
+        """
+        self.registry.add(
+            (self.name, '', self._label_values(labels)), int(amount))
+
+
+class Histogram(_Metric):
+    """
+    counts observations in cumulative buckets and keeps their sum
+    """
+    metric_type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(),
+                 buckets=DEFAULT_BUCKETS, registry=None):
+        super().__init__(name, documentation, labelnames, registry)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        """
+        record an observation
+
+        :arg float value: the observed value, in seconds for timings
+        :arg labels: the label values
+        """
+        label_values = self._label_values(labels)
+
+        for bucket in self.buckets:
+            if value <= bucket:
+                self.registry.add(
+                    (self.name, f'bucket:{bucket}', label_values), 1)
+        self.registry.add((self.name, 'bucket:+Inf', label_values), 1)
+        self.registry.add((self.name, 'count', label_values), 1)
+        self.registry.add(
+            (self.name, 'sum', label_values), int(value * SUM_SCALE))
+
+    @contextmanager
+    def time(self, **labels):
+        """
+        context manager that observes how long its block took to run
+
+        The observation is recorded even if the block raises an exception.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+
+class Registry:
+    """
+    collects the metric updates made by this process and flushes them to the
+    cache
+
+    The updates are flushed when more than
+    :attr:`p_soc_auto.settings.common.METRICS_FLUSH_INTERVAL` seconds have
+    passed since the previous flush, and when the metrics are rendered. A
+    background timer flushes the updates of a process that has gone idle.
+
+    The cache keeps an index of the known series: a counter at
+    `<prefix>:series:count` and one `<prefix>:series:<slot>` entry for each
+    series. A slot is taken by the process that creates the value of a
+    series, so concurrent flushes never overwrite each other's entries.
+    """
+    def __init__(self, prefix=KEY_PREFIX):
+        self.prefix = prefix
+        self.metrics = {}
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        self._pid = os.getpid()
+        self._timer = None
+
+    def register(self, metric):
+        """
+        add a metric to the registry
+
+        :raises: :exc:`ValueError` if a metric with the same name is already
+            registered
+        """
+        if metric.name in self.metrics:
+            raise ValueError(f'metric {metric.name} is already registered')
+        self.metrics[metric.name] = metric
+
+    def _cache_key(self, series):
+        # label values can contain anything so we hash them to get a
+        # memcached safe key
+        digest = hashlib.md5(repr(series).encode()).hexdigest()
+        return f'{self.prefix}:{digest}'
+
+    def add(self, series, amount):
+        """
+        add `amount` to the value of a series
+
+        :arg tuple series: `(metric name, part, label values)`
+        :arg int amount: the increment
+        """
+        with self._lock:
+            if self._pid != os.getpid():
+                # forked; the parent will flush what it had
+                self._pending = {}
+                self._pid = os.getpid()
+                self._timer = None
+
+            self._pending[series] = self._pending.get(series, 0) + amount
+            due = time.monotonic() - self._last_flush \
+                > settings.METRICS_FLUSH_INTERVAL
+
+            if not due and self._timer is None:
+                self._timer = threading.Timer(
+                    settings.METRICS_FLUSH_INTERVAL, self._timed_flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+        if due:
+            self.flush()
+
+    def _timed_flush(self):
+        """
+        flush the updates left pending by a process that stopped recording
+        """
+        with self._lock:
+            self._timer = None
+
+        self.flush()
+
+    def _index(self, series):
+        """
+        add a new series to the index in the cache
+        """
+        count_key = f'{self.prefix}:series:count'
+        cache.add(count_key, 0, timeout=None)
+        slot = cache.incr(count_key)
+        cache.set(f'{self.prefix}:series:{slot}', series, timeout=None)
+
+    def flush(self):
+        """
+        push the pending updates to the cache
+
+        Errors are logged and swallowed; metrics must never break the
+        instrumented code.
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._last_flush = time.monotonic()
+
+        if not pending:
+            return
+
+        try:
+            for series, amount in pending.items():
+                key = self._cache_key(series)
+                if cache.add(key, 0, timeout=None):
+                    self._index(series)
+                cache.incr(key, amount)
+        except Exception:  # pylint: disable=broad-except
+            LOG.exception('cannot flush metrics')
+
+    def collect(self):
+        """
+        :returns: the aggregated values of all known series as a
+            :class:`dict` keyed by `(metric name, part, label values)`
+        """
+        self.flush()
+
+        count = cache.get(f'{self.prefix}:series:count') or 0
+        series_index = sorted(set(cache.get_many(
+            [f'{self.prefix}:series:{slot}'
+             for slot in range(1, count + 1)]).values()))
+        values = cache.get_many(
+            [self._cache_key(series) for series in series_index])
+
+        return {series: values.get(self._cache_key(series), 0)
+                for series in series_index}
+
+    def render(self):
+        """
+        :returns: the metrics in the `Prometheus` text exposition format
+        :rtype: str
+
+        Histograms are rendered with all their buckets, in increasing order,
+        including the buckets that have not received any observations.
+        """
+        collected = self.collect()
+        lines = []
+
+        for name, metric in sorted(self.metrics.items()):
+            lines.append(f'# HELP {name} {metric.documentation}')
+            lines.append(f'# TYPE {name} {metric.metric_type}')
+
+            parts = {}
+            for (series_name, part, label_values), value in collected.items():
+                if series_name == name:
+                    parts.setdefault(label_values, {})[part] = value
+
+            for label_values, values in sorted(parts.items()):
+                labels = list(zip(metric.labelnames, label_values))
+
+                if metric.metric_type != 'histogram':
+                    lines.append(_sample(name, labels, values.get('', 0)))
+                    continue
+
+                for bucket in metric.buckets + ('+Inf',):
+                    lines.append(_sample(
+                        f'{name}_bucket', labels + [('le', str(bucket))],
+                        values.get(f'bucket:{bucket}', 0)))
+                lines.append(_sample(
+                    f'{name}_sum', labels, values.get('sum', 0) / SUM_SCALE))
+                lines.append(_sample(
+                    f'{name}_count', labels, values.get('count', 0)))
+
+        return '\n'.join(lines) + '\n'
+
+
+def _sample(sample, labels, value):
+    """
+    :returns: a sample line in the `Prometheus` text exposition format
+    :rtype: str
+    """
+    label_text = ','.join(
+        '{}="{}"'.format(
+            label, label_value.replace('\\', r'\\').
+            replace('"', r'\"').replace('\n', r'\n'))
+        for label, label_value in labels)
+    if label_text:
+        sample = f'{sample}{{{label_text}}}'
+
+    return f'{sample} {value}'
+
+
+REGISTRY = Registry()
+"""the default metrics registry"""
+
+atexit.register(REGISTRY.flush)
+
+
+EVENT_PARSE_SECONDS = Histogram(
+    'soc_event_parse_seconds', 'Time spent parsing incoming events',
+    labelnames=('source',))
+
+DB_WRITE_SECONDS = Histogram(
+    'soc_db_write_seconds', 'Time spent saving incoming events',
+    labelnames=('model',))
+
+EVENT_QUEUE_LAG_SECONDS = Histogram(
+    'soc_event_queue_lag_seconds',
+    'Time between the event timestamp and the moment the event was saved',
+    labelnames=('source',),
+    buckets=(1.0, 5.0, 15.0, 30.0, 60.0, 300.0, 900.0, 1800.0, 3600.0))
+
+EVENTS_TOTAL = Counter(
+    'soc_events_total', 'Incoming events saved', labelnames=('source',))
+
+EXTERNAL_CALL_SECONDS = Histogram(
+    'soc_external_call_seconds',
+    'Latency of calls to external services (Orion, SMTP, LDAP)',
+    labelnames=('service', 'operation'))
+
+TASK_RUNTIME_SECONDS = Histogram(
+    'soc_task_runtime_seconds', 'Celery task runtime',
+    labelnames=('task', 'state'))
@@ -0,0 +1,32 @@
+# Generated by Django 2.2.13 on 2026-10-18 17:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('p_soc_auto_base', '0006_auto_20200420_0928'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskQueryProfile',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('task_name', models.CharField(db_index=True, max_length=255, verbose_name='task')),
+                ('task_id', models.CharField(blank=True, max_length=255, null=True, verbose_name='task id')),
+                ('query_count', models.PositiveIntegerField(db_index=True, default=0, verbose_name='queries')),
+                ('query_time', models.FloatField(default=0, verbose_name='query time (seconds)')),
+                ('distinct_queries', models.PositiveIntegerField(default=0, verbose_name='distinct queries')),
+                ('repeated_queries', models.TextField(blank=True, help_text='query fingerprints that were executed repeatedly during the task run, with their counts', null=True, verbose_name='repeated queries')),
+                ('flagged', models.BooleanField(db_index=True, default=False, help_text='the task run has exceeded one of the query profiler thresholds', verbose_name='over threshold')),
+                ('created_on', models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='created on')),
+            ],
+            options={
+                'verbose_name': 'task query profile',
+                'verbose_name_plural': 'task query profiles',
+                'ordering': ['-created_on'],
+            },
+        ),
+    ]
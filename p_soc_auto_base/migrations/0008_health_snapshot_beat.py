@@ -0,0 +1,22 @@
+# Generated by Django 2.2.6 on 2020-05-07 14:05
+
+from django.db import migrations
+
+from p_soc_auto_base.migrations import add_beats, remove_beats
+
+
+TASK = ({'name': 'Refresh the live health snapshot',
+         'task': 'p_soc_auto_base.tasks.refresh_health_snapshot', },
+        {'every': 1, 'period': 'minutes', }, )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('p_soc_auto_base', '0007_taskqueryprofile'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            add_beats([], [TASK]), reverse_code=remove_beats([TASK]))
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 2.2.6 on 2020-05-11 10:20
+
+from django.db import migrations
+
+from p_soc_auto_base.migrations import add_beats, remove_beats
+
+
+TASKS = [
+    ({'name': 'Refresh the admin dashboard summary',
+      'task': 'p_soc_auto_base.tasks.refresh_dashboard_summary', },
+     {'every': 1, 'period': 'minutes', }, ),
+    ({'name': 'Refresh the admin dashboard feed',
+      'task': 'p_soc_auto_base.tasks.refresh_dashboard_feed', },
+     {'every': 30, 'period': 'minutes', }, ),
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('p_soc_auto_base', '0008_health_snapshot_beat'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            add_beats([], TASKS), reverse_code=remove_beats(TASKS))
+    ]
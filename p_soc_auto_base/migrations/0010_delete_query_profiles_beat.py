@@ -0,0 +1,22 @@
+# Generated by Django 2.2.13 on 2026-10-18 17:11
+
+from django.db import migrations
+
+from p_soc_auto_base.migrations import add_beats, remove_beats
+
+
+TASK = ({'name': 'Delete old task query profiles',
+         'task': 'p_soc_auto_base.tasks.delete_query_profiles', },
+        {'every': 24, 'period': 'hours', }, )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('p_soc_auto_base', '0009_dashboard_beats'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            add_beats([], [TASK]), reverse_code=remove_beats([TASK]))
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 2.2.13 on 2026-10-18 17:13
+
+from django.db import migrations
+
+from p_soc_auto_base.migrations import add_beats, remove_beats
+
+
+# both tasks run ssl_cert_tracker.tasks.ssl_sweep
+LEGACY_TASKS = [
+    ({'name': 'Bootstrap nmap probes to collect SSL certificates',
+      'task': 'ssl_cert_tracker.tasks.get_ssl_nodes', },
+     {'hour': '06,18', 'minute': '08', }, ),
+    ({'name': 'Bootstrap nmap probes to verify SSL certificates',
+      'task': 'ssl_cert_tracker.tasks.verify_ssl_certificates', },
+     {'hour': '02', 'minute': '35', }, ),
+]
+
+TASKS = [
+    ({'name': 'Sweep the network for SSL certificates',
+      'task': 'ssl_cert_tracker.tasks.ssl_sweep', },
+     {'hour': '06,18', 'minute': '08', }, ),
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('p_soc_auto_base', '0010_delete_query_profiles_beat'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            remove_beats(LEGACY_TASKS), reverse_code=add_beats(LEGACY_TASKS)),
+        migrations.RunPython(
+            add_beats(TASKS), reverse_code=remove_beats(TASKS)),
+    ]
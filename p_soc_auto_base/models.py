@@ -14,6 +14,9 @@ Abstract base model classes
 """
 __updated__ = '2018_08_08'
 
+import time
+from logging import getLogger
+
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.exceptions import ValidationError
@@ -23,6 +26,9 @@ from django.utils.translation import gettext_lazy as _
 from p_soc_auto_base.utils import get_default_user_id
 
 
+LOG = getLogger(__name__)
+
+
 # Managers only need to implement get_queryset
 class EnabledManager(models.Manager):  # pylint: disable=too-few-public-methods
     """
@@ -210,6 +216,15 @@ class BaseModelWithDefaultInstance(BaseModel, models.Model):
         abstract = True
 
 
+_SUBSCRIPTION_CACHE = {}
+"""
+per process cache for :meth:`Subscription.get_subscription`
+
+The keys are lower case subscription names and the values are
+`(expiry time, subscription instance)` tuples.
+"""
+
+
 class Subscription(BaseModel):
     """
     Data model with all the details required to create and send an email
@@ -339,12 +354,75 @@ class Subscription(BaseModel):
         doesn't
             exist.
         """
+        key = subscription.lower()
+        cached = _SUBSCRIPTION_CACHE.get(key)
+        if cached is not None and cached[0] > time.monotonic():
+            return cached[1]
+
         try:
-            return Subscription.objects.get(subscription__iexact=subscription)
+            subscription_obj = Subscription.objects.get(
+                subscription__iexact=subscription)
         except Subscription.DoesNotExist:
             error_msg = f'Subscription "{subscription}" does not exist.'
             LOG.exception(error_msg)
             raise Subscription.DoesNotExist(error_msg)
 
+        _SUBSCRIPTION_CACHE[key] = (
+            time.monotonic() + settings.SUBSCRIPTION_CACHE_TTL,
+            subscription_obj)
+
+        return subscription_obj
+
+    @staticmethod
+    def clear_cache():
+        """
+        empty the per process cache used by :meth:`get_subscription`
+
+        This method is invoked from
+        :func:`p_soc_auto_base.signals.clear_subscription_cache` whenever a
+        :class:`Subscription` instance is saved or deleted.
+        """
+        _SUBSCRIPTION_CACHE.clear()
+
+    class Meta:
+        app_label = 'p_soc_auto_base'
+
+
+class TaskQueryProfile(models.Model):
+    """
+    :class:`django.db.models.Model` class used for storing the database
+    query profile of a `Celery` task run
+
+    Instances are created by :mod:`p_soc_auto_base.profiler` for a sample of
+    the task runs.
+    """
+    task_name = models.CharField(
+        _('task'), max_length=255, db_index=True, blank=False, null=False)
+    task_id = models.CharField(
+        _('task id'), max_length=255, blank=True, null=True)
+    query_count = models.PositiveIntegerField(
+        _('queries'), db_index=True, blank=False, null=False, default=0)
+    query_time = models.FloatField(
+        _('query time (seconds)'), blank=False, null=False, default=0)
+    distinct_queries = models.PositiveIntegerField(
+        _('distinct queries'), blank=False, null=False, default=0)
+    repeated_queries = models.TextField(
+        _('repeated queries'), blank=True, null=True,
+        help_text=_('query fingerprints that were executed repeatedly'
+                    ' during the task run, with their counts'))
+    flagged = models.BooleanField(
+        _('over threshold'), db_index=True, blank=False, null=False,
+        default=False,
+        help_text=_('the task run has exceeded one of the query profiler'
+                    ' thresholds'))
+    created_on = models.DateTimeField(
+        _('created on'), db_index=True, auto_now_add=True)
+
+    def __str__(self):
+        return f'{self.task_name} ({self.created_on})'
+
     class Meta:
         app_label = 'p_soc_auto_base'
+        verbose_name = _('task query profile')
+        verbose_name_plural = _('task query profiles')
+        ordering = ['-created_on']
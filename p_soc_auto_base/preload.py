@@ -0,0 +1,254 @@
+"""
+p_soc_auto_base.preload
+-----------------------
+
+This module contains the warm up of the `Celery` worker processes.
+
+The workers run with `--max-tasks-per-child`, so their pool processes are
+replaced every few tasks. Each new pool process is forked from the main
+worker process and used to read the dynamic preferences from the database
+and to compile the templates again before it could run its first task.
+
+:func:`preload` runs in the main worker process, before the pool processes
+are forked; see :func:`p_soc_auto.celery.preload_worker`. It imports the
+modules in :attr:`p_soc_auto.settings.common.PRELOAD_MODULES`, loads all
+the dynamic preferences with
+:func:`citrus_borg.dynamic_preferences_registry.snapshot_preferences`, and
+compiles the templates of the :ref:`SOC Automation Server` applications.
+The pool processes inherit all that from the main process. Each pool
+process renews the inherited preferences with :func:`preload_pool_process`
+because the main process may have loaded them long before the fork.
+
+:func:`measure_first_task` forks processes that do the work of a first task
+with and without the warm up and reports how long that takes.
+
+Example, from `python manage.py shell`::
+
+    from p_soc_auto_base.preload import measure_first_task
+    measure_first_task()
+
+:copyright:
+
+    Copyright 2018 - 2020 Provincial Health Service Authority
+    of British Columbia
+
+:contact:    daniel.busto@phsa.ca
+"""
+import importlib
+import os
+import statistics
+import time
+from logging import getLogger
+
+from django.conf import settings
+from django.core.cache import close_caches
+from django.db import connections
+from django.template import engines
+from django.template.utils import get_app_template_dirs
+from dynamic_preferences.registries import global_preferences_registry
+
+from citrus_borg.dynamic_preferences_registry import (
+    clear_preference_snapshot, get_cached_preference,
+    renew_preference_snapshot, snapshot_preferences,
+)
+
+
+LOG = getLogger(__name__)
+
+
+def project_templates():
+    """
+    :returns: the names of the templates in the `templates` directories of
+        the :ref:`SOC Automation Server` applications; the templates of the
+        third party applications are left out
+    :rtype: list
+    """
+    project_root = os.path.dirname(settings.BASE_DIR)
+
+    names = []
+    for directory in get_app_template_dirs('templates'):
+        if not str(directory).startswith(project_root):
+            continue
+
+        for root, _, files in os.walk(directory):
+            names.extend(
+                os.path.relpath(os.path.join(root, name), directory)
+                for name in files)
+
+    return sorted(names)
+
+
+def _load_templates(names):
+    """
+    compile templates; the compiled templates are kept by the cached
+    template loader, which is used when `DEBUG` is off
+
+    :returns: the number of compiled templates
+    """
+    engine = engines['django']
+    loaded = 0
+    for name in names:
+        try:
+            engine.get_template(name)
+        except Exception as error:  # pylint: disable=broad-except
+            LOG.warning('cannot preload template %s: %s', name, error)
+        else:
+            loaded += 1
+
+    return loaded
+
+
+def _reset_templates():
+    for loader in engines['django'].engine.template_loaders:
+        reset = getattr(loader, 'reset', None)
+        if reset is not None:
+            reset()
+
+
+def preload(close_connections=True):
+    """
+    warm up the current process before it forks the `Celery` pool
+    processes
+
+    :arg bool close_connections: close the database and cache connections
+        when done; connections must not be shared with the forked processes
+
+    :returns: how long each step took, in seconds, keyed by step
+    :rtype: dict
+    """
+    timings = {}
+
+    start = time.perf_counter()
+    for module in settings.PRELOAD_MODULES:
+        try:
+            importlib.import_module(module)
+        except ImportError as error:
+            LOG.warning('cannot preload module %s: %s', module, error)
+    timings['modules'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    try:
+        snapshot_preferences()
+    except Exception:  # pylint: disable=broad-except
+        LOG.exception('cannot preload the dynamic preferences')
+    timings['preferences'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    _load_templates(project_templates())
+    timings['templates'] = time.perf_counter() - start
+
+    if close_connections:
+        connections.close_all()
+        close_caches()
+
+    LOG.info('preloaded the worker process: %s', timings)
+
+    return timings
+
+
+def preload_pool_process():
+    """
+    renew the dynamic preferences inherited by a newly forked pool process,
+    see :func:`p_soc_auto.celery.preload_pool_process`
+
+    This runs before the `Celery` fixup that closes the connections
+    inherited from the main worker process, so the cache connections are
+    closed here first; the pool processes must not share a cache socket.
+
+    :returns: the number of renewed preferences
+    :rtype: int
+    """
+    close_caches()
+
+    try:
+        return renew_preference_snapshot()
+    except Exception:  # pylint: disable=broad-except
+        LOG.exception('cannot renew the preloaded dynamic preferences')
+        clear_preference_snapshot()
+
+    return 0
+
+
+def first_task():
+    """
+    the work a new pool process does before it can run its first task: read
+    the dynamic preferences, compile the templates, and import the modules
+    that are not imported by the task modules
+    """
+    for module in settings.PRELOAD_MODULES:
+        try:
+            importlib.import_module(module)
+        except ImportError:
+            pass
+
+    for preference in global_preferences_registry.preferences():
+        get_cached_preference(preference.identifier())
+
+    _load_templates(project_templates())
+
+
+def _time_forked(probe):
+    """
+    run a function in a forked process
+
+    :returns: how long the function took in the forked process, in seconds
+
+    :raises: :exc:`RuntimeError` if the forked process fails
+    """
+    connections.close_all()
+
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_fd)
+        try:
+            start = time.perf_counter()
+            probe()
+            os.write(write_fd, str(time.perf_counter() - start).encode())
+        finally:
+            os._exit(0)  # pylint: disable=protected-access
+
+    os.close(write_fd)
+    with os.fdopen(read_fd) as pipe:
+        elapsed = pipe.read()
+    os.waitpid(pid, 0)
+
+    if not elapsed:
+        raise RuntimeError(f'{probe.__name__} failed in the forked process')
+
+    return float(elapsed)
+
+
+def measure_first_task(runs=None, probe=first_task):
+    """
+    measure the time to the first task of a newly forked pool process, with
+    and without :func:`preload`
+
+    The runs without preload come first. Modules imported by any earlier
+    code are already loaded in both cases.
+
+    :arg int runs: how many processes to fork for each case; defaults to
+        :attr:`p_soc_auto.settings.common.STARTUP_RUNS`
+
+    :arg probe: the function timed in the forked processes
+
+    :returns: the median 'without_preload_ms' and 'with_preload_ms'
+    :rtype: dict
+    """
+    runs = runs or settings.STARTUP_RUNS
+
+    clear_preference_snapshot()
+    _reset_templates()
+    without_preload = [_time_forked(probe) for _ in range(runs)]
+
+    preload()
+    with_preload = [_time_forked(probe) for _ in range(runs)]
+
+    result = {
+        'without_preload_ms': round(
+            statistics.median(without_preload) * 1000, 3),
+        'with_preload_ms': round(statistics.median(with_preload) * 1000, 3),
+    }
+    LOG.info('time to first task: %s', result)
+
+    return result
@@ -0,0 +1,218 @@
+"""
+p_soc_auto_base.profiler
+------------------------
+
+This module contains the database query profiler for `Celery` tasks.
+
+A sample of the task runs, controlled by
+:attr:`p_soc_auto.settings.common.QUERY_PROFILER_SAMPLE_RATE`, is profiled
+using a `database instrumentation wrapper
+<https://docs.djangoproject.com/en/2.2/topics/db/instrumentation/>`__. This
+works without `DEBUG`. The results are saved as
+:class:`p_soc_auto_base.models.TaskQueryProfile` instances.
+
+The profiler is started and stopped by the `task_prerun` and `task_postrun`
+signal handlers in :mod:`p_soc_auto_base.signals`.
+
+A profiled run is compared with the recent profiles of the same task. It is
+flagged when it runs many more queries, or spends much more time in the
+database, than the median of those profiles. Tasks without enough history
+are compared with fixed limits instead.
+
+:copyright:
+
+    Copyright 2018 - 2020 Provincial Health Service Authority
+    of British Columbia
+
+:contact:    daniel.busto@phsa.ca
+"""
+import json
+import random
+import re
+import statistics
+import time
+from collections import Counter
+from logging import getLogger
+
+from django.conf import settings
+from django.db import connection
+
+
+LOG = getLogger(__name__)
+
+_IN_LIST = re.compile(r'IN \((?:%s, )*%s\)')
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_WHITESPACE = re.compile(r'\s+')
+
+
+def fingerprint(sql):
+    """
+    reduce an `SQL` statement to its shape
+
+    Literals are replaced with `?` and `IN` lists of any length are
+    collapsed so that the same query issued for different rows gets the same
+    fingerprint.
+
+    :arg str sql: the `SQL` statement as passed to the database cursor;
+        the parameters are normally not embedded in it
+
+    :returns: the fingerprint
+    :rtype: str
+    """
+    sql = _WHITESPACE.sub(' ', sql).strip()
+    sql = _IN_LIST.sub('IN (...)', sql)
+
+    return _LITERALS.sub('?', sql)
+
+
+class QueryProfiler:
+    """
+    `database instrumentation wrapper
+    <https://docs.djangoproject.com/en/2.2/topics/db/instrumentation/>`__
+    that counts and times the queries executed while it is installed
+    """
+    def __init__(self, task_name, task_id=None):
+        self.task_name = task_name
+        self.task_id = task_id
+        self.query_count = 0
+        self.query_time = 0.0
+        self.fingerprints = Counter()
+        self._context = None
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.query_time += time.perf_counter() - start
+            self.query_count += 1
+            self.fingerprints[fingerprint(sql)] += 1
+
+    def start(self):
+        """
+        install this profiler on the default database connection
+        """
+        self._context = connection.execute_wrapper(self)
+        self._context.__enter__()  # pylint: disable=no-member
+
+        return self
+
+    def stop(self):
+        """
+        remove this profiler from the default database connection
+        """
+        if self._context is not None:
+            self._context.__exit__(None, None, None)
+            self._context = None
+
+    def repeated_queries(self):
+        """
+        :returns: the fingerprints of the queries executed at least
+            :attr:`p_soc_auto.settings.common.QUERY_PROFILER_REPEAT_THRESHOLD`
+            times with their counts, most repeated first
+        :rtype: dict
+        """
+        return {
+            sql: count for sql, count in self.fingerprints.most_common()
+            if count >= settings.QUERY_PROFILER_REPEAT_THRESHOLD
+        }
+
+    def limits(self):
+        """
+        :returns: the query count and the query time above which this run is
+            flagged
+
+            The limits are the medians of the last
+            :attr:`p_soc_auto.settings.QUERY_PROFILER_BASELINE_RUNS` profiles
+            of the task multiplied by
+            :attr:`p_soc_auto.settings.QUERY_PROFILER_REGRESSION_FACTOR`. If
+            the task has fewer than
+            :attr:`p_soc_auto.settings.QUERY_PROFILER_BASELINE_MIN_RUNS`
+            profiles, the limits are
+            :attr:`p_soc_auto.settings.QUERY_PROFILER_MAX_QUERIES` and
+            :attr:`p_soc_auto.settings.QUERY_PROFILER_MAX_QUERY_TIME`.
+        :rtype: tuple
+        """
+        # pylint: disable=import-outside-toplevel
+        from p_soc_auto_base.models import TaskQueryProfile
+
+        baseline = list(
+            TaskQueryProfile.objects.filter(task_name=self.task_name).
+            order_by('-created_on').
+            values_list('query_count', 'query_time')
+            [:settings.QUERY_PROFILER_BASELINE_RUNS])
+
+        if len(baseline) < settings.QUERY_PROFILER_BASELINE_MIN_RUNS:
+            return (settings.QUERY_PROFILER_MAX_QUERIES,
+                    settings.QUERY_PROFILER_MAX_QUERY_TIME)
+
+        counts, times = zip(*baseline)
+        factor = settings.QUERY_PROFILER_REGRESSION_FACTOR
+
+        return (statistics.median(counts) * factor,
+                statistics.median(times) * factor)
+
+    def save(self):
+        """
+        stop profiling and save the results
+
+        :returns: the new :class:`p_soc_auto_base.models.TaskQueryProfile`
+            instance
+        """
+        self.stop()
+
+        # pylint: disable=import-outside-toplevel
+        from p_soc_auto_base.models import TaskQueryProfile
+
+        repeated = self.repeated_queries()
+        max_queries, max_query_time = self.limits()
+        flagged = (
+            self.query_count > max_queries
+            or self.query_time > max_query_time
+            or bool(repeated))
+
+        return TaskQueryProfile.objects.create(
+            task_name=self.task_name, task_id=self.task_id,
+            query_count=self.query_count,
+            query_time=round(self.query_time, 6),
+            distinct_queries=len(self.fingerprints),
+            repeated_queries=json.dumps(repeated, indent=2),
+            flagged=flagged)
+
+
+_PROFILERS = {}
+"""profilers for the running tasks keyed by task id"""
+
+
+def start_profiling(task_name, task_id):
+    """
+    start profiling a task run if it is picked by the sampling rate
+    """
+    if random.random() >= settings.QUERY_PROFILER_SAMPLE_RATE:
+        return
+
+    _PROFILERS[task_id] = QueryProfiler(task_name, task_id).start()
+
+
+def stop_profiling(task_id):
+    """
+    stop profiling a task run and save the results
+
+    Errors are logged and swallowed; the profiler must never break the
+    profiled task.
+    """
+    profiler = _PROFILERS.pop(task_id, None)
+    if profiler is None:
+        return
+
+    try:
+        profile = profiler.save()
+    except Exception:  # pylint: disable=broad-except
+        LOG.exception('cannot save query profile for task %s',
+                      profiler.task_name)
+        return
+
+    if profile.flagged:
+        LOG.warning('task %s ran %s queries in %s seconds; repeated: %s',
+                    profile.task_name, profile.query_count,
+                    profile.query_time, profile.repeated_queries)
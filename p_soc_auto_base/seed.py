@@ -0,0 +1,402 @@
+"""
+p_soc_auto_base.seed
+--------------------
+
+This module contains the data seeder used by the query benchmarks in
+:mod:`p_soc_auto_base.benchmark`.
+
+The seeder creates remote sites, bots, `Citrix` session hosts and `AD`
+controllers and then bulk inserts large numbers of
+:class:`citrus_borg.models.WinlogEvent`,
+:class:`mail_collector.models.MailBotLogEvent` and
+:class:`ldap_probe.models.LdapProbeLog` rows spread over the requested
+number of days, and :class:`ssl_cert_tracker.models.SslCertificate` rows
+that are valid, expired, or not yet valid. A small fraction of the bots
+stop reporting part way through the period so that the "dead bot" and
+"dead site" queries have something to find.
+
+All the seeded objects have names starting with :attr:`PREFIX` and can be
+removed with :func:`clear_seed`. No signals are sent while seeding.
+
+Example, from `python manage.py shell`::
+
+    from p_soc_auto_base.seed import seed
+    seed(winlog_events=2000000, mail_events=1000000, probes=1000000)
+
+.. warning::
+
+    Only run the seeder against a development or benchmark database.
+
+:copyright:
+
+    Copyright 2018 - 2020 Provincial Health Service Authority
+    of British Columbia
+
+:contact:    daniel.busto@phsa.ca
+"""
+import random
+import uuid
+from contextlib import contextmanager
+from decimal import Decimal
+from logging import getLogger
+
+from django.conf import settings
+from django.utils import timezone
+
+from citrus_borg import test_tools
+from citrus_borg.models import (
+    AllowedEventSource, BorgSite, KnownBrokeringDevice, WindowsLog,
+    WinlogbeatHost, WinlogEvent,
+)
+from ldap_probe.models import LdapProbeLog, NonOrionADNode
+from mail_collector.lib import event_sort_code
+from mail_collector.models import MailBotLogEvent
+from p_soc_auto_base.utils import get_or_create_user
+from ssl_cert_tracker.models import (
+    SslCertificate, SslCertificateIssuer, SslProbePort,
+)
+
+
+LOG = getLogger(__name__)
+
+PREFIX = 'bench'
+"""all the seeded sites, hosts, brokers and `AD` nodes use this prefix"""
+
+MAIL_EVENT_TYPES = ('connection', 'send', 'receive', 'verify')
+
+SSL_PORT = 65443
+"""the port of the seeded `SSL` certificates"""
+
+
+@contextmanager
+def _explicit_timestamps(*fields):
+    """
+    allow explicit values for `auto_now_add` fields while seeding
+    """
+    saved = [(field, field.auto_now_add) for field in fields]
+    for field, _ in saved:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now_add in saved:
+            field.auto_now_add = auto_now_add
+
+
+def _bulk_insert(model, rows, batch_size):
+    """
+    insert rows generated by the `rows` iterable in batches
+
+    :returns: the number of inserted rows
+    """
+    batch, count = [], 0
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            model.objects.bulk_create(batch, batch_size=batch_size)
+            count += len(batch)
+            batch = []
+            LOG.info('seeded %s %s rows', count, model._meta.model_name)
+
+    if batch:
+        model.objects.bulk_create(batch, batch_size=batch_size)
+        count += len(batch)
+
+    return count
+
+
+class _Clock:
+    """
+    pick event times for the seeded hosts
+
+    Events for a host that has gone silent are moved to before the moment
+    the host stopped reporting.
+    """
+    def __init__(self, now, days, silent_since):
+        self.now = now
+        self.span = days * 86400
+        self.silent_since = silent_since
+
+    def pick(self, key):
+        """
+        :arg str key: the name of the host the event is for
+
+        :returns: a random moment in the seeded period
+        :rtype: :class:`datetime.datetime`
+        """
+        moment = self.now - timezone.timedelta(
+            seconds=random.uniform(0, self.span))
+        cutoff = self.silent_since.get(key)
+        if cutoff is not None and moment > cutoff:
+            moment = cutoff - (moment - cutoff)
+
+        return moment
+
+
+def _seed_topology(sites, hosts_per_site, brokers, ad_nodes, user):
+    """
+    create the sites, hosts, brokers and `AD` nodes
+    """
+    audit = {'created_by': user, 'updated_by': user}
+
+    site_objects = [
+        BorgSite.objects.get_or_create(
+            site=f'{PREFIX}-site-{index:03}', defaults=audit)[0]
+        for index in range(sites)]
+
+    hosts = []
+    for site_index, site in enumerate(site_objects):
+        for index in range(hosts_per_site):
+            hosts.append(WinlogbeatHost.objects.get_or_create(
+                host_name=f'{PREFIX}-bot-{site_index:03}-{index:02}',
+                defaults=dict(
+                    audit, site=site,
+                    ip_address=f'10.{site_index // 250}.{site_index % 250}'
+                               f'.{index + 1}'))[0])
+
+    broker_objects = [
+        KnownBrokeringDevice.objects.get_or_create(
+            broker_name=f'BNCH-BRK{index:03}', defaults=audit)[0]
+        for index in range(brokers)]
+
+    node_objects = [
+        NonOrionADNode.objects.get_or_create(
+            node_dns=f'{PREFIX}-dc-{index:03}.{PREFIX}.local',
+            defaults=audit)[0]
+        for index in range(ad_nodes)]
+
+    return site_objects, hosts, broker_objects, node_objects
+
+
+def _duration(mean):
+    """
+    :returns: a random duration around `mean` seconds for the `ControlUp`
+        timing fields
+    :rtype: :class:`datetime.timedelta`
+    """
+    return timezone.timedelta(seconds=max(random.gauss(mean, mean / 3), 0.1))
+
+
+def _winlog_rows(count, hosts, brokers, clock, failure_ratio, user):
+    """
+    generate unsaved :class:`citrus_borg.models.WinlogEvent` instances
+    spread over the seeded hosts and brokers
+    """
+    source = AllowedEventSource.objects.get_or_create(
+        source_name='ControlUp Logon Monitor',
+        defaults={'created_by': user, 'updated_by': user})[0]
+    log = WindowsLog.objects.get_or_create(
+        log_name='Application',
+        defaults={'created_by': user, 'updated_by': user})[0]
+
+    for index in range(count):
+        host = random.choice(hosts)
+        moment = clock.pick(host.host_name)
+        failed = random.random() < failure_ratio
+        yield WinlogEvent(
+            source_host=host, record_number=index, event_source=source,
+            windows_log=log,
+            event_state='failed' if failed else 'successful',
+            xml_broker=None if failed else random.choice(brokers),
+            event_test_result=not failed,
+            storefront_connection_duration=None if failed else _duration(2),
+            receiver_startup_duration=None if failed else _duration(1),
+            connection_achieved_duration=None if failed else _duration(5),
+            logon_achieved_duration=None if failed else _duration(10),
+            logoff_achieved_duration=None if failed else _duration(3),
+            failure_reason='Logon timeout' if failed else None,
+            failure_details=test_tools.FAIL_MSG if failed else None,
+            event_id=1003 if failed else 1000,
+            timestamp=moment,
+            raw_message=test_tools.FAIL_MSG if failed
+            else test_tools.PASS_MSG,
+            created_on=moment,
+            created_by=user, updated_by=user)
+
+
+def _mail_rows(count, hosts, clock, failure_ratio):
+    """
+    generate unsaved :class:`mail_collector.models.MailBotLogEvent`
+    instances, one for each event type of a send and receive cycle
+    """
+    index = 0
+    while index < count:
+        host = random.choice(hosts)
+        moment = clock.pick(host.host_name)
+        group_id = str(uuid.uuid4())
+        account = f'{PREFIX}\\{host.host_name}, {host.host_name}@phsa.ca'
+
+        for event_type in MAIL_EVENT_TYPES:
+            if index >= count:
+                break
+
+            failed = random.random() < failure_ratio
+            status = 'FAIL' if failed else 'PASS'
+            yield MailBotLogEvent(
+                event_group_id=group_id, source_host=host,
+                event_status=status, event_type=event_type,
+                event_type_sort=event_sort_code(event_type),
+                event_message=f'{event_type} {status}',
+                event_exception='ErrorNonExistentMailbox' if failed else None,
+                event_body=str({'wm_id': group_id, 'type': event_type,
+                                'status': status, 'account': account}),
+                mail_account=account, event_registered_on=moment)
+            index += 1
+
+
+def _probe_rows(count, nodes, clock, failure_ratio):
+    """
+    generate unsaved :class:`ldap_probe.models.LdapProbeLog` instances,
+    about half of them for anonymous binds
+    """
+    def elapsed(mean):
+        return Decimal(f'{max(random.gauss(mean, mean / 3), 0.0001):.6f}')
+
+    for _ in range(count):
+        node = random.choice(nodes)
+        moment = clock.pick(node.node_dns)
+
+        if random.random() < failure_ratio:
+            yield LdapProbeLog(
+                ad_node=node, failed=True, created_on=moment,
+                errors='LDAPSocketOpenError: socket connection error')
+            continue
+
+        anon = random.random() < 0.5
+        yield LdapProbeLog(
+            ad_node=node, failed=False, created_on=moment,
+            elapsed_initialize=elapsed(0.001),
+            elapsed_bind=None if anon else elapsed(0.05),
+            elapsed_anon_bind=elapsed(0.02) if anon else None,
+            elapsed_read_root=elapsed(0.01) if anon else None,
+            elapsed_search_ext=None if anon else elapsed(0.1),
+            ad_response='{"dn": "", "raw": {}}')
+
+
+def _ssl_rows(count, now, user):
+    """
+    generate unsaved :class:`ssl_cert_tracker.models.SslCertificate`
+    instances with a spread of expiry dates
+    """
+    audit = {'created_by': user, 'updated_by': user}
+    port = SslProbePort.objects.get_or_create(port=SSL_PORT, defaults=audit)[0]
+    issuer = SslCertificateIssuer.objects.get_or_create(
+        common_name=f'{PREFIX}-issuer', defaults=audit)[0]
+
+    for index in range(count):
+        # about 10% expired and 2% not yet valid
+        not_after = now + timezone.timedelta(days=random.uniform(-45, 400))
+        if random.random() < 0.02:
+            not_before = now + timezone.timedelta(days=random.uniform(1, 30))
+        else:
+            not_before = not_after - timezone.timedelta(days=730)
+
+        yield SslCertificate(
+            common_name=f'{PREFIX}-cert-{index:06}.{PREFIX}.local',
+            port=port, issuer=issuer, hostnames=f'{PREFIX}-{index:06}',
+            not_before=not_before, not_after=not_after, pem='seeded',
+            pk_bits='2048', pk_type='rsa', pk_md5=uuid.uuid4().hex,
+            pk_sha1=uuid.uuid4().hex, last_seen=now, **audit)
+
+
+def seed(winlog_events=1000000, mail_events=500000, probes=500000,
+         ssl_certificates=100000, sites=40, hosts_per_site=3, brokers=30,
+         ad_nodes=30, days=30, silent_ratio=0.05, failure_ratio=0.05,
+         batch_size=5000, seed_=None):
+    """
+    seed the database for the query benchmarks
+
+    :arg int winlog_events: number of `Citrix` login events
+    :arg int mail_events: number of `Exchange` client events
+    :arg int probes: number of `LDAP` probes
+    :arg int ssl_certificates: number of `SSL` certificates
+    :arg int sites: number of remote sites
+    :arg int hosts_per_site: number of bots at each site
+    :arg int brokers: number of `Citrix` session hosts
+    :arg int ad_nodes: number of `AD` controllers
+    :arg int days: the rows are spread over this many days before now
+    :arg float silent_ratio: the proportion of bots and `AD` controllers
+        that stop reporting part way through the period
+    :arg float failure_ratio: the proportion of failed events and probes
+    :arg int batch_size: rows per `INSERT` statement
+    :arg int seed_: seed for the random generator to make runs repeatable
+
+    :returns: the number of rows inserted for each model
+    :rtype: dict
+    """
+    if seed_ is not None:
+        random.seed(seed_)
+
+    user = get_or_create_user(settings.CITRUS_BORG_SERVICE_USER)
+    now = timezone.now()
+
+    _, hosts, brokers, nodes = _seed_topology(
+        sites, hosts_per_site, brokers, ad_nodes, user)
+
+    silent_since = {
+        key: now - timezone.timedelta(
+            seconds=random.uniform(3600, days * 86400 / 2))
+        for key in [host.host_name for host in hosts]
+        + [node.node_dns for node in nodes]
+        if random.random() < silent_ratio
+    }
+    clock = _Clock(now, days, silent_since)
+
+    mail_hosts = hosts[::2]
+    counts = {}
+    with _explicit_timestamps(
+            WinlogEvent._meta.get_field('created_on'),
+            MailBotLogEvent._meta.get_field('event_registered_on'),
+            LdapProbeLog._meta.get_field('created_on')):
+        counts['winlogevent'] = _bulk_insert(
+            WinlogEvent,
+            _winlog_rows(winlog_events, hosts, brokers, clock,
+                         failure_ratio, user),
+            batch_size)
+        counts['mailbotlogevent'] = _bulk_insert(
+            MailBotLogEvent,
+            _mail_rows(mail_events, mail_hosts, clock, failure_ratio),
+            batch_size)
+        counts['ldapprobelog'] = _bulk_insert(
+            LdapProbeLog, _probe_rows(probes, nodes, clock, failure_ratio),
+            batch_size)
+
+    counts['sslcertificate'] = _bulk_insert(
+        SslCertificate, _ssl_rows(ssl_certificates, now, user), batch_size)
+
+    # the heartbeat columns are normally maintained by the event handlers
+    for host in hosts:
+        cutoff = silent_since.get(host.host_name, now)
+        host.last_seen = cutoff
+        host.exchange_last_seen = cutoff if host in mail_hosts else None
+    WinlogbeatHost.objects.bulk_update(
+        hosts, ['last_seen', 'exchange_last_seen'], batch_size=batch_size)
+    KnownBrokeringDevice.objects.filter(
+        broker_name__startswith='BNCH-').update(last_seen=now)
+
+    LOG.info('seeded %s', counts)
+
+    return counts
+
+
+def clear_seed():
+    """
+    delete everything created by :func:`seed`
+    """
+    hosts = WinlogbeatHost.objects.filter(host_name__startswith=f'{PREFIX}-')
+
+    WinlogEvent.objects.filter(source_host__in=hosts).delete()
+    MailBotLogEvent.objects.filter(source_host__in=hosts).delete()
+    LdapProbeLog.objects.filter(
+        ad_node__node_dns__startswith=f'{PREFIX}-').delete()
+
+    SslCertificate.objects.filter(
+        common_name__startswith=f'{PREFIX}-cert-').delete()
+    SslCertificateIssuer.objects.filter(
+        common_name=f'{PREFIX}-issuer').delete()
+
+    hosts.delete()
+    BorgSite.objects.filter(site__startswith=f'{PREFIX}-').delete()
+    KnownBrokeringDevice.objects.filter(
+        broker_name__startswith='BNCH-').delete()
+    NonOrionADNode.objects.filter(node_dns__startswith=f'{PREFIX}-').delete()
@@ -0,0 +1,100 @@
+"""
+p_soc_auto_base.signals
+-----------------------
+
+This module contains the `Django signals
+<https://docs.djangoproject.com/en/2.2/topics/signals/#module-django.dispatch>`__
+for the base application.
+
+:copyright:
+
+    Copyright 2018 - 2020 Provincial Health Service Authority
+    of British Columbia
+
+:contact:    daniel.busto@phsa.ca
+"""
+import time
+
+from celery.signals import (
+    task_postrun, task_prerun, worker_process_init, worker_ready,
+)
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from p_soc_auto_base import identity
+from p_soc_auto_base.metrics import TASK_RUNTIME_SECONDS
+from p_soc_auto_base.models import Subscription
+from p_soc_auto_base.profiler import start_profiling, stop_profiling
+
+_TASK_STARTS = {}
+"""start times for the running tasks keyed by task id"""
+
+
+# To be used as a receiver all these arguments are required (despite not being
+# used)
+# pylint: disable=unused-argument
+
+@receiver(post_delete, sender=Subscription)
+@receiver(post_save, sender=Subscription)
+def clear_subscription_cache(sender, instance, *args, **kwargs):
+    """
+    invalidate the per process :class:`p_soc_auto_base.models.Subscription`
+    cache when a subscription is changed
+    """
+    Subscription.clear_cache()
+
+
+def invalidate_identity_maps(sender, instance, *args, **kwargs):
+    """
+    remove a changed instance from the identity maps of this process
+
+    This receiver is connected only to the models that have an identity
+    map. See :mod:`p_soc_auto_base.identity`.
+    """
+    identity.invalidate(sender, instance)
+
+
+for _model_label in {identity_map.model_label
+                     for identity_map in identity.IDENTITY_MAPS}:
+    post_save.connect(invalidate_identity_maps, sender=_model_label)
+    post_delete.connect(invalidate_identity_maps, sender=_model_label)
+
+
+@worker_ready.connect
+@worker_process_init.connect
+def warm_identity_maps(*args, **kwargs):
+    """
+    load the identity maps when a `Celery` worker starts
+
+    `worker_ready` covers the main worker process where the event consumer
+    runs and `worker_process_init` covers the pool processes.
+    """
+    identity.warm()
+
+
+@task_prerun.connect
+def start_task_timer(sender=None, task_id=None, **kwargs):
+    """
+    remember when a `Celery` task has started and start the query profiler
+    if the task run is sampled
+    """
+    _TASK_STARTS[task_id] = time.perf_counter()
+    start_profiling(sender.name, task_id)
+
+
+@task_postrun.connect
+def observe_task_runtime(sender=None, task_id=None, state=None, **kwargs):
+    """
+    record the runtime of a `Celery` task in
+    :attr:`p_soc_auto_base.metrics.TASK_RUNTIME_SECONDS` and save the query
+    profile if there is one
+    """
+    stop_profiling(task_id)
+
+    start = _TASK_STARTS.pop(task_id, None)
+    if start is None:
+        return
+
+    TASK_RUNTIME_SECONDS.observe(
+        time.perf_counter() - start, task=sender.name,
+        state=state or 'UNKNOWN')
@@ -0,0 +1,268 @@
+"""
+p_soc_auto_base.spool
+---------------------
+
+This module contains the outbound mail spool used by
+:class:`p_soc_auto_base.email.Email`.
+
+The spool delivers rendered email messages over a small pool of persistent
+`SMTP` connections. Messages are sent in batches and a batch that fails
+because the connection to the `SMTP` relay was refused or dropped is retried
+over a fresh connection.
+
+Each worker process gets its own spool via :func:`get_spool`. Connections
+are never shared across a `fork`.
+
+:copyright:
+
+    Copyright 2018 - 2020 Provincial Health Service Authority
+    of British Columbia
+
+:contact:    daniel.busto@phsa.ca
+"""
+import atexit
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from logging import getLogger
+from smtplib import SMTPConnectError, SMTPServerDisconnected
+
+from django.conf import settings
+from django.core.mail import get_connection
+
+from p_soc_auto_base.metrics import EXTERNAL_CALL_SECONDS
+
+
+LOG = getLogger(__name__)
+
+RETRY_ON = (SMTPConnectError, SMTPServerDisconnected, ConnectionError)
+"""
+exceptions that cause a batch to be retried over a new connection
+"""
+
+
+class _SpoolConnection:
+    """
+    wrapper around a `Django` email backend connection that keeps the
+    connection open between batches unless it has been idle for too long
+    """
+    def __init__(self, connection_factory, idle_timeout):
+        self.connection = connection_factory(fail_silently=False)
+        self.idle_timeout = idle_timeout
+        self.last_used = None
+
+    def send_messages(self, messages):
+        """
+        send a batch of messages over this connection, (re)opening it if
+        needed
+        """
+        if self.last_used is not None \
+                and time.monotonic() - self.last_used > self.idle_timeout:
+            self.close()
+
+        with EXTERNAL_CALL_SECONDS.time(service='smtp',
+                                        operation='send_messages'):
+            self.connection.open()
+            sent = self.connection.send_messages(messages)
+        self.last_used = time.monotonic()
+
+        return sent or 0
+
+    def close(self):
+        """
+        close the connection and ignore any errors while doing so
+        """
+        try:
+            self.connection.close()
+        except Exception:  # pylint: disable=broad-except
+            LOG.debug('error while closing spool connection', exc_info=True)
+        self.last_used = None
+
+
+class MailSpool:
+    """
+    queue rendered email messages and deliver them in batches over a pool of
+    persistent connections
+
+    Messages can be sent right away with :meth:`send`, or queued with
+    :meth:`enqueue` and delivered together with :meth:`flush`.
+    """
+    def __init__(self, connections=None, batch_size=None, max_retries=None,
+                 retry_delay=None, idle_timeout=None,
+                 connection_factory=get_connection):
+        """
+        all the numeric arguments default to the matching `EMAIL_SPOOL_*`
+        settings in :mod:`p_soc_auto.settings.common`
+
+        :arg int connections: maximum number of concurrent connections
+
+        :arg int batch_size: maximum number of messages sent per batch
+
+        :arg int max_retries: how many times a batch is retried
+
+        :arg float retry_delay: the delay in seconds before the first retry;
+            the delay is doubled with each retry
+
+        :arg float idle_timeout: connections idle for longer than this many
+            seconds are re-opened before use
+
+        :arg connection_factory: the callable returning `Django` email
+            backend connections; see :func:`django.core.mail.get_connection`
+        """
+        self.connections = connections or settings.EMAIL_SPOOL_CONNECTIONS
+        self.batch_size = batch_size or settings.EMAIL_SPOOL_BATCH_SIZE
+        self.max_retries = settings.EMAIL_SPOOL_MAX_RETRIES \
+            if max_retries is None else max_retries
+        self.retry_delay = settings.EMAIL_SPOOL_RETRY_DELAY \
+            if retry_delay is None else retry_delay
+        self.idle_timeout = idle_timeout or settings.EMAIL_SPOOL_IDLE_TIMEOUT
+        self.connection_factory = connection_factory
+
+        self._messages = queue.Queue()
+        self._pool = queue.Queue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _checkout(self):
+        """
+        get an idle connection from the pool or create a new one if the pool
+        is not full; wait for an idle connection otherwise
+        """
+        try:
+            return self._pool.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            if self._created < self.connections:
+                self._created += 1
+                return _SpoolConnection(
+                    self.connection_factory, self.idle_timeout)
+
+        return self._pool.get()
+
+    def _send_batch(self, messages):
+        """
+        send one batch, retrying over a fresh connection when the `SMTP`
+        relay refuses or drops the connection
+
+        :raises: the last exception in :attr:`RETRY_ON` if all the retries
+            have failed
+        """
+        connection = self._checkout()
+        try:
+            for attempt in range(self.max_retries + 1):
+                try:
+                    return connection.send_messages(messages)
+                except RETRY_ON as err:
+                    connection.close()
+                    if attempt == self.max_retries:
+                        LOG.error('giving up on %s email messages: %s',
+                                  len(messages), err)
+                        raise
+
+                    delay = self.retry_delay * 2 ** attempt
+                    LOG.warning('retrying %s email messages in %s seconds: %s',
+                                len(messages), delay, err)
+                    time.sleep(delay)
+        finally:
+            self._pool.put(connection)
+
+        return 0
+
+    def send(self, *messages):
+        """
+        send email messages right away
+
+        :arg messages: :class:`django.core.mail.EmailMessage` instances
+
+        :returns: the number of messages sent
+
+        :raises: the last :attr:`RETRY_ON` exception if a batch could not be
+            delivered; the other batches are still attempted
+        """
+        messages = list(messages)
+        batches = [messages[i:i + self.batch_size]
+                   for i in range(0, len(messages), self.batch_size)]
+
+        if not batches:
+            return 0
+
+        if len(batches) == 1:
+            return self._send_batch(batches[0])
+
+        sent, error = 0, None
+        with ThreadPoolExecutor(
+                max_workers=min(self.connections, len(batches))) as executor:
+            for future in [executor.submit(self._send_batch, batch)
+                           for batch in batches]:
+                try:
+                    sent += future.result()
+                except RETRY_ON as err:
+                    error = err
+
+        if error is not None:
+            raise error
+
+        return sent
+
+    def enqueue(self, *messages):
+        """
+        queue email messages for delivery by :meth:`flush`
+        """
+        for message in messages:
+            self._messages.put(message)
+
+    def flush(self):
+        """
+        deliver all the queued email messages
+
+        :returns: the number of messages sent
+        """
+        messages = []
+        while True:
+            try:
+                messages.append(self._messages.get_nowait())
+            except queue.Empty:
+                break
+
+        if not messages:
+            return 0
+
+        return self.send(*messages)
+
+    def close(self):
+        """
+        close all the idle connections in the pool
+        """
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                break
+
+        with self._lock:
+            self._created = 0
+
+
+_SPOOL = None
+_SPOOL_PID = None
+
+
+def get_spool():
+    """
+    :returns: the :class:`MailSpool` instance for the current process
+
+    A new spool is created after a `fork` so that the worker processes do
+    not share `SMTP` connections with their parent.
+    """
+    global _SPOOL, _SPOOL_PID  # pylint: disable=global-statement
+
+    if _SPOOL is None or _SPOOL_PID != os.getpid():
+        _SPOOL = MailSpool()
+        _SPOOL_PID = os.getpid()
+        atexit.register(_SPOOL.close)
+
+    return _SPOOL
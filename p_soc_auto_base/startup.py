@@ -0,0 +1,149 @@
+"""
+p_soc_auto_base.startup
+-----------------------
+
+This module contains the startup benchmark for the :ref:`SOC Automation
+Server` processes.
+
+Each `uWSGI` and `Celery` worker process sets up `Django` and imports all the
+`Celery` tasks before it can do any work. With more than ten worker pools,
+the time this takes adds up during each deploy. Startup must also not touch
+the database: a module that reads a dynamic preference at import time makes
+every process fail to start while the database is down, and freezes the
+value of the preference until the process is restarted.
+
+:func:`measure_startup` starts new `Python` processes that do just that and
+reports how long it took and how many database connections were opened.
+:func:`check_startup` compares the measurements with
+:attr:`p_soc_auto.settings.common.STARTUP_BUDGET`.
+
+The startup time is also registered as a benchmark in
+:mod:`p_soc_auto_base.benchmarks`, so
+:func:`p_soc_auto_base.benchmark.run_benchmarks` reports it when it grows
+over its baseline.
+
+Example, from `python manage.py shell`::
+
+    from p_soc_auto_base.startup import check_startup
+    check_startup()
+
+:copyright:
+
+    Copyright 2018 - 2020 Provincial Health Service Authority
+    of British Columbia
+
+:contact:    daniel.busto@phsa.ca
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+from logging import getLogger
+
+from django.conf import settings
+
+
+LOG = getLogger(__name__)
+
+STARTUP_SCRIPT = '''
+import json
+import time
+
+start = time.perf_counter()
+
+import django
+from django.db.backends.signals import connection_created
+
+connections = []
+connection_created.connect(
+    lambda sender, connection, **kwargs: connections.append(connection.alias),
+    weak=False)
+
+django.setup()
+setup_done = time.perf_counter()
+
+from p_soc_auto.celery import app
+app.loader.import_default_modules()
+done = time.perf_counter()
+
+print(json.dumps({
+    'setup_seconds': setup_done - start,
+    'tasks_seconds': done - setup_done,
+    'total_seconds': done - start,
+    'task_count': len(app.tasks),
+    'connections': connections,
+}))
+'''
+"""the script run by the measured processes"""
+
+
+def _run_once():
+    """
+    start one process and return its measurements
+
+    :raises: :exc:`subprocess.CalledProcessError` if the process fails
+    """
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE=settings.SETTINGS_MODULE)
+    completed = subprocess.run(
+        [sys.executable, '-c', STARTUP_SCRIPT],
+        cwd=os.path.dirname(settings.BASE_DIR), env=env, check=True,
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+        universal_newlines=True)
+
+    # anything logged while starting comes before the measurements
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def measure_startup(runs=None):
+    """
+    measure the startup of new processes
+
+    :arg int runs: how many processes to start; defaults to
+        :attr:`p_soc_auto.settings.common.STARTUP_RUNS`
+
+    :returns: the median 'setup_seconds', 'tasks_seconds' and
+        'total_seconds', the 'task_count', and the database 'connections'
+        opened by any of the processes
+    :rtype: dict
+    """
+    measurements = [_run_once() for _ in range(runs or settings.STARTUP_RUNS)]
+
+    result = {
+        key: round(statistics.median(
+            measurement[key] for measurement in measurements), 3)
+        for key in ('setup_seconds', 'tasks_seconds', 'total_seconds')
+    }
+    result['task_count'] = measurements[-1]['task_count']
+    result['connections'] = sorted({
+        alias for measurement in measurements
+        for alias in measurement['connections']})
+
+    LOG.info('startup measurements: %s', result)
+
+    return result
+
+
+def check_startup(runs=None):
+    """
+    measure the startup of new processes and compare it with the budget
+
+    :arg int runs: see :func:`measure_startup`
+
+    :returns: the problems found, an empty :class:`list` if there are none
+    :rtype: list
+    """
+    result = measure_startup(runs)
+
+    problems = []
+    if result['total_seconds'] > settings.STARTUP_BUDGET:
+        problems.append(
+            f'startup took {result["total_seconds"]} seconds, the budget is'
+            f' {settings.STARTUP_BUDGET} seconds')
+
+    if result['connections']:
+        problems.append(
+            f'startup opened database connections to'
+            f' {", ".join(result["connections"])}')
+
+    return problems
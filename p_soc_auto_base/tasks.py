@@ -16,10 +16,12 @@ have a more specific location to be.
 """
 from logging import getLogger
 
-from celery import shared_task
+from celery import current_app, shared_task
 from django.apps import apps
+from django.conf import settings
 
-from p_soc_auto_base import utils
+from p_soc_auto_base import dashboard, health, utils
+from p_soc_auto_base.alerts import pop_coalesced
 
 LOG = getLogger(__name__)
 
@@ -45,3 +47,76 @@ def delete_emails(**age):
 
     LOG.info('Deleted %s emails created earlier than %s.', count_deleted,
              older_than.isoformat())
+
+
+@shared_task(queue='data_prune')
+def delete_query_profiles(**age):
+    """
+    Deletes the task query profiles saved by :mod:`p_soc_auto_base.profiler`
+    which are older than the inputted age
+
+    :arg age: named arguments that can be used for creating a
+        :class:`datetime.timedelta` object; by default, the value of
+        :attr:`p_soc_auto.settings.common.QUERY_PROFILER_RETENTION`
+    """
+    older_than = utils.MomentOfTime.past(
+        **(age or settings.QUERY_PROFILER_RETENTION))
+
+    count_deleted, _ = apps.get_model('p_soc_auto_base.TaskQueryProfile').\
+        objects.filter(created_on__lte=older_than).delete()
+
+    LOG.info('Deleted %s task query profiles created earlier than %s.',
+             count_deleted, older_than.isoformat())
+
+
+@shared_task(queue='email')
+def dispatch_coalesced_alert(task_name, key, generation, **task_kwargs):
+    """
+    send the digest for a closed coalescing window
+
+    This task is scheduled by :func:`p_soc_auto_base.alerts.coalesce_alert`
+    when the window opens. Nothing is sent if no other alerts were recorded
+    while the window was open.
+
+    :arg str task_name: the name of the `Celery` task that sends the alert
+    :arg str key: the cache key for the (task, subject) pair
+    :arg str generation: the identifier of the coalescing window
+    :arg task_kwargs: other keyword arguments for the alert task
+    """
+    coalesced = pop_coalesced(key, generation)
+    if not coalesced:
+        LOG.debug('nothing to digest for %s', task_name)
+        return
+
+    LOG.info('dispatching digest of %s alerts for %s', len(coalesced),
+             task_name)
+    current_app.tasks[task_name].delay(
+        coalesced[-1], coalesced=coalesced[:-1], **task_kwargs)
+
+
+@shared_task(queue='shared')
+def refresh_health_snapshot():
+    """
+    rebuild the live health snapshot, see :mod:`p_soc_auto_base.health`
+
+    :returns: the `ETag` of the new snapshot
+    """
+    return health.refresh_snapshot()['etag']
+
+
+@shared_task(queue='shared')
+def refresh_dashboard_summary():
+    """
+    recompute the live summary shown on the `Django Admin` dashboard, see
+    :mod:`p_soc_auto_base.dashboard`
+    """
+    dashboard.refresh_summary()
+
+
+@shared_task(queue='shared')
+def refresh_dashboard_feed():
+    """
+    fetch the feed shown on the `Django Admin` dashboard, see
+    :mod:`p_soc_auto_base.dashboard`
+    """
+    dashboard.refresh_feed()
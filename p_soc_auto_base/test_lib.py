@@ -12,3 +12,20 @@ class UserTestCase(TestCase):
         super().setUpClass()
         user = get_or_create_user()
         cls.USER_ARGS = {'created_by': user, 'updated_by': user}
+
+
+def disconnect_receiver(test_case, signal, receiver, sender):
+    """
+    disconnect a signal receiver until the end of a test
+
+    :arg test_case: the :class:`unittest.TestCase` instance; the receiver is
+        connected again by one of its cleanup functions
+
+    :arg signal: the :class:`django.dispatch.Signal` instance
+
+    :arg receiver: the receiver function
+
+    :arg sender: the sender the receiver was connected for
+    """
+    signal.disconnect(receiver, sender=sender)
+    test_case.addCleanup(signal.connect, receiver, sender=sender)
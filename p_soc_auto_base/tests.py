@@ -12,12 +12,48 @@ This module contains tests for functionality shared across the
 
 :contact:    daniel.busto@phsa.ca
 """
+import os
+import runpy
+import tempfile
+import time
+from smtplib import SMTPServerDisconnected
+from unittest import mock
+
+from django.contrib import admin
 from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
-from django.test import TestCase
+from django.core.mail import EmailMessage, get_connection
+from django.db import connection
+from django.db.models.signals import post_save
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
 
+from citrus_borg.dynamic_preferences_registry import (
+    _SNAPSHOT, clear_preference_snapshot, get_cached_preference,
+)
+from citrus_borg.models import (
+    AllowedEventSource, WindowsLog, WinlogbeatHost, WinlogEvent,
+)
+from citrus_borg.signals import orion_update_citrix_error
 from mail_collector.models import DomainAccount
-from p_soc_auto_base.test_lib import UserTestCase
+from p_soc_auto_base import benchmark, dashboard, fields, health, identity
+from p_soc_auto_base.alerts import coalesce_alert, pop_coalesced
+from p_soc_auto_base.changelist import EstimatedCountPaginator
+from p_soc_auto_base.preload import (
+    preload, preload_pool_process, project_templates,
+)
+from p_soc_auto_base.archive import archive_queryset, monthly_stats, \
+    read_archive
+from p_soc_auto_base.metrics import Counter, Histogram, Registry
+from p_soc_auto_base.models import Subscription, TaskQueryProfile
+from p_soc_auto_base.profiler import QueryProfiler, fingerprint
+from p_soc_auto_base.spool import MailSpool
+from p_soc_auto_base.tasks import delete_query_profiles
+from p_soc_auto_base.test_lib import UserTestCase, disconnect_receiver
 from p_soc_auto_base.utils import get_or_create_user
 
 
@@ -67,3 +103,925 @@ class DefaultTest(UserTestCase):
         Test that the get_default function gets the id of the object.
         """
         self.assertIsInstance(DomainAccount.get_default(), int)
+
+
+class ArchiveTest(UserTestCase):
+    """
+    Tests for :mod:`p_soc_auto_base.archive`
+    """
+    def setUp(self):
+        self.archive_root = tempfile.TemporaryDirectory()
+        self.settings_override = override_settings(
+            ARCHIVE_ROOT=self.archive_root.name)
+        self.settings_override.enable()
+
+        # the receiver calls the Orion server and expects older events
+        disconnect_receiver(
+            self, post_save, orion_update_citrix_error, WinlogEvent)
+        host = WinlogbeatHost.objects.first()
+        source = AllowedEventSource.objects.first()
+        log = WindowsLog.objects.first()
+        for state in ['successful', 'successful', 'failed']:
+            WinlogEvent.objects.create(
+                source_host=host, record_number=0, event_source=source,
+                windows_log=log, event_state=state, timestamp=timezone.now(),
+                **self.USER_ARGS)
+
+    def tearDown(self):
+        WinlogEvent.objects.all().delete()
+        self.settings_override.disable()
+        self.archive_root.cleanup()
+
+    def test_archive_readsbackallrows(self):
+        """
+        test that every archived row can be read back from the archive
+        """
+        count = archive_queryset(WinlogEvent.objects.all())
+        uuids = {str(uuid) for uuid in
+                 WinlogEvent.objects.values_list('uuid', flat=True)}
+
+        self.assertEqual(count, 3)
+        self.assertEqual(
+            {row['uuid'] for row in read_archive('winlogevent')}, uuids)
+
+    def test_monthlystats_countsfailed(self):
+        """
+        test that the monthly stats count all rows and the failed rows
+        """
+        archive_queryset(WinlogEvent.objects.all())
+
+        stats = monthly_stats(
+            'winlogevent', ['source_host__host_name'],
+            failed=('event_state', 'failed'))
+
+        self.assertEqual(len(stats), 1)
+        self.assertEqual(stats[0]['count'], 3)
+        self.assertEqual(stats[0]['failed'], 1)
+        self.assertEqual(stats[0]['month'],
+                         timezone.localtime().strftime('%Y-%m'))
+
+
+class MailSpoolTest(TestCase):
+    """
+    Tests for :class:`p_soc_auto_base.spool.MailSpool`
+    """
+    @staticmethod
+    def _messages(count):
+        return [EmailMessage(f'subject {i}', 'body', 'from@example.com',
+                             ['to@example.com']) for i in range(count)]
+
+    def test_send_batchesallmessages(self):
+        """
+        test that all messages are sent when they span several batches
+        """
+        spool = MailSpool(connections=2, batch_size=3)
+
+        self.assertEqual(spool.send(*self._messages(7)), 7)
+        self.assertEqual(len(mail.outbox), 7)
+
+    def test_send_nomessages(self):
+        """
+        test that sending nothing returns 0 without opening a connection
+        """
+        opened = []
+
+        def factory(**kwargs):
+            opened.append(kwargs)
+            return get_connection(**kwargs)
+
+        spool = MailSpool(connections=2, connection_factory=factory)
+
+        self.assertEqual(spool.send(), 0)
+        self.assertEqual(opened, [])
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_send_fewerbatchesthanconnections(self):
+        """
+        test that fewer batches than pooled connections are all sent
+        """
+        spool = MailSpool(connections=4, batch_size=3)
+
+        self.assertEqual(spool.send(*self._messages(5)), 5)
+        self.assertEqual(len(mail.outbox), 5)
+
+    def test_send_reusesconnection(self):
+        """
+        test that consecutive sends use the same connection
+        """
+        opened = []
+
+        def factory(**kwargs):
+            opened.append(kwargs)
+            return get_connection(**kwargs)
+
+        spool = MailSpool(connections=2, connection_factory=factory)
+        for message in self._messages(3):
+            spool.send(message)
+
+        self.assertEqual(len(opened), 1)
+
+    def test_send_retriesdroppedconnection(self):
+        """
+        test that a batch is retried when the connection is dropped
+        """
+        failures = []
+
+        def factory(**kwargs):
+            connection = get_connection(**kwargs)
+            send_messages = connection.send_messages
+
+            def flaky_send_messages(messages):
+                if not failures:
+                    failures.append(1)
+                    raise SMTPServerDisconnected('dropped')
+                return send_messages(messages)
+
+            connection.send_messages = flaky_send_messages
+            return connection
+
+        spool = MailSpool(retry_delay=0, connection_factory=factory)
+
+        self.assertEqual(spool.send(*self._messages(2)), 2)
+        self.assertEqual(len(failures), 1)
+
+    def test_flush_sendsqueued(self):
+        """
+        test that queued messages are sent by flush and only once
+        """
+        spool = MailSpool()
+        spool.enqueue(*self._messages(4))
+
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(spool.flush(), 4)
+        self.assertEqual(spool.flush(), 0)
+        self.assertEqual(len(mail.outbox), 4)
+
+
+class SubscriptionCacheTest(UserTestCase):
+    """
+    Tests for the per process cache used by
+    :meth:`p_soc_auto_base.models.Subscription.get_subscription`
+    """
+    def setUp(self):
+        Subscription.clear_cache()
+        self.subscription = Subscription.objects.create(
+            subscription='Test Cache Subscription', emails_list='a@b.c',
+            from_email='a@b.c', template_dir='dir', template_name='name',
+            **self.USER_ARGS)
+
+    def tearDown(self):
+        self.subscription.delete()
+
+    def test_getsubscription_cached(self):
+        """
+        test that a cached subscription does not hit the database
+        """
+        Subscription.get_subscription('test cache subscription')
+
+        with self.assertNumQueries(0):
+            Subscription.get_subscription('Test Cache Subscription')
+
+    def test_save_invalidatescache(self):
+        """
+        test that saving a subscription invalidates the cache
+        """
+        Subscription.get_subscription('Test Cache Subscription')
+        self.subscription.email_subject = 'changed'
+        self.subscription.save()
+
+        self.assertEqual(
+            Subscription.get_subscription(
+                'Test Cache Subscription').email_subject, 'changed')
+
+
+class _FakeAlertTask:
+    """
+    stand-in for an alert `Celery` task that records its invocations
+    """
+    name = 'tests.fake_alert'
+
+    def __init__(self):
+        self.calls = []
+
+    def delay(self, *args, **kwargs):
+        self.calls.append((args, kwargs))
+
+
+@override_settings(CACHES={'default': {
+    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class CoalesceAlertTest(TestCase):
+    """
+    Tests for :func:`p_soc_auto_base.alerts.coalesce_alert`
+    """
+    def setUp(self):
+        cache.clear()
+        self.task = _FakeAlertTask()
+        patcher = mock.patch(
+            'p_soc_auto_base.tasks.dispatch_coalesced_alert.apply_async')
+        self.dispatch_digest = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_firstalert_sentimmediately(self):
+        """
+        test that the first alert for a subject is sent and a digest is
+        scheduled
+        """
+        self.assertTrue(coalesce_alert(self.task, 'bot', 1))
+        self.assertEqual(self.task.calls, [((1,), {})])
+        self.dispatch_digest.assert_called_once()
+
+    def test_repeatalerts_coalesced(self):
+        """
+        test that alerts within the window are held back for the digest and
+        that duplicates are dropped
+        """
+        for instance_pk in [1, 2, 3, 3]:
+            coalesce_alert(self.task, 'bot', instance_pk)
+
+        self.assertEqual(len(self.task.calls), 1)
+
+        _, key, generation = self.dispatch_digest.call_args[1]['args']
+        self.assertEqual(pop_coalesced(key, generation), [2, 3])
+        self.assertEqual(pop_coalesced(key, generation), [])
+
+    def test_alertafterdigest_notlost(self):
+        """
+        test that an alert that arrives after the digest was collected opens
+        a new window instead of being recorded for a digest that is never
+        sent
+        """
+        coalesce_alert(self.task, 'bot', 1)
+        _, key, generation = self.dispatch_digest.call_args[1]['args']
+        self.assertEqual(pop_coalesced(key, generation), [])
+
+        self.assertTrue(coalesce_alert(self.task, 'bot', 2))
+        self.assertEqual(self.task.calls, [((1,), {}), ((2,), {})])
+
+    def test_alertwhiledigestcollected_notlost(self):
+        """
+        test that an alert that sees the window while the digest is being
+        collected is either in the digest or sent on its own
+        """
+        coalesce_alert(self.task, 'bot', 1)
+        _, key, generation = self.dispatch_digest.call_args[1]['args']
+
+        # the digest task has sealed the window but has not retired it yet
+        cache.set(f'{key}:{generation}:closed', True)
+
+        self.assertTrue(coalesce_alert(self.task, 'bot', 2))
+        self.assertEqual(pop_coalesced(key, generation), [])
+        self.assertEqual(self.task.calls, [((1,), {}), ((2,), {})])
+
+    def test_othersubject_notcoalesced(self):
+        """
+        test that alerts about different subjects are sent separately
+        """
+        coalesce_alert(self.task, 'bot', 1)
+        coalesce_alert(self.task, 'other bot', 2)
+
+        self.assertEqual(len(self.task.calls), 2)
+
+
+@override_settings(CACHES={'default': {
+    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class MetricsTest(TestCase):
+    """
+    Tests for :mod:`p_soc_auto_base.metrics`
+    """
+    def setUp(self):
+        cache.clear()
+        self.registry = Registry(prefix='test_metrics')
+        self.counter = Counter('test_total', 'test counter',
+                               labelnames=('source',), registry=self.registry)
+        self.histogram = Histogram('test_seconds', 'test histogram',
+                                   buckets=(0.1, 1.0), registry=self.registry)
+
+    def test_render_counter(self):
+        """
+        test that counter increments are aggregated
+        """
+        self.counter.inc(source='citrix')
+        self.counter.inc(2, source='citrix')
+
+        self.assertIn('test_total{source="citrix"} 3', self.registry.render())
+
+    def test_render_histogram(self):
+        """
+        test that histogram observations end up in the right buckets
+        """
+        self.histogram.observe(0.05)
+        self.histogram.observe(0.5)
+
+        rendered = self.registry.render()
+
+        self.assertIn('test_seconds_bucket{le="0.1"} 1', rendered)
+        self.assertIn('test_seconds_bucket{le="1.0"} 2', rendered)
+        self.assertIn('test_seconds_bucket{le="+Inf"} 2', rendered)
+        self.assertIn('test_seconds_count 2', rendered)
+        self.assertIn('test_seconds_sum 0.55', rendered)
+
+    def test_render_histogramallbuckets(self):
+        """
+        test that histograms are rendered with every bucket, in increasing
+        order, including the empty ones
+        """
+        histogram = Histogram('test_sorted_seconds', 'test histogram',
+                              buckets=(10.0, 2.5, 0.5),
+                              registry=self.registry)
+        histogram.observe(5.0)
+
+        rendered = self.registry.render().splitlines()
+        start = rendered.index('# TYPE test_sorted_seconds histogram') + 1
+
+        self.assertEqual(rendered[start:start + 6], [
+            'test_sorted_seconds_bucket{le="0.5"} 0',
+            'test_sorted_seconds_bucket{le="2.5"} 0',
+            'test_sorted_seconds_bucket{le="10.0"} 1',
+            'test_sorted_seconds_bucket{le="+Inf"} 1',
+            'test_sorted_seconds_sum 5.0',
+            'test_sorted_seconds_count 1'])
+
+    def test_badlabels_raises(self):
+        """
+        test that unknown labels are rejected
+        """
+        self.assertRaises(ValueError, self.counter.inc, host='bot')
+
+    def test_flushes_keepeachothersseries(self):
+        """
+        test that processes flushing different series do not drop each
+        other's series from the index
+        """
+        other = Registry(prefix='test_metrics')
+        self.registry.add(('test_total', '', ('citrix',)), 1)
+        other.add(('test_total', '', ('exchange',)), 2)
+        other.flush()
+        self.registry.add(('test_total', '', ('citrix',)), 1)
+        self.registry.flush()
+
+        self.assertEqual(other.collect(), {
+            ('test_total', '', ('citrix',)): 2,
+            ('test_total', '', ('exchange',)): 2})
+
+    @override_settings(METRICS_FLUSH_INTERVAL=0.05)
+    def test_idle_flushed(self):
+        """
+        test that the updates of an idle process are flushed by the timer
+        """
+        self.counter.inc(source='citrix')
+        key = self.registry._cache_key(('test_total', '', ('citrix',)))
+
+        deadline = time.monotonic() + 5
+        while cache.get(key) is None and time.monotonic() < deadline:
+            time.sleep(0.05)
+
+        self.assertEqual(cache.get(key), 1)
+
+
+class QueryProfilerTest(UserTestCase):
+    """
+    Tests for :mod:`p_soc_auto_base.profiler`
+    """
+    def tearDown(self):
+        TaskQueryProfile.objects.all().delete()
+
+    def test_fingerprint_collapsesinlists(self):
+        """
+        test that queries with different IN list lengths share a fingerprint
+        """
+        self.assertEqual(
+            fingerprint('SELECT * FROM t WHERE id IN (%s, %s) LIMIT 21'),
+            fingerprint('SELECT *  FROM t WHERE id IN (%s) LIMIT 5'))
+
+    @override_settings(QUERY_PROFILER_REPEAT_THRESHOLD=3)
+    def test_save_flagsrepeatedqueries(self):
+        """
+        test that repeated queries are counted and the task run is flagged
+        """
+        profiler = QueryProfiler('tests.task').start()
+        for _ in range(3):
+            list(WindowsLog.objects.filter(log_name='Application'))
+        profile = profiler.save()
+
+        self.assertEqual(profile.query_count, 3)
+        self.assertEqual(profile.distinct_queries, 1)
+        self.assertTrue(profile.flagged)
+
+    @override_settings(QUERY_PROFILER_BASELINE_MIN_RUNS=3,
+                       QUERY_PROFILER_REGRESSION_FACTOR=2.0,
+                       QUERY_PROFILER_MAX_QUERIES=1000)
+    def test_save_flagsregressionfrombaseline(self):
+        """
+        test that a run is flagged against the baseline of its task and not
+        against the fixed limits once the task has enough profiles
+        """
+        for query_count in [1, 2, 2]:
+            TaskQueryProfile.objects.create(
+                task_name='tests.task', query_count=query_count)
+
+        profiler = QueryProfiler('tests.task').start()
+        for log_name in ['Application', 'System', 'Security', 'Setup',
+                         'Forwarded']:
+            list(WindowsLog.objects.filter(log_name=log_name))
+        profile = profiler.save()
+
+        self.assertEqual(profiler.limits()[0], 4)
+        self.assertTrue(profile.flagged)
+
+    def test_delete_query_profiles(self):
+        """
+        test that the purge task deletes only the old profiles
+        """
+        old = TaskQueryProfile.objects.create(task_name='tests.task')
+        TaskQueryProfile.objects.filter(pk=old.pk).update(
+            created_on=timezone.now() - timezone.timedelta(days=31))
+        TaskQueryProfile.objects.create(task_name='tests.task')
+
+        delete_query_profiles(days=30)
+
+        self.assertEqual(TaskQueryProfile.objects.count(), 1)
+        self.assertFalse(TaskQueryProfile.objects.filter(pk=old.pk).exists())
+
+    def test_stop_removeswrapper(self):
+        """
+        test that queries after stop are not counted
+        """
+        profiler = QueryProfiler('tests.task').start()
+        profiler.stop()
+        list(WindowsLog.objects.all())
+
+        self.assertEqual(profiler.query_count, 0)
+
+
+class BenchmarkTest(UserTestCase):
+    """
+    Tests for :mod:`p_soc_auto_base.benchmark`
+    """
+    def setUp(self):
+        super().setUp()
+        self.root = tempfile.TemporaryDirectory()
+
+        @benchmark.benchmark('tests.windows_logs')
+        def windows_logs():  # pylint: disable=unused-variable
+            list(WindowsLog.objects.filter(log_name='Application'))
+
+    def tearDown(self):
+        benchmark.BENCHMARKS.pop('tests.windows_logs', None)
+        self.root.cleanup()
+
+    def test_runbenchmarks_capturesqueriesandplans(self):
+        """
+        test that the results have timings, the query count and the plans
+        """
+        with override_settings(BENCHMARK_ROOT=self.root.name):
+            results = benchmark.run_benchmarks(
+                names=['tests.windows_logs'], repeat=2, save_baseline=True)
+
+        result = results['benchmarks']['tests.windows_logs']
+        self.assertEqual(result['query_count'], 1)
+        self.assertEqual(len(result['plans']), 1)
+        self.assertLessEqual(result['min_ms'], result['max_ms'])
+        self.assertEqual(results['regressions'], {})
+        self.assertTrue(os.path.exists(
+            os.path.join(self.root.name, benchmark.BASELINE_FILE)))
+
+    def test_compare_flagsregressions(self):
+        """
+        test that slower runs, extra queries and plan changes are flagged
+        """
+        baseline = {'bench': {
+            'median_ms': 10, 'query_count': 1,
+            'plans': {'SELECT ?': [{'table': 't', 'type': 'ref',
+                                    'key': 't_idx', 'rows': '10'}]}}}
+        current = {'bench': {
+            'median_ms': 11, 'query_count': 1,
+            'plans': {'SELECT ?': [{'table': 't', 'type': 'ref',
+                                    'key': 't_idx', 'rows': '99'}]}}}
+
+        self.assertEqual(benchmark.compare(baseline, current, 0.2), {})
+
+        current['bench'].update(
+            median_ms=13, query_count=2,
+            plans={'SELECT ?': [{'table': 't', 'type': 'ALL', 'key': None}]})
+
+        self.assertEqual(
+            len(benchmark.compare(baseline, current, 0.2)['bench']), 3)
+
+
+class IdentityMapTest(UserTestCase):
+    """
+    Tests for :mod:`p_soc_auto_base.identity`
+    """
+    def setUp(self):
+        super().setUp()
+        # the maps do not cache inside transactions and every test case
+        # runs inside one
+        patcher = mock.patch.object(
+            identity.IdentityMap, '_can_cache', return_value=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        for identity_map in identity.IDENTITY_MAPS:
+            identity_map.invalidate()
+
+    def test_get_normalizedkeyhit(self):
+        """
+        test that a second lookup with a different case runs no queries
+        """
+        log = identity.WINDOWS_LOGS.get('Application')
+
+        with self.assertNumQueries(0):
+            self.assertEqual(identity.WINDOWS_LOGS.get(' application '), log)
+
+    def test_get_unknownsourcecached(self):
+        """
+        test that unknown event sources are cached until one is created
+        """
+        with self.assertRaises(AllowedEventSource.DoesNotExist):
+            identity.EVENT_SOURCES.get('Not A Source')
+
+        with self.assertNumQueries(0):
+            self.assertIsNone(
+                identity.EVENT_SOURCES.get_or_none('Not A Source'))
+
+        source = AllowedEventSource.objects.create(
+            source_name='Not A Source', **self.USER_ARGS)
+
+        self.assertEqual(identity.EVENT_SOURCES.get('not a source'), source)
+
+    def test_save_invalidates(self):
+        """
+        test that saving an instance removes it from the map
+        """
+        host = WinlogbeatHost.objects.create(
+            host_name='identity-host', **self.USER_ARGS)
+        identity.HOSTS.get('identity-host')
+
+        host.host_name = 'renamed-host'
+        host.save()
+
+        self.assertIsNone(identity.HOSTS.get_or_none('identity-host'))
+        self.assertEqual(identity.HOSTS.get('renamed-host').pk, host.pk)
+
+    def test_save_othermodel_notinvalidated(self):
+        """
+        test that saving a model without an identity map does not reach the
+        identity maps
+        """
+        with mock.patch.object(identity, 'invalidate') as invalidate:
+            TaskQueryProfile.objects.create(task_name='tests.task')
+
+        invalidate.assert_not_called()
+
+
+class CompressedTextFieldTest(UserTestCase):
+    """
+    Tests for :class:`p_soc_auto_base.fields.CompressedTextField`
+    """
+    LONG_TEXT = 'Failure details: a timeout was reached.\n' * 50
+
+    def setUp(self):
+        # the receiver calls the Orion server and expects older events
+        disconnect_receiver(
+            self, post_save, orion_update_citrix_error, WinlogEvent)
+        self.event = WinlogEvent.objects.create(
+            source_host=WinlogbeatHost.objects.first(), record_number=0,
+            event_source=AllowedEventSource.objects.first(),
+            windows_log=WindowsLog.objects.first(),
+            raw_message=self.LONG_TEXT, failure_details='short',
+            timestamp=timezone.now(), **self.USER_ARGS)
+
+    def test_compress_round_trip(self):
+        stored = fields.compress(self.LONG_TEXT)
+        self.assertTrue(stored.startswith(fields.MAGIC))
+        self.assertLess(len(stored), len(self.LONG_TEXT))
+        self.assertEqual(fields.decompress(stored), self.LONG_TEXT)
+
+    def test_short_values_are_not_compressed(self):
+        self.assertEqual(fields.compress('short'), b'short')
+        self.assertEqual(fields.decompress(b'short'), 'short')
+
+    def test_instance_values(self):
+        event = WinlogEvent.objects.get(pk=self.event.pk)
+        self.assertEqual(event.raw_message, self.LONG_TEXT)
+        self.assertEqual(event.failure_details, 'short')
+
+    def test_values_and_exact_lookup(self):
+        raw_message = WinlogEvent.objects.values_list(
+            'raw_message', flat=True).get(pk=self.event.pk)
+        self.assertIs(type(raw_message), str)
+        self.assertEqual(raw_message, self.LONG_TEXT)
+        self.assertEqual(
+            WinlogEvent.objects.values('failure_details').get(
+                pk=self.event.pk),
+            {'failure_details': 'short'})
+        self.assertTrue(WinlogEvent.objects.filter(
+            pk=self.event.pk, raw_message=self.LONG_TEXT).exists())
+
+    def test_save_without_access(self):
+        event = WinlogEvent.objects.get(pk=self.event.pk)
+        event.save()
+        self.assertEqual(
+            WinlogEvent.objects.get(pk=self.event.pk).raw_message,
+            self.LONG_TEXT)
+
+    def test_rewrite_is_idempotent(self):
+        self.assertEqual(fields.rewrite_compressed_columns(
+            WinlogEvent, ['raw_message', 'failure_details']), 0)
+        self.assertGreater(fields.rewrite_compressed_columns(
+            WinlogEvent, ['raw_message'], to_compressed=False), 0)
+        self.assertGreater(fields.rewrite_compressed_columns(
+            WinlogEvent, ['raw_message']), 0)
+        self.assertEqual(
+            WinlogEvent.objects.get(pk=self.event.pk).raw_message,
+            self.LONG_TEXT)
+
+
+@override_settings(CACHES={'default': {
+    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class ChangeListTest(UserTestCase):
+    """
+    Tests for :mod:`p_soc_auto_base.changelist`
+    """
+    def setUp(self):
+        # the receiver calls the Orion server and expects older events
+        disconnect_receiver(
+            self, post_save, orion_update_citrix_error, WinlogEvent)
+        for _ in range(5):
+            WinlogEvent.objects.create(
+                source_host=WinlogbeatHost.objects.first(), record_number=0,
+                event_source=AllowedEventSource.objects.first(),
+                windows_log=WindowsLog.objects.first(),
+                event_state='failed', timestamp=timezone.now(),
+                **self.USER_ARGS)
+
+        self.model_admin = admin.site._registry[WinlogEvent]
+        self.model_admin.list_per_page = 2
+        self.client.force_login(get_user_model().objects.create_superuser(
+            'changelist_admin', 'admin@example.com', 'password'))
+        self.url = reverse('admin:citrus_borg_winlogevent_changelist')
+
+    def tearDown(self):
+        self.model_admin.list_per_page = type(self.model_admin).list_per_page
+        cache.clear()
+
+    @override_settings(ADMIN_EXACT_COUNT_LIMIT=3)
+    def test_bounded_count(self):
+        paginator = EstimatedCountPaginator(
+            WinlogEvent.objects.filter(event_state='failed'), 2)
+        self.assertEqual(paginator.count, 3)
+
+    def test_keyset_pages(self):
+        seen = []
+        url = self.url
+        while url:
+            response = self.client.get(
+                url if url.startswith('/') else self.url + url)
+            self.assertEqual(response.status_code, 200)
+            changelist = response.context['cl']
+            seen.extend(event.pk for event in changelist.result_list)
+            url = changelist.next_page_url
+
+        self.assertEqual(
+            seen, list(WinlogEvent.objects.order_by(
+                '-created_on', '-pk').values_list('pk', flat=True)))
+
+    def test_bad_cursor(self):
+        response = self.client.get(self.url, {'after': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 302)
+
+
+@override_settings(CACHES={'default': {
+    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class HealthSnapshotTest(TestCase):
+    """
+    Tests for :mod:`p_soc_auto_base.health` and
+    :func:`p_soc_auto_base.views.health`
+    """
+    def setUp(self):
+        self.dead_bots = [{'host_name': 'bot-01', 'site__site': 'site'}]
+
+        def failing():
+            raise ValueError('no data')
+
+        self.sections = mock.patch.dict(
+            health.SECTIONS, {'dead_bots': lambda: list(self.dead_bots),
+                              'ldap_errors': failing}, clear=True)
+        self.sections.start()
+        self.url = reverse('health')
+
+    def tearDown(self):
+        self.sections.stop()
+        cache.clear()
+
+    def test_snapshot(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.has_header('ETag'))
+
+        sections = response.json()['sections']
+        self.assertEqual(sections['dead_bots'],
+                         {'count': 1, 'items': self.dead_bots})
+        self.assertEqual(sections['ldap_errors'], {'error': 'no data'})
+
+    def test_if_none_match(self):
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_snapshot_readonce(self):
+        """
+        test that the ETag and the body come from one read of the snapshot
+        """
+        with mock.patch('p_soc_auto_base.views.get_snapshot',
+                        wraps=health.get_snapshot) as get_snapshot:
+            response = self.client.get(self.url)
+
+        get_snapshot.assert_called_once_with()
+        self.assertEqual(response.status_code, 200)
+
+    def test_served_from_cache(self):
+        etag = self.client.get(self.url)['ETag']
+        self.dead_bots.append({'host_name': 'bot-02', 'site__site': 'site'})
+        self.assertEqual(self.client.get(self.url)['ETag'], etag)
+
+        health.refresh_snapshot()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+
+@override_settings(CACHES={'default': {
+    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class DashboardTest(TestCase):
+    """
+    Tests for :mod:`p_soc_auto_base.dashboard`
+    """
+    def setUp(self):
+        def failing():
+            raise ValueError('no data')
+
+        self.summaries = mock.patch.object(dashboard, 'SUMMARIES', [
+            ('Dead Citrix bots',
+             'admin:citrus_borg_winlogbeathostnotseen_changelist', lambda: 3),
+            ('Dead Exchange sites',
+             'admin:mail_collector_mailsite_changelist', failing),
+        ])
+        self.summaries.start()
+
+    def tearDown(self):
+        self.summaries.stop()
+        cache.clear()
+
+    def test_refresh_summary(self):
+        dashboard.refresh_summary()
+        titles = [link['title']
+                  for link in cache.get(dashboard.SUMMARY_KEY)['children']]
+        self.assertEqual(titles, ['Dead Citrix bots: 3',
+                                  'Dead Exchange sites: not available'])
+
+    def test_alert_summaries_need_orion_flash(self):
+        """
+        test that the pending `Orion` alerts are left out of the summary if
+        the `orion_flash` application is not installed
+        """
+        with mock.patch.object(
+                dashboard.apps, 'is_installed', return_value=False):
+            self.assertEqual(dashboard.summaries(), dashboard.SUMMARIES)
+
+        with mock.patch.object(
+                dashboard.apps, 'is_installed', return_value=True):
+            self.assertEqual(
+                dashboard.summaries(),
+                dashboard.SUMMARIES + dashboard.ALERT_SUMMARIES)
+
+    @mock.patch('p_soc_auto_base.dashboard.current_app')
+    def test_cold_cache_does_not_block(self, app):
+        with mock.patch.object(dashboard, 'refresh_summary') as refresh:
+            self.assertIsNone(dashboard.get_summary())
+            self.assertIsNone(dashboard.get_summary())
+            refresh.assert_not_called()
+
+        # the refresh is requested once for both tasks
+        self.assertEqual(app.send_task.call_count, 2)
+
+        dashboard.refresh_summary()
+        self.assertEqual(len(dashboard.get_summary()['children']), 2)
+
+    @override_settings(DASHBOARD_FEED_URL=None)
+    def test_no_feed(self):
+        with mock.patch('p_soc_auto_base.dashboard.requests.get') as get:
+            self.assertIsNone(dashboard.refresh_feed())
+            get.assert_not_called()
+
+    @override_settings(DASHBOARD_FEED_URL='http://feed.example.com/rss/')
+    def test_feed_timeout_keeps_entries(self):
+        previous = {'generated_on': timezone.now(), 'children': []}
+        cache.set(dashboard.FEED_KEY, previous)
+        with mock.patch('p_soc_auto_base.dashboard.requests.get',
+                        side_effect=dashboard.requests.Timeout) as get:
+            self.assertIsNone(dashboard.refresh_feed())
+
+        self.assertEqual(get.call_args[1]['timeout'], 5)
+        self.assertEqual(dashboard.get_feed(), previous)
+
+
+class StartupTest(TestCase):
+    """
+    Tests for the import time behaviour checked by
+    :mod:`p_soc_auto_base.startup`
+
+    The startup time itself is measured by the `process_startup`
+    benchmark in :mod:`p_soc_auto_base.benchmarks`.
+    """
+    MODULES = (
+        'citrus_borg.locutus.communication',
+        'orion_flash.api',
+        'orion_flash.orion.api',
+        'orion_integration.lib',
+    )
+    """the modules that used to read dynamic preferences when imported"""
+
+    def test_import_runsnoqueries(self):
+        """
+        test that running the module level code of the modules that used to
+        read dynamic preferences does not query the database
+        """
+        for module in self.MODULES:
+            with self.subTest(module=module):
+                with CaptureQueriesContext(connection) as queries:
+                    # runs the module code without replacing the module
+                    # that is already imported
+                    runpy.run_module(module)
+
+                self.assertEqual(queries.captured_queries, [])
+
+
+@override_settings(CACHES={'default': {
+    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class PreloadTest(TestCase):
+    """
+    Tests for :mod:`p_soc_auto_base.preload`
+    """
+    def tearDown(self):
+        clear_preference_snapshot()
+        cache.clear()
+
+    def test_preload_preferences(self):
+        """
+        test that the preferences are read from memory after the preload
+        """
+        cache.clear()
+        preload(close_connections=False)
+
+        cache.clear()
+        with self.assertNumQueries(0):
+            get_cached_preference('citrusborgux__ux_alert_threshold')
+
+    def expire_snapshot(self):
+        """
+        make the preloaded preferences look like they were loaded longer
+        than the cache timeout ago
+        """
+        for key, (value, _) in list(_SNAPSHOT.items()):
+            _SNAPSHOT[key] = (value, 0)
+
+    def test_pool_process_renewsexpiredsnapshot(self):
+        """
+        test that a pool process forked after the snapshot expired renews it
+        from the cache and reads the preferences from memory
+        """
+        preload(close_connections=False)
+        self.expire_snapshot()
+
+        with self.assertNumQueries(0):
+            self.assertGreater(preload_pool_process(), 0)
+
+        cache.clear()
+        with self.assertNumQueries(0):
+            get_cached_preference('citrusborgux__ux_alert_threshold')
+
+    def test_pool_process_reloadsevictedsnapshot(self):
+        """
+        test that a pool process loads the preferences again if they are no
+        longer in the cache
+        """
+        preload(close_connections=False)
+        self.expire_snapshot()
+        cache.clear()
+
+        with self.assertNumQueries(1):
+            preload_pool_process()
+
+        with self.assertNumQueries(0):
+            get_cached_preference('citrusborgux__ux_alert_threshold')
+
+    def test_project_templates(self):
+        """
+        test that only the templates of the project applications are
+        preloaded
+        """
+        templates = project_templates()
+        self.assertIn('admin/keyset_change_list.html', templates)
+        self.assertNotIn('admin/base.html', templates)
@@ -0,0 +1,21 @@
+"""
+p_soc_auto_base.urls
+--------------------
+
+URL mappings for functionality shared across the :ref:`SOC Automation Server`
+
+:copyright:
+
+    Copyright 2018 - 2020 Provincial Health Service Authority
+    of British Columbia
+
+:contact:    daniel.busto@phsa.ca
+"""
+from django.urls import path
+
+from p_soc_auto_base import views
+
+urlpatterns = [
+    path(r'metrics/', views.metrics, name='metrics'),
+    path(r'health/', views.health, name='health'),
+]
@@ -18,6 +18,7 @@ This module contains utility `Python` classes and functions used by the
 """
 import decimal
 import datetime
+import functools
 import ipaddress
 import socket
 import time
@@ -67,6 +68,20 @@ def show_milliseconds(seconds):
     return humanfriendly.format_timespan(float(seconds), detailed=True)
 
 
+@functools.lru_cache(maxsize=None)
+def get_fqdn():
+    """
+    :returns: the fully qualified domain name of the host running this
+        process as returned by :meth:`socket.getfqdn`
+
+    The value is looked up only once per process. :meth:`socket.getfqdn`
+    can be slow because it may require a `DNS` round trip and it is
+    called for every email message and for every `URL` annotated
+    `queryset`.
+    """
+    return socket.getfqdn()
+
+
 @mark_safe
 def get_absolute_admin_change_url(
         admin_view, obj_pk, obj_anchor_name=None, root_url=None):
@@ -89,12 +104,12 @@ def get_absolute_admin_change_url(
         It is supposed to look something like
         '<a href="http://server:port/'. If this argument is set to `None`,
         it will be populated from specific `Django` settings and the
-        value returned by :meth:`socket.getfqdn`
+        value returned by :func:`get_fqdn`
 
     """
     if root_url is None:
         root_url = (
-            f'<a href="{settings.SERVER_PROTO}://{socket.getfqdn()}:'
+            f'<a href="{settings.SERVER_PROTO}://{get_fqdn()}:'
             f'{settings.SERVER_PORT}/')
 
     if obj_anchor_name is None:
@@ -325,7 +340,7 @@ def url_annotate(queryset):
     return queryset.annotate(url_id=Cast(obj_sample.pk.name, TextField())).\
         annotate(url=Concat(
             Value(settings.SERVER_PROTO), Value('://'),
-            Value(socket.getfqdn()),
+            Value(get_fqdn()),
             Value(':'), Value(settings.SERVER_PORT),
             Value('/admin/'),
             Value(obj_sample.app_label), Value(
@@ -400,7 +415,7 @@ def details_url_annotate(
     try:
         return queryset.annotate(details_url=Concat(
             Value(settings.SERVER_PROTO), Value('://'),
-            Value(socket.getfqdn()),
+            Value(get_fqdn()),
             Value(':'), Value(settings.SERVER_PORT),
             Value('/admin/'),
             Value(app_path), Value(
@@ -0,0 +1,69 @@
+"""
+p_soc_auto_base.views
+---------------------
+
+This module contains the `Django` views for functionality shared across the
+:ref:`SOC Automation Server`.
+
+:copyright:
+
+    Copyright 2018 - 2020 Provincial Health Service Authority
+    of British Columbia
+
+:contact:    daniel.busto@phsa.ca
+"""
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
+from django.views.decorators.http import require_GET
+
+from p_soc_auto_base.health import get_snapshot
+from p_soc_auto_base.metrics import REGISTRY
+
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+@require_GET
+def metrics(request):  # pylint: disable=unused-argument
+    """
+    expose the metrics in :attr:`p_soc_auto_base.metrics.REGISTRY` in the
+    `Prometheus text format
+    <https://prometheus.io/docs/instrumenting/exposition_formats/>`__
+    """
+    return HttpResponse(REGISTRY.render(),
+                        content_type=PROMETHEUS_CONTENT_TYPE)
+
+
+@require_GET
+def health(request):
+    """
+    serve the live health snapshot from :mod:`p_soc_auto_base.health` as
+    `JSON`
+
+    The response carries an `ETag`; requests with a matching
+    `If-None-Match` header get an empty `304 Not Modified` response.
+    If the snapshot is being built for the first time, the response is a
+    `503 Service Unavailable` with a `Retry-After` header.
+
+    The snapshot is read once; the `ETag` and the body come from the same
+    snapshot.
+    """
+    snapshot = get_snapshot()
+    if snapshot is None:
+        response = HttpResponse(status=503)
+        response['Retry-After'] = settings.HEALTH_RETRY_AFTER
+        return response
+
+    etag = quote_etag(snapshot['etag'])
+
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(snapshot['body'],
+                                content_type='application/json')
+
+    response['ETag'] = etag
+    patch_cache_control(response, max_age=settings.HEALTH_RETRY_AFTER)
+
+    return response
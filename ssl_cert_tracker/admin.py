@@ -18,10 +18,16 @@ See `The Django admin site
 """
 from django.contrib import admin
 from django.contrib.auth import get_user_model
+from django.db.models import OuterRef, Subquery
+from django.urls import reverse
+from django.utils.safestring import mark_safe
 from django.utils.translation import gettext_lazy as _
 from rangefilter.filter import DateTimeRangeFilter
 
+from citrus_borg.dynamic_preferences_registry import get_preference
+from orion_integration.models import OrionNode
 from p_soc_auto_base.admin import BaseAdmin
+from p_soc_auto_base.changelist import ComputedColumnsMixin
 
 from .models import (ExternalSslNode, SslExpiresIn, SslHasExpired,
                      SslNotYetValid, SslCertificate, SslCertificateIssuer,
@@ -107,12 +113,26 @@ class SSLCertTrackerBaseAdmin(BaseAdmin, admin.ModelAdmin):
         return self.readonly_fields
 
 
+def _orion_node_column(column):
+    return Subquery(OrionNode.objects.filter(
+        orion_id=OuterRef('orion_id')).values(column)[:1])
+
+
 @admin.register(SslCertificate)
-class SslCertificateAdmin(SSLCertTrackerBaseAdmin, admin.ModelAdmin):
+class SslCertificateAdmin(
+        ComputedColumnsMixin, SSLCertTrackerBaseAdmin, admin.ModelAdmin):
     """
     :class:`django.contrib.admin.ModelAdmin` class for the
     :class:`ssl_cert_tracker.models.SslCertificate` model
     """
+    list_annotations = {
+        'orion_node_pk': _orion_node_column('id'),
+        'orion_node_caption': _orion_node_column('node_caption'),
+        'orion_node_details_url': _orion_node_column('details_url'),
+        'external_node_address': Subquery(ExternalSslNode.active.filter(
+            id=OuterRef('external_node_id')).values('address')[:1]),
+    }
+    list_select_related = ('issuer', 'port', )
     list_display = ['common_name', 'organization_name',
                     'country_name', 'enabled', 'is_trusted', 'port',
                     'pk_bits', 'node_admin_url',
@@ -172,6 +192,42 @@ class SslCertificateAdmin(SSLCertTrackerBaseAdmin, admin.ModelAdmin):
         return obj.issuer.is_trusted
     is_trusted.format_short_description = _('Is Trusted?')
 
+    @mark_safe
+    def node_admin_url(self, obj):
+        """
+        calculated display for
+        :attr:`ssl_cert_tracker.models.SslCertificate.node_admin_url`
+        using the annotations instead of one query per row
+        """
+        if obj.orion_node_pk is not None:
+            return '<a href="%s">%s on django</>' % (
+                reverse('admin:orion_integration_orionnode_change',
+                        args=(obj.orion_node_pk,)), obj.orion_node_caption)
+
+        if obj.external_node_address is not None:
+            return '<a href="%s">%s on django</>' % (
+                reverse('admin:ssl_cert_tracker_externalsslnode_change',
+                        args=(obj.external_node_id,)),
+                obj.external_node_address)
+
+        return 'acquired outside the Orion infrastructure'
+    node_admin_url.short_description = _('node admin url')
+
+    @mark_safe
+    def orion_node_url(self, obj):
+        """
+        calculated display for
+        :attr:`ssl_cert_tracker.models.SslCertificate.orion_node_url`
+        using the annotations instead of one query per row
+        """
+        if obj.orion_node_pk is not None:
+            return '<a href="%s%s">%s on Orion</>' % (
+                get_preference('orionserverconn__orion_server_url'),
+                obj.orion_node_details_url, obj.orion_node_caption)
+
+        return 'acquired outside the Orion infrastructure'
+    orion_node_url.short_description = _('orion node url')
+
 
 @admin.register(SslCertificateIssuer)
 class SslCertificateIssuerAdmin(SSLCertTrackerBaseAdmin, admin.ModelAdmin):
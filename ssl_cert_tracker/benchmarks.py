@@ -0,0 +1,63 @@
+"""
+ssl_cert_tracker.benchmarks
+---------------------------
+
+Query benchmarks for the :ref:`SSL Certificate Tracker Application`
+
+See :mod:`p_soc_auto_base.benchmark`. The `NMAP` report parser benchmarks
+run on the sample report multiplied
+:attr:`ssl_cert_tracker.nmap_xml.BENCHMARK_COPIES` times.
+
+:copyright:
+
+    Copyright 2018 - 2020 Provincial Health Service Authority
+    of British Columbia
+
+:contact:    daniel.busto@phsa.ca
+"""
+from p_soc_auto_base.benchmark import benchmark
+from ssl_cert_tracker.lib import expires_in, has_expired, is_not_yet_valid
+from ssl_cert_tracker.nmap_xml import (
+    count_libnmap, count_stream, synthetic_report,
+)
+
+
+@benchmark()
+def certificates_expiring():
+    """
+    the query behind the `SSL` certificate expiry alerts
+    """
+    list(expires_in(lt_days=30))
+
+
+@benchmark()
+def certificates_expired():
+    """
+    the query behind the expired `SSL` certificate alerts
+    """
+    list(has_expired())
+
+
+@benchmark()
+def certificates_not_yet_valid():
+    """
+    the query behind the not yet valid `SSL` certificate alerts
+    """
+    list(is_not_yet_valid())
+
+
+@benchmark()
+def nmap_report_stream():
+    """
+    parse an `ssl-cert` report with
+    :func:`ssl_cert_tracker.nmap_xml.iter_ssl_certs`
+    """
+    count_stream(synthetic_report())
+
+
+@benchmark()
+def nmap_report_libnmap():
+    """
+    parse an `ssl-cert` report with :meth:`libnmap.parser.NmapParser.parse`
+    """
+    count_libnmap(synthetic_report())
@@ -11,15 +11,15 @@ application.
 
 :copyright:
 
-    Copyright 2018 - 2019 Provincial Health Service Authority
+    Copyright 2018 - 2020 Provincial Health Service Authority
     of British Columbia
 
 :contact:    daniel.busto@phsa.ca
 
 """
+import datetime
 from enum import Enum
 from logging import getLogger
-import socket
 
 from django.conf import settings
 from django.db.models import (
@@ -104,6 +104,44 @@ validity and expiration dates. The possible cases are:
 """
 
 
+def state_field(now=None):
+    """
+    :returns: the :attr:`STATE_FIELD` `SQL CASE` for a given moment
+
+        :attr:`STATE_FIELD` compares the `SSL` certificate dates with the
+        moment when this module was imported. This function must be used
+        instead when the state is needed at query time.
+
+    :arg datetime.datetime now: the moment, by default the current time
+    """
+    now = now or timezone.now()
+
+    return Case(
+        When(not_after__lt=now, then=Value(State.EXPIRED)),
+        When(not_before__gt=now, then=Value(State.NOT_YET_VALID)),
+        default=Value(State.VALID), output_field=CharField())
+
+
+def day_boundary(days, now=None):
+    """
+    :returns: the start of the `UTC` day that is `days` days after the
+        current day
+
+        `DATEDIFF(not_after, NOW()) < days` is true exactly when
+        `not_after` is earlier than this moment. Filtering on the raw column
+        lets the database use the index on the column.
+    :rtype: datetime.datetime
+
+    :arg int days: the number of days
+
+    :arg datetime.datetime now: the moment, by default the current time
+    """
+    today = (now or timezone.now()).astimezone(datetime.timezone.utc).replace(
+        hour=0, minute=0, second=0, microsecond=0)
+
+    return today + datetime.timedelta(days=days)
+
+
 class DateDiff(Func):  # pylint: disable=abstract-method
     """
     Subclass of the `Django` :class:`django.db.models.Func` class; used as a
@@ -189,7 +227,7 @@ def get_ssl_base_queryset(app_label, model_name, url_annotate=True,
             annotate(url_issuer_id=Cast('issuer__id', TextField())).\
             annotate(url_issuer=Concat(
                 Value(settings.SERVER_PROTO), Value('://'),
-                Value(socket.getfqdn()),
+                Value(utils.get_fqdn()),
                 Value(':'), Value(settings.SERVER_PORT),
                 Value('/admin/'),
                 Value(app_label), Value('/sslcertificateissuer/'),
@@ -232,7 +270,8 @@ def expires_in(app_label='ssl_cert_tracker', model_name='sslcertificate',
           :class:`django.db.models.BigIntegerField` field named
           `expires_in_x_days`
 
-        * ordered ascending on the `expires_in_x_days` field
+        * ordered ascending on the `not_after` field, i.e. on the
+          `expires_in_x_days` field
 
     :arg str app_label:
 
@@ -245,14 +284,19 @@ def expires_in(app_label='ssl_cert_tracker', model_name='sslcertificate',
 
         If less than 2, set to 2.
 
+    All the filters compare the `not_before` and `not_after` columns with
+    moments computed before the query is sent, see :func:`day_boundary`.
+    The day counts are only computed for display.
     """
     if lt_days and lt_days < 2:
         LOG.warning('expiring in less than 2 days is not supported.'
                     ' resetting lt_days=%s to 2', lt_days)
         lt_days = 2
 
+    now = timezone.now()
     queryset = get_ssl_base_queryset(app_label, model_name).\
-        annotate(state=STATE_FIELD).filter(state=State.VALID).\
+        filter(not_before__lte=now, not_after__gte=now).\
+        annotate(state=state_field(now)).\
         annotate(mysql_now=Now()).\
         annotate(expires_in=DateDiff(F('not_after'), F('mysql_now'))).\
         annotate(expires_in_x_days=Cast('expires_in', BigIntegerField()))
@@ -267,9 +311,9 @@ def expires_in(app_label='ssl_cert_tracker', model_name='sslcertificate',
                     'SSL Certificate will expire in less than ', TextField()),
                 F('expires_in_less_than_cast'),
                 Value(' days', TextField()), output_field=TextField())).\
-            filter(expires_in_x_days__lt=lt_days)
+            filter(not_after__lt=day_boundary(lt_days, now))
 
-    queryset = queryset.order_by('expires_in_x_days')
+    queryset = queryset.order_by('not_after')
 
     return queryset
 
@@ -296,10 +340,12 @@ def has_expired(app_label='ssl_cert_tracker', model_name='sslcertificate'):
           :class:`django.db.models.BigIntegerField` field named
           `has_expired_x_days_ago`
 
-        * ordered descending on the `has_expired_x_days_ago` field
+        * ordered ascending on the `not_after` field, i.e. descending on the
+          `has_expired_x_days_ago` field
     """
+    now = timezone.now()
     queryset = get_ssl_base_queryset(app_label, model_name).\
-        annotate(state=STATE_FIELD).filter(state=State.EXPIRED).\
+        filter(not_after__lt=now).annotate(state=state_field(now)).\
         annotate(mysql_now=Now()).\
         annotate(has_expired_x_days_ago=DateDiff(F('mysql_now'),
                                                  F('not_after'))).\
@@ -309,7 +355,7 @@ def has_expired(app_label='ssl_cert_tracker', model_name='sslcertificate'):
             Value('SSL Certificate has expired ', TextField()),
             F('has_expired_x_days_ago_cast'),
             Value(' days ago', TextField()), output_field=TextField())).\
-        order_by('-has_expired_x_days_ago')
+        order_by('not_after')
 
     return queryset
 
@@ -337,10 +383,13 @@ def is_not_yet_valid(
           :class:`django.db.models.BigIntegerField` field named
           'will_become_valid_in_x_days'
 
-        * ordered descending on the 'will_become_valid_in_x_days' field
+        * ordered descending on the `not_before` field, i.e. on the
+          'will_become_valid_in_x_days' field
     """
+    now = timezone.now()
     queryset = get_ssl_base_queryset(app_label, model_name).\
-        annotate(state=STATE_FIELD).filter(state=State.NOT_YET_VALID).\
+        filter(not_before__gt=now, not_after__gte=now).\
+        annotate(state=state_field(now)).\
         annotate(mysql_now=Now()).\
         annotate(will_become_valid_in_x_days=DateDiff(
             F('not_before'), F('mysql_now'))).\
@@ -350,7 +399,7 @@ def is_not_yet_valid(
             Value('SSL Certificate will become valid in ', TextField()),
             F('will_become_valid_in_x_days_cast'),
             Value(' days', TextField()), output_field=TextField())).\
-        order_by('-will_become_valid_in_x_days')
+        order_by('-not_before')
 
     return queryset
 
@@ -0,0 +1,21 @@
+# Generated by Django 2.2.6 on 2020-07-28 11:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ssl_cert_tracker', '0016_sslcertificate_external_node_id'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='sslcertificate',
+            index=models.Index(fields=['enabled', 'not_after'], name='sslcertificate_expiry_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sslcertificate',
+            index=models.Index(fields=['enabled', 'not_before'], name='sslcertificate_validity_idx'),
+        ),
+    ]
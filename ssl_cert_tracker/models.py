@@ -441,6 +441,12 @@ class SslCertificate(SslCertificateBase, models.Model):
         verbose_name = _('SSL Certificate')
         verbose_name_plural = _('SSL Certificates')
         unique_together = (('orion_id', 'port'),)
+        indexes = [
+            models.Index(fields=['enabled', 'not_after'],
+                         name='sslcertificate_expiry_idx'),
+            models.Index(fields=['enabled', 'not_before'],
+                         name='sslcertificate_validity_idx'),
+        ]
 
 
 class SslExpiresIn(SslCertificate):
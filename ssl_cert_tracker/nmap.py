@@ -24,7 +24,13 @@ the `libnmap` package is available at
 """
 import csv
 import logging
+import os
 import socket
+import time
+from concurrent.futures import (
+    ProcessPoolExecutor, ThreadPoolExecutor, as_completed,
+)
+from contextlib import ExitStack
 
 from django.conf import settings
 
@@ -81,6 +87,13 @@ class NmapTooManyHostsError(Exception):
     """
 
 
+class NmapTimeoutError(Exception):
+    """
+    Custom :exc:`Exception` class raised if the `NMAP <https://nmap.org/>`__
+    scan does not finish within the timeout of the :class:`NmapProbe`
+    """
+
+
 class NmapNotAnSslNodeError(Exception):
     """
     Custom :exc:`Exception` class raised if the `NMAP <https://nmap.org/>`__
@@ -96,7 +109,12 @@ class NmapProbe:
     Note that, unlike other base classes, this class can be used on its own.
     """
 
-    def __init__(self, address=None, opts=None):
+    poll_interval = 0.1
+    """
+    how often, in seconds, a scan with a timeout is checked for completion
+    """
+
+    def __init__(self, address=None, opts=None, timeout=None):
         """
         :class:`NmapProbe` constructor
 
@@ -111,7 +129,9 @@ class NmapProbe:
             <https://nmap.org/book/man-briefoptions.html>`__ if curiosity
             overwhelms you (but remember how the cat died).
 
-        :arg `logging.Logger` logger: the logging object
+        :arg float timeout: stop the scan and raise :exc:`NmapTimeoutError`
+            if it takes longer than this many seconds; by default, the scan
+            runs until `NMAP` is done
 
         :raises: :exc:`NmapTargetError`
 
@@ -128,6 +148,9 @@ class NmapProbe:
         self._opts = opts
         """the options for the `NMAP` scan"""
 
+        self._timeout = timeout
+        """the timeout of the `NMAP` scan"""
+
         self.nmap_data = self.probe_node()
         """
         :class:`libnmap.objects.report.NmapReport` instance with the data
@@ -144,16 +167,32 @@ class NmapProbe:
             The :class:`libnmap.objects.report.NmapReport` instance is created
             by calling :meth:`libnmap.parser.NmapParser.parse`
 
-        :raises: :exc:`NmapError` if the `NMAP <https://nmap.org/>`__ scan
+        :raises:
+
+            :exc:`NmapError` if the `NMAP <https://nmap.org/>`__ scan
             returns anything on `stderr`
 
+            :exc:`NmapTimeoutError` if the scan takes longer than the
+            timeout
+
         """
         LOG.debug(
             'nmap probe with target %s and options %s',
             self._address, self._opts)
 
         nmap_task = NmapProcess(self._address, options=self._opts)
-        nmap_task.run()
+        if self._timeout is None:
+            nmap_task.run()
+        else:
+            deadline = time.monotonic() + self._timeout
+            nmap_task.run_background()
+            while nmap_task.is_running():
+                if time.monotonic() > deadline:
+                    nmap_task.stop()
+                    raise NmapTimeoutError(
+                        f'the nmap probe to node {self._address} did not'
+                        f' finish in {self._timeout} seconds')
+                time.sleep(self.poll_interval)
 
         if nmap_task.stderr and 'warning' not in nmap_task.stderr.lower():
             raise NmapError(nmap_task.stderr)
@@ -274,53 +313,20 @@ class NmapProbe:
         return self.service.reason
 
 
-class SslProbe(NmapProbe):
+class SslCertificateData:
     """
-    :class:`NmapProbe` child class specialized in `NMAP <https://nmap.org/>`__
-    `SSL server certificate
+    mixin with the properties of an `SSL server certificate
     <https://en.wikipedia.org/wiki/Public_key_certificate#TLS/SSL_server_certificate>`__
-    scans
-
-    .. todo::
+    collected by an `NMAP <https://nmap.org/>`__ `ssl-cert` scan
 
-        Both :attr:`p_soc_auto.settings.SSL_PROBE_OPTIONS` and
-        :attr:`p_soc_auto.settings.SSLDEFAULT_PORT` need to be extended with
-        `dynamic preferences` and the :meth:`constructor <__init__>` of this
-        class needs to use said `dynamic preference` when initializing.
+    The classes using this mixin must provide the `ssl_data` attribute with
+    the elements of the `ssl-cert` script output, as parsed by
+    :meth:`libnmap.parser.NmapParser.parse`.
 
     See :class:`ssl_cert_tracker.models.SslCertificate` for detailed
     descriptions of the properties in this class.
     """
-
-    def __init__(
-            self, address=None, port=settings.SSL_DEFAULT_PORT):
-        """
-        :arg str address: the DNS name or the IP address of the host that
-            will be probed for an `SSL server certificate
-            <https://en.wikipedia.org/wiki/Public_key_certificate#TLS/SSL_server_certificate>`__
-
-        :arg int port: the network port that will be probed for an `SSL
-            server certificate
-            <https://en.wikipedia.org/wiki/Public_key_certificate#TLS/SSL_server_certificate>`__
-        """
-        opts = r'{}'.format(settings.SSL_PROBE_OPTIONS % port)
-
-        super().__init__(address, opts)
-
-        self.ssl_data = self.get_ssl_data()
-
-    def get_ssl_data(self):
-        """
-        :returns: the SSL certificate data
-        :rtype: dict
-
-        :raises: :exc:`NmapNotAnSslNodeError`
-        """
-        try:
-            return self.service.scripts_results[0].get('elements', None)
-        except IndexError:
-            raise NmapNotAnSslNodeError('node {} is not an SSL node'.
-                                        format(self._address))
+    __slots__ = ()
 
     @property
     def ssl_subject(self):
@@ -404,6 +410,57 @@ class SslProbe(NmapProbe):
             ))
 
 
+class SslProbe(SslCertificateData, NmapProbe):
+    """
+    :class:`NmapProbe` child class specialized in `NMAP <https://nmap.org/>`__
+    `SSL server certificate
+    <https://en.wikipedia.org/wiki/Public_key_certificate#TLS/SSL_server_certificate>`__
+    scans
+
+    .. todo::
+
+        Both :attr:`p_soc_auto.settings.SSL_PROBE_OPTIONS` and
+        :attr:`p_soc_auto.settings.SSLDEFAULT_PORT` need to be extended with
+        `dynamic preferences` and the :meth:`constructor <__init__>` of this
+        class needs to use said `dynamic preference` when initializing.
+
+    The `SSL` certificate properties are provided by
+    :class:`SslCertificateData`.
+    """
+
+    def __init__(
+            self, address=None, port=settings.SSL_DEFAULT_PORT, timeout=None):
+        """
+        :arg str address: the DNS name or the IP address of the host that
+            will be probed for an `SSL server certificate
+            <https://en.wikipedia.org/wiki/Public_key_certificate#TLS/SSL_server_certificate>`__
+
+        :arg int port: the network port that will be probed for an `SSL
+            server certificate
+            <https://en.wikipedia.org/wiki/Public_key_certificate#TLS/SSL_server_certificate>`__
+
+        :arg float timeout: see :class:`NmapProbe`
+        """
+        opts = r'{}'.format(settings.SSL_PROBE_OPTIONS % port)
+
+        super().__init__(address, opts, timeout)
+
+        self.ssl_data = self.get_ssl_data()
+
+    def get_ssl_data(self):
+        """
+        :returns: the SSL certificate data
+        :rtype: dict
+
+        :raises: :exc:`NmapNotAnSslNodeError`
+        """
+        try:
+            return self.service.scripts_results[0].get('elements', None)
+        except IndexError:
+            raise NmapNotAnSslNodeError('node {} is not an SSL node'.
+                                        format(self._address))
+
+
 def to_hex(input_string=None):
     """
     :returns: the hex representation of the input string
@@ -425,14 +482,117 @@ def to_hex(input_string=None):
     return bytes(input_string, 'utf8').hex()
 
 
-def probe_for_state(dns_list=None):
+def run_probes(probe, targets, workers=None, pool=None):
+    """
+    run a probe function for each target in a bounded pool of workers
+
+    :arg probe: the probe function; it must be defined at module level so
+        that it can be used by a process pool, and it must return its
+        errors instead of raising them
+
+    :arg targets: the arguments of each call to the probe function, as
+        :class:`tuples <tuple>`
+
+    :arg int workers: the size of the pool; defaults to
+        :attr:`p_soc_auto.settings.common.NMAP_PROBE_WORKERS`
+
+    :arg str pool: 'thread' or 'process'; defaults to
+        :attr:`p_soc_auto.settings.common.NMAP_PROBE_POOL`
+
+    :returns: a generator of the results, in the order the probes finish
+
+    :raises: :exc:`ValueError` if the pool is not known
+    """
+    executors = {'thread': ThreadPoolExecutor, 'process': ProcessPoolExecutor}
+    pool = pool or settings.NMAP_PROBE_POOL
+    if pool not in executors:
+        raise ValueError(
+            f'unknown pool {pool}, use one of {", ".join(executors)}')
+
+    executor = executors[pool](
+        max_workers=workers or settings.NMAP_PROBE_WORKERS)
+    futures = [executor.submit(probe, *target) for target in targets]
+    try:
+        for future in as_completed(futures):
+            yield future.result()
+    finally:
+        # nothing left to do if the caller stopped early
+        for future in futures:
+            future.cancel()
+        executor.shutdown()
+
+
+class CsvStream:
+    """
+    `CSV` file written one row at a time
+
+    Each row is flushed as soon as it is written, so the rows written
+    before an interruption are not lost.
+    """
+    def __init__(self, file_name, fieldnames):
+        self.csv_file = open(file_name, 'w', newline='')
+        self.writer = csv.DictWriter(self.csv_file, fieldnames=fieldnames)
+        self.writer.writeheader()
+        self.csv_file.flush()
+
+    def write(self, row):
+        """
+        write and flush a row
+        """
+        self.writer.writerow(row)
+        self.csv_file.flush()
+
+    def close(self):
+        """
+        close the file
+        """
+        self.csv_file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _probe_state(dns, timeout):
+    """
+    :returns: 'unresolved', 'up' or 'down', and the `CSV` row for a DNS name
+    """
+    try:
+        socket.gethostbyname(dns)
+    except (OSError, UnicodeError):
+        return 'unresolved', dict(dns=dns)
+
+    try:
+        probe = NmapProbe(address=dns, opts='-A -T4 -Pn', timeout=timeout)
+        return 'up', dict(dns=dns, open_ports=', '.join(
+            [str(service.port) for service in probe.host.services]))
+    except Exception as err:  # pylint: disable=broad-except
+        return 'down', dict(dns=dns, err=str(err))
+
+
+def probe_for_state(dns_list=None, workers=None, pool=None, timeout=None,
+                    output_dir='.'):
     """
     try to connect to each DNS name in a list and save the results in
     separate `CSV` files: one file for unresolved hosts, one file for hosts
     known to the `DNS` servers that are not connectable, and one file
     with connectable hosts
 
+    The DNS names are probed concurrently, see :func:`run_probes`, and each
+    result is written as soon as its probe finishes.
+
     :arg list dns_list: the :class:`list` of DNS names
+
+    :arg int workers: see :func:`run_probes`
+
+    :arg str pool: see :func:`run_probes`
+
+    :arg float timeout: the timeout of each probe, in seconds; defaults to
+        :attr:`p_soc_auto.settings.common.NMAP_PROBE_TIMEOUT`
+
+    :arg str output_dir: the directory for the `CSV` files
     """
     if dns_list is None:
         dns_list = []
@@ -444,33 +604,26 @@ def probe_for_state(dns_list=None):
                     continue
                 dns_list.append(common_name)
 
-    hosts_up = []
-    hosts_down = []
-    hosts_unresolved = []
-    for dns in dns_list:
-        try:
-            socket.gethostbyname(dns)
-        except:
-            hosts_unresolved.append(dict(dns=dns))
-            print('unresolved host: ', dns)
-            continue
-
-        try:
-            probe = NmapProbe(address=dns, opts='-A -T4 -Pn')
-            hosts_up.append(dict(
-                dns=dns,
-                open_ports=', '.join(
-                    [str(service.port) for service in probe.host.services])))
-            print(dns, 'open ports: ', ', '.join(
-                [str(service.port) for service in probe.host.services]))
+    if timeout is None:
+        timeout = settings.NMAP_PROBE_TIMEOUT
 
-        except Exception as err:
-            hosts_down.append(dict(dns=dns, err=str(err)))
-            print('!!!', dns, str(err))
+    outputs = {
+        'unresolved': ('unresolved.csv', ['dns']),
+        'up': ('hosts_open_ports.csv', ['dns', 'open_ports']),
+        'down': ('hosts_down.csv', ['dns', 'err']),
+    }
+    with ExitStack() as stack:
+        streams = {
+            state: stack.enter_context(
+                CsvStream(os.path.join(output_dir, file_name), fieldnames))
+            for state, (file_name, fieldnames) in outputs.items()
+        }
 
-    write_csv('unresolved.csv', hosts_unresolved, ['dns'])
-    write_csv('hosts_open_ports.csv', hosts_up, ['dns', 'open_ports'])
-    write_csv('hosts_down.csv', hosts_down, ['dns', 'err'])
+        for state, row in run_probes(
+                _probe_state, [(dns, timeout) for dns in dns_list],
+                workers, pool):
+            streams[state].write(row)
+            print(state, ': ', ', '.join(row.values()))
 
 
 def write_csv(file_name, source, fieldnames):
@@ -486,13 +639,37 @@ def write_csv(file_name, source, fieldnames):
             csv_writer.writerow(item)
 
 
-def probe_for_certs(dns_list=None, port_list=None):
+def _probe_cert(dns, port, timeout):
+    """
+    :returns: the DNS name, the port, and either the `CSV` row for the
+        certificate found there or the error
+    """
+    try:
+        cert = SslProbe(dns, port, timeout=timeout)
+        return dns, port, dict(
+            dns=dns, port=str(port),
+            common_name=cert.ssl_subject.get('commonName'),
+            not_before=cert.ssl_not_before,
+            expires_on=cert.ssl_not_after), None
+    except Exception as error:  # pylint: disable=broad-except
+        return dns, port, None, str(error)
+
+
+def probe_for_certs(dns_list=None, port_list=None, workers=None, pool=None,
+                    timeout=None, output_dir='.'):
     """
     prepare a file with common name, port, expiration date;
     and a file with the dns list where no certs were found on any of the probed
     ports;
     and a file with nmap errors (may or may not be useful)
 
+    Each (DNS name, port) pair is probed concurrently, see
+    :func:`run_probes`. Each result is written as soon as its probe
+    finishes; a DNS name is written to the no certs file once all its ports
+    have been probed.
+
+    See :func:`probe_for_state` for the `workers`, `pool`, `timeout` and
+    `output_dir` arguments.
     """
     field_names = ['dns', 'port', 'common_name', 'not_before', 'expires_on']
 
@@ -502,58 +679,44 @@ def probe_for_certs(dns_list=None, port_list=None):
     if port_list is None:
         port_list = list(SslProbePort.objects.values_list('port', flat=True))
 
-    err_field_names = ['dns', 'port', 'err']
-
-    certs = []
-    dns_errors = []
+    if timeout is None:
+        timeout = settings.NMAP_PROBE_TIMEOUT
 
-    # assume that no dns has any certificates on the listed ports
-    dns_no_certs = dns_list
+    err_field_names = ['dns', 'port', 'err']
 
+    # the ports left to probe and whether a certificate was found, per dns
+    pending = {}
     for dns in dns_list:
-        for port in port_list:
-            try:
-                cert = SslProbe(dns, port)
-
-                # oh, look.... this dns serves a certificate
-                # take it out from the list of no certs found
-                dns_no_certs.remove(dns)
-                certs.append(dict(
-                    dns=dns, port=str(port),
-                    common_name=cert.ssl_subject.get('commonName'),
-                    not_before=cert.ssl_not_before,
-                    expires_on=cert.ssl_not_after))
-                print('found', cert.ssl_subject.get(
-                    'commonName'), ': ', str(port), ', ', cert.ssl_not_after)
-            except Exception as error:
+        pending[dns] = pending.get(dns, 0) + len(port_list)
+    dns_with_certs = set()
+    ports = ' '.join([str(port) for port in port_list])
+
+    with ExitStack() as stack:
+        certs = stack.enter_context(CsvStream(
+            os.path.join(output_dir, 'certs_found.csv'), field_names))
+        no_certs = stack.enter_context(CsvStream(
+            os.path.join(output_dir, 'no_certs.csv'), ['dns', 'ports']))
+        dns_errors = stack.enter_context(CsvStream(
+            os.path.join(output_dir, 'dns_cert_errors.csv'),
+            err_field_names))
+
+        for dns, port, cert, error in run_probes(
+                _probe_cert,
+                [(dns, port, timeout) for dns in dns_list
+                 for port in port_list],
+                workers, pool):
+            if cert is None:
                 print(f'{dns}, {port}, {error}')
-                dns_errors.append(dict(dns=dns, port=str(port), err=str(error)))
-
-    with open('certs_found.csv', 'w', newline='') as csv_file:
-        csv_writer = csv.DictWriter(csv_file, fieldnames=field_names)
-
-        csv_writer.writeheader()
-
-        for cert in certs:
-            csv_writer.writerow(cert)
-
-    with open('no_certs.csv', 'w', newline='') as no_certs_csv_file:
-        fieldnames = ['dns', 'ports']
-        no_certs_csv_writer = csv.DictWriter(
-            no_certs_csv_file, fieldnames=fieldnames)
-
-        _port_list = [str(port) for port in port_list]
-        no_certs_csv_writer.writeheader()
-        for dns in dns_no_certs:
-            no_certs_csv_writer.writerow(
-                {'dns': dns, 'ports': ' '.join(_port_list)})
-
-    with open('dns_cert_errors.csv', 'w', newline='') as err_file:
-        err_writer = csv.DictWriter(err_file, fieldnames=err_field_names)
-
-        err_writer.writeheader()
-        for dns_error in dns_errors:
-            err_writer.writerow(dns_error)
+                dns_errors.write(dict(dns=dns, port=str(port), err=error))
+            else:
+                print('found', cert['common_name'], ': ', str(port), ', ',
+                      cert['expires_on'])
+                certs.write(cert)
+                dns_with_certs.add(dns)
+
+            pending[dns] -= 1
+            if not pending[dns] and dns not in dns_with_certs:
+                no_certs.write({'dns': dns, 'ports': ports})
 
 
 def get_dns_list(csv_file_name):
@@ -0,0 +1,289 @@
+"""
+ssl_cert_tracker.nmap_xml
+-------------------------
+
+This module contains the streaming parser for the `XML` output of
+`NMAP <https://nmap.org/>`__ `ssl-cert` scans.
+
+:meth:`libnmap.parser.NmapParser.parse` builds the whole object tree of a
+report before the `ssl-cert` script output can be picked from it. For
+reports with thousands of hosts, that tree does not fit comfortably in the
+memory of a worker.
+
+:func:`iter_ssl_certs` reads the report with
+:func:`xml.etree.ElementTree.iterparse` and yields one
+:class:`SslCertRecord` for each host and port serving a certificate. The
+elements are cleared as soon as they are parsed, so the memory used does
+not grow with the size of the report. The records have the same properties
+as :class:`ssl_cert_tracker.nmap.SslProbe` and can be used with
+:meth:`ssl_cert_tracker.models.SslCertificate.create_or_update`.
+
+:func:`measure_throughput` compares this parser with `libnmap` on a copy
+of the sample report multiplied many times.
+
+Example, from `python manage.py shell`::
+
+    from ssl_cert_tracker.nmap_xml import measure_throughput
+    measure_throughput()
+
+:copyright:
+
+    Copyright 2018 - 2020 Provincial Health Service Authority
+    of British Columbia
+
+:contact:    daniel.busto@phsa.ca
+"""
+import functools
+import io
+import os
+import tempfile
+import time
+import tracemalloc
+from logging import getLogger
+from xml.etree import ElementTree
+
+from django.conf import settings
+from libnmap.parser import NmapParser
+
+from .nmap import SslCertificateData
+
+
+LOG = getLogger(__name__)
+
+SSL_CERT_SCRIPT = 'ssl-cert'
+"""the id of the `NMAP` script reporting `SSL` certificates"""
+
+BENCHMARK_COPIES = 500
+"""how many times the sample report is multiplied for the benchmarks"""
+
+
+def sample_report():
+    """
+    :returns: the path to the sample `ssl-cert` report
+    :rtype: str
+    """
+    return os.path.join(
+        os.path.dirname(settings.BASE_DIR), 'xml', 'nmap_ssl_cert_dump.xml')
+
+
+class SslCertRecord(SslCertificateData):
+    """
+    the `SSL` certificate served on a host and port
+
+    :attr:`ssl_data` holds the elements of the `ssl-cert` script output in
+    the same shape as :attr:`ssl_cert_tracker.nmap.SslProbe.ssl_data`.
+    """
+    __slots__ = ('address', 'hostnames', 'port', 'protocol', 'state',
+                 'ssl_data')
+
+    def __init__(self, address, hostnames, port, protocol, state, ssl_data):
+        self.address = address
+        self.hostnames = hostnames
+        self.port = port
+        self.protocol = protocol
+        self.state = state
+        self.ssl_data = ssl_data
+
+    def __repr__(self):
+        return f'<SslCertRecord {self.address}:{self.port}>'
+
+
+def _add_item(items, key, value):
+    """
+    add an item to a parsed script table; repeated keys are collected in a
+    :class:`list`, like :meth:`libnmap.parser.NmapParser.parse` does
+    """
+    if key not in items:
+        items[key] = value
+    elif isinstance(items[key], list):
+        items[key].append(value)
+    else:
+        items[key] = [items[key], value]
+
+
+def _parse_table(table):
+    """
+    :returns: the `elem` and `table` children of a script element or of a
+        script table, keyed by their `key` attribute
+    :rtype: dict
+    """
+    items = {}
+    for child in table:
+        if child.tag == 'elem':
+            _add_item(items, child.get('key'), child.text)
+        elif child.tag == 'table':
+            _add_item(items, child.get('key'), _parse_table(child))
+
+    return items
+
+
+def _ssl_cert_script(port):
+    for script in port.iter('script'):
+        if script.get('id') == SSL_CERT_SCRIPT:
+            return script
+
+    return None
+
+
+def iter_ssl_certs(source):
+    """
+    parse an `NMAP` `XML` report and yield the `SSL` certificates in it
+
+    Hosts that are not up and ports without `ssl-cert` output are skipped.
+
+    :arg source: the path to the report or a binary file object; wrap the
+        output of a scan in an :class:`io.BytesIO` instance
+
+    :returns: a generator of :class:`SslCertRecord` instances
+    """
+    context = ElementTree.iterparse(source, events=('start', 'end'))
+    _, root = next(context)
+
+    host = None
+    for event, element in context:
+        if event == 'start':
+            if element.tag == 'host':
+                host = {'address': None, 'hostnames': [], 'up': True}
+            continue
+
+        if host is None:
+            # e.g. task progress or host hints, cleared with the next host
+            continue
+
+        if element.tag == 'status':
+            host['up'] = element.get('state') == 'up'
+        elif element.tag == 'address':
+            if host['address'] is None \
+                    and element.get('addrtype') in ('ipv4', 'ipv6'):
+                host['address'] = element.get('addr')
+        elif element.tag == 'hostname':
+            host['hostnames'].append(element.get('name'))
+        elif element.tag == 'port':
+            script = _ssl_cert_script(element)
+            if host['up'] and script is not None:
+                state = element.find('state')
+                yield SslCertRecord(
+                    address=host['address'],
+                    hostnames=list(host['hostnames']),
+                    port=int(element.get('portid')),
+                    protocol=element.get('protocol'),
+                    state=None if state is None else state.get('state'),
+                    ssl_data=_parse_table(script))
+            element.clear()
+        elif element.tag == 'host':
+            host = None
+            root.clear()
+
+
+def parse_ssl_certs(nmap_output):
+    """
+    :returns: the `SSL` certificates in the output of a scan, see
+        :func:`iter_ssl_certs`
+    :rtype: list
+
+    :arg str nmap_output: the `XML` output of the scan
+    """
+    return list(iter_ssl_certs(io.BytesIO(nmap_output.encode('utf-8'))))
+
+
+def multiply_report(path, copies, target):
+    """
+    write a copy of a report with all its hosts repeated
+
+    :arg str path: the report
+
+    :arg int copies: how many times each host is repeated
+
+    :arg target: the binary file object to write to
+    """
+    with open(path, 'rb') as report:
+        text = report.read()
+
+    start = text.index(b'<host ')
+    end = text.rindex(b'</host>') + len(b'</host>')
+
+    target.write(text[:start])
+    for _ in range(copies):
+        target.write(text[start:end])
+        target.write(b'\n')
+    target.write(text[end:])
+
+
+@functools.lru_cache(maxsize=None)
+def synthetic_report(copies=BENCHMARK_COPIES):
+    """
+    :returns: the path to the sample report multiplied `copies` times; the
+        file is written once per process, in the temporary directory
+    :rtype: str
+    """
+    with tempfile.NamedTemporaryFile(
+            prefix='nmap_ssl_cert_', suffix='.xml', delete=False) as target:
+        multiply_report(sample_report(), copies, target)
+
+    return target.name
+
+
+def count_stream(path):
+    """
+    :returns: the number of `SSL` certificates in an `NMAP` report, read
+        with :func:`iter_ssl_certs`
+    :rtype: int
+    """
+    return sum(1 for _ in iter_ssl_certs(path))
+
+
+def count_libnmap(path):
+    """
+    :returns: the number of `SSL` certificates in an `NMAP` report, read
+        with :class:`libnmap.parser.NmapParser`
+    :rtype: int
+    """
+    with open(path) as report:
+        nmap_report = NmapParser.parse(report.read())
+
+    return sum(
+        1 for host in nmap_report.hosts if host.is_up()
+        for service in host.services
+        if any(script.get('id') == SSL_CERT_SCRIPT
+               for script in service.scripts_results))
+
+
+def _measure(count, path):
+    tracemalloc.start()
+    try:
+        start = time.perf_counter()
+        records = count(path)
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'records': records,
+        'seconds': round(elapsed, 3),
+        'records_per_second': round(records / elapsed) if elapsed else None,
+        'peak_kib': round(peak / 1024),
+    }
+
+
+def measure_throughput(copies=BENCHMARK_COPIES):
+    """
+    parse the sample report multiplied `copies` times with
+    :func:`iter_ssl_certs` and with :meth:`libnmap.parser.NmapParser.parse`
+
+    The memory is traced with :mod:`tracemalloc`, which slows both parsers
+    down by about the same amount.
+
+    :returns: the 'records', 'seconds', 'records_per_second' and 'peak_kib'
+        of each parser, keyed by 'stream' and 'libnmap'
+    :rtype: dict
+    """
+    path = synthetic_report(copies)
+
+    result = {
+        'stream': _measure(count_stream, path),
+        'libnmap': _measure(count_libnmap, path),
+    }
+    LOG.info('nmap ssl-cert parser throughput: %s', result)
+
+    return result
@@ -0,0 +1,268 @@
+"""
+ssl_cert_tracker.sweep
+----------------------
+
+This module contains the `SSL` sweep planner for the
+:ref:`SSL Certificate Tracker Application`.
+
+Discovering new `SSL` certificates and verifying the known ones used to run
+their own `NMAP <https://nmap.org/>`__ scans, so the same network address and
+port were often scanned twice within the hour. The sweep builds one
+deduplicated set of (address, port) targets from:
+
+* the :class:`orion_integration.models.OrionNode` instances known to serve
+  `SSL` certificates and the :class:`ssl_cert_tracker.models.ExternalSslNode`
+  instances, times the enabled :class:`ssl_cert_tracker.models.SslProbePort`
+  instances
+
+* the network address and port of each known
+  :class:`ssl_cert_tracker.models.SslCertificate` instance
+
+Each target is scanned once by :func:`process_target` and the result is used
+both to create or update the certificate found there and to delete the known
+certificates that are not served there anymore. Nodes that share a network
+address, e.g. an `Orion` node also configured as an external node, share the
+target; the certificate found there is recorded for each of them.
+
+The result of each scan is kept in the cache for
+:attr:`p_soc_auto.settings.common.SSL_SWEEP_FRESHNESS` seconds; a target
+processed again within that window, e.g. by an on-demand recheck, reuses the
+result instead of running another scan. The result keeps the certificate
+data, so the certificate is still recorded for nodes that did not have it,
+e.g. a newly added node.
+
+:copyright:
+
+    Copyright 2018 - 2020 Provincial Health Service Authority
+    of British Columbia
+
+:contact:    daniel.busto@phsa.ca
+"""
+import time
+from collections import namedtuple
+from logging import getLogger
+
+from django.conf import settings
+from django.core.cache import cache
+
+from orion_integration.lib import OrionSslNode
+from orion_integration.models import OrionNode
+
+from .models import ExternalSslNode, SslProbePort, SslCertificate
+from .nmap import SslProbe, NmapNotAnSslNodeError
+from .nmap_xml import SslCertRecord
+
+
+LOG = getLogger(__name__)
+
+FOUND = 'found'
+"""scan result: there is an `SSL` certificate on the target"""
+
+ABSENT = 'absent'
+"""scan result: there is no `SSL` certificate on the target"""
+
+Target = namedtuple('Target', ['address', 'port', 'nodes'])
+"""
+a network address and port to scan, and the (orion_id, external_id) pairs of
+the nodes serving it
+"""
+
+
+class SweepPlan:
+    """
+    the deduplicated targets of a sweep
+    """
+    def __init__(self):
+        self.targets = {}
+        """the :class:`Target` instances keyed by (address, port)"""
+
+        self.certificates = {}
+        """
+        the ids of the known certificates served by each target, keyed by
+        (address, port)
+        """
+
+        self.orphans = []
+        """the ids of the known certificates without a network node"""
+
+    def add_target(self, address, port, orion_id=None, external_id=None):
+        """
+        add a target unless it is already planned, and the node serving it
+        unless it is already known for the target
+
+        :returns: the (address, port) key of the target
+        :rtype: tuple
+        """
+        key = (address.strip().lower(), int(port))
+        target = self.targets.setdefault(key, Target(key[0], key[1], []))
+
+        node = (orion_id, external_id)
+        if node not in target.nodes:
+            target.nodes.append(node)
+
+        return key
+
+    def add_certificate(self, certificate_id, address, port, orion_id=None,
+                        external_id=None):
+        """
+        add the target serving a known certificate
+        """
+        key = self.add_target(address, port, orion_id, external_id)
+        self.certificates.setdefault(key, []).append(certificate_id)
+
+    def __len__(self):
+        return len(self.targets)
+
+
+def plan_sweep():
+    """
+    build the deduplicated targets of a sweep
+
+    :returns: the plan
+    :rtype: :class:`SweepPlan`
+    """
+    plan = SweepPlan()
+    ports = list(SslProbePort.active.values_list('port', flat=True))
+
+    for orion_id, address in OrionSslNode.nodes().values_list(
+            'orion_id', 'ip_address'):
+        for port in ports:
+            plan.add_target(address, port, orion_id=orion_id)
+
+    for external_id, address in ExternalSslNode.active.values_list(
+            'id', 'address'):
+        for port in ports:
+            plan.add_target(address, port, external_id=external_id)
+
+    certificates = list(SslCertificate.active.values_list(
+        'id', 'orion_id', 'external_node_id', 'port__port'))
+
+    orion_addresses = dict(OrionNode.objects.filter(orion_id__in={
+        certificate[1] for certificate in certificates if certificate[1]
+    }).values_list('orion_id', 'ip_address'))
+    external_addresses = dict(ExternalSslNode.objects.filter(id__in={
+        certificate[2] for certificate in certificates if certificate[2]
+    }).values_list('id', 'address'))
+
+    for certificate_id, orion_id, external_id, port in certificates:
+        if orion_id:
+            address = orion_addresses.get(orion_id)
+        else:
+            address = external_addresses.get(external_id)
+
+        if not address:
+            plan.orphans.append(certificate_id)
+            continue
+
+        plan.add_certificate(
+            certificate_id, address, port, orion_id=orion_id,
+            external_id=external_id)
+
+    LOG.info('planned an SSL sweep of %s targets, %s known certificates,'
+             ' %s orphans', len(plan), len(certificates), len(plan.orphans))
+
+    return plan
+
+
+def _cache_key(address, port):
+    return f'ssl_sweep:{address.strip().lower()}:{int(port)}'
+
+
+def cached_result(address, port, max_age=None):
+    """
+    :returns: the result of the last scan of a target if it is fresh, or
+        `None`
+
+    :arg int max_age: how old the result can be, in seconds; defaults to
+        :attr:`p_soc_auto.settings.common.SSL_SWEEP_FRESHNESS`
+    """
+    result = cache.get(_cache_key(address, port))
+    if result is None:
+        return None
+
+    if max_age is None:
+        max_age = settings.SSL_SWEEP_FRESHNESS
+
+    if time.time() - result['scanned_on'] > max_age:
+        return None
+
+    return result
+
+
+def process_target(address, port, orion_id=None, external_id=None,
+                   certificate_ids=None, max_age=None, nodes=None):
+    """
+    scan a target, unless it was scanned recently, and update the known
+    certificates with the result
+
+    If there is an `SSL` certificate on the target, it is created or updated
+    with :meth:`ssl_cert_tracker.models.SslCertificate.create_or_update`.
+    If there is none, the certificates in `certificate_ids` are deleted.
+
+    :arg str address: the network address of the target
+
+    :arg int port: the network port of the target
+
+    :arg int orion_id: the node serving the target, if it is an `Orion` node
+
+    :arg int external_id: the node serving the target, if it is an
+        :class:`ssl_cert_tracker.models.ExternalSslNode`
+
+    :arg list certificate_ids: the known certificates served by the target
+
+    :arg int max_age: see :func:`cached_result`; use 0 to force a scan
+
+    :arg list nodes: the (orion_id, external_id) pairs of all the nodes
+        serving the target; the certificate found on the target is created
+        or updated for each of them. Defaults to the node in `orion_id` and
+        `external_id`
+
+    :returns: the result with the 'status', 'scanned_on', and
+        'certificate' keys; 'status' is :attr:`FOUND` or :attr:`ABSENT`, and
+        'certificate' is the :class:`ssl_cert_tracker.nmap_xml.SslCertRecord`
+        found on the target, or `None`
+    :rtype: dict
+
+    :raises: :exc:`ssl_cert_tracker.nmap.NmapError` and
+        :exc:`ssl_cert_tracker.nmap.NmapHostDownError` if the scan fails;
+        failed scans are not cached
+    """
+    result = cached_result(address, port, max_age)
+    if result is not None:
+        LOG.debug('reusing the SSL scan of %s:%s from %s', address, port,
+                  result['scanned_on'])
+    else:
+        LOG.info('scanning %s:%s for an SSL certificate', address, port)
+        try:
+            probe = SslProbe(address, port)
+        except NmapNotAnSslNodeError:
+            result = {'status': ABSENT, 'certificate': None}
+        else:
+            result = {'status': FOUND, 'certificate': SslCertRecord(
+                address, probe.hostnames, probe.port, probe.protocol,
+                probe.state, probe.ssl_data)}
+
+        result['scanned_on'] = time.time()
+        cache.set(_cache_key(address, port), result,
+                  settings.SSL_SWEEP_FRESHNESS)
+
+    if result['status'] == ABSENT:
+        if certificate_ids:
+            SslCertificate.objects.filter(id__in=certificate_ids).delete()
+            LOG.info('there is no SSL certificate on %s:%s, deleted the'
+                     ' known certificates %s', address, port,
+                     certificate_ids)
+        return result
+
+    certificate = result.get('certificate')
+    if certificate is None:
+        return result
+
+    for node_orion_id, node_external_id in nodes or [(orion_id, external_id)]:
+        created, ssl_obj = SslCertificate.create_or_update(
+            certificate, orion_id=node_orion_id,
+            external_id=node_external_id)
+        LOG.info('SSL certificate %s on %s:%s has been %s', ssl_obj,
+                 address, port, 'created' if created else 'seen')
+
+    return result
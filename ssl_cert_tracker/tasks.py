@@ -19,16 +19,14 @@ from smtplib import SMTPConnectError
 
 from celery import shared_task, group
 
-from orion_integration.lib import OrionSslNode
 from orion_integration.models import OrionNode
 from p_soc_auto_base.email import Email
 from p_soc_auto_base.models import Subscription
 
+from . import sweep
 from .lib import expires_in, has_expired, is_not_yet_valid
-from .models import ExternalSslNode, SslProbePort, SslCertificate
-from .nmap import (
-    SslProbe, NmapError, NmapHostDownError, NmapNotAnSslNodeError,
-)
+from .models import SslProbePort, SslCertificate
+from .nmap import NmapError, NmapHostDownError
 
 
 LOG = logging.getLogger(__name__)
@@ -132,178 +130,156 @@ def email_invalid_ssl_report():
         invalid=True)
 
 
-@shared_task(task_serializer='pickle', rate_limit='5/s', queue='shared')
-def get_ssl_for_node(address, orion_id=None, external_id=None):
+@shared_task(queue='shared')
+def ssl_sweep():
     """
-    task that spawns separate :func:`get_ssl_for_node_port` tasks for each
-    network port to be probed on a given :class:`Orion node
-    <orion_integration.models.OrionNode>`
-
-    The list of network ports is collected from the
-    :class:`ssl_cert_tracker.models.SslProbePort` models, specifically all the
-    instances of this model that are `enabled`.
+    task that scans each `SSL` target once and updates the known `SSL`
+    certificates with the results
 
-    :arg orion_node: the :class:`orion_integration.models.OrionNode` instance
+    The targets are planned by :func:`ssl_cert_tracker.sweep.plan_sweep`.
+    This task deletes the known certificates without a network node and
+    spawns a :func:`sweep_ssl_target` task for each target.
 
-    :returns: the :attr:`orion_integration.models.OrionNode.node_caption` and
-        a list of ports to be probed
+    :returns: the number of targets that will be processed
     :rtype: str
+
+    :raises: :exc:`OrionDataError` if there is nothing to scan
     """
-    ssl_ports = SslProbePort.active.all()
+    plan = sweep.plan_sweep()
 
-    LOG.info('looking for SSL certificates for the node at %s, ports %s',
-             address, ', '.join(
-            [str(port) for port in ssl_ports.values_list('port', flat=True)]))
+    if plan.orphans:
+        SslCertificate.objects.filter(id__in=plan.orphans).delete()
+        LOG.info('deleted orphan SSL certificates %s, their network nodes'
+                 ' do not exist', plan.orphans)
+
+    if not plan:
+        raise OrionDataError(
+            'there are no nodes available for SSL nmap probing')
 
-    group(get_ssl_for_node_port.
-          s(address, ssl_port, orion_id=orion_id, external_id=external_id).
-          set(serializer='pickle') for ssl_port in ssl_ports)()
+    group(sweep_ssl_target.s(
+        target.address, target.port, nodes=target.nodes,
+        certificate_ids=plan.certificates.get(key))
+          for key, target in plan.targets.items())()
 
+    return f'processing {len(plan)} SSL targets'
 
-@shared_task(task_serializer='pickle', rate_limit='2/s', queue='nmap',
+
+@shared_task(rate_limit='2/s', queue='nmap',
              autoretry_for=(NmapError, NmapHostDownError),
              max_retries=3, retry_backoff=True)
-def get_ssl_for_node_port(address, port, orion_id=None, external_id=None):
+def sweep_ssl_target(address, port, orion_id=None, external_id=None,
+                     certificate_ids=None, max_age=None, nodes=None):
     """
-    this task is a wrapper around an :class:`ssl_cert_tracker.nmap.SslProbe`
-    `NMAP <https://nmap.org/>`__ `SSL
-    <https://en.wikipedia.org/wiki/Public_key_certificate#TLS/SSL_server_certificate>`__
-    scan
+    task wrapped around :func:`ssl_cert_tracker.sweep.process_target`
 
-    :arg orion_node: the :class:`<orion_integration.models.OrionNode>` instance
+    :returns: :attr:`ssl_cert_tracker.sweep.FOUND` or
+        :attr:`ssl_cert_tracker.sweep.ABSENT`
+    :rtype: str
+    """
+    return sweep.process_target(
+        address, port, orion_id=orion_id, external_id=external_id,
+        certificate_ids=certificate_ids, max_age=max_age,
+        nodes=nodes)['status']
 
-    :arg int port: the network port for the scan
 
-    :returns: the `SSL` certificate subject, the `SSL` certificate host names,
-        the `SSL` certificate port, and the date when the certificate was
-        created or updated
-    :rtype: str
+@shared_task(rate_limit='5/s', queue='shared')
+def get_ssl_for_node(address, orion_id=None, external_id=None):
     """
-    LOG.info('Trying to get certificate at %s:%s', address, port)
+    task that spawns separate :func:`sweep_ssl_target` tasks for each
+    network port to be probed on a given network node
 
-    try:
-        ssl_certificate = SslProbe(address, port)
-    except NmapNotAnSslNodeError:
-        LOG.warning('there is no SSL certificate on %s:%s',
-                    address, port)
-        return
-    except Exception as e:
-        LOG.warning('Unexpected error while trying to get cert for %s:%s: %s',
-                    address, port, e)
+    The list of network ports is collected from the
+    :class:`ssl_cert_tracker.models.SslProbePort` models, specifically all the
+    instances of this model that are `enabled`.
 
-    LOG.debug('nmap returned %s', ssl_certificate.summary)
+    Ports scanned within the last
+    :attr:`p_soc_auto.settings.common.SSL_SWEEP_FRESHNESS` seconds are not
+    scanned again.
 
-    try:
-        created, ssl_obj = SslCertificate.create_or_update(ssl_certificate,
-                                                           orion_id=orion_id,
-                                                           external_id=external_id)
-    except Exception as e:
-        LOG.info('OOPS: %s', e)
+    :arg str address: the network address of the node
+
+    :arg int orion_id: the `Orion` id of the node
+
+    :arg int external_id: the id of the
+        :class:`ssl_cert_tracker.models.ExternalSslNode` instance
+    """
+    ssl_ports = list(SslProbePort.active.values_list('port', flat=True))
 
-    if created:
-        LOG.info('SSL certificate %s on %s, port %s has been created at %s',
-                 ssl_certificate.ssl_subject, ssl_certificate.hostnames,
-                 ssl_certificate.port, ssl_obj.created_on)
-        return
+    LOG.info('looking for SSL certificates for the node at %s, ports %s',
+             address, ', '.join(str(port) for port in ssl_ports))
 
-    LOG.info('SSL certificate %s on %s, port %s last seen at %s',
-             ssl_certificate.ssl_subject, ssl_certificate.hostnames,
-             ssl_certificate.port, ssl_obj.last_seen)
+    group(sweep_ssl_target.s(
+        address, port, orion_id=orion_id, external_id=external_id)
+          for port in ssl_ports)()
 
 
 @shared_task(rate_limit='2/s', queue='nmap',
              autoretry_for=(NmapError, NmapHostDownError),
              max_retries=3, retry_backoff=True)
-def verify_ssl_for_node_port(cert_node_port_tuple):
+def verify_ssl_for_node_port(cert_node_port_tuple, max_age=None):
     """
     task that verifies the existence of an `SSL` certificate know to us on the
     network.
 
-    This task will run a :class:`ssl_cert_tracker.nmap.SslProbe`
-    `NMAP <https://nmap.org/>`__ `SSL
-    <https://en.wikipedia.org/wiki/Public_key_certificate#TLS/SSL_server_certificate>`__
-    scan for an :class:`ssl_cert_tracker.models.SslCertificate` instance
-    represented by a (:class:`orion_integration.models.OrionNode`, network port)
-    tuple.
-    If the `SSL` certificate is not found during the scan, the corresponding
-    :class:`ssl_cert_tracker.models.SslCertificate` instance will be deleted.
+    The certificate is represented by a (certificate id, `Orion` node id,
+    network port) tuple. If the `SSL` certificate is not found, the
+    corresponding :class:`ssl_cert_tracker.models.SslCertificate` instance
+    will be deleted. A recent result of :func:`ssl_sweep` is reused, see
+    :func:`ssl_cert_tracker.sweep.process_target`.
 
-    :arg tuple cert_node_port_tuple:
+    :arg tuple cert_node_port_tuple: the certificate to verify
 
-        a (:class:`orion_integration.models.OrionNode`, network port) tuple
+    :arg int max_age: see :func:`ssl_cert_tracker.sweep.cached_result`
 
-    :returns: a :class:`str` with the result of the verification
+    :returns: :attr:`ssl_cert_tracker.sweep.FOUND` or
+        :attr:`ssl_cert_tracker.sweep.ABSENT`, or `None` if the `Orion` node
+        does not exist
+    :rtype: str
     """
-    port = cert_node_port_tuple[2]
+    certificate_id, orion_id, port = cert_node_port_tuple
 
     try:
-        ip_address = OrionNode.objects.get(
-            orion_id=cert_node_port_tuple[1]).ip_address
+        ip_address = OrionNode.objects.get(orion_id=orion_id).ip_address
     except OrionNode.DoesNotExist:
-        SslCertificate.objects.filter(
-            orion_id=cert_node_port_tuple[1]).all().delete()
-        LOG.info('Deleted orphan SSL certificate on %s:%s. Orion node with id'
-                 ' %s does not exist', cert_node_port_tuple[1], port,
-                 cert_node_port_tuple[1])
+        SslCertificate.objects.filter(id=certificate_id).delete()
+        LOG.info('Deleted orphan SSL certificate on port %s. Orion node with'
+                 ' id %s does not exist', port, orion_id)
+        return None
 
-    try:
-        _ = SslProbe(ip_address, port)
-    except NmapNotAnSslNodeError:
-        SslCertificate.objects.filter(
-            id=cert_node_port_tuple[0]).delete()
-        LOG.info('there is no SSL certificate on %s:%s. Removing this'
-                 ' certificate from the database', ip_address, port)
-        return
-
-    LOG.info('found an SSL certificate on %s:%s.', ip_address, port)
+    return sweep.process_target(
+        ip_address, port, orion_id=orion_id,
+        certificate_ids=[certificate_id], max_age=max_age)['status']
 
 
 @shared_task(queue='shared')
 def verify_ssl_certificates():
     """
-    task that spawns a :func:`verify_ssl_for_node_port` task for each `enabled`
-    :class:`ssl_cert_tracker.models.SslCertificate` instance
+    task that verifies all the `enabled`
+    :class:`ssl_cert_tracker.models.SslCertificate` instances
+
+    The verification is part of :func:`ssl_sweep`; targets scanned within
+    the last :attr:`p_soc_auto.settings.common.SSL_SWEEP_FRESHNESS` seconds
+    are not scanned again. This task is kept for on-demand runs; the beat
+    runs :func:`ssl_sweep` directly.
 
-    :returns: the number of `SSL` certificates that will be verified
+    :returns: the number of targets that will be processed
     :rtype: str
     """
-    cert_node_port_list = SslCertificate.active.\
-        values_list('id', 'orion_id', 'port__port')
-
-    group(verify_ssl_for_node_port.s(cert_node_port_tuple) for
-          cert_node_port_tuple in cert_node_port_list)()
-
-    LOG.info('verifying %s known SSL certificates against Orion nodes',
-             len(cert_node_port_list))
+    return ssl_sweep()
 
 
 @shared_task(queue='shared')
 def get_ssl_nodes():
     """
-    task that spawns a :func:`get_ssl_for_node` task for each
-    :class:`orion_integration.models.OrionNode` instance known to serve `SSL`
-    certificates
+    task that looks for `SSL` certificates on the
+    :class:`orion_integration.models.OrionNode` instances known to serve `SSL`
+    certificates and on the
+    :class:`ssl_cert_tracker.models.ExternalSslNode` instances
+
+    The discovery is part of :func:`ssl_sweep`. This task is kept for
+    on-demand runs; the beat runs :func:`ssl_sweep` directly.
 
-    :returns: the number of :class:`Orion nodes
-        <orion_integration.models.OrionNode>` that will be inspected
+    :returns: the number of targets that will be processed
     :rtype: str
     """
-    external_nodes = ExternalSslNode.active.all()
-
-    LOG.info('looking for SSL certificates on %s external nodes',
-             len(external_nodes))
-
-    LOG.info('%s', external_nodes)
-    group(get_ssl_for_node.s(e_node.address, external_id=e_node.id).set(
-        serializer='pickle') for e_node in external_nodes)()
-
-    orion_nodes = OrionSslNode.nodes().all()
-    if not orion_nodes:
-        raise OrionDataError(
-            'there are no Orion nodes available for SSL nmap probing')
-
-    LOG.info('looking for SSL certificates on %s Orion nodes', len(orion_nodes))
-
-    group(get_ssl_for_node.s(
-        orion_node.ip_address, orion_node.orion_id).set(serializer='pickle') for
-          orion_node in orion_nodes)()
+    return ssl_sweep()
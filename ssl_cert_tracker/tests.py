@@ -10,11 +10,33 @@ This module contains tests for the :ref:`SSL Certificate Tracker Application`.
 
 :contact:    daniel.busto@phsa.ca
 """
+import csv
+import io
+import os
+import random
+import re
+import shutil
+import socket
+import tempfile
+import threading
+import time
 from collections import namedtuple
+from unittest import mock
 
-from django.test import TestCase
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+from libnmap.parser import NmapParser
 
-from ssl_cert_tracker.models import SslCertificateIssuer, SslCertificate
+from p_soc_auto_base.test_lib import UserTestCase
+from ssl_cert_tracker.lib import (
+    day_boundary, expires_in, has_expired, is_not_yet_valid,
+)
+from ssl_cert_tracker import nmap, nmap_xml, sweep
+from ssl_cert_tracker.models import (
+    ExternalSslNode, SslCertificateIssuer, SslCertificate, SslProbePort,
+)
+from ssl_cert_tracker.nmap import NmapNotAnSslNodeError
 
 
 class SslCertificateIssuerTest(TestCase):
@@ -51,3 +73,371 @@ class SslCertificateTest(TestCase):
                     {}, 443, {}, 'hosts', '2000-01-01 00:00',
                     '2000-01-01 00:00', 'pem', *fakes)
             )[0])
+
+
+class SslExpiryQueryTest(UserTestCase):
+    """
+    Tests for the `SSL` certificate expiry queries in
+    :mod:`ssl_cert_tracker.lib`
+    """
+    def setUp(self):
+        now = timezone.now()
+        # only probe the port created here, not the ports seeded by the
+        # migrations
+        SslProbePort.objects.update(enabled=False)
+        port = SslProbePort.objects.create(port=8443, **self.USER_ARGS)
+
+        def certificate(name, not_before_days, not_after_days):
+            return SslCertificate.objects.create(
+                common_name=name, port=port, hostnames=name,
+                not_before=now + timezone.timedelta(days=not_before_days),
+                not_after=now + timezone.timedelta(days=not_after_days),
+                pem='pem', pk_bits='2048', pk_type='rsa', pk_md5=name,
+                pk_sha1=name, last_seen=now, **self.USER_ARGS)
+
+        self.soon = certificate('soon', -300, 10)
+        self.later = certificate('later', -300, 100)
+        self.expired = certificate('expired', -400, -5)
+        self.future = certificate('future', 5, 400)
+
+    @staticmethod
+    def _where(queryset):
+        sql = str(queryset.query)
+        return sql[sql.index(' WHERE '):sql.index(' ORDER BY ')]
+
+    def test_no_function_on_columns(self):
+        """
+        test that the date columns are compared as they are
+        """
+        for queryset in (expires_in(lt_days=30), has_expired(),
+                         is_not_yet_valid()):
+            where = self._where(queryset)
+            self.assertNotIn('DATEDIFF', where.upper())
+            self.assertIsNone(
+                re.search(r'\w+\([^)]*not_(after|before)', where), where)
+
+    def test_filters(self):
+        """
+        test that each query returns the certificates in its state
+        """
+        self.assertEqual(list(expires_in(lt_days=30)), [self.soon])
+        self.assertEqual(list(expires_in()), [self.soon, self.later])
+        self.assertEqual(list(has_expired()), [self.expired])
+        self.assertEqual(list(is_not_yet_valid()), [self.future])
+
+    def test_day_boundary(self):
+        """
+        test that the boundary is a UTC midnight
+        """
+        boundary = day_boundary(2)
+        self.assertEqual(boundary.utcoffset(), timezone.timedelta(0))
+        self.assertEqual(
+            (boundary.hour, boundary.minute, boundary.second), (0, 0, 0))
+        self.assertGreater(boundary - timezone.now(), timezone.timedelta(1))
+
+
+class SslSweepTest(UserTestCase):
+    """
+    Tests for :mod:`ssl_cert_tracker.sweep`
+    """
+    def setUp(self):
+        now = timezone.now()
+        # only probe the port created here, not the ports seeded by the
+        # migrations
+        SslProbePort.objects.update(enabled=False)
+        port = SslProbePort.objects.create(port=8443, **self.USER_ARGS)
+        self.duplicate = ExternalSslNode.objects.create(
+            address='10.0.0.1', **self.USER_ARGS)
+        self.external = ExternalSslNode.objects.create(
+            address='Host.Example.com', **self.USER_ARGS)
+
+        def certificate(name, **node):
+            return SslCertificate.objects.create(
+                common_name=name, port=port, hostnames=name, not_before=now,
+                not_after=now, pem='pem', pk_bits='2048', pk_type='rsa',
+                pk_md5=name, pk_sha1=name, last_seen=now, **node,
+                **self.USER_ARGS)
+
+        self.known = certificate('known', orion_id=1)
+        self.orphan = certificate('orphan', orion_id=99)
+
+        self.addCleanup(mock.patch.stopall)
+        orion_nodes = mock.patch.object(sweep, 'OrionSslNode')
+        orion_nodes.start().nodes.return_value.values_list.return_value = [
+            (1, '10.0.0.1')]
+
+        orion_addresses = mock.patch.object(sweep, 'OrionNode')
+        orion_addresses.start().objects.filter.return_value.values_list.\
+            return_value = [(1, '10.0.0.1')]
+
+        self.probe = mock.patch.object(sweep, 'SslProbe').start()
+        # the scan results are pickled in the cache
+        self.probe.return_value.configure_mock(
+            hostnames=['host.example.com'], port=8443, protocol='tcp',
+            state='open', ssl_data={'md5': 'md5'})
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_plan(self):
+        """
+        test that each network address and port is planned once
+        """
+        plan = sweep.plan_sweep()
+
+        self.assertEqual(
+            set(plan.targets),
+            {('10.0.0.1', 8443), ('host.example.com', 8443)})
+        self.assertEqual(plan.targets[('10.0.0.1', 8443)].nodes,
+                         [(1, None), (None, self.duplicate.id)])
+        self.assertEqual(plan.certificates,
+                         {('10.0.0.1', 8443): [self.known.id]})
+        self.assertEqual(plan.orphans, [self.orphan.id])
+
+    def test_absent_deletes_known_certificates(self):
+        """
+        test that a target without a certificate is scanned once and its
+        known certificates are deleted
+        """
+        self.probe.side_effect = NmapNotAnSslNodeError
+
+        result = sweep.process_target(
+            '10.0.0.1', 8443, orion_id=1, certificate_ids=[self.known.id])
+
+        self.assertEqual(result['status'], sweep.ABSENT)
+        self.assertFalse(
+            SslCertificate.objects.filter(id=self.known.id).exists())
+
+        sweep.process_target('10.0.0.1', 8443, orion_id=1)
+        self.assertEqual(self.probe.call_count, 1)
+
+    def test_found_reuses_recent_scan(self):
+        """
+        test that a recent scan is reused, that the certificate is still
+        recorded from it, and that a zero max age forces a new scan
+        """
+        with mock.patch.object(
+                SslCertificate, 'create_or_update',
+                return_value=(False, self.known)) as upsert:
+            for _ in range(2):
+                result = sweep.process_target(
+                    'host.example.com', 8443, external_id=self.external.id)
+            self.assertEqual(result['status'], sweep.FOUND)
+            self.assertEqual(self.probe.call_count, 1)
+            self.assertEqual(upsert.call_count, 2)
+
+            certificate, = upsert.call_args[0]
+            self.assertEqual(upsert.call_args[1],
+                             {'orion_id': None,
+                              'external_id': self.external.id})
+            self.assertEqual(
+                (certificate.port, certificate.ssl_md5), (8443, 'md5'))
+
+            sweep.process_target(
+                'host.example.com', 8443, external_id=self.external.id,
+                max_age=0)
+            self.assertEqual(self.probe.call_count, 2)
+            self.assertEqual(upsert.call_count, 3)
+
+    def test_found_recorded_for_new_node(self):
+        """
+        test that a recent scan of a target is used to record the
+        certificate of a node that did not have it yet
+        """
+        with mock.patch.object(
+                SslCertificate, 'create_or_update',
+                return_value=(True, self.known)) as upsert:
+            sweep.process_target('10.0.0.1', 8443, orion_id=1)
+            sweep.process_target(
+                '10.0.0.1', 8443, external_id=self.duplicate.id)
+
+        self.assertEqual(self.probe.call_count, 1)
+        self.assertEqual(upsert.call_args[1],
+                         {'orion_id': None, 'external_id': self.duplicate.id})
+
+
+    def test_found_updates_each_node(self):
+        """
+        test that the certificate found on a target shared by several nodes
+        is created or updated for each of them with one scan
+        """
+        nodes = sweep.plan_sweep().targets[('10.0.0.1', 8443)].nodes
+
+        with mock.patch.object(
+                SslCertificate, 'create_or_update',
+                return_value=(False, self.known)) as upsert:
+            sweep.process_target('10.0.0.1', 8443, nodes=nodes)
+
+        self.assertEqual(self.probe.call_count, 1)
+        self.assertEqual(
+            [call[1] for call in upsert.call_args_list],
+            [{'orion_id': 1, 'external_id': None},
+             {'orion_id': None, 'external_id': self.duplicate.id}])
+
+
+class NmapXmlTest(SimpleTestCase):
+    """
+    Tests for the streaming parser in :mod:`ssl_cert_tracker.nmap_xml`
+    """
+    def setUp(self):
+        with open(nmap_xml.sample_report()) as report:
+            self.report = report.read()
+
+    def test_matches_libnmap(self):
+        """
+        test that the records match the libnmap parser field for field
+        """
+        expected = []
+        for host in NmapParser.parse(self.report).hosts:
+            for service in host.services:
+                for script in service.scripts_results:
+                    if script['id'] == nmap_xml.SSL_CERT_SCRIPT:
+                        expected.append((host, service, script['elements']))
+
+        records = nmap_xml.parse_ssl_certs(self.report)
+
+        self.assertEqual(len(records), len(expected))
+        self.assertTrue(records)
+        for record, (host, service, elements) in zip(records, expected):
+            self.assertEqual(record.address, host.address)
+            self.assertEqual(record.hostnames, host.hostnames)
+            self.assertEqual(record.port, service.port)
+            self.assertEqual(record.protocol, service.protocol)
+            self.assertEqual(record.state, service.state)
+            self.assertEqual(record.ssl_data, elements)
+            self.assertEqual(record.ssl_subject, elements['subject'])
+            self.assertEqual(record.ssl_md5, elements['md5'])
+            self.assertEqual(record.ssl_not_after.year,
+                             int(elements['validity']['notAfter'][:4]))
+
+    def test_multiplied_report(self):
+        """
+        test that a multiplied report yields each certificate each time
+        """
+        target = io.BytesIO()
+        nmap_xml.multiply_report(nmap_xml.sample_report(), 25, target)
+        target.seek(0)
+
+        self.assertEqual(
+            sum(1 for _ in nmap_xml.iter_ssl_certs(target)),
+            25 * len(nmap_xml.parse_ssl_certs(self.report)))
+
+
+class FakeNmapProcess:
+    """
+    stand-in for :class:`libnmap.process.NmapProcess` that sleeps for a
+    random time and returns the report of :attr:`output`
+    """
+    delay = (0.05, 0.15)
+    output = ''
+
+    def __init__(self, targets, options=None):
+        self.targets = targets
+        self.options = options
+        self.stdout = ''
+        self.stderr = ''
+        self._done = threading.Event()
+
+    def run(self):
+        time.sleep(random.uniform(*self.delay))
+        self.stdout = self.output
+        self._done.set()
+
+    def run_background(self):
+        threading.Thread(target=self.run, daemon=True).start()
+
+    def is_running(self):
+        return not self._done.is_set()
+
+    def stop(self):
+        pass
+
+
+class ProbePoolTest(SimpleTestCase):
+    """
+    Tests for the concurrent probes in :mod:`ssl_cert_tracker.nmap`
+    """
+    def setUp(self):
+        with open(nmap_xml.sample_report()) as report:
+            text = report.read()
+
+        # the probes expect one host per report
+        first_host_end = text.index('</host>') + len('</host>')
+        last_host_end = text.rindex('</host>') + len('</host>')
+        FakeNmapProcess.output = text[:first_host_end] + text[last_host_end:]
+        FakeNmapProcess.delay = (0.05, 0.15)
+
+        self.output_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.output_dir)
+        mock.patch.object(nmap, 'NmapProcess', FakeNmapProcess).start()
+        mock.patch.object(nmap.NmapProbe, 'poll_interval', 0.01).start()
+        self.addCleanup(mock.patch.stopall)
+
+    def _rows(self, file_name):
+        with open(os.path.join(self.output_dir, file_name)) as csv_file:
+            return list(csv.DictReader(csv_file))
+
+    def test_certs_in_parallel(self):
+        """
+        test that each target is probed once, concurrently
+        """
+        dns_list = [f'host{index}.example.com' for index in range(32)]
+
+        start = time.perf_counter()
+        nmap.probe_for_certs(
+            dns_list=dns_list, port_list=[443], workers=16, pool='thread',
+            timeout=5, output_dir=self.output_dir)
+        elapsed = time.perf_counter() - start
+
+        found = self._rows('certs_found.csv')
+        self.assertEqual(sorted(row['dns'] for row in found),
+                         sorted(dns_list))
+        self.assertEqual(
+            {row['common_name'] for row in found}, {'*.www.yahoo.com'})
+        self.assertEqual(self._rows('no_certs.csv'), [])
+        self.assertEqual(self._rows('dns_cert_errors.csv'), [])
+
+        # run one at a time, the probes would sleep at least 1.6 seconds
+        self.assertLess(elapsed, len(dns_list) * FakeNmapProcess.delay[0] / 2)
+
+    def test_timeout(self):
+        """
+        test that a probe taking too long is reported as an error
+        """
+        FakeNmapProcess.delay = (1, 1)
+
+        nmap.probe_for_certs(
+            dns_list=['slow.example.com'], port_list=[443, 8443],
+            timeout=0.1, output_dir=self.output_dir)
+
+        errors = self._rows('dns_cert_errors.csv')
+        self.assertEqual(sorted(row['port'] for row in errors),
+                         ['443', '8443'])
+        self.assertIn('did not finish', errors[0]['err'])
+        self.assertEqual(
+            self._rows('no_certs.csv'),
+            [{'dns': 'slow.example.com', 'ports': '443 8443'}])
+
+    def test_state(self):
+        """
+        test that each DNS name ends up in the file matching its state
+        """
+        def resolve(dns):
+            if dns.startswith('unresolved'):
+                raise socket.gaierror('unknown host')
+            return '10.0.0.1'
+
+        with mock.patch.object(nmap.socket, 'gethostbyname', resolve):
+            nmap.probe_for_state(
+                dns_list=['up1.example.com', 'unresolved.example.com',
+                          'up2.example.com'],
+                workers=2, output_dir=self.output_dir)
+
+        self.assertEqual(
+            sorted(self._rows('hosts_open_ports.csv'),
+                   key=lambda row: row['dns']),
+            [{'dns': 'up1.example.com', 'open_ports': '443, 8443'},
+             {'dns': 'up2.example.com', 'open_ports': '443, 8443'}])
+        self.assertEqual(self._rows('unresolved.csv'),
+                         [{'dns': 'unresolved.example.com'}])
+        self.assertEqual(self._rows('hosts_down.csv'), [])